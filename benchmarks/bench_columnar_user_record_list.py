@@ -0,0 +1,54 @@
+"""ColumnarUserRecordList のメモリ使用量ベンチマーク
+
+同じ件数のレコードを FollowingList と ColumnarFollowingList で保持した場合の
+メモリ使用量(tracemalloc で計測した確保量)を比較する
+
+ex: python ./benchmarks/bench_columnar_user_record_list.py --scales 10000 100000 1000000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Iterator
+
+from ff_getter.value_object.columnar_user_record_list import ColumnarFollowingList
+from ff_getter.value_object.user_record import Following
+from ff_getter.value_object.user_record_list import FollowingList
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+
+
+def make_rows(num: int) -> Iterator[tuple[int, str, str]]:
+    """(ID, ユーザ名, スクリーンネーム) の組を1件ずつ作成する"""
+    for i in range(num):
+        yield (1_000_000_000_000 + i, f"ユーザー{i}", f"screen_name_{i}")
+
+
+def measure(num: int, is_columnar: bool) -> int:
+    """レコードリストを作成し、保持し続けているメモリ量[byte]を返す
+
+    文字列もレコードリストの作成中に生成するため、レコードから参照され続ける文字列の分も計測に含まれる
+    """
+    gc.collect()
+    tracemalloc.start()
+    if is_columnar:
+        record_list = ColumnarFollowingList.from_rows(make_rows(num))
+    else:
+        record_list = FollowingList.create([Following.create(*row) for row in make_rows(num)])
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del record_list
+    return current
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Memory benchmark for ColumnarUserRecordList.")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    args = arg_parser.parse_args()
+
+    print(f"{'records':>10} {'list[B/rec]':>12} {'columnar[B/rec]':>16} {'ratio':>8}")
+    for num in args.scales:
+        list_size = measure(num, False)
+        columnar_size = measure(num, True)
+        print(f"{num:>10} {list_size / num:>12.1f} {columnar_size / num:>16.1f} {list_size / columnar_size:>8.1f}")
@@ -0,0 +1,56 @@
+"""DiffRecordList.create_from_diff のベンチマーク
+
+前回と今回のレコードリストを規模ごとに生成し、差分作成にかかる時間を計測する
+件数の 1% が入れ替わった状態(フォロー解除 + 新規フォロー)を想定する
+
+ex: python ./benchmarks/bench_diff_record_list.py --scales 1000 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+from ff_getter.value_object.diff_record_list import DiffRecordList
+from ff_getter.value_object.user_record import UserRecord
+from ff_getter.value_object.user_record_list import UserRecordList
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000]
+CHURN_RATE = 0.01
+
+
+def make_record_lists(num: int) -> tuple[UserRecordList, UserRecordList]:
+    """今回/前回のレコードリストを作成する
+
+    Args:
+        num (int): レコード件数
+
+    Returns:
+        tuple[UserRecordList, UserRecordList]: (今回のレコードリスト, 前回のレコードリスト)
+    """
+    churn_num = max(1, int(num * CHURN_RATE))
+    records = [UserRecord.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in range(num + churn_num)]
+    p_list = UserRecordList.create(records[churn_num:])
+    q_list = UserRecordList.create(records[:num])
+    return p_list, q_list
+
+
+def bench(num: int, repeat: int) -> float:
+    """create_from_diff を repeat 回実行し、最速の実行時間[s]を返す"""
+    p_list, q_list = make_record_lists(num)
+    elapsed_list = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        DiffRecordList.create_from_diff(p_list, q_list)
+        elapsed_list.append(time.perf_counter() - start)
+    return min(elapsed_list)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark for DiffRecordList.create_from_diff.")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(f"{'records':>10} {'elapsed[s]':>12} {'per record[us]':>16}")
+    for num in args.scales:
+        elapsed = bench(num, args.repeat)
+        print(f"{num:>10} {elapsed:>12.4f} {elapsed / num * 1_000_000:>16.3f}")
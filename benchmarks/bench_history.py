@@ -0,0 +1,97 @@
+"""履歴問い合わせのベンチマーク
+
+毎日実行した場合の数年分のイベントログを合成し、History の各問い合わせの所要時間を計測する
+各問い合わせは索引の読み込みも含めて計測する
+
+ex: python ./benchmarks/bench_history.py --days 1095 --follower-num 50000 --churn-rate 0.005
+"""
+
+import argparse
+import datetime
+import random
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from unittest.mock import patch
+
+from ff_getter.event_log import EventLog
+from ff_getter.history import History, Period
+from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+
+DEFAULT_DAYS = 365 * 3
+DEFAULT_FOLLOWER_NUM = 50_000
+DEFAULT_CHURN_RATE = 0.005
+
+
+def make_event_log(event_log: EventLog, days: int, follower_num: int, churn_rate: float) -> int:
+    """毎日 churn_rate の割合で follower が入れ替わるイベントログを作成し、イベント数を返す
+
+    following は follower の1/10の規模で同じ割合で入れ替わるものとする
+    """
+    random_generator = random.Random(0)
+    start_date = datetime.date(2020, 1, 1)
+    user_set_pair = (set(range(follower_num // 10)), set(range(follower_num)))
+    next_id = follower_num
+    event_num = 0
+
+    def iter_diff_run() -> Iterator[tuple[str, DiffFollowingList, DiffFollowerList, None, None]]:
+        nonlocal next_id, event_num
+        for day in range(days):
+            run_id = (start_date + datetime.timedelta(days=day)).strftime("%Y%m%d")
+            diff_list_pair = []
+            for user_set, record_class in zip(user_set_pair, [DiffFollowing, DiffFollower]):
+                churn_num = max(1, int(len(user_set) * churn_rate / 2))
+                removed = random_generator.sample(sorted(user_set), churn_num)
+                added = list(range(next_id, next_id + churn_num))
+                next_id += churn_num
+                user_set.difference_update(removed)
+                user_set.update(added)
+                diff_list_pair.append(
+                    [record_class.create("ADD", i, f"ユーザー{i}", f"screen_name_{i}") for i in added]
+                    + [record_class.create("REMOVE", i, f"ユーザー{i}", f"screen_name_{i}") for i in removed]
+                )
+                event_num += churn_num * 2
+            following_diff, follower_diff = diff_list_pair
+            yield run_id, DiffFollowingList.create(following_diff), DiffFollowerList.create(follower_diff), None, None
+
+    event_log.append_many(iter_diff_run())
+    return event_num
+
+
+def measure(func: Callable, repeat: int = 3) -> float:
+    """func の最短所要時間[s]を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark for history queries.")
+    arg_parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    arg_parser.add_argument("--follower-num", type=int, default=DEFAULT_FOLLOWER_NUM)
+    arg_parser.add_argument("--churn-rate", type=float, default=DEFAULT_CHURN_RATE)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir, patch.object(EventLog, "EVENT_DIRECTORY", work_dir):
+        event_log = EventLog()
+        start = time.perf_counter()
+        event_num = make_event_log(event_log, args.days, args.follower_num, args.churn_rate)
+        print(f"event log: {args.days} runs, {event_num} events, {time.perf_counter() - start:.1f}s to build")
+        print(f"log size: {event_log.log_path.stat().st_size / 1024**2:.1f}MB")
+
+        history = History(event_log)
+        run_id_list = event_log.get_run_id_list()
+        query_dict = {
+            "load index": event_log.load_index,
+            "timeline(id)": lambda: history.timeline(1),
+            "timeline(screen name)": lambda: history.timeline("@screen_name_1"),
+            "diff(1 month)": lambda: history.diff(run_id_list[-31], run_id_list[-1]),
+            "diff(all)": lambda: history.diff(run_id_list[0], run_id_list[-1]),
+            "churn(month)": lambda: history.churn(Period.month),
+        }
+        for name, query in query_dict.items():
+            print(f"{name:>24}: {measure(query):.3f}s")
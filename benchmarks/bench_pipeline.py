@@ -0,0 +1,243 @@
+"""ff_getter / following_syncer の処理段階ごとのベンチマーク
+
+page_generator で合成した GraphQL ページを入力として、規模ごとに以下の各段階の所要時間を計測する
+    parse: 応答(JSON バイト列)のデコード
+    extract: ページからの (id_str, name, screen_name) の取り出し(FetcherBase.to_convert の前半)
+    construct: レコードリストの作成(FetcherBase.to_convert の後半, from_columns)
+    create_from_diff: 前回との差分レコードリストの作成
+    account_init: Account.__init__(dry-run, キャッシュファイルからの読み込み)
+    deff_account: FollowingSyncer._deff_account と同じ following と list の差分計算
+    save_file: Directory.save_file
+    parse_previous_file: 前回実行ファイル(結果ファイル)の読み込み
+    load_last_snapshot: 前回実行時のスナップショットからの読み込み
+    move_old_file: Directory.move_old_file
+follower を指定した規模とし、following はその1/10の規模とする
+前回からは churn_rate の割合のユーザが入れ替わった状態を想定する
+結果は JSON で出力するため、コミット間で比較できる
+
+ex: python ./benchmarks/bench_pipeline.py --scales 1000 10000 100000 1000000 --output bench_pipeline.json
+"""
+
+import argparse
+import datetime
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import PropertyMock, patch
+
+import orjson
+from freezegun import freeze_time
+from page_generator import DEFAULT_ID_BASE, DEFAULT_PAGE_SIZE, iter_pages, make_user_results
+
+from ff_getter.directory import Directory
+from ff_getter.fetcher.fetcher_base import FetcherBase
+from ff_getter.util import FFtype
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+from following_syncer.account import Account
+from following_syncer.reconciler import Reconciler
+from following_syncer.twitter_api import TwitterAPI
+from following_syncer.util import AccountType
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_CHURN_RATE = 0.01
+
+FETCHER_CONFIG = {
+    "twitter_api_client": {
+        "ct0": "dummy_ct0",
+        "auth_token": "dummy_auth_token",
+        "target_screen_name": "dummy_target_screen_name",
+        "target_id": 0,
+    }
+}
+ACCOUNT_CONFIG = {
+    "account": {
+        "screen_name": "dummy_screen_name",
+        "ct0": "dummy_ct0",
+        "auth_token": "dummy_auth_token",
+        "list_id": "dummy_list_id",
+        "diff_solve_each_num": 1,
+    }
+}
+
+
+def make_user_ids(num: int, churn_rate: float) -> tuple[list[int], list[int]]:
+    """(前回のユーザIDリスト, 今回のユーザIDリスト) を作成する
+
+    今回は前回から churn_rate の割合が入れ替わり、新たに加わったユーザは取得時と同じく先頭に並ぶ
+    """
+    churn_num = max(1, int(num * churn_rate))
+    prev_ids = list(range(DEFAULT_ID_BASE, DEFAULT_ID_BASE + num))
+    added_ids = list(range(DEFAULT_ID_BASE + num, DEFAULT_ID_BASE + num + churn_num))
+    return prev_ids, added_ids + prev_ids[: num - churn_num]
+
+
+def iter_encoded_pages(user_ids: list[int], page_size: int) -> Iterator[bytes]:
+    """ページを応答と同じく JSON のバイト列にして1ページずつ返す"""
+    for page in iter_pages(user_ids, page_size):
+        yield orjson.dumps(page)
+
+
+def measure_fetch(
+    stage_dict: dict[str, float], ff_type: FFtype, user_ids: list[int], page_size: int
+) -> FollowingList | FollowerList:
+    """ページのデコード, 取り出し, レコードリストの作成の各段階を計測し、作成したレコードリストを返す
+
+    ページは1つずつ作成してはデコードし、FetcherBase.fetch と同じく1ページ分のみを保持する
+    """
+    fetcher = FetcherBase(FETCHER_CONFIG, ff_type)
+    ids: list[int] = []
+    names: list[str] = []
+    screen_names: list[str] = []
+    for encoded_page in iter_encoded_pages(user_ids, page_size):
+        start = time.perf_counter()
+        page = orjson.loads(encoded_page)
+        stage_dict["parse"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for id_str, name, screen_name in fetcher._iter_page_rows(page):
+            ids.append(int(id_str))
+            names.append(name)
+            screen_names.append(screen_name)
+        stage_dict["extract"] += time.perf_counter() - start
+
+    record_list_class = FollowingList if ff_type == FFtype.following else FollowerList
+    start = time.perf_counter()
+    record_list = record_list_class.from_columns(ids, names, screen_names)
+    stage_dict["construct"] += time.perf_counter() - start
+    return record_list
+
+
+def measure_account(
+    stage_dict: dict[str, float], work_path: Path, following_ids: list[int], list_ids: list[int]
+) -> None:
+    """Account.__init__ と、master_sync と同じ following と list の差分計算を計測する
+
+    Account はキャッシュファイルから読み込む dry-run とし、対象ユーザIDの問い合わせは行わない
+    差分計算は FollowingSyncer._deff_account の本体(Reconciler)を直接呼び出す
+    (following_syncer.main はインポート時にログ設定を読み込むため)
+    """
+    screen_name = ACCOUNT_CONFIG["account"]["screen_name"]
+    list_id = ACCOUNT_CONFIG["account"]["list_id"]
+    (work_path / f"{screen_name}_following.json").write_bytes(orjson.dumps(make_user_results(following_ids)))
+    (work_path / f"{screen_name}_{list_id}_list.json").write_bytes(orjson.dumps(make_user_results(list_ids)))
+
+    with (
+        patch.object(Account, "CACHE_PATH", work_path),
+        patch.object(TwitterAPI, "target_id", new_callable=PropertyMock, return_value=0),
+    ):
+        start = time.perf_counter()
+        account = Account(ACCOUNT_CONFIG, AccountType.master, is_dry_run=True)
+        stage_dict["account_init"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Reconciler(account.following_user).diff(account.list_user)
+    stage_dict["deff_account"] = time.perf_counter() - start
+
+
+def measure_directory(
+    stage_dict: dict[str, float], work_path: Path, prev_lists: tuple, lists: tuple, diff_lists: tuple
+) -> None:
+    """前回分を保存した状態から、save_file, 前回実行ファイルの読み込み, move_old_file を計測する"""
+    # freezegun は time.perf_counter も固定するため、固定前の関数を使う
+    perf_counter = time.perf_counter
+    directory = Directory(is_native_writer=True)
+    object.__setattr__(directory, "RESULT_DIRECTORY", str(work_path / "result"))
+    object.__setattr__(directory, "BACKUP_DIRECTORY", str(work_path / "bak"))
+    object.__setattr__(directory, "SNAPSHOT_DIRECTORY", str(work_path / "snapshot"))
+    Path(directory.RESULT_DIRECTORY).mkdir(parents=True, exist_ok=True)
+    Path(directory.BACKUP_DIRECTORY).mkdir(parents=True, exist_ok=True)
+
+    today = datetime.date(2023, 3, 18)
+    with freeze_time(today - datetime.timedelta(days=1)):
+        last_file_path = directory.save_file(
+            "dummy_target_username", *prev_lists, DiffFollowingList.create(), DiffFollowerList.create(), None
+        )
+
+    start = perf_counter()
+    directory._read_result_file(last_file_path)
+    stage_dict["parse_previous_file"] = perf_counter() - start
+
+    start = perf_counter()
+    directory.load_last_snapshot()
+    stage_dict["load_last_snapshot"] = perf_counter() - start
+
+    with freeze_time(today):
+        start = perf_counter()
+        directory.save_file("dummy_target_username", *lists, *diff_lists, last_file_path)
+        stage_dict["save_file"] = perf_counter() - start
+
+    start = perf_counter()
+    directory.move_old_file(1)
+    stage_dict["move_old_file"] = perf_counter() - start
+
+
+def measure(num: int, args: argparse.Namespace) -> dict[str, float]:
+    """規模 num での各段階の所要時間[s]を返す"""
+    stage_dict = dict.fromkeys(["parse", "extract", "construct"], 0.0)
+    prev_follower_ids, follower_ids = make_user_ids(num, args.churn_rate)
+    prev_following_ids, following_ids = make_user_ids(max(1, num // 10), args.churn_rate)
+
+    prev_lists = (
+        measure_fetch(stage_dict, FFtype.following, prev_following_ids, args.page_size),
+        measure_fetch(stage_dict, FFtype.follower, prev_follower_ids, args.page_size),
+    )
+    # 前回分と今回分の両方を取得した時間とする
+    lists = (
+        measure_fetch(stage_dict, FFtype.following, following_ids, args.page_size),
+        measure_fetch(stage_dict, FFtype.follower, follower_ids, args.page_size),
+    )
+
+    start = time.perf_counter()
+    diff_lists = (
+        DiffFollowingList.create_from_diff(lists[0], prev_lists[0]),
+        DiffFollowerList.create_from_diff(lists[1], prev_lists[1]),
+    )
+    stage_dict["create_from_diff"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        measure_account(stage_dict, Path(work_dir), following_ids, prev_following_ids)
+    with tempfile.TemporaryDirectory() as work_dir:
+        measure_directory(stage_dict, Path(work_dir), prev_lists, lists, diff_lists)
+    return stage_dict
+
+
+def get_commit() -> str | None:
+    """計測したコミットのハッシュを返す, 取得できない場合は None"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark for each stage of ff_getter and following_syncer.")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    arg_parser.add_argument("--churn-rate", type=float, default=DEFAULT_CHURN_RATE)
+    arg_parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    arg_parser.add_argument("--output", type=Path, default=None, help="Write JSON to this path instead of stdout.")
+    args = arg_parser.parse_args()
+
+    result_dict = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "churn_rate": args.churn_rate,
+        "page_size": args.page_size,
+        "results": [],
+    }
+    for num in args.scales:
+        stage_dict = measure(num, args)
+        result_dict["results"].append({"scale": num, "stages": stage_dict})
+        print(f"{num:>10} " + " ".join(f"{k}={v:.3f}" for k, v in stage_dict.items()), file=sys.stderr)
+
+    output = orjson.dumps(result_dict, option=orjson.OPT_INDENT_2) + b"\n"
+    if args.output:
+        args.output.write_bytes(output)
+    else:
+        sys.stdout.buffer.write(output)
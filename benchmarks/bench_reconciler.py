@@ -0,0 +1,66 @@
+"""FollowingSyncer の差分計算(Reconciler)のベンチマーク
+
+master 1アカウントと複数の slave アカウントの following を生成し、
+following_sync と同様に master のインデックスを使い回して全 slave との差分を求める時間を計測する
+各 slave は master の following のうち 1% が入れ替わった状態を想定する
+
+ex: python ./benchmarks/bench_reconciler.py --slaves 1 5 10 --scales 1000 10000 100000
+"""
+
+import argparse
+import time
+
+from following_syncer.reconciler import Reconciler
+from following_syncer.user import FollowingUser
+
+DEFAULT_SLAVE_NUMS = [1, 5, 10]
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+CHURN_RATE = 0.01
+
+
+def make_users(start: int, stop: int) -> list[FollowingUser]:
+    """rest_id が start から stop - 1 の FollowingUser リストを作成する"""
+    return [FollowingUser(f"{i}", f"user_{i}", f"screen_name_{i}") for i in range(start, stop)]
+
+
+def make_accounts(num: int, slave_num: int) -> tuple[list[FollowingUser], list[list[FollowingUser]]]:
+    """master と slave の following を作成する
+
+    Args:
+        num (int): 1アカウントあたりの following 件数
+        slave_num (int): slave アカウント数
+
+    Returns:
+        tuple[list[FollowingUser], list[list[FollowingUser]]]: (master の following, slave ごとの following)
+    """
+    churn_num = max(1, int(num * CHURN_RATE))
+    master = make_users(0, num)
+    slave_list = [make_users(churn_num * (s + 1), num + churn_num * (s + 1)) for s in range(slave_num)]
+    return master, slave_list
+
+
+def bench(num: int, slave_num: int, repeat: int) -> float:
+    """全 slave との差分計算を repeat 回実行し、最速の実行時間[s]を返す"""
+    master, slave_list = make_accounts(num, slave_num)
+    elapsed_list = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reconciler = Reconciler(master)
+        for slave in slave_list:
+            reconciler.diff(slave)
+        elapsed_list.append(time.perf_counter() - start)
+    return min(elapsed_list)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark for following_syncer Reconciler.")
+    arg_parser.add_argument("--slaves", type=int, nargs="+", default=DEFAULT_SLAVE_NUMS)
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(f"{'slaves':>8} {'following':>10} {'elapsed[s]':>12}")
+    for slave_num in args.slaves:
+        for num in args.scales:
+            elapsed = bench(num, slave_num, args.repeat)
+            print(f"{slave_num:>8} {num:>10} {elapsed:>12.4f}")
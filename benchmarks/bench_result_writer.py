@@ -0,0 +1,102 @@
+"""結果ファイル書き出しのベンチマーク
+
+同じ件数のレコードをテンプレート(jinja2)と直接書き出しのそれぞれで保存した場合の所要時間を比較する
+書き出し処理のみ(各レコードの行文字列は作成済)の時間と、
+スナップショットの保存や実行履歴の更新も含めた save_file 全体の時間をそれぞれ計測する
+
+ex: python ./benchmarks/bench_result_writer.py --scales 10000 100000 500000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from ff_getter.directory import Directory
+from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+from ff_getter.value_object.user_record import Follower, Following
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+DEFAULT_SCALES = [10_000, 100_000, 500_000]
+DEFAULT_REPEAT = 3
+
+
+def make_lists(num: int) -> tuple[FollowingList, FollowerList, DiffFollowingList, DiffFollowerList]:
+    """following / follower を num 件ずつ、差分をその1割ずつ作成する"""
+    following_list = FollowingList.create([
+        Following.create(1_000_000_000_000 + i, f"ユーザー{i}", f"screen_name_{i}") for i in range(num)
+    ])
+    follower_list = FollowerList.create([
+        Follower.create(2_000_000_000_000 + i, f"ユーザー{i}, カンマ入り", f"screen_name_{i}") for i in range(num)
+    ])
+    diff_num = num // 10
+    diff_following_list = DiffFollowingList.create([
+        DiffFollowing.create("ADD", 1_000_000_000_000 + i, f"ユーザー{i}", f"screen_name_{i}") for i in range(diff_num)
+    ])
+    diff_follower_list = DiffFollowerList.create([
+        DiffFollower.create("REMOVE", 3_000_000_000_000 + i, f"ユーザー{i}", f"screen_name_{i}")
+        for i in range(diff_num)
+    ])
+    return following_list, follower_list, diff_following_list, diff_follower_list
+
+
+def make_render_dict(lists: tuple) -> dict:
+    """save_file と同じ構成の、書き出し処理に渡す辞書を作成する"""
+    following_list, follower_list, diff_following_list, diff_follower_list = lists
+    return {
+        "today_str": "20230318",
+        "target_username": "dummy_target_username",
+        "following_caption": f"following {len(following_list)}",
+        "following_list": iter(following_list),
+        "follower_caption": f"follower {len(follower_list)}",
+        "follower_list": iter(follower_list),
+        "difference_caption": "difference with nothing (first run)",
+        "diff_following_list": iter(diff_following_list),
+        "diff_follower_list": iter(diff_follower_list),
+    }
+
+
+def measure(work_path: Path, is_native_writer: bool, lists: tuple, repeat: int) -> tuple[float, float, bytes]:
+    """書き出し処理のみと save_file 全体のそれぞれの最短所要時間[s]と、書き出した内容を返す"""
+    directory = Directory(is_native_writer=is_native_writer)
+    object.__setattr__(directory, "RESULT_DIRECTORY", str(work_path / "result"))
+    object.__setattr__(directory, "BACKUP_DIRECTORY", str(work_path / "bak"))
+    object.__setattr__(directory, "SNAPSHOT_DIRECTORY", str(work_path / "snapshot"))
+    Path(directory.RESULT_DIRECTORY).mkdir(parents=True, exist_ok=True)
+    writer = directory._write_native if is_native_writer else directory._write_with_template
+
+    line_lists = tuple([r.line + "\n" for r in record_list] for record_list in lists)
+    writer_best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        writer(work_path / "writer_only.txt", make_render_dict(line_lists))
+        writer_best = min(writer_best, time.perf_counter() - start)
+
+    save_file_best = float("inf")
+    file_path = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        file_path = directory.save_file("dummy_target_username", *lists, None)
+        save_file_best = min(save_file_best, time.perf_counter() - start)
+    return writer_best, save_file_best, file_path.read_bytes()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark for result file writers.")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    arg_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = arg_parser.parse_args()
+
+    header = f"{'records':>10} {'writer':>8} {'template[s]':>12} {'native[s]':>10} {'speedup':>8} {'identical':>10}"
+    print(header)
+    for num in args.scales:
+        lists = make_lists(num)
+        with tempfile.TemporaryDirectory() as work_dir:
+            template_result = measure(Path(work_dir) / "template", False, lists, args.repeat)
+            native_result = measure(Path(work_dir) / "native", True, lists, args.repeat)
+        identical = template_result[2] == native_result[2]
+        for index, label in enumerate(["only", "all"]):
+            template_sec, native_sec = template_result[index], native_result[index]
+            speedup = template_sec / native_sec
+            print(f"{num:>10} {label:>8} {template_sec:>12.3f} {native_sec:>10.3f} {speedup:>8.2f} {identical!s:>10}")
@@ -0,0 +1,99 @@
+"""キーフレームと差分によるスナップショット保存のベンチマーク
+
+毎日実行した場合の following/follower を合成して save_file で保存し、
+毎回全件を保存する場合(keyframe_interval=1)と差分を保存する場合とで、
+保存したファイル(結果ファイルとスナップショット)の合計サイズと save_file の所要時間、
+最も復元に時間のかかる実行分(キーフレーム直前)の read_run の所要時間を比較する
+
+ex: python ./benchmarks/bench_snapshot_chain.py --days 60 --follower-num 50000 --keyframe-interval 30
+"""
+
+import argparse
+import datetime
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from freezegun import freeze_time
+
+from ff_getter.directory import Directory
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+from ff_getter.value_object.user_record import Follower, Following
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+DEFAULT_DAYS = 60
+DEFAULT_FOLLOWER_NUM = 50_000
+DEFAULT_CHURN_RATE = 0.005
+DEFAULT_KEYFRAME_INTERVAL = 30
+
+
+def iter_daily_lists(days: int, follower_num: int, churn_rate: float) -> Iterator[tuple[FollowingList, FollowerList]]:
+    """毎日 churn_rate の割合で入れ替わる following/follower を作成する
+
+    following は follower の1/10の規模とし、新たに加わったユーザは取得時と同じく先頭に並べる
+    """
+    random_generator = random.Random(0)
+    next_id = follower_num
+    id_list_pair = [list(range(follower_num // 10)), list(range(follower_num))]
+    for _ in range(days):
+        for id_list in id_list_pair:
+            churn_num = max(1, int(len(id_list) * churn_rate / 2))
+            removed_set = set(random_generator.sample(id_list, churn_num))
+            id_list[:] = list(range(next_id, next_id + churn_num)) + [i for i in id_list if i not in removed_set]
+            next_id += churn_num
+        following_ids, follower_ids = id_list_pair
+        yield (
+            FollowingList.create([Following.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in following_ids]),
+            FollowerList.create([Follower.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in follower_ids]),
+        )
+
+
+def measure(work_path: Path, keyframe_interval: int, args: argparse.Namespace) -> tuple[int, float, float]:
+    """(保存したファイルの合計サイズ[byte], save_file の平均所要時間[s], read_run の最長所要時間[s]) を返す"""
+    directory = Directory(is_native_writer=True, keyframe_interval=keyframe_interval)
+    object.__setattr__(directory, "RESULT_DIRECTORY", str(work_path / "result"))
+    object.__setattr__(directory, "BACKUP_DIRECTORY", str(work_path / "bak"))
+    object.__setattr__(directory, "SNAPSHOT_DIRECTORY", str(work_path / "snapshot"))
+    Path(directory.RESULT_DIRECTORY).mkdir(parents=True, exist_ok=True)
+
+    # freezegun は time.perf_counter も固定するため、固定前の関数を使う
+    perf_counter = time.perf_counter
+    save_sec = 0.0
+    start_date = datetime.date(2023, 1, 1)
+    prev_following_list, prev_follower_list = FollowingList.create(), FollowerList.create()
+    daily_lists = iter_daily_lists(args.days, args.follower_num, args.churn_rate)
+    for day, (following_list, follower_list) in enumerate(daily_lists):
+        diff_following_list = DiffFollowingList.create_from_diff(following_list, prev_following_list)
+        diff_follower_list = DiffFollowerList.create_from_diff(follower_list, prev_follower_list)
+        with freeze_time(start_date + datetime.timedelta(days=day)):
+            start = perf_counter()
+            directory.save_file(
+                "dummy_target_username", following_list, follower_list, diff_following_list, diff_follower_list, None
+            )
+            save_sec += perf_counter() - start
+        prev_following_list, prev_follower_list = following_list, follower_list
+
+    total_size = sum(path.stat().st_size for path in work_path.rglob("*") if path.is_file())
+    read_sec = 0.0
+    for run in directory.get_run_list()[: max(keyframe_interval, 1)]:
+        start = time.perf_counter()
+        directory.read_run(run)
+        read_sec = max(read_sec, time.perf_counter() - start)
+    return total_size, save_sec / args.days, read_sec
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark for delta-chain snapshot storage.")
+    arg_parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    arg_parser.add_argument("--follower-num", type=int, default=DEFAULT_FOLLOWER_NUM)
+    arg_parser.add_argument("--churn-rate", type=float, default=DEFAULT_CHURN_RATE)
+    arg_parser.add_argument("--keyframe-interval", type=int, default=DEFAULT_KEYFRAME_INTERVAL)
+    args = arg_parser.parse_args()
+
+    print(f"{'keyframe_interval':>18} {'total[MB]':>10} {'save_file[s]':>13} {'read_run max[s]':>16}")
+    for keyframe_interval in [1, args.keyframe_interval]:
+        with tempfile.TemporaryDirectory() as work_dir:
+            total_size, save_sec, read_sec = measure(Path(work_dir), keyframe_interval, args)
+        print(f"{keyframe_interval:>18} {total_size / 1024**2:>10.1f} {save_sec:>13.3f} {read_sec:>16.3f}")
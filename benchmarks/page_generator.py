@@ -0,0 +1,167 @@
+"""ベンチマーク用の合成 GraphQL ページ生成
+
+Following/Followers の GraphQL 応答と同じ構成(instructions -> entries -> user_results)のページを作成する
+FetcherBase.to_convert に渡すページと、Account が読み込む user_results のリストの両方を作成できる
+ユーザ名には実データと同じくカンマや絵文字を含むものを混ぜる
+
+ex:
+    from page_generator import iter_pages, make_user_results
+
+    pages = list(iter_pages(range(10_000)))
+    user_results = make_user_results(range(1_000))
+"""
+
+import random
+from collections.abc import Iterable, Iterator
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_ID_BASE = 1_000_000_000_000
+
+NAME_SUFFIX_LIST = ["", "", "", "🎉", ", カンマ入り", "@休止中", " / 絵描き"]
+
+
+def make_user_result(user_id: int) -> dict:
+    """1ユーザ分の user_results を作成する
+
+    rest_id, legacy.name, legacy.screen_name 以外の項目も実際の応答と同程度に含める
+
+    Args:
+        user_id (int): ユーザID
+
+    Returns:
+        dict: {"result": {...}} 形式の user_results
+    """
+    random_generator = random.Random(user_id)
+    return {
+        "result": {
+            "__typename": "User",
+            "id": f"VXNlcjo{user_id}",
+            "rest_id": str(user_id),
+            "affiliates_highlighted_label": {},
+            "has_graduated_access": True,
+            "is_blue_verified": random_generator.random() < 0.1,
+            "profile_image_shape": "Circle",
+            "legacy": {
+                "can_dm": False,
+                "can_media_tag": True,
+                "created_at": "Sat Mar 18 00:00:00 +0000 2023",
+                "default_profile": False,
+                "default_profile_image": False,
+                "description": f"ユーザー{user_id}のプロフィール",
+                "entities": {"description": {"urls": []}},
+                "fast_followers_count": 0,
+                "favourites_count": random_generator.randrange(100_000),
+                "followers_count": random_generator.randrange(10_000),
+                "friends_count": random_generator.randrange(5_000),
+                "has_custom_timelines": False,
+                "is_translator": False,
+                "listed_count": random_generator.randrange(100),
+                "location": "",
+                "media_count": random_generator.randrange(1_000),
+                "name": f"ユーザー{user_id}{random_generator.choice(NAME_SUFFIX_LIST)}",
+                "normal_followers_count": 0,
+                "pinned_tweet_ids_str": [],
+                "possibly_sensitive": False,
+                "profile_image_url_https": f"https://pbs.twimg.com/profile_images/{user_id}/normal.jpg",
+                "profile_interstitial_type": "",
+                "protected": random_generator.random() < 0.05,
+                "screen_name": f"screen_name_{user_id}",
+                "statuses_count": random_generator.randrange(100_000),
+                "translator_type": "none",
+                "verified": False,
+                "want_retweets": True,
+                "withheld_in_countries": [],
+            },
+        }
+    }
+
+
+def make_user_results(user_ids: Iterable[int]) -> list[dict]:
+    """user_ids の順に user_results のリストを作成する
+
+    TwitterAPI.get_following_list などと同じく、応答から user_results のみを取り出した形式とする
+    """
+    return [make_user_result(user_id) for user_id in user_ids]
+
+
+def make_page(user_ids: Iterable[int], page_index: int, is_last: bool) -> dict:
+    """1ページ分の GraphQL 応答を作成する
+
+    Args:
+        user_ids (Iterable[int]): ページに含めるユーザID
+        page_index (int): ページ番号, カーソルの値に使う
+        is_last (bool): 最終ページかどうか, 最終ページにはユーザのエントリを含めず、bottom カーソルを "0|" で始める
+
+    Returns:
+        dict: Following/Followers の GraphQL 応答
+    """
+    entries = []
+    if not is_last:
+        entries = [
+            {
+                "entryId": f"user-{user_id}",
+                "sortIndex": str(DEFAULT_ID_BASE * 2 - index),
+                "content": {
+                    "entryType": "TimelineTimelineItem",
+                    "__typename": "TimelineTimelineItem",
+                    "itemContent": {
+                        "itemType": "TimelineUser",
+                        "__typename": "TimelineUser",
+                        "user_results": make_user_result(user_id),
+                        "userDisplayType": "User",
+                    },
+                    "clientEventInfo": {"component": "FollowersSgs", "element": "user"},
+                },
+            }
+            for index, user_id in enumerate(user_ids)
+        ]
+    for cursor_type in ["bottom", "top"]:
+        if cursor_type == "bottom":
+            cursor_value = f"{0 if is_last else page_index + 1}|{page_index}"
+        else:
+            cursor_value = f"{page_index - 1}|{page_index}"
+        entries.append({
+            "entryId": f"cursor-{cursor_type}-{page_index}",
+            "sortIndex": str(page_index),
+            "content": {
+                "entryType": "TimelineTimelineCursor",
+                "__typename": "TimelineTimelineCursor",
+                "value": cursor_value,
+                "cursorType": cursor_type.capitalize(),
+            },
+        })
+    instructions = [
+        {"type": "TimelineClearCache"},
+        {"type": "TimelineTerminateTimeline", "direction": "Top"},
+        {"type": "TimelineAddEntries", "entries": entries},
+    ]
+    return {
+        "data": {"user": {"result": {"__typename": "User", "timeline": {"timeline": {"instructions": instructions}}}}}
+    }
+
+
+def iter_pages(user_ids: Iterable[int], page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[dict]:
+    """user_ids の順にユーザを page_size 件ずつ含むページを作成する
+
+    実際の応答と同じく、ユーザを含まないページを最終ページとして最後に返す
+
+    Args:
+        user_ids (Iterable[int]): ページに含めるユーザID
+        page_size (int, optional): 1ページあたりのユーザ数
+
+    Yields:
+        dict: Following/Followers の GraphQL 応答
+    """
+    user_id_list = list(user_ids)
+    page_index = -1
+    for page_index, start in enumerate(range(0, len(user_id_list), page_size)):
+        yield make_page(user_id_list[start : start + page_size], page_index, False)
+    yield make_page([], page_index + 1, True)
+
+
+if __name__ == "__main__":
+    import pprint
+
+    page_list = list(iter_pages(range(DEFAULT_ID_BASE, DEFAULT_ID_BASE + 3), page_size=2))
+    pprint.pprint(len(page_list))
+    pprint.pprint(page_list[0]["data"]["user"]["result"]["timeline"]["timeline"]["instructions"][2]["entries"][0])
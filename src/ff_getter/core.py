@@ -2,6 +2,8 @@ import argparse
 import configparser
 import datetime
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from logging import INFO, getLogger
 from pathlib import Path
@@ -11,10 +13,15 @@ import orjson
 from plyer import notification
 
 from ff_getter.directory import Directory
+from ff_getter.event_log import EventLog
 from ff_getter.fetcher.fetcher_base import FollowerFetcher, FollowingFetcher
 from ff_getter.log_message import Message as Msg
+from ff_getter.metrics import RunMetrics
+from ff_getter.snapshot_chain import SnapshotChain
+from ff_getter.textfile_exporter import TextfileExporter
 from ff_getter.util import Result
 from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -31,12 +38,16 @@ class Core:
         parser (argparse.ArgumentParser): ArgumentParser インスタンス
         config (configparser.ConfigParser): config 設定
         CONFIG_FILE_PATH (str): config 設定ファイルがあるパス
+        METRICS_FILE_PATH (str): 段階ごとの計測結果を追記するファイルパスのデフォルト値
+        TEXTFILE_PATH (str): node_exporter 向けのメトリクスを書き出すファイルパスのデフォルト値
     """
 
     parser: argparse.ArgumentParser | None = None
     config: ClassVar[configparser.ConfigParser]
 
     CONFIG_FILE_PATH = "./config/ff_getter_config.json"
+    METRICS_FILE_PATH = "./metrics/ff_getter_metrics.jsonl"
+    TEXTFILE_PATH = "./metrics/ff_getter.prom"
 
     def __post_init__(self) -> None:
         """初期化後処理"""
@@ -58,110 +69,301 @@ class Core:
         self.config = config
         logger.info(Msg.CORE_INIT_DONE())
 
+    def _fetch(
+        self, fetcher: FollowingFetcher | FollowerFetcher, start_msg: Msg, done_msg: Msg
+    ) -> tuple[FollowingList | FollowerList, float, float]:
+        """fetcher による取得を実行し、開始/終了時刻とともに返す
+
+        Args:
+            fetcher (FollowingFetcher | FollowerFetcher): 実行する fetcher
+            start_msg (Msg): 開始時のログメッセージ
+            done_msg (Msg): 終了時のログメッセージ
+
+        Returns:
+            tuple[FollowingList | FollowerList, float, float]:
+                (取得結果, 開始時刻, 終了時刻), 時刻は time.perf_counter() の値
+        """
+        logger.info(start_msg())
+        start = time.perf_counter()
+        result = fetcher.fetch()
+        end = time.perf_counter()
+        logger.info(done_msg())
+        return result, start, end
+
+    def _write_metrics(self, metrics: RunMetrics, result: Result) -> None:
+        """段階ごとの計測結果をログに出力し、有効ならばファイルに追記する
+
+        計測結果の追記に失敗しても実行結果には影響させない
+
+        Args:
+            metrics (RunMetrics): 今回の実行の計測結果
+            result (Result): 実行結果
+        """
+        for stage in metrics.stage_list:
+            logger.info(Msg.STAGE_METRICS().format(stage.name, stage.wall_sec, stage.cpu_sec, stage.item_num_dict))
+
+        metrics_config = self.config.get("metrics", {})
+        if not metrics_config.get("is_metrics", False):
+            return
+        try:
+            metrics_file_path = Path(metrics_config.get("metrics_file_path", self.METRICS_FILE_PATH))
+            metrics.write(metrics_file_path, result)
+            logger.info(Msg.METRICS_WRITTEN().format(str(metrics_file_path)))
+        except OSError as e:
+            logger.warning(e)
+
+    def _export_textfile(
+        self, metrics: RunMetrics, result: Result, api_call_dict: dict[str, int], retry_dict: dict[str, int]
+    ) -> None:
+        """有効ならば、今回の実行の統計を node_exporter の textfile collector 向けのファイルに書き出す
+
+        各段階の所要時間と件数は計測結果から取り出す
+        書き出しに失敗しても実行結果には影響させない
+
+        Args:
+            metrics (RunMetrics): 今回の実行の計測結果
+            result (Result): 実行結果
+            api_call_dict (dict[str, int]): following/follower それぞれの API 呼び出し回数
+            retry_dict (dict[str, int]): following/follower それぞれのページを取得し直した回数
+        """
+        textfile_config = self.config.get("textfile_exporter", {})
+        if not textfile_config.get("is_textfile_exporter", False):
+            return
+
+        exporter = TextfileExporter("ff_getter")
+        exporter.set("run_success", result == Result.success, "Whether the last run succeeded.")
+        exporter.set("run_timestamp_seconds", time.time(), "Unix time the last run finished.")
+        run_dict = metrics.to_dict(result)
+        exporter.set("run_duration_seconds", run_dict["wall_sec"], "Total duration of the last run.")
+        if run_dict["peak_rss"] is not None:
+            exporter.set("peak_rss_bytes", run_dict["peak_rss"], "Peak resident set size of the last run.")
+        for stage in metrics.stage_list:
+            exporter.set("stage_duration_seconds", stage.wall_sec, "Duration of each stage.", stage=stage.name)
+            exporter.set("stage_cpu_seconds", stage.cpu_sec, "CPU time of each stage.", stage=stage.name)
+            if stage.item_per_sec is not None:
+                exporter.set(
+                    "stage_items_per_second", stage.item_per_sec, "Throughput of each stage.", stage=stage.name
+                )
+            for ff_type, item_num in stage.item_num_dict.items():
+                if stage.name == "fetch":
+                    exporter.set("users", item_num, "Number of fetched users.", ff_type=ff_type)
+                elif stage.name == "diff":
+                    exporter.set(
+                        "diff_users", item_num, "Number of users differing from previous run.", ff_type=ff_type
+                    )
+        for ff_type, api_call_num in api_call_dict.items():
+            exporter.set("api_calls", api_call_num, "Number of API calls to fetch users.", ff_type=ff_type)
+        for ff_type, retry_num in retry_dict.items():
+            exporter.set(
+                "fetch_retries",
+                retry_num,
+                "Number of pages fetched again due to malformed responses.",
+                ff_type=ff_type,
+            )
+
+        try:
+            textfile_path = Path(textfile_config.get("textfile_path", self.TEXTFILE_PATH))
+            exporter.write(textfile_path)
+            logger.info(Msg.TEXTFILE_WRITTEN().format(str(textfile_path)))
+        except OSError as e:
+            logger.warning(e)
+
     def run(self) -> Result:
         """ffgetter メイン実行
 
-        (1)following と follower リストを取得する
+        (1)following と follower リストを並行して取得する
         (2)前回記録した following と follower を前回実行ファイルから取得する(prev_*)
         (3)今回のffと前回のffを比較し、その差分を取得する(diff_*)
         (4)結果をファイルに記録・保存する
         (5)完了通知を行う
         (6)古いファイルを移動させる
         (7)完了後にファイルを開く
+        各段階の所要時間や件数は RunMetrics で計測し、実行ごとに1行の JSON として記録する
 
         Returns:
             FFGetResult: 成功時 SUCCESS, 失敗時 FAILED
         """
         logger.info(Msg.CORE_RUN_START())
+        metrics = RunMetrics()
+        result = Result.failed
+        api_call_dict: dict[str, int] = {}
+        retry_dict: dict[str, int] = {}
         try:
             # (1)ffを取得
-            following_list = None
-            follower_list = None
-            logger.info(Msg.TAC_MODE())
-
-            logger.info(Msg.GET_FOLLOWING_LIST_START())
-            following_fetcher = FollowingFetcher(self.config)
-            following_list = following_fetcher.fetch()
-            logger.info(Msg.GET_FOLLOWING_LIST_DONE())
-
-            logger.info(Msg.GET_FOLLOWER_LIST_START())
-            follower_fetcher = FollowerFetcher(self.config)
-            follower_list = follower_fetcher.fetch()
-            logger.info(Msg.GET_FOLLOWER_LIST_DONE())
+            # following と follower は互いに独立しているため並行して取得する
+            with metrics.stage("fetch") as stage:
+                logger.info(Msg.TAC_MODE())
+                logger.info(Msg.GET_FF_LIST_CONCURRENT_START())
+                following_fetcher = FollowingFetcher(self.config)
+                follower_fetcher = FollowerFetcher(self.config)
+                fetch_start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    following_future = executor.submit(
+                        self._fetch, following_fetcher, Msg.GET_FOLLOWING_LIST_START, Msg.GET_FOLLOWING_LIST_DONE
+                    )
+                    follower_future = executor.submit(
+                        self._fetch, follower_fetcher, Msg.GET_FOLLOWER_LIST_START, Msg.GET_FOLLOWER_LIST_DONE
+                    )
+                    following_list, following_start, following_end = following_future.result()
+                    follower_list, follower_start, follower_end = follower_future.result()
+                fetch_elapsed = time.perf_counter() - fetch_start
+                overlap = max(0.0, min(following_end, follower_end) - max(following_start, follower_start))
+                logger.info(Msg.GET_FF_LIST_ELAPSED().format("following", following_end - following_start))
+                logger.info(Msg.GET_FF_LIST_ELAPSED().format("follower", follower_end - follower_start))
+                logger.info(Msg.GET_FF_LIST_CONCURRENT_ELAPSED().format(fetch_elapsed, overlap))
+                logger.info(Msg.GET_FF_LIST_CONCURRENT_DONE())
+                stage.count(following=len(following_list), follower=len(follower_list))
+                api_call_dict = {
+                    "following": following_fetcher.api_call_num,
+                    "follower": follower_fetcher.api_call_num,
+                }
+                retry_dict = {
+                    "following": following_fetcher.retry_num,
+                    "follower": follower_fetcher.retry_num,
+                }
 
             # (2)前回実行ファイルより前回のffを取得
-            logger.info(Msg.DIRECTORY_INIT_START())
-            directory = Directory()
-            logger.info(Msg.SET_CURRENT_DIRECTORY().format(str(directory.base_path)))
-            logger.info(Msg.DIRECTORY_INIT_DONE())
-
-            logger.info(Msg.GET_PREV_FOLLOWING_LIST_START())
-            prev_following_list = directory.get_last_following()
-            logger.info(Msg.GET_PREV_FOLLOWING_LIST_DONE())
+            with metrics.stage("load_previous") as stage:
+                logger.info(Msg.DIRECTORY_INIT_START())
+                is_native_writer = self.config.get("save_file", {}).get("is_native_writer", False)
+                delta_chain_config = self.config.get("delta_chain", {})
+                keyframe_interval = 1
+                if delta_chain_config.get("is_delta_chain", False):
+                    keyframe_interval = int(
+                        delta_chain_config.get("keyframe_interval", SnapshotChain.DEFAULT_KEYFRAME_INTERVAL)
+                    )
+                directory = Directory(is_native_writer=is_native_writer, keyframe_interval=keyframe_interval)
+                logger.info(Msg.SET_CURRENT_DIRECTORY().format(str(directory.base_path)))
+                logger.info(Msg.DIRECTORY_INIT_DONE())
 
-            logger.info(Msg.GET_PREV_FOLLOWER_LIST_START())
-            prev_follower_list = directory.get_last_follower()
-            logger.info(Msg.GET_PREV_FOLLOWER_LIST_DONE())
+                # 前回実行ファイルは1回だけ読み込み、そのパスは結果保存時にも使い回す
+                logger.info(Msg.GET_PREV_FF_LIST_START())
+                prev_following_list, prev_follower_list, last_file_path = directory.load_last_snapshot()
+                logger.info(Msg.GET_PREV_FF_LIST_DONE())
+                stage.count(following=len(prev_following_list), follower=len(prev_follower_list))
 
             # (3)差分取得
-            logger.info(Msg.GET_DIFF_FOLLOWING_LIST_START())
-            diff_following_list = DiffFollowingList.create_from_diff(following_list, prev_following_list)
-            logger.info(Msg.GET_DIFF_FOLLOWING_LIST_DONE())
+            with metrics.stage("diff") as stage:
+                logger.info(Msg.GET_DIFF_FOLLOWING_LIST_START())
+                diff_following_list = DiffFollowingList.create_from_diff(following_list, prev_following_list)
+                logger.info(Msg.GET_DIFF_FOLLOWING_LIST_DONE())
 
-            logger.info(Msg.GET_DIFF_FOLLOWER_LIST_START())
-            diff_follower_list = DiffFollowerList.create_from_diff(follower_list, prev_follower_list)
-            logger.info(Msg.GET_DIFF_FOLLOWER_LIST_DONE())
+                logger.info(Msg.GET_DIFF_FOLLOWER_LIST_START())
+                diff_follower_list = DiffFollowerList.create_from_diff(follower_list, prev_follower_list)
+                logger.info(Msg.GET_DIFF_FOLLOWER_LIST_DONE())
+                stage.count(following=len(diff_following_list), follower=len(diff_follower_list))
 
             # (4)結果保存
-            logger.info(Msg.SAVE_RESULT_START())
-            target_screen_name = self.config["twitter_api_client"]["target_screen_name"]
-            saved_file_path = directory.save_file(
-                target_screen_name, following_list, follower_list, diff_following_list, diff_follower_list
-            )
-            logger.info(f"file saved to {str(saved_file_path)}.")
-            logger.info(Msg.SAVE_RESULT_DONE())
-
-            # (5)完了通知
-            done_msg = "FFGetter run.\n"
-            done_msg += datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-            done_msg += " Process Done.\n"
-            done_msg += f"follow num : {len(following_list)} , "
-            done_msg += f"follower num : {len(follower_list)}\n"
-
-            is_notify = self.config["notification"]["is_notify"]
-            if is_notify:
-                notification.notify(
-                    title="ffgetter",
-                    message=done_msg,
+            with metrics.stage("save") as stage:
+                logger.info(Msg.SAVE_RESULT_START())
+                target_screen_name = self.config["twitter_api_client"]["target_screen_name"]
+                saved_file_path = directory.save_file(
+                    target_screen_name,
+                    following_list,
+                    follower_list,
+                    diff_following_list,
+                    diff_follower_list,
+                    last_file_path,
                 )
+                logger.info(f"file saved to {str(saved_file_path)}.")
+                logger.info(Msg.SAVE_RESULT_DONE())
+                stage.count(following=len(following_list), follower=len(follower_list))
+
+            # (5)イベントログに今回の差分を追記する
+            if self.config.get("event_log", {}).get("is_event_log", False):
+                with metrics.stage("event_log") as stage:
+                    logger.info(Msg.APPEND_EVENT_LOG_START())
+                    event_log = EventLog()
+                    run_id = directory.get_run_id(saved_file_path)
+                    recorded_set = set()
+                    if event_log.exists():
+                        # 結果ファイルを読み込めず補えなかった実行分は、再度補っても読み込めないため対象外とする
+                        recorded_set = set(event_log.get_run_id_list()) | set(event_log.get_skipped_run_id_list())
+                    imported_list = []
+                    if any(
+                        run["run_id"] not in recorded_set and run["run_id"] != run_id
+                        for run in directory.get_run_list()
+                    ):
+                        # 初回やログが作り直された場合など、ログに無い実行分が目録にあれば既存の結果ファイルから補う
+                        # 記録済の実行IDは追記されず、今回の実行分も未記録であれば含まれる
+                        imported_list = event_log.import_runs(directory)
+                        logger.info(Msg.IMPORT_EVENT_LOG().format(len(imported_list)))
+                        stage.count(run=len(imported_list))
+                    if run_id not in imported_list:
+                        event_log.append(
+                            run_id,
+                            diff_following_list,
+                            diff_follower_list,
+                            len(following_list),
+                            len(follower_list),
+                        )
+                        stage.count(event=len(diff_following_list) + len(diff_follower_list))
+                    logger.info(Msg.APPEND_EVENT_LOG_DONE())
+
+            # (6)完了通知
+            with metrics.stage("notify"):
+                done_msg = "FFGetter run.\n"
+                done_msg += datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+                done_msg += " Process Done.\n"
+                done_msg += f"follow num : {len(following_list)} , "
+                done_msg += f"follower num : {len(follower_list)}\n"
+
+                is_notify = self.config["notification"]["is_notify"]
+                if is_notify:
+                    notification.notify(
+                        title="ffgetter",
+                        message=done_msg,
+                    )
+
+                logger.info("")
+                logger.info(done_msg)
+
+            # (7)古いファイルを移動させる
+            with metrics.stage("move") as stage:
+                is_move_old_file = self.config["move_old_file"]["is_move_old_file"]
+                if is_move_old_file:
+                    logger.info(Msg.MOVE_OLD_FILE_START())
+                    reserved_file_num = int(self.config["move_old_file"]["reserved_file_num"])
+                    moved_list = directory.move_old_file(reserved_file_num)
+                    if moved_list:
+                        moved_file_list = [str(f) for f in moved_list]
+                        logger.info(Msg.MOVE_OLD_FILE_PATH().format(",".join(moved_file_list) + "."))
+                    else:
+                        logger.info(Msg.MOVE_OLD_FILE_PATH().format("No File moved."))
+                    logger.info(Msg.MOVE_OLD_FILE_DONE())
+                    stage.count(file=len(moved_list))
+
+            # (8)バックアップ済の古いファイルを月ごとに圧縮する
+            # 圧縮は目録とスナップショットを書き換えるため、それらを読み書きする他の段階とは並行させない
+            archive_config = self.config.get("archive_old_file", {})
+            if archive_config.get("is_archive_old_file", False):
+                with metrics.stage("archive") as stage:
+                    logger.info(Msg.ARCHIVE_OLD_FILE_START())
+                    reserved_backup_num = int(archive_config.get("reserved_backup_num", 0))
+                    archived_list = directory.archive_old_file(reserved_backup_num)
+                    if archived_list:
+                        logger.info(Msg.ARCHIVE_OLD_FILE_PATH().format(",".join(str(f) for f in archived_list) + "."))
+                    else:
+                        logger.info(Msg.ARCHIVE_OLD_FILE_PATH().format("No File archived."))
+                    logger.info(Msg.ARCHIVE_OLD_FILE_DONE())
+                    stage.count(file=len(archived_list))
 
-            logger.info("")
-            logger.info(done_msg)
-
-            # (6)古いファイルを移動させる
-            is_move_old_file = self.config["move_old_file"]["is_move_old_file"]
-            if is_move_old_file:
-                logger.info(Msg.MOVE_OLD_FILE_START())
-                reserved_file_num = int(self.config["move_old_file"]["reserved_file_num"])
-                moved_list = directory.move_old_file(reserved_file_num)
-                if moved_list:
-                    moved_file_list = [str(f) for f in moved_list]
-                    logger.info(Msg.MOVE_OLD_FILE_PATH().format(",".join(moved_file_list) + "."))
-                else:
-                    logger.info(Msg.MOVE_OLD_FILE_PATH().format("No File moved."))
-                logger.info(Msg.MOVE_OLD_FILE_DONE())
-
-            # (7)完了後にファイルを開く
-            is_after_open = self.config["after_open"]["is_after_open"]
-            if is_after_open:
-                subprocess.Popen(["start", str(saved_file_path)], shell=True)
-                logger.info(Msg.RESULT_FILE_OPENING().format(str(saved_file_path)))
+            # (9)完了後にファイルを開く
+            with metrics.stage("open"):
+                is_after_open = self.config["after_open"]["is_after_open"]
+                if is_after_open:
+                    subprocess.Popen(["start", str(saved_file_path)], shell=True)
+                    logger.info(Msg.RESULT_FILE_OPENING().format(str(saved_file_path)))
 
+            result = Result.success
         except Exception as e:
             logger.error(e)
-            return Result.failed
-        logger.info(Msg.CORE_RUN_DONE())
-        return Result.success
+        finally:
+            self._write_metrics(metrics, result)
+            self._export_textfile(metrics, result, api_call_dict, retry_dict)
+        if result == Result.success:
+            logger.info(Msg.CORE_RUN_DONE())
+        return result
 
 
 if __name__ == "__main__":
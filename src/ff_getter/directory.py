@@ -1,33 +1,91 @@
 import datetime
+import io
 import re
+import shutil
+import zlib
+from collections.abc import Iterable
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import ClassVar
+from types import EllipsisType
+from typing import IO, ClassVar
+from zipfile import ZIP_DEFLATED, ZipFile
 
-from jinja2 import Template
+import orjson
+from jinja2 import Environment, FileSystemLoader, Template
 
+from ff_getter.snapshot import Snapshot, SnapshotDelta
+from ff_getter.snapshot_chain import SnapshotChain
+from ff_getter.util import RunLocation
 from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
 from ff_getter.value_object.user_record import Follower, Following
 from ff_getter.value_object.user_record_list import FollowerList, FollowingList
 
 
+def get_template(template_file_path: str) -> Template:
+    """テンプレートファイルをコンパイルして返す
+
+    テンプレートファイルのディレクトリごとに Environment を1つだけ作成し、コンパイル結果を使い回す
+    テンプレートファイルが更新された場合は Environment により再コンパイルされる
+
+    Args:
+        template_file_path (str): テンプレートファイルのパス
+
+    Returns:
+        Template: コンパイル済のテンプレート
+    """
+    template_path = Path(template_file_path).resolve()
+    return _get_environment(str(template_path.parent)).get_template(template_path.name)
+
+
+@lru_cache(maxsize=None)
+def _get_environment(template_directory: str) -> Environment:
+    """テンプレートディレクトリに対応する Environment を返す"""
+    return Environment(loader=FileSystemLoader(template_directory, encoding="utf-8"))
+
+
 @dataclass(frozen=True)
 class Directory:
     """ディレクトリ操作を司るクラス
+
+    Args:
+        is_native_writer (bool, optional):
+            結果ファイルをテンプレートを使わずに直接書き出すかどうか, デフォルトはFalse
+            出力内容は TEMPLATE_FILE_PATH の既定のテンプレートで出力した場合と同一となる
+        keyframe_interval (int, optional):
+            スナップショットを全件保存する間隔(実行回数), デフォルトは1
+            1の場合は毎回全件を保存する
+            2以上の場合、間の実行分は前回からの差分のみを保存し、結果ファイルにも following/follower の一覧を出力しない
+            各実行分の following/follower は、アーカイブに圧縮した後も含めて read_run で復元できる
+
     Attributes:
         base_path (Path): 基準となるパス
         FILE_NAME_BASE (str): 保存する際の基幹ファイル名, デフォルトは"ff_list"
         TEMPLATE_FILE_PATH (str): 出力内容のテンプレートファイルパス, デフォルトは"./ext/template.txt"
         RESULT_DIRECTORY (str): 保存する際の結果保存ディレクトリ, デフォルトは"./result/"
         BACKUP_DIRECTORY (str): 古い結果を移動させる先のディレクトリ, デフォルトは"./bak/"
+        ARCHIVE_SUFFIX (str): 古い結果を月ごとに圧縮したアーカイブファイルの拡張子, デフォルトは".zip"
+        MANIFEST_FILE_NAME (str): 実行履歴の目録ファイル名, RESULT_DIRECTORY に保存される, デフォルトは"manifest.json"
+        SNAPSHOT_DIRECTORY (str): 差分の基準となるスナップショットの保存ディレクトリ, デフォルトは"./snapshot/"
+        BLOCK_PATTERN (re.Pattern): 結果ファイル中の following/follower ブロックの開始行パターン
+        RECORD_PATTERN (re.Pattern): 結果ファイル中のレコード行パターン
+        WRITE_BUFFER_SIZE (int): 結果ファイルを直接書き出す際のバッファサイズ
     """
 
+    is_native_writer: bool = False
+    keyframe_interval: int = 1
     base_path: ClassVar[Path]
 
     FILE_NAME_BASE = "ff_list"
     TEMPLATE_FILE_PATH = "./ext/template.txt"
     RESULT_DIRECTORY = "./result/"
     BACKUP_DIRECTORY = "./bak/"
+    ARCHIVE_SUFFIX = ".zip"
+    MANIFEST_FILE_NAME = "manifest.json"
+    SNAPSHOT_DIRECTORY = "./snapshot/"
+    BLOCK_PATTERN = re.compile("^(following|follower)")
+    RECORD_PATTERN = re.compile("^(.*?), (.*), (.*?)$")
+    WRITE_BUFFER_SIZE = 1024 * 1024
 
     def __post_init__(self) -> None:
         """初期化後処理"""
@@ -38,108 +96,289 @@ class Directory:
         Path(self.RESULT_DIRECTORY).mkdir(parents=True, exist_ok=True)
         Path(self.BACKUP_DIRECTORY).mkdir(parents=True, exist_ok=True)
 
+    @property
+    def manifest_path(self) -> Path:
+        """実行履歴の目録ファイルパス"""
+        return Path(self.RESULT_DIRECTORY) / self.MANIFEST_FILE_NAME
+
+    @property
+    def snapshot_chain(self) -> SnapshotChain:
+        """各実行時の following/follower の保存先, 削除済の分は BACKUP_DIRECTORY のアーカイブから読み込む"""
+        return SnapshotChain(
+            Path(self.SNAPSHOT_DIRECTORY),
+            self.FILE_NAME_BASE,
+            self.keyframe_interval,
+            Path(self.BACKUP_DIRECTORY),
+            self.ARCHIVE_SUFFIX,
+        )
+
+    def _get_location_path(self, location: RunLocation) -> Path:
+        """保存場所に対応するディレクトリのパスを取得する"""
+        return Path(self.RESULT_DIRECTORY if location == RunLocation.result else self.BACKUP_DIRECTORY)
+
+    def get_run_id(self, file_path: Path) -> str:
+        """結果ファイル名から実行ID(実行日の文字列)を取得する
+
+        Args:
+            file_path (Path): 結果ファイルのパス, ex: "./result/ff_list_20230318.txt"
+
+        Returns:
+            run_id (str): 実行ID, ex: "20230318"
+        """
+        return file_path.stem.removeprefix(f"{self.FILE_NAME_BASE}_")
+
+    def get_archive_path(self, run_id: str) -> Path:
+        """実行IDに対応する月ごとのアーカイブファイルのパスを取得する
+
+        Args:
+            run_id (str): 実行ID(実行日の文字列), ex: "20230318"
+
+        Returns:
+            archive_path (Path): アーカイブファイルのパス, ex: "./bak/ff_list_202303.zip"
+        """
+        return Path(self.BACKUP_DIRECTORY) / f"{self.FILE_NAME_BASE}_{run_id[:6]}{self.ARCHIVE_SUFFIX}"
+
+    def _write_manifest(self, run_list: list[dict]) -> list[dict]:
+        """実行履歴を時系列順に並べて目録ファイルに保存する
+
+        Args:
+            run_list (list[dict]): 実行履歴のリスト
+
+        Returns:
+            run_list (list[dict]): 時系列順に並べた実行履歴のリスト
+        """
+        run_list = sorted(run_list, key=lambda run: (run["run_id"], run["path"]))
+        self.manifest_path.write_bytes(orjson.dumps({"run_list": run_list}, option=orjson.OPT_INDENT_2))
+        return run_list
+
+    def rebuild_manifest(self) -> list[dict]:
+        """RESULT_DIRECTORY と BACKUP_DIRECTORY を走査して目録を作り直す
+
+        目録ファイルが存在しない, 壊れている, 実態と合わない場合に使用する
+        結果ファイルから件数は取得しないため、作り直した実行履歴の件数は None となる
+        アーカイブファイルは中に格納された結果ファイルを実行履歴とする
+
+        Returns:
+            run_list (list[dict]): 時系列順に並べた実行履歴のリスト
+        """
+        run_list = []
+        for location in [RunLocation.result, RunLocation.backup]:
+            for file_path in self._get_location_path(location).glob(f"{self.FILE_NAME_BASE}*"):
+                if file_path.suffix == self.ARCHIVE_SUFFIX:
+                    continue
+                run_list.append({
+                    "run_id": self.get_run_id(file_path),
+                    "timestamp": datetime.datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
+                    "path": file_path.name,
+                    "following_num": None,
+                    "follower_num": None,
+                    "location": location.value,
+                })
+        for archive_path in Path(self.BACKUP_DIRECTORY).glob(f"{self.FILE_NAME_BASE}*{self.ARCHIVE_SUFFIX}"):
+            with ZipFile(archive_path) as archive:
+                for info in archive.infolist():
+                    if Path(info.filename).suffix in [Snapshot.SUFFIX, SnapshotDelta.SUFFIX]:
+                        # 実行分と一緒に圧縮したスナップショットは実行履歴としない
+                        continue
+                    run_list.append({
+                        "run_id": self.get_run_id(Path(info.filename)),
+                        "timestamp": datetime.datetime(*info.date_time).isoformat(),
+                        "path": info.filename,
+                        "following_num": None,
+                        "follower_num": None,
+                        "location": RunLocation.archive.value,
+                        "archive": archive_path.name,
+                    })
+        return self._write_manifest(run_list)
+
+    def get_run_list(self, location: RunLocation | None = None) -> list[dict]:
+        """実行履歴を時系列順に取得する
+
+        目録ファイルが存在しないまたは読み込めない場合は作り直す
+
+        Args:
+            location (RunLocation | None, optional): 指定した場合はその保存場所にある実行履歴のみを返す
+
+        Returns:
+            run_list (list[dict]):
+                時系列順(古い順)に並べた実行履歴のリスト
+                各要素は run_id, timestamp, path, following_num, follower_num, location をキーに持つ
+                location が archive の場合は、格納先のアーカイブファイル名 archive もキーに持つ
+        """
+        run_list: list[dict] = []
+        try:
+            run_list = orjson.loads(self.manifest_path.read_bytes())["run_list"]
+        except (FileNotFoundError, orjson.JSONDecodeError, KeyError, TypeError):
+            run_list = self.rebuild_manifest()
+        if location:
+            run_list = [run for run in run_list if run["location"] == location.value]
+        return run_list
+
     def get_last_file_path(self) -> Path | None:
         """前回実行ファイルのパスを取得する
 
+        実行履歴の目録から取得する
+        目録が指すファイルが存在しない場合は目録を作り直して取得し直す
+
         Returns:
             last_file_path (Path | None): 前回実行ファイルのパス, 存在しないまたは初回実行の場合None
         """
-        last_file_path: Path
+        for is_retry in [False, True]:
+            # RESULT_DIRECTORY 内の実行履歴を時系列順に取得
+            run_list = self.get_run_list(RunLocation.result)
+            if not run_list:
+                # 前回実行ファイルが無かった = 初回実行
+                return None
 
-        # RESULT_DIRECTORY 内の FILE_NAME_BASE をファイル名に持つすべてのファイルパスを取得
-        prev_file_path_list = list(Path(self.RESULT_DIRECTORY).glob(f"{self.FILE_NAME_BASE}*"))
-        if not prev_file_path_list:
-            # 前回実行ファイルが無かった = 初回実行
+            # 前回実行のうち最新のものを保持
+            last_run = run_list[-1]
+            today_datetime = datetime.date.today()
+            today_str = today_datetime.strftime("%Y%m%d")
+            if today_str in last_run["path"]:
+                # 今日と同じ日付がファイル名に含まれる = 初回実行ではないが実行済
+                if len(run_list) > 1:
+                    # 2つ以上見つかっているならば
+                    # 前回ファイルを2つ前のファイルとする = 今日でなく、その前に実行したときのファイル
+                    last_run = run_list[-2]
+                else:
+                    # 本日実行分しかなかったため、前回実行分は無かった
+                    return None
+
+            last_file_path = Path(self.RESULT_DIRECTORY) / last_run["path"]
+            if last_file_path.is_file() or is_retry:
+                break
+            # 目録が実態と合っていないため作り直す
+            self.rebuild_manifest()
+        if not last_file_path.is_file():
             return None
-
-        # 前回実行のうち最新のパスを保持
-        last_file_path = prev_file_path_list[-1]
-        today_datetime = datetime.date.today()
-        today_str = today_datetime.strftime("%Y%m%d")
-        if today_str in last_file_path.name:
-            # 今日と同じ日付がファイル名に含まれる = 初回実行ではないが実行済
-            if len(prev_file_path_list) > 1:
-                # 2つ以上見つかっているならば
-                # 前回ファイルを2つ前のファイルとする = 今日でなく、その前に実行したときのファイル
-                last_file_path = prev_file_path_list[-2]
-            else:
-                # 本日実行分しかなかったため、前回実行分は無かった
-                return None
         return last_file_path
 
-    def get_last_following(self) -> FollowingList:
-        """前回実行ファイル中から following を取得する
+    def _read_result_file(self, file_path: Path) -> tuple[FollowingList, FollowerList]:
+        """結果ファイルを1回の走査で読み込み、following と follower を取得する
+
+        following/follower ブロックはそれぞれキャプション行から次の空行までとする
+
+        Args:
+            file_path (Path): 結果ファイルのパス
 
         Returns:
-            prev_following_list (FollowingList):
-                前回実行ファイルから抽出した FollowingList
-                前回実行ファイルが存在しない場合も FollowingList は返却されるが、その要素は空となる
+            tuple[FollowingList, FollowerList]: 結果ファイルから抽出した FollowingList と FollowerList
+        """
+        with file_path.open("r", encoding="utf-8") as fin:
+            return self._parse_result_lines(fin)
+
+    def _parse_result_lines(self, lines: Iterable[str]) -> tuple[FollowingList, FollowerList]:
+        """結果ファイルの各行から following と follower を取得する
+
+        Args:
+            lines (Iterable[str]): 結果ファイルの各行(改行文字を含む)
+
+        Returns:
+            tuple[FollowingList, FollowerList]: 結果ファイルから抽出した FollowingList と FollowerList
+        """
+        record_dict: dict[str, list[Following] | list[Follower]] = {}
+        record_class_dict: dict[str, type[Following] | type[Follower]] = {
+            "following": Following,
+            "follower": Follower,
+        }
+        block_name: str | None = None
+        for line in lines:
+            if block_name is None:
+                if (m := self.BLOCK_PATTERN.match(line)) and m[1] not in record_dict:
+                    # ブロック読み込み開始
+                    block_name = m[1]
+                    record_dict[block_name] = []
+                else:
+                    continue
+            if line == "\n":
+                # 空行まで読み込んだらブロック終了
+                block_name = None
+                if len(record_dict) == len(record_class_dict):
+                    break
+                continue
+            if m := self.RECORD_PATTERN.match(line):
+                if m[1] == "id":
+                    continue
+                record_dict[block_name].append(record_class_dict[block_name].create(m[1], m[2], m[3]))
+        return (
+            FollowingList.create(record_dict.get("following", [])),
+            FollowerList.create(record_dict.get("follower", [])),
+        )
+
+    def read_run(self, run: dict) -> tuple[FollowingList, FollowerList]:
+        """実行履歴が示す実行時の following と follower を取得する
+
+        スナップショット(キーフレームと差分)から復元できる場合はそちらを優先し、できない場合は結果ファイルを読み込む
+        アーカイブに格納されている場合は、アーカイブから対象のファイルのみを読み込む
+
+        Args:
+            run (dict): get_run_list で取得した実行履歴の要素
+
+        Raises:
+            FileNotFoundError: 結果ファイルが存在しない場合
+
+        Returns:
+            tuple[FollowingList, FollowerList]: 実行時の FollowingList と FollowerList
+        """
+        location = RunLocation(run["location"])
+        file_path = self._get_location_path(location) / run["path"]
+        if run_lists := self.snapshot_chain.load(self.get_run_id(file_path)):
+            return run_lists
+        if location == RunLocation.archive:
+            with self.open_archived_file(run["path"]) as fin:
+                return self._parse_result_lines(io.TextIOWrapper(fin, encoding="utf-8"))
+        return self._read_result_file(file_path)
+
+    def load_last_snapshot(self) -> tuple[FollowingList, FollowerList, Path | None]:
+        """前回実行時の following と follower をまとめて取得する
+
+        前回実行時のスナップショット(キーフレームと差分)から復元できる場合はそちらから取得する
+        存在しない場合は前回実行ファイルを1回だけ走査して両方を取得する
+
+        Returns:
+            tuple[FollowingList, FollowerList, Path | None]:
+                (前回の FollowingList, 前回の FollowerList, 前回実行ファイルのパス)
+                前回実行ファイルが存在しない場合は、要素が空のリストと None を返す
         """
         # 前回実行ファイルパス取得
         last_file_path = self.get_last_file_path()
         if not last_file_path:
-            return FollowingList.create()
+            return FollowingList.create(), FollowerList.create(), None
+
+        # スナップショットから復元できればそちらを優先する
+        if run_lists := self.snapshot_chain.load(self.get_run_id(last_file_path)):
+            prev_following_list, prev_follower_list = run_lists
+            return prev_following_list, prev_follower_list, last_file_path
 
         # 前回実行ファイルを読み込む
-        pattern = "^(.*?), (.*), (.*?)$"
-        read_flag = False
-        prev_following_list = []
-        with last_file_path.open("r", encoding="utf-8") as fin:
-            for line in fin:
-                if not read_flag and re.findall("^following(.*)", line):
-                    # following ブロック読み込み開始
-                    read_flag = True
-                if read_flag and line == "\n":
-                    # 空行まで読み込んだら終了
-                    break
-                if read_flag and (records := re.findall(pattern, line)):
-                    record = records[0]
-                    if record[0] == "id":
-                        continue
-                    prev_following = Following.create(
-                        record[0],
-                        record[1],
-                        record[2],
-                    )
-                    prev_following_list.append(prev_following)
-        return FollowingList.create(prev_following_list)
+        prev_following_list, prev_follower_list = self._read_result_file(last_file_path)
+        return prev_following_list, prev_follower_list, last_file_path
+
+    def get_last_following(self) -> FollowingList:
+        """前回実行ファイル中から following を取得する
+
+        following と follower の両方が必要な場合は load_last_snapshot を使うこと
+
+        Returns:
+            prev_following_list (FollowingList):
+                前回実行ファイルから抽出した FollowingList
+                前回実行ファイルが存在しない場合も FollowingList は返却されるが、その要素は空となる
+        """
+        prev_following_list, _, _ = self.load_last_snapshot()
+        return prev_following_list
 
     def get_last_follower(self) -> FollowerList:
         """前回実行ファイル中から follower を取得する
 
+        following と follower の両方が必要な場合は load_last_snapshot を使うこと
+
         Returns:
             prev_follower_list (FollowerList):
                 前回実行ファイルから抽出した FollowerList
                 前回実行ファイルが存在しない場合も FollowerList は返却されるが、その要素は空となる
         """
-        # 前回実行ファイルパス取得
-        last_file_path = self.get_last_file_path()
-        if not last_file_path:
-            return FollowerList.create()
-
-        # 前回実行ファイルを読み込む
-        pattern = "^(.*?), (.*), (.*?)$"
-        read_flag = False
-        prev_follower_list = []
-        with last_file_path.open("r", encoding="utf-8") as fin:
-            for line in fin:
-                if not read_flag and re.findall("^follower(.*)", line):
-                    # follower ブロック読み込み開始
-                    read_flag = True
-                if read_flag and line == "\n":
-                    # 空行まで読み込んだら終了
-                    break
-                if read_flag and (records := re.findall(pattern, line)):
-                    record = records[0]
-                    if record[0] == "id":
-                        continue
-                    prev_follower = Follower.create(
-                        record[0],
-                        record[1],
-                        record[2],
-                    )
-                    prev_follower_list.append(prev_follower)
-        return FollowerList.create(prev_follower_list)
+        _, prev_follower_list, _ = self.load_last_snapshot()
+        return prev_follower_list
 
     def save_file(
         self,
@@ -148,70 +387,156 @@ class Directory:
         follower_list: FollowerList,
         diff_following_list: DiffFollowingList,
         diff_follower_list: DiffFollowerList,
+        last_file_path: Path | None | EllipsisType = ...,
     ) -> Path:
         """結果をファイルに保存する
 
+        次回実行時の差分の基準として、同じ内容のスナップショットも保存する
+        スナップショットを差分として保存した場合は、結果ファイルには following/follower の一覧を出力しない
+
         Args:
             target_username (str): 操作対象の username
             following_list (FollowingList): 今回取得した FollowingList
             follower_list (FollowerList): 今回取得した FollowerList
             diff_following_list (DiffFollowingList): 前回との差分を格納した DiffFollowingList
             diff_follower_list (DiffFollowerList): 前回との差分を格納した DiffFollowerList
+            last_file_path (Path | None, optional):
+                load_last_snapshot で取得した前回実行ファイルのパス, 初回実行の場合None
+                省略した場合は改めて前回実行ファイルを探す
 
         Returns:
             file_path (Path): 保存したファイルのパス
         """
         # 前回ファイルがあるならパスを取得
-        last_file_path: Path | None = self.get_last_file_path()
+        if last_file_path is ...:
+            last_file_path = self.get_last_file_path()
 
         # 保存ファイルパスを生成
         today_datetime = datetime.date.today()
         today_str = today_datetime.strftime("%Y%m%d")
         file_path = Path(self.RESULT_DIRECTORY) / f"{self.FILE_NAME_BASE}_{today_str}.txt"
 
-        # 引数のリストを文字列リストに変換
-        t_following_list = [r.line + "\n" for r in following_list]
-        t_follower_list = [r.line + "\n" for r in follower_list]
-        t_diff_following_list = [r.line + "\n" for r in diff_following_list]
-        t_diff_follower_list = [r.line + "\n" for r in diff_follower_list]
+        # 次回実行時の差分の基準として、キーフレームまたは前回からの差分を保存する
+        snapshot_path = self.snapshot_chain.save(today_str, following_list, follower_list)
+        is_omit_list = snapshot_path.suffix == SnapshotDelta.SUFFIX
 
         # 各プロックのキャプション設定
-        following_num = len(t_following_list)
-        follower_num = len(t_follower_list)
+        following_num = len(following_list)
+        follower_num = len(follower_list)
         following_caption = f"following {following_num}"
         follower_caption = f"follower {follower_num}"
+        if is_omit_list:
+            # 一覧はキーフレームと差分から復元できるため出力しない
+            following_caption += f" (omitted, saved as {snapshot_path.name})"
+            follower_caption += f" (omitted, saved as {snapshot_path.name})"
         difference_caption = ""
         if last_file_path:
             difference_caption = f"difference with {last_file_path.name}"
         else:
             difference_caption = f"difference with nothing (first run)"
 
-        # テンプレートファイル読み込み
-        template_str = Path(self.TEMPLATE_FILE_PATH).read_text(encoding="utf8")
-
-        # レンダリング
-        template: Template = Template(template_str)
-        rendered_str = template.render({
+        # 書き出しながらファイルに保存する
+        # 各レコードは1行ずつ文字列に変換し、結果全体を1つの文字列として保持しない
+        render_dict = {
             "today_str": today_str,
             "target_username": target_username,
             "following_caption": following_caption,
-            "following_list": t_following_list,
+            "following_list": (r.line + "\n" for r in ([] if is_omit_list else following_list)),
             "follower_caption": follower_caption,
-            "follower_list": t_follower_list,
+            "follower_list": (r.line + "\n" for r in ([] if is_omit_list else follower_list)),
             "difference_caption": difference_caption,
-            "diff_following_list": t_diff_following_list,
-            "diff_follower_list": t_diff_follower_list,
+            "diff_following_list": (r.line + "\n" for r in diff_following_list),
+            "diff_follower_list": (r.line + "\n" for r in diff_follower_list),
+        }
+        if self.is_native_writer:
+            self._write_native(file_path, render_dict)
+        else:
+            self._write_with_template(file_path, render_dict)
+
+        # 実行履歴の目録を更新(同日に再実行した場合は上書き)
+        run_list = [run for run in self.get_run_list() if run["path"] != file_path.name]
+        run_list.append({
+            "run_id": today_str,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "path": file_path.name,
+            "following_num": following_num,
+            "follower_num": follower_num,
+            "location": RunLocation.result.value,
         })
-
-        # ファイル保存
-        file_path.write_text(rendered_str, encoding="utf-8")
+        self._write_manifest(run_list)
         return file_path
 
+    def _write_with_template(self, file_path: Path, render_dict: dict) -> None:
+        """テンプレートをレンダリングしながら結果ファイルに書き出す
+
+        Args:
+            file_path (Path): 保存先のパス
+            render_dict (dict): テンプレートに渡す値の辞書
+        """
+        # テンプレート取得(コンパイル済のものを使い回す)
+        template: Template = get_template(self.TEMPLATE_FILE_PATH)
+        with file_path.open("w", encoding="utf-8") as fout:
+            fout.writelines(template.generate(render_dict))
+
+    def _write_native(self, file_path: Path, render_dict: dict) -> None:
+        """テンプレートを使わずに結果ファイルを直接書き出す
+
+        既定のテンプレート(ext/template.txt)と同じレイアウトで書き出す
+
+        Args:
+            file_path (Path): 保存先のパス
+            render_dict (dict): テンプレートに渡す値の辞書と同じ構成の辞書
+        """
+        with file_path.open("w", encoding="utf-8", buffering=self.WRITE_BUFFER_SIZE) as fout:
+            fout.write(f"{render_dict['today_str']} {render_dict['target_username']}\n")
+            fout.write(f"{render_dict['following_caption']}\n")
+            fout.write("id, name, screen_name\n")
+            fout.writelines(render_dict["following_list"])
+            fout.write("\n")
+            fout.write(f"{render_dict['follower_caption']}\n")
+            fout.write("id, name, screen_name\n")
+            fout.writelines(render_dict["follower_list"])
+            fout.write("\n")
+            fout.write(f"{render_dict['difference_caption']}\n")
+            fout.write("following\n")
+            fout.write("diff_type, id, name, screen_name\n")
+            fout.writelines(render_dict["diff_following_list"])
+            fout.write("\n")
+            fout.write("follower\n")
+            fout.write("diff_type, id, name, screen_name\n")
+            fout.writelines(render_dict["diff_follower_list"])
+
+    def _prune_snapshot(self, run_list: list[dict]) -> list[Path]:
+        """復元に必要な分を残して古いスナップショットを削除する
+
+        RESULT_DIRECTORY にある実行分と、一覧を差分としてのみ保存している BACKUP_DIRECTORY の実行分は復元できるよう残す
+        それより前の実行分は、結果ファイルに一覧が出力されているか、アーカイブにスナップショットごと圧縮済である
+
+        Args:
+            run_list (list[dict]): 実行履歴のリスト
+
+        Returns:
+            pruned_list (list[Path]): 削除したスナップショットのファイルパスリスト
+        """
+        snapshot_chain = self.snapshot_chain
+        entry_dict = dict(snapshot_chain.get_entry_list())
+        retained_run_id_list = [
+            run["run_id"]
+            for run in run_list
+            if run["location"] == RunLocation.result.value
+            or (run["location"] == RunLocation.backup.value and entry_dict.get(run["run_id"]) is False)
+        ]
+        if not retained_run_id_list:
+            return []
+        return snapshot_chain.prune(min(retained_run_id_list))
+
     def move_old_file(self, reserved_file_num: int) -> list[str] | FileExistsError:
         """古いファイルを移動させる
 
         RESULT_DIRECTORY に存在する reserved_file_num 個を超える分の古いファイルを
         BACKUP_DIRECTORY に移動させる
+        移動対象は実行履歴の目録から時系列順に決定し、移動後に目録を更新する
+        移動後は、復元に必要なくなった古いスナップショットを削除する
 
         Args:
             reserved_file_num (int): RESULT_DIRECTORY に残すファイル数
@@ -227,28 +552,153 @@ class Directory:
 
         result_path = Path(self.RESULT_DIRECTORY)
         backup_path = Path(self.BACKUP_DIRECTORY)
-        file_path_list = list(result_path.glob(f"{self.FILE_NAME_BASE}*"))
-        if len(file_path_list) <= reserved_file_num:
+        run_list = self.get_run_list()
+        result_run_list = [run for run in run_list if run["location"] == RunLocation.result.value]
+        if len(result_run_list) <= reserved_file_num:
             return []
 
         moved_list = []
-        to_move_index = len(file_path_list) - reserved_file_num
-        to_move_file_list = file_path_list[:to_move_index]
-        for to_move_file in to_move_file_list:
-            # すでに移動先に同じ名前のファイルが存在している場合は
-            # FileExistsError が発生する
-            to_move_file.rename(backup_path / to_move_file.name)
-            moved_list.append(backup_path / to_move_file.name)
+        to_move_index = len(result_run_list) - reserved_file_num
+        to_move_run_list = result_run_list[:to_move_index]
+        try:
+            for to_move_run in to_move_run_list:
+                # すでに移動先に同じ名前のファイルが存在している場合は
+                # FileExistsError が発生する
+                to_move_file = result_path / to_move_run["path"]
+                if not to_move_file.is_file():
+                    # 目録にあるが実態が無いものは目録から除外する
+                    run_list.remove(to_move_run)
+                    continue
+                if backup_path.joinpath(to_move_file.name).exists():
+                    raise FileExistsError(f"{backup_path / to_move_file.name} is already exist.")
+                to_move_file.rename(backup_path / to_move_file.name)
+                to_move_run["location"] = RunLocation.backup.value
+                moved_list.append(backup_path / to_move_file.name)
+        finally:
+            # 途中で失敗した場合も、移動できた分は目録に反映する
+            self._write_manifest(run_list)
+        self._prune_snapshot(run_list)
         return moved_list
 
+    def archive_old_file(self, reserved_backup_num: int) -> list[Path]:
+        """BACKUP_DIRECTORY の古いファイルを月ごとのアーカイブに圧縮する
+
+        BACKUP_DIRECTORY に存在する reserved_backup_num 個を超える分の古いファイルを、
+        実行月ごとのアーカイブファイル(zip)に追加して元のファイルを削除する
+        アーカイブ内の各ファイルは個別に圧縮されるため、1つだけを取り出す際にアーカイブ全体を展開する必要はない
+        アーカイブへの追加は一時ファイル上で行い、完了してから置き換える
+        対象は実行履歴の目録から時系列順に決定し、圧縮後に目録を更新する
+        対象の実行分のスナップショット(キーフレームまたは差分)も同じアーカイブに追加し、
+        圧縮後は復元に必要なくなった古いスナップショットを削除する
+
+        Args:
+            reserved_backup_num (int): BACKUP_DIRECTORY に圧縮せずに残すファイル数
+
+        Raises:
+            FileExistsError: アーカイブ内に同じ名前で内容の異なるファイルが存在している場合
+
+        Returns:
+            archived_list (list[Path]): ファイルを追加したアーカイブファイルのパスリスト
+        """
+        if not isinstance(reserved_backup_num, int) or reserved_backup_num < 0:
+            return []
+
+        backup_path = Path(self.BACKUP_DIRECTORY)
+        run_list = self.get_run_list()
+        backup_run_list = [run for run in run_list if run["location"] == RunLocation.backup.value]
+        if len(backup_run_list) <= reserved_backup_num:
+            return []
+
+        # 圧縮対象を実行月ごとにまとめる
+        to_archive_index = len(backup_run_list) - reserved_backup_num
+        to_archive_dict: dict[Path, list[dict]] = {}
+        for to_archive_run in backup_run_list[:to_archive_index]:
+            if not (backup_path / to_archive_run["path"]).is_file():
+                # 目録にあるが実態が無いものは目録から除外する
+                run_list.remove(to_archive_run)
+                continue
+            archive_path = self.get_archive_path(to_archive_run["run_id"])
+            to_archive_dict.setdefault(archive_path, []).append(to_archive_run)
+
+        snapshot_chain = self.snapshot_chain
+        archived_list = []
+        try:
+            for archive_path, to_archive_run_list in to_archive_dict.items():
+                crc_dict: dict[str, int] = {}
+                if archive_path.is_file():
+                    with ZipFile(archive_path) as archive:
+                        crc_dict = {info.filename: info.CRC for info in archive.infolist()}
+
+                to_write_file_list = []
+                for to_archive_run in to_archive_run_list:
+                    to_archive_file_list = [backup_path / to_archive_run["path"]]
+                    for is_keyframe in [True, False]:
+                        snapshot_path = snapshot_chain.get_path(to_archive_run["run_id"], is_keyframe)
+                        if snapshot_path.is_file():
+                            to_archive_file_list.append(snapshot_path)
+                    for to_archive_file in to_archive_file_list:
+                        if to_archive_file.name not in crc_dict:
+                            to_write_file_list.append(to_archive_file)
+                            continue
+                        # 前回中断した場合などで、すでに同じ内容が格納されているならば追加しない
+                        if crc_dict[to_archive_file.name] != zlib.crc32(to_archive_file.read_bytes()):
+                            raise FileExistsError(f"{to_archive_file.name} is already exist in {archive_path}.")
+
+                if to_write_file_list:
+                    tmp_path = archive_path.with_name(f".{archive_path.name}.tmp")
+                    tmp_path.unlink(missing_ok=True)
+                    if archive_path.is_file():
+                        shutil.copyfile(archive_path, tmp_path)
+                    with ZipFile(tmp_path, "a", compression=ZIP_DEFLATED) as archive:
+                        for to_archive_file in to_write_file_list:
+                            archive.write(to_archive_file, arcname=to_archive_file.name)
+                    tmp_path.replace(archive_path)
+
+                # アーカイブの書き込みが完了してから元のファイルを削除する
+                for to_archive_run in to_archive_run_list:
+                    (backup_path / to_archive_run["path"]).unlink()
+                    to_archive_run["location"] = RunLocation.archive.value
+                    to_archive_run["archive"] = archive_path.name
+                archived_list.append(archive_path)
+        finally:
+            # 途中で失敗した場合も、圧縮できた分は目録に反映する
+            self._write_manifest(run_list)
+        self._prune_snapshot(run_list)
+        return archived_list
+
+    def open_archived_file(self, file_name: str) -> IO[bytes]:
+        """アーカイブに格納された結果ファイルを1つだけ開く
+
+        アーカイブ全体は展開せず、対象のファイルのみを読み込みながら展開する
+        返り値のストリームは使用後に閉じること
+
+        Args:
+            file_name (str): 結果ファイル名, ex: "ff_list_20230318.txt"
+
+        Raises:
+            FileNotFoundError: 結果ファイルがアーカイブに格納されていない場合
+
+        Returns:
+            IO[bytes]: 結果ファイルの内容を読み込むバイナリストリーム
+        """
+        # 格納先のアーカイブはファイル名の実行月から決まる
+        archive_path = self.get_archive_path(self.get_run_id(Path(file_name)))
+        if not archive_path.is_file():
+            raise FileNotFoundError(f"{archive_path} is not exist.")
+
+        # ストリームを閉じるまでアーカイブファイルは開いたままとなる
+        with ZipFile(archive_path) as archive:
+            if file_name not in archive.namelist():
+                raise FileNotFoundError(f"{file_name} is not found in {archive_path}.")
+            return archive.open(file_name)
+
 
 if __name__ == "__main__":
     directory = Directory()
     print(directory)
 
-    prev_following_list = directory.get_last_following()
+    prev_following_list, prev_follower_list, last_file_path = directory.load_last_snapshot()
     print(len(prev_following_list))
-    prev_follower_list = directory.get_last_follower()
     print(len(prev_follower_list))
 
     from ff_getter.value_object.diff_record_list import DiffType
@@ -269,7 +719,7 @@ if __name__ == "__main__":
     diff_following = DiffFollowingList.create_from_diff(following_list1, following_list2)
     diff_follower = DiffFollowerList.create_from_diff(following_list1, following_list2)
     rendered_str = directory.save_file(
-        user_name.name, prev_following_list, prev_follower_list, diff_following, diff_follower
+        user_name.name, prev_following_list, prev_follower_list, diff_following, diff_follower, last_file_path
     )
     print(rendered_str)
 
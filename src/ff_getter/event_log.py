@@ -0,0 +1,610 @@
+import datetime
+import hashlib
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar, Self
+
+import orjson
+
+from ff_getter.directory import Directory
+from ff_getter.util import FFtype
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList, DiffRecordList
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+
+class UserOffsetTable:
+    """ユーザIDごとのイベントレコードの位置と、スクリーンネームからユーザIDへの対応を保持する表
+
+    どちらもソート済の数値配列の組として保持し、二分探索で引く
+    スクリーンネームは小文字にしたものの64bitハッシュ値で保持する
+    読み込みはファイル全体を一度に行い、各配列はコピーせずにそのまま参照する
+
+    ファイル構成(数値はすべてリトルエンディアンの符号なし64bit整数):
+        ヘッダ: MAGIC, 反映済のログのバイト長, 位置の件数, スクリーンネームの件数
+        数値部: ユーザIDの配列, 位置の配列 (ユーザID, 位置の順にソート済),
+                スクリーンネームのハッシュ値の配列, ユーザIDの配列 (ハッシュ値, ユーザIDの順にソート済, 重複なし)
+
+    Attributes:
+        MAGIC (bytes): ファイル先頭に記録する識別子
+    """
+
+    log_size: int
+
+    MAGIC = b"FFEVIX01"
+    _HEADER = struct.Struct("<8s3Q")
+    _ITEM_SIZE = 8
+
+    def __init__(self, buffer: bytes) -> None:
+        """表のバイト列を解釈する
+
+        Args:
+            buffer (bytes): 表のファイルの内容
+
+        Raises:
+            ValueError: 表として解釈できない場合
+        """
+        if len(buffer) < self._HEADER.size:
+            raise ValueError("user offset table is too short.")
+        magic, self.log_size, offset_num, screen_name_num = self._HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC:
+            raise ValueError("user offset table magic is invalid.")
+        if len(buffer) != self._HEADER.size + 2 * (offset_num + screen_name_num) * self._ITEM_SIZE:
+            raise ValueError("user offset table size is invalid.")
+
+        view = memoryview(buffer)
+        numeric_offset = self._HEADER.size
+        self.offset_user_ids, numeric_offset = self._take_numeric(view, numeric_offset, offset_num)
+        self.offsets, numeric_offset = self._take_numeric(view, numeric_offset, offset_num)
+        self.screen_name_hashes, numeric_offset = self._take_numeric(view, numeric_offset, screen_name_num)
+        self.screen_name_user_ids, numeric_offset = self._take_numeric(view, numeric_offset, screen_name_num)
+
+    def _take_numeric(self, view: memoryview, offset: int, num: int) -> tuple[memoryview, int]:
+        """view の offset から num 個の数値配列を取り出し、(配列, 次のオフセット) を返す"""
+        end = offset + num * self._ITEM_SIZE
+        if sys.byteorder == "little":
+            return view[offset:end].cast("Q"), end
+        # ビッグエンディアン環境ではコピーしてバイトオーダーを変換する
+        values = array("Q", view[offset:end])
+        values.byteswap()
+        return memoryview(values), end
+
+    @staticmethod
+    def hash_screen_name(screen_name: str) -> int:
+        """スクリーンネームを大文字小文字を区別しない64bitハッシュ値に変換する"""
+        digest = hashlib.blake2b(screen_name.lower().encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def get_offset_list(self, user_id: int) -> list[int]:
+        """ユーザIDのイベントレコードの位置をログ中の順に取得する"""
+        start = bisect_left(self.offset_user_ids, user_id)
+        end = bisect_right(self.offset_user_ids, user_id, lo=start)
+        return list(self.offsets[start:end])
+
+    def get_user_id_list(self, screen_name: str) -> list[int]:
+        """スクリーンネームからユーザIDを取得する, ハッシュ値が衝突した場合は他のユーザIDも含みうる"""
+        screen_name_hash = self.hash_screen_name(screen_name)
+        start = bisect_left(self.screen_name_hashes, screen_name_hash)
+        end = bisect_right(self.screen_name_hashes, screen_name_hash, lo=start)
+        return list(self.screen_name_user_ids[start:end])
+
+    @classmethod
+    def dumps(
+        cls,
+        log_size: int,
+        base: Self | None,
+        offset_pair_list: list[tuple[int, int]],
+        screen_name_pair_list: list[tuple[int, int]],
+    ) -> bytes:
+        """既存の表に追加分を合わせた表のバイト列を作成する
+
+        Args:
+            log_size (int): 反映済のログのバイト長
+            base (Self | None): 既存の表, Noneの場合は追加分のみから作成する
+            offset_pair_list (list[tuple[int, int]]): 追加する (ユーザID, 位置) のリスト
+            screen_name_pair_list (list[tuple[int, int]]): 追加する (スクリーンネームのハッシュ値, ユーザID) のリスト
+
+        Returns:
+            bytes: 表のバイト列
+        """
+        if base is not None:
+            offset_pair_list = list(zip(base.offset_user_ids, base.offsets)) + offset_pair_list
+            screen_name_pair_list = (
+                list(zip(base.screen_name_hashes, base.screen_name_user_ids)) + screen_name_pair_list
+            )
+        offset_pair_list = sorted(offset_pair_list)
+        screen_name_pair_list = sorted(set(screen_name_pair_list))
+
+        numeric_list = [
+            array("Q", [pair[0] for pair in offset_pair_list]),
+            array("Q", [pair[1] for pair in offset_pair_list]),
+            array("Q", [pair[0] for pair in screen_name_pair_list]),
+            array("Q", [pair[1] for pair in screen_name_pair_list]),
+        ]
+        if sys.byteorder != "little":
+            for values in numeric_list:
+                values.byteswap()
+        header = cls._HEADER.pack(cls.MAGIC, log_size, len(offset_pair_list), len(screen_name_pair_list))
+        return b"".join([header, *numeric_list])
+
+    @classmethod
+    def load(cls, table_path: Path) -> Self:
+        """表のファイルを読み込む
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+            ValueError: 表として解釈できない場合
+        """
+        return cls(table_path.read_bytes())
+
+
+@dataclass(frozen=True)
+class EventLog:
+    """follow/unfollow のイベントを全実行分記録する追記専用のログ
+
+    ログは1行1レコードの JSON Lines 形式で、実行ごとに実行レコードとイベントレコードを追記する
+        実行レコード: {"kind": "run", "seq", "run_id", "timestamp", "following_num", "follower_num"}
+        イベントレコード: {"kind": "event", "seq", "run_id", "ff_type", "diff_type", "id", "name", "screen_name"}
+    seq は追記ごとに採番する通し番号で、同じ実行IDで複数回追記された場合(同日の再実行)は最後の追記のみを有効とする
+
+    追記ごとのログ中の範囲と差分の種類ごとの件数を索引(JSON)として保持し、
+    ユーザIDごとのイベントレコードのログ中の位置(バイトオフセット)とスクリーンネームからユーザIDへの対応を
+    ユーザ位置表(UserOffsetTable)として保持する
+    1ユーザの履歴の取得は実行回数によらず、そのユーザのイベント数分の読み込みで済む
+    索引とユーザ位置表はログから再作成可能で、ログより古い場合は差分のみを走査して追いつかせる
+
+    Attributes:
+        base_path (Path): ログと索引の保存ディレクトリ
+        EVENT_DIRECTORY (str): ログと索引の保存ディレクトリ, デフォルトは"./event/"
+        LOG_FILE_NAME (str): ログファイル名, デフォルトは"event_log.jsonl"
+        INDEX_FILE_NAME (str): 索引ファイル名, デフォルトは"event_index.json"
+        TABLE_FILE_NAME (str): ユーザ位置表のファイル名, デフォルトは"event_user_table.bin"
+        SKIPPED_FILE_NAME (str): 結果ファイルを読み込めずにログを作成できなかった実行IDの記録ファイル名,
+                                 デフォルトは"event_skipped.json"
+    """
+
+    base_path: ClassVar[Path]
+
+    EVENT_DIRECTORY = "./event/"
+    LOG_FILE_NAME = "event_log.jsonl"
+    INDEX_FILE_NAME = "event_index.json"
+    TABLE_FILE_NAME = "event_user_table.bin"
+    SKIPPED_FILE_NAME = "event_skipped.json"
+    _INDEX_KEY_SET = frozenset(["log_size", "seq", "run_dict", "seq_dict"])
+
+    def __post_init__(self) -> None:
+        """初期化後処理"""
+        object.__setattr__(self, "base_path", Path(self.EVENT_DIRECTORY))
+        self.base_path.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def log_path(self) -> Path:
+        """ログファイルのパス"""
+        return self.base_path / self.LOG_FILE_NAME
+
+    @property
+    def index_path(self) -> Path:
+        """索引ファイルのパス"""
+        return self.base_path / self.INDEX_FILE_NAME
+
+    @property
+    def table_path(self) -> Path:
+        """ユーザ位置表のファイルのパス"""
+        return self.base_path / self.TABLE_FILE_NAME
+
+    @property
+    def skipped_path(self) -> Path:
+        """ログを作成できなかった実行IDの記録ファイルのパス"""
+        return self.base_path / self.SKIPPED_FILE_NAME
+
+    def exists(self) -> bool:
+        """ログファイルが存在するかどうか"""
+        return self.log_path.is_file()
+
+    def _new_index(self) -> dict:
+        """空の索引を作成する"""
+        return {"log_size": 0, "seq": 0, "run_dict": {}, "seq_dict": {}}
+
+    def _add_to_index(self, index: dict, record: dict, offset: int, length: int) -> None:
+        """ログ中の offset バイト目から始まる長さ length の1レコードを索引に反映する
+
+        ユーザ位置表への追加分は、保存するまで索引の new_offset_list, new_screen_name_list に保持する
+        """
+        seq_key = str(record["seq"])
+        if record["kind"] == "run":
+            index["seq"] = max(index["seq"], record["seq"])
+            index["run_dict"][record["run_id"]] = record["seq"]
+            index["seq_dict"][seq_key] = {
+                "run_id": record["run_id"],
+                "start": offset,
+                "end": offset + length,
+                "count_dict": {},
+            }
+            return
+
+        if seq_index := index["seq_dict"].get(seq_key):
+            seq_index["end"] = offset + length
+            count_key = f"{record['ff_type']}_{record['diff_type']}"
+            seq_index["count_dict"][count_key] = seq_index["count_dict"].get(count_key, 0) + 1
+        index.setdefault("new_offset_list", []).append((record["id"], offset))
+        screen_name_hash = UserOffsetTable.hash_screen_name(record["screen_name"])
+        index.setdefault("new_screen_name_list", []).append((screen_name_hash, record["id"]))
+
+    def _update_index(self, index: dict, start: int) -> dict:
+        """ログの start バイト目以降を走査して索引に反映する
+
+        Args:
+            index (dict): 更新する索引
+            start (int): 走査を開始するログ中の位置, 行の先頭であること
+
+        Returns:
+            index (dict): 更新した索引
+        """
+        if not self.log_path.is_file():
+            return index
+        with self.log_path.open("rb") as fin:
+            fin.seek(start)
+            offset = start
+            for line in fin:
+                if not line.endswith(b"\n"):
+                    # 書き込み途中で中断された行は索引に含めない
+                    break
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # 中断された行の後に追記された場合は、中断された行を読み飛ばす
+                    offset += len(line)
+                    continue
+                self._add_to_index(index, record, offset, len(line))
+                offset += len(line)
+        index["log_size"] = offset
+        return index
+
+    def _write_index(self, index: dict, table: UserOffsetTable | None = None) -> dict:
+        """索引を索引ファイルに、ユーザ位置表を既存の表 table に追加分を合わせて保存する
+
+        書き込み途中で中断しても壊れた索引が残らないよう、一時ファイルから置き換える
+        ユーザ位置表を先に保存し、索引とユーザ位置表の反映済のログのバイト長が異なる場合は作り直す
+        """
+        table_bytes = UserOffsetTable.dumps(
+            index["log_size"], table, index.pop("new_offset_list", []), index.pop("new_screen_name_list", [])
+        )
+        for path, data in [(self.table_path, table_bytes), (self.index_path, orjson.dumps(index))]:
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        return index
+
+    def rebuild_index(self) -> dict:
+        """ログ全体を走査して索引とユーザ位置表を作り直す
+
+        Returns:
+            index (dict): 作り直した索引
+        """
+        return self._write_index(self._update_index(self._new_index(), 0))
+
+    def _load(self) -> tuple[dict, UserOffsetTable | None]:
+        """索引とユーザ位置表を読み込む
+
+        Returns:
+            tuple[dict, UserOffsetTable | None]: (索引, ユーザ位置表), ユーザ位置表は作り直した場合などはNone
+        """
+        try:
+            index = orjson.loads(self.index_path.read_bytes())
+            if not (isinstance(index, dict) and index.keys() == self._INDEX_KEY_SET):
+                raise KeyError("index keys are invalid.")
+            log_size = index["log_size"]
+            table = UserOffsetTable.load(self.table_path)
+            if table.log_size != log_size:
+                raise ValueError("user offset table is not consistent with index.")
+        except (FileNotFoundError, orjson.JSONDecodeError, KeyError, ValueError):
+            return self.rebuild_index(), None
+
+        actual_log_size = self.log_path.stat().st_size if self.log_path.is_file() else 0
+        if log_size == actual_log_size:
+            return index, table
+        if log_size > actual_log_size:
+            # ログが索引より短い = ログが作り直された
+            return self.rebuild_index(), None
+        return self._write_index(self._update_index(index, log_size), table), None
+
+    def _load_table(self) -> tuple[dict, UserOffsetTable]:
+        """最新の索引とユーザ位置表を読み込む"""
+        index, table = self._load()
+        if table is None:
+            table = UserOffsetTable.load(self.table_path)
+        return index, table
+
+    def load_index(self) -> dict:
+        """索引を読み込む
+
+        索引ファイルまたはユーザ位置表が存在しないまたは読み込めない場合は作り直す
+        索引がログより古い場合は、索引作成後に追記された分のみを走査して更新する
+
+        Returns:
+            index (dict): 索引
+                log_size (int): 索引に反映済のログのバイト長
+                seq (int): 最後に採番した通し番号
+                run_dict (dict[str, int]): 実行IDから有効な追記の通し番号への辞書
+                seq_dict (dict[str, dict]):
+                    通し番号から追記ごとの情報への辞書
+                    各要素は run_id, ログ中の範囲 start, end, 差分の種類ごとの件数 count_dict をキーに持つ
+                    count_dict のキーは "{ff_type}_{diff_type}", ex: "following_ADD"
+        """
+        return self._load()[0]
+
+    def _iter_event_records(self, seq: int, run_id: str, ff_type: FFtype, diff_list: DiffRecordList) -> Iterator[dict]:
+        """差分レコードリストをイベントレコードに変換する"""
+        for r in diff_list:
+            yield {
+                "kind": "event",
+                "seq": seq,
+                "run_id": run_id,
+                "ff_type": ff_type.value,
+                "diff_type": r.diff_type.value,
+                "id": r.id.id,
+                "name": r.name.name,
+                "screen_name": r.screen_name.name,
+            }
+
+    def append(
+        self,
+        run_id: str,
+        diff_following_list: DiffFollowingList,
+        diff_follower_list: DiffFollowerList,
+        following_num: int | None = None,
+        follower_num: int | None = None,
+    ) -> int:
+        """1回分の実行の差分をログに追記する
+
+        同じ実行IDで再度追記した場合は、以降は後から追記した分のみが有効となる
+
+        Args:
+            run_id (str): 実行ID(実行日の文字列), ex: "20230318"
+            diff_following_list (DiffFollowingList): 前回との following の差分
+            diff_follower_list (DiffFollowerList): 前回との follower の差分
+            following_num (int | None, optional): 実行時の following 数
+            follower_num (int | None, optional): 実行時の follower 数
+
+        Returns:
+            seq (int): 今回の追記に採番した通し番号
+        """
+        return self.append_many([(run_id, diff_following_list, diff_follower_list, following_num, follower_num)])[0]
+
+    def append_many(
+        self, diff_run_list: Iterable[tuple[str, DiffFollowingList, DiffFollowerList, int | None, int | None]]
+    ) -> list[int]:
+        """複数回分の実行の差分を順にログに追記する
+
+        索引の読み込みと保存はまとめて1回ずつ行う
+        途中で失敗した場合も、追記できた分は索引に反映する
+
+        Args:
+            diff_run_list (Iterable[tuple[str, DiffFollowingList, DiffFollowerList, int | None, int | None]]):
+                (実行ID, following の差分, follower の差分, following 数, follower 数) のイテラブル
+
+        Returns:
+            seq_list (list[int]): 各追記に採番した通し番号のリスト
+        """
+        index, table = self._load_table()
+        seq_list = []
+        try:
+            with self.log_path.open("ab") as fout:
+                offset = fout.tell()
+                if offset != index["log_size"]:
+                    # 中断された行が残っている場合は、その直後から書き始める
+                    fout.write(b"\n")
+                    offset += 1
+                for run_id, diff_following_list, diff_follower_list, following_num, follower_num in diff_run_list:
+                    seq = index["seq"] + 1
+                    record_list = [
+                        {
+                            "kind": "run",
+                            "seq": seq,
+                            "run_id": run_id,
+                            "timestamp": datetime.datetime.now().isoformat(),
+                            "following_num": following_num,
+                            "follower_num": follower_num,
+                        }
+                    ]
+                    for ff_type, diff_list in [
+                        (FFtype.following, diff_following_list),
+                        (FFtype.follower, diff_follower_list),
+                    ]:
+                        record_list.extend(self._iter_event_records(seq, run_id, ff_type, diff_list))
+
+                    line_list = []
+                    for record in record_list:
+                        line = orjson.dumps(record) + b"\n"
+                        self._add_to_index(index, record, offset, len(line))
+                        line_list.append(line)
+                        offset += len(line)
+                    fout.writelines(line_list)
+                    index["log_size"] = offset
+                    seq_list.append(seq)
+        finally:
+            self._write_index(index, table)
+        return seq_list
+
+    def get_run_id_list(self) -> list[str]:
+        """ログに記録済の実行IDを時系列順に取得する
+
+        Returns:
+            list[str]: 実行IDのリスト
+        """
+        return sorted(self.load_index()["run_dict"].keys())
+
+    def get_run_list(self) -> list[dict]:
+        """ログに記録済の実行ごとの差分の件数を時系列順に取得する
+
+        索引のみから取得し、ログは読み込まない
+
+        Returns:
+            list[dict]:
+                各要素は run_id, seq, count_dict をキーに持つ, 同日の再実行で無効となった追記分は含まない
+                count_dict のキーは "{ff_type}_{diff_type}", ex: "following_ADD"
+        """
+        index = self.load_index()
+        run_list = []
+        for run_id, seq in sorted(index["run_dict"].items()):
+            count_dict = index["seq_dict"][str(seq)]["count_dict"]
+            run_list.append({"run_id": run_id, "seq": seq, "count_dict": count_dict})
+        return run_list
+
+    def get_user_id_list(self, screen_name: str) -> list[int]:
+        """スクリーンネームからユーザIDを取得する
+
+        スクリーンネームの大文字小文字は区別しない
+        スクリーンネームは変更や再利用されうるため、複数のユーザIDが該当する場合がある
+
+        Args:
+            screen_name (str): スクリーンネーム, 先頭の@は無視する
+
+        Returns:
+            list[int]: そのスクリーンネームでイベントが記録されたことのあるユーザIDのリスト
+        """
+        screen_name = screen_name.removeprefix("@").lower()
+        _, table = self._load_table()
+        # ハッシュ値が衝突したユーザIDを除くため、イベントレコードのスクリーンネームと照合する
+        return [
+            user_id
+            for user_id in table.get_user_id_list(screen_name)
+            if any(event["screen_name"].lower() == screen_name for event in self._read_user_events(table, user_id))
+        ]
+
+    def _read_user_events(self, table: UserOffsetTable, user_id: int) -> list[dict]:
+        """ユーザ位置表から1ユーザのイベントレコードをログ中の順にすべて読み込む"""
+        offset_list = table.get_offset_list(user_id)
+        if not offset_list:
+            return []
+        with self.log_path.open("rb") as fin:
+            event_list = []
+            for offset in offset_list:
+                fin.seek(offset)
+                event_list.append(orjson.loads(fin.readline()))
+        return event_list
+
+    def iter_event_records(self, from_run_id: str | None = None, to_run_id: str | None = None) -> Iterator[dict]:
+        """実行IDの範囲を指定してイベントレコードを時系列順に取得する
+
+        索引から範囲内の追記分のログ中の位置を求め、その部分のみを読み込む
+
+        Args:
+            from_run_id (str | None, optional): この実行IDより後の実行分を対象とする, Noneの場合は最初から
+            to_run_id (str | None, optional): この実行ID以前の実行分を対象とする, Noneの場合は最後まで
+
+        Yields:
+            dict: イベントレコード, 同日の再実行で無効となった追記分は含まない
+        """
+        index = self.load_index()
+        seq_index_list = [
+            index["seq_dict"][str(seq)]
+            for run_id, seq in sorted(index["run_dict"].items())
+            if (from_run_id is None or from_run_id < run_id) and (to_run_id is None or run_id <= to_run_id)
+        ]
+        if not seq_index_list:
+            return
+        with self.log_path.open("rb") as fin:
+            for seq_index in seq_index_list:
+                fin.seek(seq_index["start"])
+                for line in fin.read(seq_index["end"] - seq_index["start"]).splitlines():
+                    record = orjson.loads(line)
+                    if record["kind"] == "event":
+                        yield record
+
+    def get_user_event_list(self, user_id: int) -> list[dict]:
+        """1ユーザのイベントを時系列順に取得する
+
+        ユーザ位置表からそのユーザのイベントレコードの位置を求め、その行のみを読み込む
+
+        Args:
+            user_id (int): ユーザID
+
+        Returns:
+            list[dict]: イベントレコードのリスト, 同日の再実行で無効となった追記分は含まない
+        """
+        index, table = self._load_table()
+        run_dict = index["run_dict"]
+        event_list = [
+            event for event in self._read_user_events(table, user_id) if run_dict.get(event["run_id"]) == event["seq"]
+        ]
+        return sorted(event_list, key=lambda event: (event["run_id"], event["seq"]))
+
+    def get_skipped_run_id_list(self) -> list[str]:
+        """import_runs で結果ファイルを読み込めずに追記しなかった実行IDを時系列順に取得する
+
+        Returns:
+            list[str]: 実行IDのリスト, 記録ファイルが存在しないまたは読み込めない場合は空のリスト
+        """
+        try:
+            run_id_list = orjson.loads(self.skipped_path.read_bytes())["run_id_list"]
+        except (FileNotFoundError, orjson.JSONDecodeError, KeyError, TypeError):
+            return []
+        if not (isinstance(run_id_list, list) and all(isinstance(run_id, str) for run_id in run_id_list)):
+            return []
+        return sorted(run_id_list)
+
+    def _write_skipped(self, run_id_list: list[str]) -> None:
+        """ログを作成できなかった実行IDを記録する"""
+        tmp_path = self.skipped_path.with_suffix(".tmp")
+        tmp_path.write_bytes(orjson.dumps({"run_id_list": sorted(run_id_list)}, option=orjson.OPT_INDENT_2))
+        tmp_path.replace(self.skipped_path)
+
+    def import_runs(self, directory: Directory) -> list[str]:
+        """既存の結果ファイルからログを作成する
+
+        実行履歴の目録の時系列順に、各実行時の following/follower と直前の実行分との差分をログに追記する
+        差分は Core.run と同じく DiffRecordList.create_from_diff で求める
+        すでにログに記録済の実行IDは追記しない
+        結果ファイルが存在せず読み込めなかった実行IDは記録しておき、get_skipped_run_id_list で取得できるようにする
+
+        Args:
+            directory (Directory): 結果ファイルを読み込むディレクトリ操作クラス
+
+        Returns:
+            imported_list (list[str]): 追記した実行IDのリスト
+        """
+        imported_list = []
+        recorded_set = set(self.get_run_id_list())
+        prev_skipped_set = set(self.get_skipped_run_id_list())
+        skipped_set: set[str] = set()
+
+        def iter_diff_run() -> Iterator[tuple[str, DiffFollowingList, DiffFollowerList, int, int]]:
+            # 結果ファイルは1つずつ読み込み、直前の実行分のみを保持する
+            prev_following_list, prev_follower_list = FollowingList.create(), FollowerList.create()
+            for run in directory.get_run_list():
+                try:
+                    following_list, follower_list = directory.read_run(run)
+                except FileNotFoundError:
+                    skipped_set.add(run["run_id"])
+                    continue
+                if run["run_id"] not in recorded_set:
+                    diff_following_list = DiffFollowingList.create_from_diff(following_list, prev_following_list)
+                    diff_follower_list = DiffFollowerList.create_from_diff(follower_list, prev_follower_list)
+                    imported_list.append(run["run_id"])
+                    yield (
+                        run["run_id"],
+                        diff_following_list,
+                        diff_follower_list,
+                        len(following_list),
+                        len(follower_list),
+                    )
+                prev_following_list, prev_follower_list = following_list, follower_list
+
+        self.append_many(iter_diff_run())
+        # 読み込めるようになった実行IDは記録から除く
+        skipped_set |= prev_skipped_set - recorded_set - set(imported_list)
+        if skipped_set != prev_skipped_set:
+            self._write_skipped(list(skipped_set))
+        return imported_list
+
+
+if __name__ == "__main__":
+    event_log = EventLog()
+    if not event_log.exists():
+        print(event_log.import_runs(Directory()))
+    print(event_log.get_run_id_list())
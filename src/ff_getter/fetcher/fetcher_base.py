@@ -1,11 +1,19 @@
+import datetime
+import re
 import shutil
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import count
 from logging import INFO, getLogger
 from pathlib import Path
 
 import orjson
+from twitter.constants import Operation
 from twitter.scraper import Scraper
+from twitter.util import build_params
 
-from ff_getter.util import FFtype, find_values
+from ff_getter.util import FFtype, compile_record, find_values, get_compiled_path_stats
 from ff_getter.value_object.user_name import UserName
 from ff_getter.value_object.user_record import Follower, Following
 from ff_getter.value_object.user_record_list import FollowerList, FollowingList
@@ -13,14 +21,50 @@ from ff_getter.value_object.user_record_list import FollowerList, FollowingList
 logger = getLogger(__name__)
 logger.setLevel(INFO)
 
+# entry から rest_id, name, screen_name を1回の走査でまとめて取得する
+USER_RECORD = compile_record(
+    "content.itemContent.user_results.result.rest_id",
+    "content.itemContent.user_results.result.legacy.name",
+    "content.itemContent.user_results.result.legacy.screen_name",
+)
+USER_RECORD_DEFAULTS = (None, None, None)
+
 
 class FetcherBase:
+    """following/follower を fetch する基底クラス
+
+    Attributes:
+        GRAPHQL_URL (str): GraphQL API のベースURL
+        CACHE_FILE_NAME (str): ページごとのキャッシュファイル名
+        CHECKPOINT_FILE_NAME (str): 中断した fetch を再開するためのチェックポイントファイル名
+        DEFAULT_CHECKPOINT_MAX_AGE_SEC (float): チェックポイントから再開できる経過時間[s]のデフォルト値
+        LAST_CURSOR_PREFIX (str): 最終ページを示すカーソルの接頭辞
+        DUP_LIMIT (int): ユーザーを含まないページがこの回数続いた場合に最終ページとみなす
+        MAX_RETRY_NUM (int): 構造が想定と異なるページを取得し直す回数の上限
+        RETRY_WAIT_SEC (float): 取得し直すまでの待ち時間[s], 回数に比例して延ばす
+        api_call_num (int): このインスタンスで行った API 呼び出しの回数
+        retry_num (int): このインスタンスでページを取得し直した回数, 取得し直した分も api_call_num に含まれる
+        checkpoint_max_age_sec (float): チェックポイントから再開できる、fetch 開始からの経過時間[s]
+    """
+
     ct0: str
     auth_token: str
     target_screen_name: UserName
     target_id: int
     ff_type: FFtype
     is_debug: bool
+    api_call_num: int
+    retry_num: int
+    checkpoint_max_age_sec: float
+
+    GRAPHQL_URL = "https://twitter.com/i/api/graphql"
+    CACHE_FILE_NAME = "content_cache{}.txt"
+    CHECKPOINT_FILE_NAME = "checkpoint.json"
+    DEFAULT_CHECKPOINT_MAX_AGE_SEC = 6 * 60 * 60
+    LAST_CURSOR_PREFIX = "0|"
+    DUP_LIMIT = 3
+    MAX_RETRY_NUM = 3
+    RETRY_WAIT_SEC = 1.0
 
     def __init__(self, config: dict, ff_type: FFtype, is_debug: False = False) -> None:
         """FetcherBase
@@ -55,132 +99,352 @@ class FetcherBase:
 
         self.ff_type = ff_type
         self.is_debug = is_debug
+        self.api_call_num = 0
+        self.retry_num = 0
+        self.checkpoint_max_age_sec = float(
+            config.get("checkpoint", {}).get("max_age_sec", self.DEFAULT_CHECKPOINT_MAX_AGE_SEC)
+        )
 
     @property
     def cache_path(self) -> Path:
         """キャッシュファイルパス"""
         return Path(__file__).parent / f"cache/{self.ff_type.value}/"
 
-    def fetch_jsons(self) -> list[dict]:
-        """fetch
+    def _fetch_page(self, scraper: Scraper, cursor: str | None = None) -> dict:
+        """following/follower の1ページ分を取得する
+
+        Args:
+            scraper (Scraper): 認証済のセッションを持つ Scraper
+            cursor (str | None, optional): 続きを取得するためのカーソル, None の場合は先頭ページを取得する
 
         Returns:
-            list[dict]: fetch したff情報辞書を格納したリスト
+            dict: 取得したページのレスポンス辞書
+        """
+        keys, qid, name = Operation.Following if self.ff_type == FFtype.following else Operation.Followers
+        variables = Operation.default_variables | {"userId": self.target_id}
+        if cursor:
+            variables = variables | {"cursor": cursor}
+        params = {"variables": variables, "features": Operation.default_features}
+        self.api_call_num += 1
+        response = scraper.session.get(f"{self.GRAPHQL_URL}/{qid}/{name}", params=build_params(params))
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def _write_cache(self, cache_file_path: Path, content: dict) -> None:
+        """ページをキャッシュファイルに保存する"""
+        cache_file_path.write_bytes(orjson.dumps(content))
+
+    def _write_page(
+        self, base_path: Path, page_index: int, content: dict, next_cursor: str | None, started_at: str
+    ) -> None:
+        """ページをキャッシュに保存し、続けてチェックポイントを更新する
+
+        チェックポイントはページの保存が完了してから更新するため、
+        チェックポイントが指すページまでは必ずキャッシュに存在する
+
+        Args:
+            base_path (Path): キャッシュ保存場所
+            page_index (int): ページ番号
+            content (dict): 取得したページのレスポンス辞書
+            next_cursor (str | None): 次のページを取得するためのカーソル, 最終ページの場合 None
+            started_at (str): 先頭ページの fetch を開始した日時(ISO 8601 形式), 再開した場合も最初の開始日時
+        """
+        self._write_cache(base_path / self.CACHE_FILE_NAME.format(page_index), content)
+        checkpoint = {
+            "target_id": self.target_id,
+            "ff_type": self.ff_type.value,
+            "page_index": page_index,
+            "next_cursor": next_cursor,
+            "started_at": started_at,
+        }
+        # 書き込み途中で中断しても壊れたチェックポイントが残らないよう、一時ファイルから置き換える
+        checkpoint_path = base_path / self.CHECKPOINT_FILE_NAME
+        tmp_path = checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_bytes(orjson.dumps(checkpoint))
+        tmp_path.replace(checkpoint_path)
+
+    def _load_checkpoint(self, base_path: Path) -> dict | None:
+        """前回中断した fetch のチェックポイントを読み込む
+
+        以下の場合は再開できないとみなし None を返す
+            チェックポイントが存在しない, または解釈できない
+            対象アカウントや following/follower の種別が異なる
+            fetch の開始が今日ではない(別の実行日の結果となる), または checkpoint_max_age_sec より前である
+            チェックポイントが指すページまでのキャッシュが揃っていない
+
+        Args:
+            base_path (Path): キャッシュ保存場所
+
+        Returns:
+            dict | None: 再開可能ならばチェックポイント辞書, そうでなければ None
+        """
+        checkpoint_path = base_path / self.CHECKPOINT_FILE_NAME
+        if not checkpoint_path.is_file():
+            return None
+        try:
+            checkpoint = orjson.loads(checkpoint_path.read_bytes())
+        except orjson.JSONDecodeError:
+            return None
+        match checkpoint:
+            case {
+                "target_id": target_id,
+                "ff_type": ff_type,
+                "page_index": int(page_index),
+                "next_cursor": next_cursor,
+                "started_at": str(started_at),
+            } if target_id == self.target_id and ff_type == self.ff_type.value and page_index >= 0:
+                pass
+            case _:
+                return None
+        if not (next_cursor is None or isinstance(next_cursor, str)):
+            return None
+        try:
+            started_datetime = datetime.datetime.fromisoformat(started_at)
+        except ValueError:
+            return None
+        now = datetime.datetime.now()
+        if started_datetime.date() != now.date():
+            return None
+        if not (0 <= (now - started_datetime).total_seconds() <= self.checkpoint_max_age_sec):
+            return None
+        for i in range(page_index + 1):
+            if not (base_path / self.CACHE_FILE_NAME.format(i)).is_file():
+                return None
+        return checkpoint
+
+    def _get_next_cursor(self, content: dict) -> tuple[str | None, int]:
+        """ページから続きを取得するためのカーソルとユーザーのエントリ数を取り出す
+
+        Args:
+            content (dict): 取得したページのレスポンス辞書
+
+        Raises:
+            ValueError: ページの構造が想定と異なる(entries が1つに定まらない)場合
+
+        Returns:
+            tuple[str | None, int]: (続きを取得するためのカーソル, ユーザーのエントリ数), カーソルが無い場合 None
+        """
+        entries_list = find_values(content, "entries")
+        if len(entries_list) != 1 or not isinstance(entries_list[0], list):
+            raise ValueError(f"Unexpected {self.ff_type.value} page, num of entries = {len(entries_list)}.")
+        entries: list[dict] = entries_list[0]
+        user_entry_num = sum(1 for entry in entries if entry.get("entryId", "").startswith("user-"))
+        for entry in entries:
+            if entry.get("entryId", "").startswith("cursor-bottom-"):
+                entry_content: dict = entry.get("content", {})
+                # v2 の応答では itemContent 以下にカーソルがある
+                cursor = entry_content.get("itemContent", entry_content).get("value")
+                return cursor, user_entry_num
+        return None, user_entry_num
+
+    def _fetch_valid_page(self, scraper: Scraper, cursor: str | None) -> tuple[dict, str | None, int]:
+        """1ページ分を取得し、ページの構造が想定と異なる場合は MAX_RETRY_NUM 回まで取得し直す
+
+        Args:
+            scraper (Scraper): 認証済のセッションを持つ Scraper
+            cursor (str | None): 続きを取得するためのカーソル, None の場合は先頭ページを取得する
+
+        Raises:
+            ValueError: 取得し直しても想定と異なる構造のページしか得られなかった場合
+
+        Returns:
+            tuple[dict, str | None, int]: (ページのレスポンス辞書, 次のページのカーソル, ユーザーのエントリ数)
+        """
+        for retry_num in count():
+            content = self._fetch_page(scraper, cursor)
+            try:
+                return content, *self._get_next_cursor(content)
+            except ValueError as e:
+                if retry_num >= self.MAX_RETRY_NUM:
+                    raise
+                logger.warning(f"{e} Retry {retry_num + 1}/{self.MAX_RETRY_NUM}.")
+                self.retry_num += 1
+                time.sleep(self.RETRY_WAIT_SEC * (retry_num + 1))
+
+    def iter_pages(self) -> Iterator[dict]:
+        """following/follower をページ単位で順に fetch する
+
+        取得したページは到着順に返され、同時にコンパクトな形式でキャッシュに保存される
+        キャッシュへの書き込みはバックグラウンドのスレッドで行い、書き込み待ちのページは高々1つとなる
+        ページを保存するたびに次ページのカーソルをチェックポイントとして記録する
+        前回の fetch が途中で中断していた場合は、保存済のページを返した後にチェックポイントのカーソルから再開する
+        すべてのページを取得し終えたらチェックポイントは削除する
+        デバッグモードの場合はキャッシュから読み込む
+
+        Raises:
+            ValueError: デバッグモードでキャッシュファイルが存在しない場合
+
+        Yields:
+            dict: fetch したページのレスポンス辞書
         """
         logger.info(f"Fetched {self.ff_type.value} by TAC -> start")
 
         # キャッシュ保存場所の準備
+        # 中断した fetch のチェックポイントがあればキャッシュを残して再開する
         base_path = Path(self.cache_path)
+        checkpoint = None
         if base_path.is_dir() and not self.is_debug:
-            shutil.rmtree(base_path)
+            checkpoint = self._load_checkpoint(base_path)
+            if not checkpoint:
+                shutil.rmtree(base_path)
         base_path.mkdir(parents=True, exist_ok=True)
 
-        # fetch
-        logger.info(f"Getting {self.ff_type.value} fetched -> start")
-        fetched_contents: list[dict] = []
         if self.is_debug:
             # キャッシュから読み込み
-            cache_file_paths = list(base_path.glob("**/*"))
+            cache_file_paths = sorted(
+                base_path.glob(self.CACHE_FILE_NAME.format("*")),
+                key=lambda path: int(re.sub(r"\D", "", path.stem) or 0),
+            )
             if not cache_file_paths:
                 raise ValueError(f"cache file not found, {str(base_path.resolve())}.")
             for cache_file_path in cache_file_paths:
-                json_dict = orjson.loads(cache_file_path.read_bytes())
-                fetched_contents.append(json_dict)
-        else:
+                yield orjson.loads(cache_file_path.read_bytes())
+            logger.info(f"Fetched {self.ff_type.value} by TAC -> done")
+            return
+
+        cursor = None
+        start_index = 0
+        started_at = datetime.datetime.now().isoformat()
+        if checkpoint:
+            # 保存済のページを返してから続きを取得する
+            last_index = checkpoint["page_index"]
+            logger.info(f"Resume {self.ff_type.value} from checkpoint, page 0 to {last_index} are cached.")
+            for page_index in range(last_index + 1):
+                yield orjson.loads((base_path / self.CACHE_FILE_NAME.format(page_index)).read_bytes())
+            cursor = checkpoint["next_cursor"]
+            start_index = last_index + 1
+            started_at = checkpoint["started_at"]
+
+        if checkpoint is None or cursor:
             scraper = Scraper(cookies={"ct0": self.ct0, "auth_token": self.auth_token}, pbar=False)
-            if self.ff_type == FFtype.following:
-                fetched_contents = scraper.following([self.target_id])
-            elif self.ff_type == FFtype.follower:
-                fetched_contents = scraper.followers([self.target_id])
-        logger.info(f"Getting {self.ff_type.value} fetched -> done")
-
-        # キャッシュに保存
-        for i, content in enumerate(fetched_contents):
-            Path(base_path / f"content_cache{i}.txt").write_bytes(orjson.dumps(content, option=orjson.OPT_INDENT_2))
-
-        # キャッシュから読み込み
-        # content_list と result はほぼ同一の内容になる
-        # 違いは result は dump -> load したときに、エンコード等が吸収されていること
-        result: list[dict] = []
-        for i, content in enumerate(fetched_contents):
-            json_dict = orjson.loads(Path(base_path / f"content_cache{i}.txt").read_bytes())
-            result.append(json_dict)
-
+            executor = ThreadPoolExecutor(max_workers=1)
+            future: Future | None = None
+            try:
+                empty_page_num = 0
+                for page_index in count(start_index):
+                    content, next_cursor, user_entry_num = self._fetch_valid_page(scraper, cursor)
+                    logger.info(f"Getting {self.ff_type.value} page {page_index} fetched.")
+
+                    # 明示的な最終ページでのみ打ち切る
+                    # ユーザーを含まないページが続く場合は、ライブラリと同じく DUP_LIMIT 回続いたら打ち切る
+                    empty_page_num = 0 if user_entry_num else empty_page_num + 1
+                    if not next_cursor or next_cursor == cursor or next_cursor.startswith(self.LAST_CURSOR_PREFIX):
+                        next_cursor = None
+                    elif empty_page_num >= self.DUP_LIMIT:
+                        logger.warning(f"{empty_page_num} pages without user are fetched, treated as last page.")
+                        next_cursor = None
+
+                    # キャッシュとチェックポイントを保存(前のページの書き込み完了を待ってから次を投入する)
+                    if future:
+                        future.result()
+                    future = executor.submit(self._write_page, base_path, page_index, content, next_cursor, started_at)
+
+                    yield content
+
+                    if not next_cursor:
+                        break
+                    cursor = next_cursor
+                if future:
+                    future.result()
+            finally:
+                executor.shutdown(wait=True)
+
+        # すべてのページを取得できたのでチェックポイントは不要
+        (base_path / self.CHECKPOINT_FILE_NAME).unlink(missing_ok=True)
         logger.info(f"Fetched {self.ff_type.value} by TAC -> done")
-        return result
+
+    def fetch_jsons(self) -> list[dict]:
+        """fetch
+
+        すべてのページをメモリ上に保持するため、大きなアカウントでは fetch によるストリーミングを使うこと
+
+        Returns:
+            list[dict]: fetch したff情報辞書を格納したリスト
+        """
+        return list(self.iter_pages())
 
     def interpret_json(self, json_dict: dict) -> dict:
         """辞書構成をたどる"""
         if not isinstance(json_dict, dict):
             return {}
 
-        match json_dict:
-            case {
-                "content": {
-                    "itemContent": {"user_results": {"result": result}},
-                },
-            }:
-                id_str = result["rest_id"]
-                name = result["legacy"]["name"]
-                screen_name = result["legacy"]["screen_name"]
-                return {
-                    "id_str": id_str,
-                    "name": name,
-                    "screen_name": screen_name,
-                }
+        id_str, name, screen_name = USER_RECORD.extract(json_dict, USER_RECORD_DEFAULTS)
+        if id_str is not None and name is not None and screen_name is not None:
+            return {
+                "id_str": id_str,
+                "name": name,
+                "screen_name": screen_name,
+            }
         return {}
 
-    def to_convert(self, fetched_jsons: list[dict]) -> FollowingList | FollowerList:
+    def _iter_page_rows(self, fetched_json: dict) -> Iterator[tuple[str, str, str]]:
+        """1ページ分のff情報辞書から (id_str, name, screen_name) の組を順に取り出す
+
+        Args:
+            fetched_json (dict): fetch したff情報辞書
+
+        Yields:
+            tuple[str, str, str]: (id_str, name, screen_name)
+        """
+        entries: list[dict] = find_values(fetched_json, "entries", True)
+        for entry in entries:
+            data_dict = self.interpret_json(entry)
+            if not data_dict:
+                continue
+            yield data_dict["id_str"], data_dict["name"], data_dict["screen_name"]
+
+    def to_convert(self, fetched_jsons: list[dict] | Iterator[dict]) -> FollowingList | FollowerList:
         """FollowingList または FollowerList にコンバートする
 
+        fetched_jsons にイテレータを渡した場合は、ページを1つずつ取り出しながらコンバートする
+        ページからは列ごとに値を取り出し、最後に from_columns でまとめて検証してレコードを作成する
+
         Args:
-            fetched_jsons (list[dict]): fetch したff情報辞書を格納したリスト
+            fetched_jsons (list[dict] | Iterator[dict]): fetch したff情報辞書を格納したリストまたはイテレータ
 
         Returns:
             FollowingList | FollowerList: コンバート後のリストインスタンス
         """
-        if not isinstance(fetched_jsons, list):
-            return []
-        if not all([isinstance(fetched_json, dict) for fetched_json in fetched_jsons]):
+        if not isinstance(fetched_jsons, list | Iterator):
             return []
 
-        ToConvertDataClass: type[Following] | type[Follower] = (
-            Following if self.ff_type == FFtype.following else Follower
-        )
         ToConvertClass: type[FollowingList] | type[FollowerList] = (
             FollowingList if self.ff_type == FFtype.following else FollowerList
         )
 
         # 辞書パース
-        data_list: list[Following] | list[Follower] = []
+        ids: list[int] = []
+        names: list[str] = []
+        screen_names: list[str] = []
         for fetched_json in fetched_jsons:
-            entries: list[dict] = find_values(fetched_json, "entries", True)
-            for entry in entries:
-                data_dict = self.interpret_json(entry)
-                if not data_dict:
-                    continue
-                ff_data = ToConvertDataClass.create(
-                    data_dict.get("id_str", ""),
-                    data_dict.get("name", ""),
-                    data_dict.get("screen_name", ""),
-                )
-                data_list.append(ff_data)
-        if not data_list:
+            if not isinstance(fetched_json, dict):
+                return []
+            for id_str, name, screen_name in self._iter_page_rows(fetched_json):
+                ids.append(int(id_str))
+                names.append(name)
+                screen_names.append(screen_name)
+
+        # スキーマ変化によりワイルドカード検索にフォールバックしたキーパスがあれば報告する
+        for stats in get_compiled_path_stats():
+            if stats["fallback_count"] > 0:
+                logger.warning(f"Key path '{stats['path']}' fallback count = {stats['fallback_count']}.")
+
+        if not ids:
             # 辞書パースエラー or 1件も無かった
             return []
 
-        return ToConvertClass.create(data_list)
+        return ToConvertClass.from_columns(ids, names, screen_names)
 
     def fetch(self) -> FollowingList | FollowerList:
         """fetch
 
         following か follower かは self.ff_type の値で判定される
+        ページを取得するごとにコンバートするため、ページの内容は1ページ分しか保持しない
 
         Returns:
             FollowingList | FollowerList: fetch結果のリストインスタンス
         """
-        fetched_jsons = self.fetch_jsons()
-        result = self.to_convert(fetched_jsons)
+        result = self.to_convert(self.iter_pages())
         return result
 
 
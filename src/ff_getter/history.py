@@ -0,0 +1,139 @@
+import datetime
+from dataclasses import dataclass, field
+from enum import Enum
+
+from ff_getter.event_log import EventLog
+from ff_getter.util import FFtype
+from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing, DiffType
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+
+
+class Period(Enum):
+    """churn を集計する期間の単位"""
+
+    day = "day"
+    week = "week"
+    month = "month"
+    year = "year"
+
+
+@dataclass(frozen=True)
+class History:
+    """イベントログから follow/unfollow の履歴を問い合わせる
+
+    いずれの問い合わせもイベントログとその索引のみから行い、結果ファイルは読み込まない
+
+    Args:
+        event_log (EventLog): 問い合わせ先のイベントログ
+    """
+
+    event_log: EventLog = field(default_factory=EventLog)
+
+    def timeline(self, user: int | str) -> list[dict]:
+        """1ユーザの follow/unfollow の履歴を時系列順に取得する
+
+        Args:
+            user (int | str):
+                ユーザIDまたはスクリーンネーム
+                数字のみの文字列はユーザIDとして扱う, スクリーンネームとして扱う場合は先頭に@を付けること
+
+        Returns:
+            list[dict]: イベントレコードのリスト, スクリーンネームに複数のユーザIDが該当する場合はすべて含む
+        """
+        if isinstance(user, int) or user.isdecimal():
+            user_id_list = [int(user)]
+        else:
+            user_id_list = self.event_log.get_user_id_list(user)
+        event_list = []
+        for user_id in user_id_list:
+            event_list.extend(self.event_log.get_user_event_list(user_id))
+        return sorted(event_list, key=lambda event: (event["run_id"], event["seq"]))
+
+    def diff(self, from_run_id: str, to_run_id: str) -> tuple[DiffFollowingList, DiffFollowerList]:
+        """2つの実行の間の following/follower の差分を取得する
+
+        from_run_id より後 to_run_id 以前の実行分のイベントを、ユーザごとに合成して差分とする
+        期間中に ADD と REMOVE の両方があり、期間の前後で状態が変わらないユーザは含まない
+        並び順は DiffRecordList.create_from_diff と同じく DiffType.ADD, DiffType.REMOVE の順となる
+
+        Args:
+            from_run_id (str): 基準とする実行ID, ex: "20230301"
+            to_run_id (str): 変更後とする実行ID, ex: "20230318"
+
+        Raises:
+            ValueError: from_run_id が to_run_id より後の場合
+
+        Returns:
+            tuple[DiffFollowingList, DiffFollowerList]: from_run_id 時点から to_run_id 時点への差分
+        """
+        if from_run_id > to_run_id:
+            raise ValueError("from_run_id must be before to_run_id.")
+
+        # following/follower ごとに、ユーザIDから期間中の最初の差分タイプと最後のイベントを求める
+        first_dict: dict[str, dict[int, str]] = {ff_type.value: {} for ff_type in FFtype}
+        last_dict: dict[str, dict[int, dict]] = {ff_type.value: {} for ff_type in FFtype}
+        for event in self.event_log.iter_event_records(from_run_id, to_run_id):
+            ff_type, user_id = event["ff_type"], event["id"]
+            first_dict[ff_type].setdefault(user_id, event["diff_type"])
+            last_dict[ff_type][user_id] = event
+
+        # 最初と最後の差分タイプが同じならば期間の前後で状態が変わっている
+        # ログに記録済の差分は検証済のため、値の検証を省略して差分レコードを作成する
+        diff_list_dict: dict[FFtype, list] = {}
+        record_class_dict = {FFtype.following: DiffFollowing, FFtype.follower: DiffFollower}
+        for ff_type, record_class in record_class_dict.items():
+            first_diff_type_dict = first_dict[ff_type.value]
+            diff_list_dict[ff_type] = [
+                record_class.create_trusted(diff_type, event["id"], event["name"], event["screen_name"])
+                for diff_type in DiffType
+                for user_id, event in last_dict[ff_type.value].items()
+                if event["diff_type"] == first_diff_type_dict[user_id] == diff_type.value
+            ]
+        return (
+            DiffFollowingList.create(diff_list_dict[FFtype.following]),
+            DiffFollowerList.create(diff_list_dict[FFtype.follower]),
+        )
+
+    def _get_period_key(self, run_id: str, period: Period) -> str:
+        """実行IDが属する期間を表す文字列を返す"""
+        match period:
+            case Period.day:
+                return run_id
+            case Period.week:
+                iso_year, iso_week, _ = datetime.datetime.strptime(run_id, "%Y%m%d").isocalendar()
+                return f"{iso_year}-W{iso_week:02}"
+            case Period.month:
+                return run_id[:6]
+            case Period.year:
+                return run_id[:4]
+        raise ValueError(f"period={period} is invalid.")
+
+    def churn(self, period: Period = Period.month) -> list[dict]:
+        """期間ごとの follow/unfollow の件数を取得する
+
+        イベントログの索引に保持した実行ごとの件数を集計するため、ログは読み込まない
+
+        Args:
+            period (Period, optional): 集計する期間の単位, デフォルトは月ごと
+
+        Returns:
+            list[dict]:
+                期間の古い順に並べたリスト
+                各要素は period, run_num, following_ADD, following_REMOVE, follower_ADD, follower_REMOVE をキーに持つ
+        """
+        count_key_list = [f"{ff_type.value}_{diff_type.value}" for ff_type in FFtype for diff_type in DiffType]
+        churn_dict: dict[str, dict] = {}
+        for run in self.event_log.get_run_list():
+            period_key = self._get_period_key(run["run_id"], period)
+            if period_key not in churn_dict:
+                churn_dict[period_key] = {"period": period_key, "run_num": 0} | dict.fromkeys(count_key_list, 0)
+            churn_dict[period_key]["run_num"] += 1
+            for count_key, count in run["count_dict"].items():
+                churn_dict[period_key][count_key] += count
+        return list(churn_dict.values())
+
+
+if __name__ == "__main__":
+    history = History()
+    for churn in history.churn(Period.month):
+        print(churn)
@@ -0,0 +1,74 @@
+import argparse
+import sys
+
+from ff_getter.history import History, Period
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """履歴問い合わせ用の ArgumentParser を作成する"""
+    parser = argparse.ArgumentParser(
+        description="Query following/follower history from event log.",
+        epilog="require event log for ./event/, enable is_event_log in ./config/ff_getter_config.json",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    timeline_parser = subparsers.add_parser("timeline", help="Show follow/unfollow history of one user.")
+    timeline_parser.add_argument("user", help="User id, or screen name with @ prefix.")
+
+    diff_parser = subparsers.add_parser("diff", help="Show difference between two run dates.")
+    diff_parser.add_argument("from_run_id", help="Base run date, ex: 20230301")
+    diff_parser.add_argument("to_run_id", help="Target run date, ex: 20230318")
+
+    churn_parser = subparsers.add_parser("churn", help="Show follow/unfollow counts per period.")
+    churn_parser.add_argument(
+        "--period", choices=[period.value for period in Period], default=Period.month.value, help="Aggregate period."
+    )
+    return parser
+
+
+def run(args: argparse.Namespace, history: History) -> list[str]:
+    """問い合わせを実行し、出力する各行を返す
+
+    Args:
+        args (argparse.Namespace): create_parser で作成した ArgumentParser の解析結果
+        history (History): 問い合わせ先
+
+    Returns:
+        list[str]: 出力する各行
+    """
+    line_list = []
+    match args.command:
+        case "timeline":
+            line_list.append("run_id, ff_type, diff_type, id, name, screen_name")
+            for event in history.timeline(args.user):
+                line_list.append(
+                    f"{event['run_id']}, {event['ff_type']}, {event['diff_type']}, "
+                    f"{event['id']}, {event['name']}, {event['screen_name']}"
+                )
+        case "diff":
+            diff_following_list, diff_follower_list = history.diff(args.from_run_id, args.to_run_id)
+            line_list.append(f"difference {args.from_run_id} -> {args.to_run_id}")
+            for ff_type, diff_list in [("following", diff_following_list), ("follower", diff_follower_list)]:
+                line_list.append(ff_type)
+                line_list.append("diff_type, id, name, screen_name")
+                line_list.extend(r.line for r in diff_list)
+                line_list.append("")
+        case "churn":
+            churn_list = history.churn(Period(args.period))
+            line_list.append("period, run_num, following_ADD, following_REMOVE, follower_ADD, follower_REMOVE")
+            line_list.extend(", ".join(str(value) for value in churn.values()) for churn in churn_list)
+    return line_list
+
+
+def main() -> None:
+    parser = create_parser()
+    args = parser.parse_args()
+    try:
+        line_list = run(args, History())
+    except ValueError as e:
+        parser.error(str(e))
+    sys.stdout.write("\n".join(line_list) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,11 @@ class Message(Enum):
 
     TAC_MODE = "TAC mode ..."
 
+    GET_FF_LIST_CONCURRENT_START = "Getting following/follower list concurrently -> start"
+    GET_FF_LIST_CONCURRENT_DONE = "Getting following/follower list concurrently -> done"
+    GET_FF_LIST_ELAPSED = "Getting {} list elapsed: {:.3f}s"
+    GET_FF_LIST_CONCURRENT_ELAPSED = "Getting following/follower list elapsed: {:.3f}s (overlap: {:.3f}s)"
+
     GET_FOLLOWING_LIST_START = "Getting following list -> start"
     GET_FOLLOWING_LIST_DONE = "Getting following list-> done"
 
@@ -32,6 +37,9 @@ class Message(Enum):
     GET_PREV_FOLLOWER_LIST_START = "Getting prev follower list -> start"
     GET_PREV_FOLLOWER_LIST_DONE = "Getting prev follower list -> done"
 
+    GET_PREV_FF_LIST_START = "Getting prev following/follower list -> start"
+    GET_PREV_FF_LIST_DONE = "Getting prev following/follower list -> done"
+
     GET_DIFF_FOLLOWING_LIST_START = "Diff following list -> start"
     GET_DIFF_FOLLOWING_LIST_DONE = "Diff following list -> done"
 
@@ -41,10 +49,22 @@ class Message(Enum):
     SAVE_RESULT_START = "Save result to file -> start"
     SAVE_RESULT_DONE = "Save result to file -> done"
 
+    APPEND_EVENT_LOG_START = "Append diff to event log -> start"
+    APPEND_EVENT_LOG_DONE = "Append diff to event log -> done"
+    IMPORT_EVENT_LOG = "Event log backfilled from {} existing result files."
+
     MOVE_OLD_FILE_START = "Move old file -> start"
     MOVE_OLD_FILE_DONE = "Move old file -> done"
     MOVE_OLD_FILE_PATH = "Moved file: {}"
 
+    ARCHIVE_OLD_FILE_START = "Archive old file -> start"
+    ARCHIVE_OLD_FILE_DONE = "Archive old file -> done"
+    ARCHIVE_OLD_FILE_PATH = "Archived to: {}"
+
+    STAGE_METRICS = "Stage {} elapsed: {:.3f}s (cpu: {:.3f}s) items: {}"
+    METRICS_WRITTEN = "Metrics written to: {}"
+    TEXTFILE_WRITTEN = "Textfile for node_exporter written to: {}"
+
     RESULT_FILE_OPENING = "Result file: {} opened."
 
     DIRECTORY_INIT_START = "Directory init -> start"
@@ -0,0 +1,168 @@
+import datetime
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import orjson
+
+from ff_getter.util import Result
+
+try:
+    import resource
+except ImportError:
+    # Windows では resource が無いため、ピークメモリ使用量は記録しない
+    resource = None
+
+
+def get_peak_rss() -> int | None:
+    """プロセス開始からのピークメモリ使用量(最大常駐セットサイズ)[byte]を返す
+
+    Returns:
+        int | None: ピークメモリ使用量[byte], 取得できない環境の場合None
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS は byte 単位, それ以外は KiB 単位
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@dataclass
+class StageMetrics:
+    """1段階分の計測結果
+
+    Args:
+        name (str): 段階名
+
+    Attributes:
+        name (str): 段階名
+        wall_sec (float): 経過時間[s]
+        cpu_sec (float): プロセス全体の CPU 時間[s], 並行して動くスレッドの分も含む
+        peak_rss_delta (int | None): 段階中のピークメモリ使用量の増分[byte], 取得できない環境の場合None
+        item_num_dict (dict[str, int]): 段階で扱った件数, ex: {"following": 100, "follower": 200}
+    """
+
+    name: str
+    wall_sec: float = 0.0
+    cpu_sec: float = 0.0
+    peak_rss_delta: int | None = None
+    item_num_dict: dict[str, int] = field(default_factory=dict)
+
+    def count(self, **item_num: int) -> None:
+        """段階で扱った件数を記録する
+
+        ex: stage.count(following=len(following_list), follower=len(follower_list))
+        """
+        self.item_num_dict.update(item_num)
+
+    @property
+    def item_per_sec(self) -> float | None:
+        """1秒あたりに扱った件数, 件数を記録していないか経過時間が0の場合None"""
+        if not self.item_num_dict or self.wall_sec <= 0:
+            return None
+        return sum(self.item_num_dict.values()) / self.wall_sec
+
+    def to_dict(self) -> dict:
+        """JSON として出力する辞書を返す"""
+        return {
+            "name": self.name,
+            "wall_sec": self.wall_sec,
+            "cpu_sec": self.cpu_sec,
+            "peak_rss_delta": self.peak_rss_delta,
+            "item_num": self.item_num_dict,
+            "item_per_sec": self.item_per_sec,
+        }
+
+
+@dataclass
+class RunMetrics:
+    """1回の実行の段階ごとの計測結果
+
+    各段階を stage で囲んで計測し、実行ごとに write で JSON Lines 形式のファイルに1行追記する
+
+    ex:
+        metrics = RunMetrics()
+        with metrics.stage("fetch") as stage:
+            following_list = fetcher.fetch()
+            stage.count(following=len(following_list))
+        metrics.write(Path("./metrics/ff_getter_metrics.jsonl"), Result.success)
+
+    Attributes:
+        started_at (str): 実行開始日時, ISO 8601 形式
+        stage_list (list[StageMetrics]): 計測を終えた段階のリスト, 終えた順
+    """
+
+    started_at: str = field(default_factory=lambda: datetime.datetime.now().isoformat(timespec="seconds"))
+    stage_list: list[StageMetrics] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """with 文で囲んだ処理を1段階として計測する
+
+        段階の途中で例外が発生した場合も、それまでの計測結果を記録する
+
+        Args:
+            name (str): 段階名
+
+        Yields:
+            StageMetrics: 計測中の段階, 件数を記録するために使う
+        """
+        stage_metrics = StageMetrics(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        peak_rss_start = get_peak_rss()
+        try:
+            yield stage_metrics
+        finally:
+            stage_metrics.wall_sec = time.perf_counter() - wall_start
+            stage_metrics.cpu_sec = time.process_time() - cpu_start
+            peak_rss_end = get_peak_rss()
+            if peak_rss_start is not None and peak_rss_end is not None:
+                stage_metrics.peak_rss_delta = peak_rss_end - peak_rss_start
+            self.stage_list.append(stage_metrics)
+
+    def to_dict(self, result: Result) -> dict:
+        """JSON として出力する辞書を返す
+
+        Args:
+            result (Result): 実行結果
+
+        Returns:
+            dict: 実行全体の合計と段階ごとの計測結果を格納した辞書
+        """
+        return {
+            "started_at": self.started_at,
+            "result": result.name,
+            "wall_sec": sum(stage.wall_sec for stage in self.stage_list),
+            "cpu_sec": sum(stage.cpu_sec for stage in self.stage_list),
+            "peak_rss": get_peak_rss(),
+            "stages": [stage.to_dict() for stage in self.stage_list],
+        }
+
+    def write(self, file_path: Path, result: Result) -> Path:
+        """計測結果を JSON Lines 形式のファイルに1行追記する
+
+        Args:
+            file_path (Path): 追記先のファイルパス, 存在しない場合は作成する
+            result (Result): 実行結果
+
+        Returns:
+            Path: 追記したファイルのパス
+        """
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_path.open("ab") as fout:
+            fout.write(orjson.dumps(self.to_dict(result)) + b"\n")
+        return file_path
+
+
+if __name__ == "__main__":
+    import pprint
+
+    metrics = RunMetrics()
+    with metrics.stage("dummy_stage") as stage:
+        dummy_list = list(range(1_000_000))
+        stage.count(dummy=len(dummy_list))
+    pprint.pprint(metrics.to_dict(Result.success))
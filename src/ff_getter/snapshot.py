@@ -0,0 +1,439 @@
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+from ff_getter.value_object.user_record import Follower, Following, UserRecord
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList, UserRecordList
+
+
+@dataclass(frozen=True)
+class SnapshotSection:
+    """スナップショット中の1ブロック(following または follower)
+
+    ID配列と文字列テーブルを列ごとに保持する
+    文字列テーブルは utf-8 でエンコードした文字列を連結したバイト列と、
+    各文字列の開始位置を格納したオフセット配列(要素数は件数 + 1)からなる
+
+    Args:
+        ids (memoryview): ユーザIDの配列, 取得時の順序を保持する
+        name_offsets (memoryview): ユーザ名テーブルのオフセット配列
+        names (memoryview): ユーザ名テーブル
+        screen_name_offsets (memoryview): スクリーンネームテーブルのオフセット配列
+        screen_names (memoryview): スクリーンネームテーブル
+    """
+
+    ids: memoryview
+    name_offsets: memoryview
+    names: memoryview
+    screen_name_offsets: memoryview
+    screen_names: memoryview
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def name(self, index: int) -> str:
+        """index 番目のユーザ名を返す"""
+        return str(self.names[self.name_offsets[index] : self.name_offsets[index + 1]], "utf-8")
+
+    def screen_name(self, index: int) -> str:
+        """index 番目のスクリーンネームを返す"""
+        start, end = self.screen_name_offsets[index], self.screen_name_offsets[index + 1]
+        return str(self.screen_names[start:end], "utf-8")
+
+    def iter_rows(self) -> Iterator[tuple[int, str, str]]:
+        """(ユーザID, ユーザ名, スクリーンネーム) の組を先頭から順に返す, 値の検証は行わない"""
+        for index, user_id in enumerate(self.ids):
+            yield user_id, self.name(index), self.screen_name(index)
+
+    def to_columns(self) -> tuple[list[int], list[str], list[str]]:
+        """(ユーザIDの列, ユーザ名の列, スクリーンネームの列) を返す, 値の検証は行わない
+
+        UserRecordList.from_columns にそのまま渡してまとめて検証する
+        """
+        names = bytes(self.names)
+        screen_names = bytes(self.screen_names)
+        name_offsets = self.name_offsets.tolist()
+        screen_name_offsets = self.screen_name_offsets.tolist()
+        return (
+            self.ids.tolist(),
+            [str(names[start:end], "utf-8") for start, end in zip(name_offsets, name_offsets[1:])],
+            [
+                str(screen_names[start:end], "utf-8")
+                for start, end in zip(screen_name_offsets, screen_name_offsets[1:])
+            ],
+        )
+
+
+class Snapshot:
+    """1回分の実行結果(following と follower)を保持するバイナリスナップショット
+
+    前回との差分を取る際の基準として使用する
+    読み込みは mmap で行い、ID配列やオフセット配列はコピーせずにそのまま参照する
+    レコードは following_list / follower_list を呼び出した時点で作成する
+
+    ファイル構成(数値はすべてリトルエンディアンの符号なし64bit整数):
+        ヘッダ: MAGIC, following 件数, following の各テーブルのバイト長(ユーザ名, スクリーンネーム),
+                follower 件数, follower の各テーブルのバイト長(ユーザ名, スクリーンネーム)
+        数値部: following の ID配列, ユーザ名オフセット配列, スクリーンネームオフセット配列,
+                follower の ID配列, ユーザ名オフセット配列, スクリーンネームオフセット配列
+        文字列部: following のユーザ名テーブル, スクリーンネームテーブル,
+                  follower のユーザ名テーブル, スクリーンネームテーブル
+
+    Attributes:
+        MAGIC (bytes): ファイル先頭に記録する識別子
+        SUFFIX (str): スナップショットファイルの拡張子
+    """
+
+    following: SnapshotSection
+    follower: SnapshotSection
+
+    MAGIC = b"FFSNAP01"
+    SUFFIX = ".snap"
+    _HEADER = struct.Struct("<8s6Q")
+    _ITEM_SIZE = 8
+
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        """スナップショットのバイト列を解釈する
+
+        Args:
+            buffer (bytes | mmap.mmap): スナップショットファイルの内容
+
+        Raises:
+            ValueError: スナップショットとして解釈できない場合
+        """
+        self._buffer = buffer
+        if len(buffer) < self._HEADER.size:
+            raise ValueError("snapshot is too short.")
+        magic, *sizes = self._HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC:
+            raise ValueError("snapshot magic is invalid.")
+        following_sizes, follower_sizes = sizes[:3], sizes[3:]
+
+        numeric_size = sum((3 * n + 2) * self._ITEM_SIZE for n in (following_sizes[0], follower_sizes[0]))
+        string_size = sum(following_sizes[1:]) + sum(follower_sizes[1:])
+        if len(buffer) != self._HEADER.size + numeric_size + string_size:
+            raise ValueError("snapshot size is invalid.")
+
+        view = memoryview(buffer)
+        numeric_offset = self._HEADER.size
+        string_offset = self._HEADER.size + numeric_size
+        sections = []
+        for num, names_size, screen_names_size in (following_sizes, follower_sizes):
+            ids, numeric_offset = self._take_numeric(view, numeric_offset, num)
+            name_offsets, numeric_offset = self._take_numeric(view, numeric_offset, num + 1)
+            screen_name_offsets, numeric_offset = self._take_numeric(view, numeric_offset, num + 1)
+            names = view[string_offset : string_offset + names_size]
+            string_offset += names_size
+            screen_names = view[string_offset : string_offset + screen_names_size]
+            string_offset += screen_names_size
+            sections.append(SnapshotSection(ids, name_offsets, names, screen_name_offsets, screen_names))
+        self.following, self.follower = sections
+
+    @classmethod
+    def _take_numeric(cls, view: memoryview, offset: int, num: int) -> tuple[memoryview, int]:
+        """view の offset から num 個の数値配列を取り出し、(配列, 次のオフセット) を返す"""
+        end = offset + num * cls._ITEM_SIZE
+        if sys.byteorder == "little":
+            return view[offset:end].cast("Q"), end
+        # ビッグエンディアン環境ではコピーしてバイトオーダーを変換する
+        values = array("Q", view[offset:end])
+        values.byteswap()
+        return memoryview(values), end
+
+    def following_list(self) -> FollowingList:
+        """スナップショットから FollowingList を作成する, 値は列ごとにまとめて検証する"""
+        return FollowingList.from_columns(*self.following.to_columns())
+
+    def follower_list(self) -> FollowerList:
+        """スナップショットから FollowerList を作成する, 値は列ごとにまとめて検証する"""
+        return FollowerList.from_columns(*self.follower.to_columns())
+
+    @classmethod
+    def load(cls, snapshot_path: Path) -> Self:
+        """スナップショットファイルを mmap で読み込む
+
+        Args:
+            snapshot_path (Path): スナップショットファイルのパス
+
+        Raises:
+            ValueError: スナップショットとして解釈できない場合
+
+        Returns:
+            Self: スナップショット
+        """
+        with snapshot_path.open("rb") as fin:
+            if snapshot_path.stat().st_size == 0:
+                raise ValueError("snapshot is empty.")
+            buffer = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    @classmethod
+    def _pack_section(
+        cls, user_record_list: UserRecordList
+    ) -> tuple[list[array], list[bytearray], tuple[int, int, int]]:
+        """レコードリストを (数値部, 文字列部, ヘッダ用サイズ) に変換する"""
+        ids = array("Q")
+        name_offsets = array("Q", [0])
+        screen_name_offsets = array("Q", [0])
+        names = bytearray()
+        screen_names = bytearray()
+        for record in user_record_list:
+            ids.append(record.id.id)
+            names += record.name.name.encode("utf-8")
+            name_offsets.append(len(names))
+            screen_names += record.screen_name.name.encode("utf-8")
+            screen_name_offsets.append(len(screen_names))
+
+        numeric_list = [ids, name_offsets, screen_name_offsets]
+        if sys.byteorder != "little":
+            for values in numeric_list:
+                values.byteswap()
+        return numeric_list, [names, screen_names], (len(ids), len(names), len(screen_names))
+
+    @classmethod
+    def _get_chunks(
+        cls, following_list: FollowingList, follower_list: FollowerList
+    ) -> list[bytes | array | bytearray]:
+        """スナップショットを構成するバイト列を先頭から順に並べて返す"""
+        following_numeric, following_string, following_sizes = cls._pack_section(following_list)
+        follower_numeric, follower_string, follower_sizes = cls._pack_section(follower_list)
+        header = cls._HEADER.pack(cls.MAGIC, *following_sizes, *follower_sizes)
+        return [header, *following_numeric, *follower_numeric, *following_string, *follower_string]
+
+    @classmethod
+    def dumps(cls, following_list: FollowingList, follower_list: FollowerList) -> bytes:
+        """following と follower をスナップショットのバイト列に変換する
+
+        Args:
+            following_list (FollowingList): 保存する FollowingList
+            follower_list (FollowerList): 保存する FollowerList
+
+        Returns:
+            bytes: スナップショットのバイト列
+        """
+        return b"".join(cls._get_chunks(following_list, follower_list))
+
+    @classmethod
+    def save(cls, snapshot_path: Path, following_list: FollowingList, follower_list: FollowerList) -> Path:
+        """following と follower をスナップショットファイルに保存する
+
+        各ブロックは連結せずにそのまま順に書き込む
+        書き込み途中で中断しても壊れたスナップショットが残らないよう、一時ファイルから置き換える
+
+        Args:
+            snapshot_path (Path): 保存先のパス
+            following_list (FollowingList): 保存する FollowingList
+            follower_list (FollowerList): 保存する FollowerList
+
+        Returns:
+            Path: 保存したスナップショットファイルのパス
+        """
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as fout:
+            fout.writelines(cls._get_chunks(following_list, follower_list))
+        tmp_path.replace(snapshot_path)
+        return snapshot_path
+
+
+class SnapshotDelta:
+    """前回保存した実行結果からの差分(デルタ)を保持するバイナリファイル
+
+    following/follower それぞれについて、削除されたユーザIDと、追加またはユーザ名等が変わったレコードを保持する
+    追加・更新レコードは Snapshot と同じ形式で保持する
+    前回の実行結果に適用すると、削除されたものを除き、更新されたものを置き換え、追加されたものを先頭に加えたリストとなる
+
+    ファイル構成(数値はすべてリトルエンディアンの符号なし64bit整数):
+        ヘッダ: MAGIC, 基準とした実行ID(utf-8, 16バイトまでゼロ埋め), following の削除件数, follower の削除件数
+        数値部: following の削除ユーザIDの配列, follower の削除ユーザIDの配列
+        追加・更新部: following と follower の追加・更新レコードのスナップショット
+
+    Attributes:
+        MAGIC (bytes): ファイル先頭に記録する識別子
+        SUFFIX (str): 差分ファイルの拡張子
+    """
+
+    base_run_id: str
+    following_removed_ids: memoryview
+    follower_removed_ids: memoryview
+    upserted: Snapshot
+
+    MAGIC = b"FFDELT01"
+    SUFFIX = ".delta"
+    _HEADER = struct.Struct("<8s16s2Q")
+    _ITEM_SIZE = 8
+
+    def __init__(self, buffer: bytes) -> None:
+        """差分のバイト列を解釈する
+
+        Args:
+            buffer (bytes): 差分ファイルの内容
+
+        Raises:
+            ValueError: 差分として解釈できない場合
+        """
+        if len(buffer) < self._HEADER.size:
+            raise ValueError("delta is too short.")
+        magic, base_run_id, following_removed_num, follower_removed_num = self._HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC:
+            raise ValueError("delta magic is invalid.")
+        self.base_run_id = base_run_id.rstrip(b"\x00").decode("utf-8")
+        upserted_offset = self._HEADER.size + (following_removed_num + follower_removed_num) * self._ITEM_SIZE
+        if len(buffer) < upserted_offset:
+            raise ValueError("delta size is invalid.")
+
+        view = memoryview(buffer)
+        numeric_offset = self._HEADER.size
+        self.following_removed_ids, numeric_offset = Snapshot._take_numeric(
+            view, numeric_offset, following_removed_num
+        )
+        self.follower_removed_ids, numeric_offset = Snapshot._take_numeric(view, numeric_offset, follower_removed_num)
+        self.upserted = Snapshot(view[upserted_offset:])
+
+    @staticmethod
+    def to_rows(user_record_list: Iterable[UserRecord]) -> list[tuple[int, str, str]]:
+        """レコードを (ユーザID, ユーザ名, スクリーンネーム) の組のリストに変換する"""
+        return [(r.id.id, r.name.name, r.screen_name.name) for r in user_record_list]
+
+    @staticmethod
+    def _diff_section(
+        prev_row_list: list[tuple[int, str, str]], row_list: list[tuple[int, str, str]]
+    ) -> tuple[array, list[tuple[int, str, str]]]:
+        """前回と今回の組から (削除されたユーザIDの配列, 追加・更新された組のリスト) を求める"""
+        prev_dict: dict[int, tuple[int, str, str]] = {}
+        for row in prev_row_list:
+            prev_dict.setdefault(row[0], row)
+        id_set = {row[0] for row in row_list}
+        removed_ids = array("Q", [user_id for user_id in prev_dict if user_id not in id_set])
+        upserted_list = [row for row in row_list if prev_dict.get(row[0]) != row]
+        return removed_ids, upserted_list
+
+    @staticmethod
+    def _apply_section(
+        prev_row_list: list[tuple[int, str, str]], removed_ids: memoryview, upserted_list: list[tuple[int, str, str]]
+    ) -> list[tuple[int, str, str]]:
+        """前回の組に差分を適用した組のリストを返す"""
+        if not (removed_ids or upserted_list):
+            return prev_row_list
+        removed_set = set(removed_ids)
+        upserted_dict = {row[0]: row for row in upserted_list}
+        kept_list = [upserted_dict.get(row[0], row) for row in prev_row_list if row[0] not in removed_set]
+        prev_id_set = {row[0] for row in prev_row_list} if upserted_list else set()
+        added_list = [row for row in upserted_list if row[0] not in prev_id_set]
+        return added_list + kept_list
+
+    def apply(
+        self, prev_following_rows: list[tuple[int, str, str]], prev_follower_rows: list[tuple[int, str, str]]
+    ) -> tuple[list[tuple[int, str, str]], list[tuple[int, str, str]]]:
+        """前回の実行結果に差分を適用する
+
+        レコードは作成せず、(ユーザID, ユーザ名, スクリーンネーム) の組のまま適用する
+
+        Args:
+            prev_following_rows (list[tuple[int, str, str]]): 前回の following の組のリスト
+            prev_follower_rows (list[tuple[int, str, str]]): 前回の follower の組のリスト
+
+        Returns:
+            tuple[list[tuple[int, str, str]], list[tuple[int, str, str]]]:
+                差分を適用した following と follower の組のリスト
+        """
+        following_rows = self._apply_section(
+            prev_following_rows, self.following_removed_ids, list(self.upserted.following.iter_rows())
+        )
+        follower_rows = self._apply_section(
+            prev_follower_rows, self.follower_removed_ids, list(self.upserted.follower.iter_rows())
+        )
+        return following_rows, follower_rows
+
+    @classmethod
+    def dumps(
+        cls,
+        base_run_id: str,
+        prev_following_rows: list[tuple[int, str, str]],
+        prev_follower_rows: list[tuple[int, str, str]],
+        following_rows: list[tuple[int, str, str]],
+        follower_rows: list[tuple[int, str, str]],
+    ) -> bytes:
+        """前回から今回への差分をバイト列に変換する
+
+        各引数の組は to_rows で作成したものを渡すこと
+
+        Args:
+            base_run_id (str): 基準とした前回の実行ID, utf-8 で16バイトまで
+            prev_following_rows (list[tuple[int, str, str]]): 前回の following の組のリスト
+            prev_follower_rows (list[tuple[int, str, str]]): 前回の follower の組のリスト
+            following_rows (list[tuple[int, str, str]]): 今回の following の組のリスト
+            follower_rows (list[tuple[int, str, str]]): 今回の follower の組のリスト
+
+        Returns:
+            bytes: 差分のバイト列
+        """
+        following_removed_ids, following_upserted = cls._diff_section(prev_following_rows, following_rows)
+        follower_removed_ids, follower_upserted = cls._diff_section(prev_follower_rows, follower_rows)
+        numeric_list = [following_removed_ids, follower_removed_ids]
+        if sys.byteorder != "little":
+            for values in numeric_list:
+                values.byteswap()
+        header = cls._HEADER.pack(
+            cls.MAGIC, base_run_id.encode("utf-8"), len(following_removed_ids), len(follower_removed_ids)
+        )
+        upserted = Snapshot.dumps(
+            FollowingList.create([Following.create(*row) for row in following_upserted]),
+            FollowerList.create([Follower.create(*row) for row in follower_upserted]),
+        )
+        return b"".join([header, *numeric_list, upserted])
+
+    @classmethod
+    def load(cls, delta_path: Path) -> Self:
+        """差分ファイルを読み込む
+
+        Args:
+            delta_path (Path): 差分ファイルのパス
+
+        Raises:
+            ValueError: 差分として解釈できない場合
+
+        Returns:
+            Self: 差分
+        """
+        return cls(delta_path.read_bytes())
+
+    @classmethod
+    def save(cls, delta_path: Path, buffer: bytes) -> Path:
+        """dumps で作成した差分のバイト列を差分ファイルに保存する
+
+        書き込み途中で中断しても壊れた差分が残らないよう、一時ファイルから置き換える
+
+        Args:
+            delta_path (Path): 保存先のパス
+            buffer (bytes): 差分のバイト列
+
+        Returns:
+            Path: 保存した差分ファイルのパス
+        """
+        delta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = delta_path.with_suffix(".tmp")
+        tmp_path.write_bytes(buffer)
+        tmp_path.replace(delta_path)
+        return delta_path
+
+
+if __name__ == "__main__":
+    following_list = FollowingList.create([Following.create(1, "ユーザー1, 名前", "screen_name_1")])
+    follower_list = FollowerList.create([Follower.create(2, "ユーザー2", "screen_name_2")])
+    snapshot = Snapshot(Snapshot.dumps(following_list, follower_list))
+    print(snapshot.following_list())
+    print(snapshot.follower_list())
+
+    next_following_list = FollowingList.create([Following.create(3, "ユーザー3", "screen_name_3")])
+    following_rows, follower_rows = SnapshotDelta.to_rows(following_list), SnapshotDelta.to_rows(follower_list)
+    next_following_rows = SnapshotDelta.to_rows(next_following_list)
+    delta = SnapshotDelta(
+        SnapshotDelta.dumps("20230317", following_rows, follower_rows, next_following_rows, follower_rows)
+    )
+    print(delta.apply(following_rows, follower_rows))
@@ -0,0 +1,284 @@
+from dataclasses import dataclass
+from pathlib import Path
+from zipfile import BadZipFile, ZipFile
+
+from ff_getter.snapshot import Snapshot, SnapshotDelta
+from ff_getter.value_object.user_record import Follower, Following
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+
+@dataclass(frozen=True)
+class SnapshotChain:
+    """各実行時の following/follower を、キーフレームと差分(デルタ)の連鎖として保存する
+
+    keyframe_interval 回の実行ごとに全件のスナップショット(キーフレーム)を保存し、
+    その間の実行分は直前に保存した実行分からの差分のみを保存する
+    任意の実行分は、直近のキーフレームから順に差分を適用して復元する
+    差分を適用した結果が保存するリストと一致しない場合(並び順の変化など)は、キーフレームとして保存する
+
+    キーフレームは Snapshot 形式, 差分は SnapshotDelta 形式で、ファイル名はいずれも "{file_name_base}_{run_id}" となる
+    base_path から削除済の実行分は、archive_path に格納されていればそこから読み込んで復元する
+
+    Args:
+        base_path (Path): 保存先のディレクトリ
+        file_name_base (str): ファイル名の基幹部分, ex: "ff_list"
+        keyframe_interval (int, optional):
+            キーフレームを保存する間隔(実行回数), デフォルトは DEFAULT_KEYFRAME_INTERVAL
+            1以下の場合は毎回キーフレームを保存する
+        archive_path (Path | None, optional):
+            キーフレームと差分を格納したアーカイブ(zip)の保存先ディレクトリ, デフォルトはNone(アーカイブを参照しない)
+            "{file_name_base}_*{archive_suffix}" に一致するアーカイブを参照する
+        archive_suffix (str, optional): アーカイブファイルの拡張子, デフォルトは".zip"
+
+    Attributes:
+        DEFAULT_KEYFRAME_INTERVAL (int): キーフレームを保存する間隔のデフォルト値, デフォルトは30
+    """
+
+    DEFAULT_KEYFRAME_INTERVAL = 30
+
+    base_path: Path
+    file_name_base: str
+    keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL
+    archive_path: Path | None = None
+    archive_suffix: str = ".zip"
+
+    def get_path(self, run_id: str, is_keyframe: bool) -> Path:
+        """実行IDに対応するキーフレームまたは差分のファイルパスを取得する
+
+        Args:
+            run_id (str): 実行ID, ex: "20230318"
+            is_keyframe (bool): キーフレームのパスを取得するかどうか
+
+        Returns:
+            Path: ファイルパス, ex: "./snapshot/ff_list_20230318.snap"
+        """
+        suffix = Snapshot.SUFFIX if is_keyframe else SnapshotDelta.SUFFIX
+        return self.base_path / f"{self.file_name_base}_{run_id}{suffix}"
+
+    def get_entry_list(self) -> list[tuple[str, bool]]:
+        """保存済の実行分を実行IDの順に取得する
+
+        Returns:
+            list[tuple[str, bool]]: (実行ID, キーフレームかどうか) のリスト
+        """
+        entry_dict: dict[str, bool] = {}
+        # 同じ実行IDでキーフレームと差分の両方がある場合はキーフレームを優先する
+        for suffix, is_keyframe in [(SnapshotDelta.SUFFIX, False), (Snapshot.SUFFIX, True)]:
+            for path in self.base_path.glob(f"{self.file_name_base}_*{suffix}"):
+                entry_dict[path.stem.removeprefix(f"{self.file_name_base}_")] = is_keyframe
+        return sorted(entry_dict.items())
+
+    def get_archived_entry_dict(self) -> dict[str, tuple[bool, Path]]:
+        """アーカイブに格納済の実行分を取得する
+
+        Returns:
+            dict[str, tuple[bool, Path]]:
+                実行IDから (キーフレームかどうか, 格納先のアーカイブファイルのパス) への辞書
+                同じ実行IDでキーフレームと差分の両方がある場合はキーフレームを優先する
+        """
+        if self.archive_path is None:
+            return {}
+        entry_dict: dict[str, tuple[bool, Path]] = {}
+        for archive_path in sorted(self.archive_path.glob(f"{self.file_name_base}_*{self.archive_suffix}")):
+            try:
+                with ZipFile(archive_path) as archive:
+                    name_list = archive.namelist()
+            except (BadZipFile, OSError):
+                continue
+            for name in name_list:
+                for suffix, is_keyframe in [(SnapshotDelta.SUFFIX, False), (Snapshot.SUFFIX, True)]:
+                    if name.startswith(f"{self.file_name_base}_") and name.endswith(suffix):
+                        run_id = name.removeprefix(f"{self.file_name_base}_").removesuffix(suffix)
+                        if is_keyframe or run_id not in entry_dict:
+                            entry_dict[run_id] = (is_keyframe, archive_path)
+        return entry_dict
+
+    @staticmethod
+    def _find_chain(entry_list: list[tuple[str, bool]], run_id: str) -> tuple[int, int] | None:
+        """run_id の復元に使う entry_list の範囲を (直近のキーフレームの位置, run_id の位置) で返す, 無い場合None"""
+        run_id_list = [entry_run_id for entry_run_id, _ in entry_list]
+        if run_id not in run_id_list:
+            return None
+        end = run_id_list.index(run_id)
+        start = end
+        while not entry_list[start][1]:
+            start -= 1
+            if start < 0:
+                return None
+        return start, end
+
+    def _read_entry(self, run_id: str, is_keyframe: bool, archived_dict: dict[str, tuple[bool, Path]]) -> bytes:
+        """保存済の実行分のバイト列を、base_path になければアーカイブから読み込む"""
+        path = self.get_path(run_id, is_keyframe)
+        if path.is_file() or run_id not in archived_dict:
+            return path.read_bytes()
+        with ZipFile(archived_dict[run_id][1]) as archive:
+            return archive.read(path.name)
+
+    def _resolve_chain(
+        self, run_id: str
+    ) -> tuple[list[tuple[str, bool]], dict[str, tuple[bool, Path]], int, int] | None:
+        """run_id の復元に使う保存済の実行分を求める
+
+        base_path の保存分だけで復元できない場合は、アーカイブに格納済の実行分も合わせて求める
+
+        Returns:
+            tuple[list[tuple[str, bool]], dict[str, tuple[bool, Path]], int, int] | None:
+                (保存済の実行分のリスト, アーカイブに格納済の実行分の辞書, 直近のキーフレームの位置, run_id の位置)
+                復元できない場合None
+        """
+        entry_list = self.get_entry_list()
+        archived_dict: dict[str, tuple[bool, Path]] = {}
+        if not (chain := self._find_chain(entry_list, run_id)):
+            archived_dict = self.get_archived_entry_dict()
+            if not archived_dict:
+                return None
+            entry_dict = {entry_run_id: is_keyframe for entry_run_id, (is_keyframe, _) in archived_dict.items()}
+            entry_dict.update(entry_list)
+            entry_list = sorted(entry_dict.items())
+            if not (chain := self._find_chain(entry_list, run_id)):
+                return None
+        return entry_list, archived_dict, *chain
+
+    def _load_keyframe(self, run_id: str, archived_dict: dict[str, tuple[bool, Path]]) -> Snapshot:
+        """キーフレームを base_path からは mmap で、なければアーカイブから読み込む"""
+        path = self.get_path(run_id, True)
+        if path.is_file():
+            return Snapshot.load(path)
+        return Snapshot(self._read_entry(run_id, True, archived_dict))
+
+    def _load_rows(self, run_id: str) -> tuple[list[tuple[int, str, str]], list[tuple[int, str, str]]] | None:
+        """実行時の following と follower を (ユーザID, ユーザ名, スクリーンネーム) の組のリストとして復元する"""
+        if not (chain := self._resolve_chain(run_id)):
+            return None
+        return self._replay_rows(*chain)
+
+    def _replay_rows(
+        self, entry_list: list[tuple[str, bool]], archived_dict: dict[str, tuple[bool, Path]], start: int, end: int
+    ) -> tuple[list[tuple[int, str, str]], list[tuple[int, str, str]]] | None:
+        """entry_list[start] のキーフレームに entry_list[end] までの差分を順に適用した組のリストを返す"""
+        try:
+            snapshot = self._load_keyframe(entry_list[start][0], archived_dict)
+            following_rows = list(snapshot.following.iter_rows())
+            follower_rows = list(snapshot.follower.iter_rows())
+            del snapshot
+            for (base_run_id, _), (delta_run_id, _) in zip(entry_list[start:end], entry_list[start + 1 : end + 1]):
+                delta = SnapshotDelta(self._read_entry(delta_run_id, False, archived_dict))
+                if delta.base_run_id != base_run_id:
+                    # 基準とした実行分が欠けている
+                    return None
+                following_rows, follower_rows = delta.apply(following_rows, follower_rows)
+        except (FileNotFoundError, KeyError, BadZipFile, ValueError):
+            return None
+        return following_rows, follower_rows
+
+    def load(self, run_id: str) -> tuple[FollowingList, FollowerList] | None:
+        """実行時の following と follower を復元する
+
+        キーフレームの実行分は、組を作成せずに列のまま読み込んでレコードリストを作成する
+        差分の実行分は、直近のキーフレームを読み込み、そこから run_id までの差分を順に適用する
+        各差分は基準とした実行分が直前の保存分と一致する場合のみ適用する
+        差分はレコードを作成せずに適用し、最後にまとめて検証してレコードリストを作成する
+
+        Args:
+            run_id (str): 実行ID, ex: "20230318"
+
+        Returns:
+            tuple[FollowingList, FollowerList] | None:
+                実行時の FollowingList と FollowerList
+                保存されていない, 途中のファイルが欠けているまたは読み込めない場合None
+        """
+        if not (chain := self._resolve_chain(run_id)):
+            return None
+        entry_list, archived_dict, start, end = chain
+        if start == end:
+            try:
+                snapshot = self._load_keyframe(run_id, archived_dict)
+                return snapshot.following_list(), snapshot.follower_list()
+            except (FileNotFoundError, KeyError, BadZipFile, TypeError, ValueError):
+                return None
+
+        if not (rows := self._replay_rows(entry_list, archived_dict, start, end)):
+            return None
+        following_rows, follower_rows = rows
+        try:
+            return (
+                FollowingList.from_columns(*map(list, zip(*following_rows)))
+                if following_rows
+                else FollowingList.create(),
+                FollowerList.from_columns(*map(list, zip(*follower_rows))) if follower_rows else FollowerList.create(),
+            )
+        except (TypeError, ValueError):
+            return None
+
+    def save(self, run_id: str, following_list: FollowingList, follower_list: FollowerList) -> Path:
+        """実行時の following と follower を保存する
+
+        直前に保存した実行分から keyframe_interval 回目に当たる場合はキーフレームを、それ以外は差分を保存する
+        同じ実行IDで保存済の場合(同日の再実行)は置き換える
+
+        Args:
+            run_id (str): 実行ID, ex: "20230318"
+            following_list (FollowingList): 保存する FollowingList
+            follower_list (FollowerList): 保存する FollowerList
+
+        Returns:
+            Path: 保存したキーフレームまたは差分のファイルパス
+        """
+        prev_entry_list = [entry for entry in self.get_entry_list() if entry[0] < run_id]
+        delta_num = 0
+        for _, is_keyframe in reversed(prev_entry_list):
+            if is_keyframe:
+                break
+            delta_num += 1
+
+        buffer: bytes | None = None
+        if prev_entry_list and delta_num + 1 < self.keyframe_interval:
+            base_run_id = prev_entry_list[-1][0]
+            if prev_rows := self._load_rows(base_run_id):
+                rows = SnapshotDelta.to_rows(following_list), SnapshotDelta.to_rows(follower_list)
+                buffer = SnapshotDelta.dumps(base_run_id, *prev_rows, *rows)
+                # 差分を適用して復元できない場合はキーフレームとする
+                if SnapshotDelta(buffer).apply(*prev_rows) != rows:
+                    buffer = None
+
+        if buffer is None:
+            saved_path = Snapshot.save(self.get_path(run_id, True), following_list, follower_list)
+            self.get_path(run_id, False).unlink(missing_ok=True)
+        else:
+            saved_path = SnapshotDelta.save(self.get_path(run_id, False), buffer)
+            self.get_path(run_id, True).unlink(missing_ok=True)
+        return saved_path
+
+    def prune(self, oldest_run_id: str) -> list[Path]:
+        """oldest_run_id の復元に必要なキーフレームより前の実行分を削除する
+
+        oldest_run_id 以降の実行分は、引き続きキーフレームから復元できる
+        oldest_run_id 以前にキーフレームが無い場合は何も削除しない
+
+        Args:
+            oldest_run_id (str): 復元できるよう残す最も古い実行ID, ex: "20230318"
+
+        Returns:
+            list[Path]: 削除したキーフレームまたは差分のファイルパスのリスト
+        """
+        entry_list = self.get_entry_list()
+        keyframe_run_id_list = [
+            run_id for run_id, is_keyframe in entry_list if is_keyframe and run_id <= oldest_run_id
+        ]
+        if not keyframe_run_id_list:
+            return []
+
+        pruned_list = []
+        for run_id, is_keyframe in entry_list:
+            if run_id >= keyframe_run_id_list[-1]:
+                break
+            path = self.get_path(run_id, is_keyframe)
+            path.unlink(missing_ok=True)
+            pruned_list.append(path)
+        return pruned_list
+
+
+if __name__ == "__main__":
+    snapshot_chain = SnapshotChain(Path("./snapshot/"), "ff_list")
+    print(snapshot_chain.get_entry_list())
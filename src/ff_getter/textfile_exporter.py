@@ -0,0 +1,106 @@
+import math
+from pathlib import Path
+
+
+class TextfileExporter:
+    """node_exporter の textfile collector 向けに、メトリクスを Prometheus のテキスト形式で書き出す
+
+    常駐せずに cron 等から実行されるため、値はすべて直近の実行時点の gauge として書き出す
+    書き出しは一時ファイルから置き換えるため、collector が書き込み途中のファイルを読むことはない
+
+    ex:
+        exporter = TextfileExporter("ff_getter")
+        exporter.set("users", 100, "Number of users in last run.", ff_type="following")
+        exporter.write(Path("./metrics/ff_getter.prom"))
+
+    Attributes:
+        prefix (str): メトリクス名の接頭辞
+    """
+
+    prefix: str
+    _metric_dict: dict[str, tuple[str, dict[tuple[tuple[str, str], ...], float]]]
+
+    def __init__(self, prefix: str) -> None:
+        """TextfileExporter
+
+        Args:
+            prefix (str): メトリクス名の接頭辞, ex: "ff_getter"
+        """
+        self.prefix = prefix
+        self._metric_dict = {}
+
+    def set(self, name: str, value: float, help_text: str, **labels: str) -> None:
+        """メトリクスの値を設定する
+
+        同じ名前とラベルの組で設定済の場合は上書きする
+
+        Args:
+            name (str): 接頭辞を除いたメトリクス名, ex: "stage_duration_seconds"
+            value (float): 値
+            help_text (str): メトリクスの説明, 同じ名前で最初に設定したものを使う
+            **labels (str): ラベル, ex: stage="fetch"
+        """
+        full_name = f"{self.prefix}_{name}"
+        _, sample_dict = self._metric_dict.setdefault(full_name, (help_text, {}))
+        sample_dict[tuple(sorted((key, str(label)) for key, label in labels.items()))] = float(value)
+
+    def get(self, name: str, **labels: str) -> float | None:
+        """設定済のメトリクスの値を返す, 未設定の場合None"""
+        _, sample_dict = self._metric_dict.get(f"{self.prefix}_{name}", ("", {}))
+        return sample_dict.get(tuple(sorted((key, str(label)) for key, label in labels.items())))
+
+    @staticmethod
+    def _escape(label: str) -> str:
+        """ラベル値をテキスト形式用にエスケープする"""
+        return label.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        """値をテキスト形式用の文字列にする"""
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return str(int(value)) if value.is_integer() else repr(value)
+
+    def render(self) -> str:
+        """Prometheus のテキスト形式の文字列を返す
+
+        メトリクスは名前順, 同じメトリクスのサンプルはラベル順に並べる
+        """
+        line_list = []
+        for full_name, (help_text, sample_dict) in sorted(self._metric_dict.items()):
+            line_list.append(f"# HELP {full_name} {help_text}")
+            line_list.append(f"# TYPE {full_name} gauge")
+            for label_pairs, value in sorted(sample_dict.items()):
+                label_str = ""
+                if label_pairs:
+                    label_str = "{" + ",".join(f'{key}="{self._escape(label)}"' for key, label in label_pairs) + "}"
+                line_list.append(f"{full_name}{label_str} {self._format_value(value)}")
+        return "".join(line + "\n" for line in line_list)
+
+    def write(self, file_path: Path) -> Path:
+        """テキスト形式でファイルに書き出す
+
+        Args:
+            file_path (Path): 書き出し先のファイルパス, 拡張子は textfile collector が読み込む .prom とすること
+
+        Returns:
+            Path: 書き出したファイルのパス
+        """
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(self.render(), encoding="utf-8")
+            tmp_path.replace(file_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return file_path
+
+
+if __name__ == "__main__":
+    exporter = TextfileExporter("ff_getter")
+    exporter.set("users", 100, "Number of users in last run.", ff_type="following")
+    exporter.set("users", 200, "Number of users in last run.", ff_type="follower")
+    exporter.set("stage_duration_seconds", 1.5, "Duration of each stage in last run.", stage="fetch")
+    print(exporter.render(), end="")
@@ -1,6 +1,11 @@
+import threading
 from enum import Enum, auto
+from logging import INFO, getLogger
 from typing import Any
 
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
 
 class Result(Enum):
     success = auto()
@@ -12,6 +17,12 @@ class FFtype(Enum):
     follower = "follower"
 
 
+class RunLocation(Enum):
+    result = "result"
+    backup = "backup"
+    archive = "archive"
+
+
 def find_values(
     obj: Any,
     key: str,
@@ -50,5 +61,244 @@ def find_values(
     return result[0]
 
 
+class CompiledPath:
+    """ドット区切りのキーパスをコンパイルしたもの
+
+    既知のキーパスを辞書の階層に沿って直接たどるため、探索は O(depth) で済む
+    途中の階層が見つからない(スキーマが変化した)場合のみ、
+    末尾のキーで find_values によるワイルドカード検索にフォールバックする
+    末尾のキーのみが存在しない場合は値が省略されたものとみなし、フォールバックしない
+
+    Args:
+        path (str): "." 区切りのキーパス, ex: "result.legacy.screen_name"
+
+    Attributes:
+        keys (tuple[str, ...]): キーパスを分割したもの
+        hit_count (int): キーパスを直接たどって値を取得できた回数
+        fallback_count (int): ワイルドカード検索にフォールバックして値を取得できた回数
+        miss_count (int): 値を取得できなかった回数
+    """
+
+    path: str
+    keys: tuple[str, ...]
+    hit_count: int
+    fallback_count: int
+    miss_count: int
+    _lock: threading.Lock
+
+    def __init__(self, path: str) -> None:
+        if not isinstance(path, str):
+            raise TypeError("path must be str.")
+        keys = tuple(path.split("."))
+        if not all(keys):
+            raise ValueError(f"path='{path}' is invalid.")
+        self.path = path
+        self.keys = keys
+        self.hit_count = 0
+        self.fallback_count = 0
+        self.miss_count = 0
+        # 複数スレッドの fetcher やアカウントのロードから同時に使われるため、集計はロックして行う
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"CompiledPath({self.path!r})"
+
+    @property
+    def stats(self) -> dict:
+        """値の取得結果の集計"""
+        with self._lock:
+            return {
+                "path": self.path,
+                "hit_count": self.hit_count,
+                "fallback_count": self.fallback_count,
+                "miss_count": self.miss_count,
+            }
+
+    def resolve(self, obj: Any, default: Any = ...) -> Any:
+        """obj からキーパスが示す値を取得する
+
+        Args:
+            obj (Any): 探索対象
+            default (Any, optional): 値が見つからなかった場合の返り値, 省略時は ValueError を送出する
+
+        Raises:
+            ValueError: 値が見つからないか複数見つかった場合で、default が省略されている場合
+
+        Returns:
+            Any: キーパスが示す値
+        """
+        current = obj
+        last_index = len(self.keys) - 1
+        for i, key in enumerate(self.keys):
+            if isinstance(current, dict) and key in current:
+                current = current[key]
+                continue
+            if i == last_index and isinstance(current, dict):
+                # 末尾のキーのみ存在しない = 値が省略されている
+                return self._miss(default, "not found")
+            break
+        else:
+            self._hit()
+            return current
+
+        # スキーマが変化した場合はワイルドカード検索にフォールバックする
+        values = find_values(obj, self.keys[-1])
+        if len(values) == 1:
+            with self._lock:
+                self.fallback_count += 1
+                is_first_fallback = self.fallback_count == 1
+            if is_first_fallback:
+                logger.warning(f"Key path '{self.path}' is not matched, fallback to wildcard search.")
+            return values[0]
+        return self._miss(default, "not found" if not values else "multiple found")
+
+    def _hit(self) -> None:
+        with self._lock:
+            self.hit_count += 1
+
+    def _miss(self, default: Any, reason: str) -> Any:
+        with self._lock:
+            self.miss_count += 1
+        if default is ...:
+            raise ValueError(f"Value of path='{self.path}' is {reason}.")
+        return default
+
+
+_compiled_path_dict: dict[str, CompiledPath] = {}
+_compiled_path_lock = threading.Lock()
+
+
+def compile_path(path: str) -> CompiledPath:
+    """キーパスをコンパイルする
+
+    同じキーパスに対しては同じ CompiledPath インスタンスを返すため、
+    fallback_count 等の集計はキーパスごとにまとめられる
+
+    Args:
+        path (str): "." 区切りのキーパス, ex: "result.legacy.screen_name"
+
+    Returns:
+        CompiledPath: コンパイル済のキーパス
+    """
+    with _compiled_path_lock:
+        if path not in _compiled_path_dict:
+            _compiled_path_dict[path] = CompiledPath(path)
+        return _compiled_path_dict[path]
+
+
+def get_compiled_path_stats() -> list[dict]:
+    """コンパイル済のすべてのキーパスについて、値の取得結果の集計を返す
+
+    Returns:
+        list[dict]: CompiledPath.stats のリスト
+    """
+    with _compiled_path_lock:
+        compiled_path_list = list(_compiled_path_dict.values())
+    return [compiled_path.stats for compiled_path in compiled_path_list]
+
+
+class CompiledRecord:
+    """複数のキーパスをまとめてコンパイルしたもの
+
+    キーパスを共通の接頭辞でまとめた木構造を作成し、
+    1つの辞書に対して1回の走査ですべてのキーパスの値をまとめて取得する
+    途中の階層が見つからなかったキーパスのみ、個別に CompiledPath.resolve でフォールバックする
+    集計はキーパスごとの CompiledPath に対して行われる
+
+    Args:
+        *paths (str): "." 区切りのキーパス, ex: "result.rest_id", "result.legacy.screen_name"
+
+    Attributes:
+        compiled_path_list (list[CompiledPath]): 各キーパスをコンパイルしたもの
+    """
+
+    compiled_path_list: list[CompiledPath]
+
+    _DRIFT = object()
+    _OMITTED = object()
+
+    def __init__(self, *paths: str) -> None:
+        if not paths:
+            raise ValueError("paths must not be empty.")
+        self.compiled_path_list = [compile_path(path) for path in paths]
+
+        # 木構造の各節は (子の辞書, 末尾のキーとインデックスのリスト) のタプル
+        self._tree: tuple[dict, list[tuple[str, int]]] = ({}, [])
+        for index, compiled_path in enumerate(self.compiled_path_list):
+            children, leaves = self._tree
+            for key in compiled_path.keys[:-1]:
+                children, leaves = children.setdefault(key, ({}, []))
+            leaves.append((compiled_path.keys[-1], index))
+
+    def __repr__(self) -> str:
+        return f"CompiledRecord({', '.join(repr(p.path) for p in self.compiled_path_list)})"
+
+    def _walk(self, node: tuple[dict, list[tuple[str, int]]], current: dict, result: list) -> None:
+        children, leaves = node
+        for key, index in leaves:
+            result[index] = current[key] if key in current else self._OMITTED
+        for key, child in children.items():
+            value = current.get(key)
+            if isinstance(value, dict):
+                self._walk(child, value, result)
+            else:
+                self._mark_drift(child, result)
+
+    def _mark_drift(self, node: tuple[dict, list[tuple[str, int]]], result: list) -> None:
+        children, leaves = node
+        for _, index in leaves:
+            result[index] = self._DRIFT
+        for child in children.values():
+            self._mark_drift(child, result)
+
+    def extract(self, obj: Any, defaults: tuple | None = None) -> tuple:
+        """obj から各キーパスが示す値をまとめて取得する
+
+        Args:
+            obj (Any): 探索対象
+            defaults (tuple | None, optional):
+                キーパスごとの値が見つからなかった場合の返り値, 要素が ... のキーパスは ValueError を送出する
+                None の場合はすべてのキーパスについて ValueError を送出する
+
+        Raises:
+            ValueError: 値が見つからないか複数見つかった場合で、対応する defaults の要素が ... の場合
+
+        Returns:
+            tuple: 各キーパスが示す値を、コンパイル時の順に並べたタプル
+        """
+        num = len(self.compiled_path_list)
+        if defaults is None:
+            defaults = (...,) * num
+        if len(defaults) != num:
+            raise ValueError(f"defaults must be tuple of length {num}.")
+
+        result = [self._DRIFT] * num
+        if isinstance(obj, dict):
+            self._walk(self._tree, obj, result)
+
+        for index, value in enumerate(result):
+            compiled_path = self.compiled_path_list[index]
+            if value is self._DRIFT:
+                # スキーマが変化した場合は個別にワイルドカード検索にフォールバックする
+                result[index] = compiled_path.resolve(obj, defaults[index])
+            elif value is self._OMITTED:
+                result[index] = compiled_path._miss(defaults[index], "not found")
+            else:
+                compiled_path._hit()
+        return tuple(result)
+
+
+def compile_record(*paths: str) -> CompiledRecord:
+    """複数のキーパスをまとめてコンパイルする
+
+    Args:
+        *paths (str): "." 区切りのキーパス, ex: "result.rest_id", "result.legacy.screen_name"
+
+    Returns:
+        CompiledRecord: コンパイル済のキーパスの組
+    """
+    return CompiledRecord(*paths)
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,181 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import ClassVar, Self
+
+from ff_getter.value_object.screen_name import ScreenName
+from ff_getter.value_object.user_id import UserId
+from ff_getter.value_object.user_name import UserName
+from ff_getter.value_object.user_record import Follower, Following, UserRecord
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList, UserRecordList
+
+
+@dataclass(frozen=True)
+class ColumnarUserRecordList(Iterable):
+    """列ごとに保持するレコードリスト
+
+    UserRecord を1件ずつ保持する代わりに、ID配列と文字列テーブルを列ごとに保持する
+    文字列テーブルは utf-8 でエンコードした文字列を連結したバイト列と、
+    各文字列の開始位置を格納したオフセット配列(要素数は件数 + 1)からなる
+    UserRecord はイテレート時に1件ずつ作成する
+
+    Args:
+        _ids (array): ユーザIDの配列
+        _name_offsets (array): ユーザ名テーブルのオフセット配列
+        _names (bytes): ユーザ名テーブル
+        _screen_name_offsets (array): スクリーンネームテーブルのオフセット配列
+        _screen_names (bytes): スクリーンネームテーブル
+
+    Attributes:
+        RECORD_CLASS (type[UserRecord]): イテレート時に作成するレコードのクラス
+        LIST_CLASS (type[UserRecordList]): to_record_list で変換する先のレコードリストのクラス
+    """
+
+    _ids: array
+    _name_offsets: array
+    _names: bytes
+    _screen_name_offsets: array
+    _screen_names: bytes
+
+    RECORD_CLASS: ClassVar[type[UserRecord]] = UserRecord
+    LIST_CLASS: ClassVar[type[UserRecordList]] = UserRecordList
+
+    def __post_init__(self) -> None:
+        if not all(isinstance(column, array) for column in [self._ids, self._name_offsets, self._screen_name_offsets]):
+            raise TypeError("ids and offsets must be array.")
+        if not (isinstance(self._names, bytes) and isinstance(self._screen_names, bytes)):
+            raise TypeError("names and screen_names must be bytes.")
+        num = len(self._ids)
+        if len(self._name_offsets) != num + 1 or len(self._screen_name_offsets) != num + 1:
+            raise ValueError("length of offsets must be length of ids + 1.")
+        if self._name_offsets[-1] != len(self._names) or self._screen_name_offsets[-1] != len(self._screen_names):
+            raise ValueError("last offset must be length of string table.")
+
+    def __iter__(self) -> Iterator[UserRecord]:
+        for index in range(len(self._ids)):
+            yield self[index]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index: int) -> UserRecord:
+        """index 番目のレコードを作成して返す"""
+        if index < 0:
+            index += len(self._ids)
+        if not 0 <= index < len(self._ids):
+            raise IndexError("index out of range.")
+        name = self._names[self._name_offsets[index] : self._name_offsets[index + 1]].decode("utf-8")
+        screen_name_start, screen_name_end = self._screen_name_offsets[index], self._screen_name_offsets[index + 1]
+        screen_name = self._screen_names[screen_name_start:screen_name_end].decode("utf-8")
+        return self.RECORD_CLASS(UserId(self._ids[index]), UserName(name), ScreenName(screen_name))
+
+    @property
+    def ids(self) -> array:
+        """ユーザIDの配列"""
+        return self._ids
+
+    def to_record_list(self) -> UserRecordList:
+        """すべてのレコードを作成し、通常のレコードリストに変換する
+
+        Returns:
+            UserRecordList: LIST_CLASS のインスタンス
+        """
+        return self.LIST_CLASS.create(list(self))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, str, str]]) -> Self:
+        """(ID, ユーザ名, スクリーンネーム) の組から作成する
+
+        UserRecord を経由しないため、値の検証は各値オブジェクトと同じ条件を列単位で行う
+
+        Args:
+            rows (Iterable[tuple[int, str, str]]): (ID, ユーザ名, スクリーンネーム) の組のイテラブル
+
+        Raises:
+            TypeError: 値の型が不正な場合
+            ValueError: 値が不正な場合
+
+        Returns:
+            Self: 列ごとに保持するレコードリスト
+        """
+        ids = array("Q")
+        name_list: list[str] = []
+        screen_name_list: list[str] = []
+        for user_id, name, screen_name in rows:
+            if not isinstance(user_id, int):
+                raise TypeError("id must be integer.")
+            if user_id < 0:
+                raise ValueError("id must be 0 or greater.")
+            ids.append(user_id)
+            name_list.append(name)
+            screen_name_list.append(screen_name)
+
+        # 値オブジェクトの作成と同じ検証を列単位で行う
+        if not all(isinstance(name, str) for name in name_list):
+            raise TypeError("name must be str.")
+        ScreenName.validate_column(screen_name_list)
+
+        name_offsets, names = cls._pack_strings(name_list)
+        screen_name_offsets, screen_names = cls._pack_strings(screen_name_list)
+        return cls(ids, name_offsets, names, screen_name_offsets, screen_names)
+
+    @classmethod
+    def _pack_strings(cls, string_list: list[str]) -> tuple[array, bytes]:
+        """文字列のリストを (オフセット配列, 文字列テーブル) に変換する"""
+        offsets = array("Q", [0])
+        encoded_list = [string.encode("utf-8") for string in string_list]
+        total = 0
+        for encoded in encoded_list:
+            total += len(encoded)
+            offsets.append(total)
+        return offsets, b"".join(encoded_list)
+
+    @classmethod
+    def create(cls, user_record_list: Iterable[UserRecord] | None = None) -> Self:
+        """レコードのイテラブルから作成する
+
+        None の場合は要素が空のレコードリストを返す
+
+        Args:
+            user_record_list (Iterable[UserRecord], optional): レコードのリストやレコードリスト
+
+        Raises:
+            TypeError: 要素が UserRecord でない場合
+
+        Returns:
+            Self: 列ごとに保持するレコードリスト
+        """
+        user_record_list = user_record_list or []
+        rows = []
+        for r in user_record_list:
+            if not isinstance(r, UserRecord):
+                raise TypeError("arg list must be list[UserRecord].")
+            rows.append((r.id.id, r.name.name, r.screen_name.name))
+        return cls.from_rows(rows)
+
+
+@dataclass(frozen=True)
+class ColumnarFollowingList(ColumnarUserRecordList):
+    """列ごとに保持する Following レコードリスト"""
+
+    RECORD_CLASS: ClassVar[type[UserRecord]] = Following
+    LIST_CLASS: ClassVar[type[UserRecordList]] = FollowingList
+
+
+@dataclass(frozen=True)
+class ColumnarFollowerList(ColumnarUserRecordList):
+    """列ごとに保持する Follower レコードリスト"""
+
+    RECORD_CLASS: ClassVar[type[UserRecord]] = Follower
+    LIST_CLASS: ClassVar[type[UserRecordList]] = FollowerList
+
+
+if __name__ == "__main__":
+    following_list = ColumnarFollowingList.from_rows([
+        (1, "ユーザー1", "screen_name_1"),
+        (2, "ユーザー2", "screen_name_2"),
+    ])
+    print(len(following_list))
+    for r in following_list:
+        print(r)
+    print(following_list.to_record_list())
@@ -96,6 +96,36 @@ class DiffRecord:
         screen_name = ScreenName(screen_name)
         return cls(diff_type, user_id, user_name, screen_name)
 
+    @classmethod
+    def create_trusted(cls, diff_type: DiffType, user_id: int, name: str, screen_name: str) -> Self:
+        """検証済の値から差分レコードを作成する
+
+        各値オブジェクトの検証を行わずに作成するため、
+        イベントログに記録済の差分など、事前に検証済の値に対してのみ使用すること
+
+        Args:
+            diff_type (DiffType): 差分タイプ
+            user_id (int): 検証済のユーザID
+            name (str): 検証済のユーザ名
+            screen_name (str): 検証済のスクリーンネーム
+
+        Returns:
+            Self: 差分レコードインスタンス
+        """
+        # frozen な dataclass の __setattr__ を経由せずにインスタンス辞書へ直接値を設定する
+        new = object.__new__
+        user_id_obj = new(UserId)
+        user_id_obj.__dict__["_id"] = user_id
+        user_name_obj = new(UserName)
+        user_name_obj.__dict__["_name"] = name
+        screen_name_obj = new(ScreenName)
+        screen_name_obj.__dict__["_name"] = screen_name
+        record = new(cls)
+        record.__dict__.update(
+            _diff_type=diff_type, _id=user_id_obj, _name=user_name_obj, _screen_name=screen_name_obj
+        )
+        return record
+
 
 @dataclass(frozen=True)
 class DiffFollowing(DiffRecord):
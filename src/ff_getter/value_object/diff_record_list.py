@@ -1,8 +1,8 @@
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Iterable, Iterator, Self
 
 from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing, DiffRecord, DiffType
+from ff_getter.value_object.user_record import UserRecord
 from ff_getter.value_object.user_record_list import UserRecordList
 
 
@@ -58,9 +58,11 @@ class DiffRecordList(Iterable):
         """2つのレコードリストから差分レコードリストを作成する
 
         p_list, q_list のどちらかが空ならば、空の差分レコードリストを返す
-        p_list, q_list の要素のIDをそれぞれ収集し、排他的論理和にて差分を得る
+        p_list, q_list の要素のIDをキーとしたハッシュマップをそれぞれ作成し、排他的論理和にて差分を得る
+        計算量は O(len(p_list) + len(q_list)) となる
         p_list に存在するが q_list に存在しないものは DiffType.ADD,
         p_list に存在しないが q_list に存在するものは DiffType.REMOVE が割り当てられる
+        並び順は DiffType.ADD を p_list の順に、続けて DiffType.REMOVE を q_list の順に並べたものとなる
 
         Args:
             p_list (UserRecordList): レコードリスト(基準)
@@ -69,49 +71,28 @@ class DiffRecordList(Iterable):
         Returns:
             Self: 差分レコードリスト
         """
-        p1_list = deepcopy(p_list)
-        q1_list = deepcopy(q_list)
-
-        p2_list = [r.to_dict() for r in p1_list]
-        q2_list = [r.to_dict() for r in q1_list]
-
         # 引数のどちらかが空なら空の差分リストを返す
-        if not (p2_list and q2_list):
+        if not (p_list and q_list):
             return cls.create()
 
-        # 順序保持用の order_id を付与
-        for i, p in enumerate(p2_list):
-            p["order_id"] = i
-        for i, q in enumerate(q2_list):
-            q["order_id"] = i + len(p2_list) + 1
-
-        p = [r["id"] for r in p2_list]
-        q = [r["id"] for r in q2_list]
-
-        result: list[dict] = []
-        # 集合演算：排他的論理和
-        diff_list = set(p) ^ set(q)
-        for diff_id in diff_list:
-            if diff_id in p:
-                record = [r for r in p2_list if r["id"] == diff_id][0]
-                record["diff_type"] = "ADD"
-                result.append(record)
-            elif diff_id in q:
-                record = [r for r in q2_list if r["id"] == diff_id][0]
-                record["diff_type"] = "REMOVE"
-                result.append(record)
-        result.sort(key=lambda r: r["order_id"])
-
-        diff_record_list = [
-            DiffRecord.create(
-                r.get("diff_type"),
-                r.get("id"),
-                r.get("name"),
-                r.get("screen_name"),
-            )
-            for r in result
+        # ID をキーとしたハッシュマップを作成する
+        # 同一IDが複数存在する場合は先に出現したものを採用する
+        p_dict: dict[int, UserRecord] = {}
+        for r in p_list:
+            p_dict.setdefault(r.id.id, r)
+        q_dict: dict[int, UserRecord] = {}
+        for r in q_list:
+            q_dict.setdefault(r.id.id, r)
+
+        # p_list のみに存在するものを p_list の順で DiffType.ADD,
+        # q_list のみに存在するものを q_list の順で DiffType.REMOVE として追加する
+        diff_record_list: list[DiffRecord] = [
+            DiffRecord(DiffType.ADD, r.id, r.name, r.screen_name) for i, r in p_dict.items() if i not in q_dict
         ]
-        return cls.create(diff_record_list)
+        diff_record_list.extend(
+            DiffRecord(DiffType.REMOVE, r.id, r.name, r.screen_name) for i, r in q_dict.items() if i not in p_dict
+        )
+        return cls(diff_record_list)
 
 
 @dataclass(frozen=True)
@@ -13,18 +13,47 @@ class ScreenName:
 
     Attributes:
         PATTERN (str): スクリーンネームとして許容されるパターン
+        COMPILED_PATTERN (re.Pattern): PATTERN をコンパイルしたもの
+        COLUMN_PATTERN (re.Pattern): 改行区切りで連結したスクリーンネーム列全体が満たすべきパターン
     """
 
     _name: str
 
     PATTERN = "^[0-9a-zA-Z_]+$"
+    COMPILED_PATTERN = re.compile(PATTERN)
+    COLUMN_PATTERN = re.compile("[0-9a-zA-Z_]+(?:\n[0-9a-zA-Z_]+)*")
 
     def __post_init__(self) -> None:
         if not isinstance(self._name, str):
             raise TypeError("name must be str.")
-        if not re.search(self.PATTERN, self._name):
+        if not self.COMPILED_PATTERN.search(self._name):
             raise ValueError(f"name must be pattern of '{self.PATTERN}'.")
 
+    @classmethod
+    def validate_column(cls, name_list: list[str]) -> None:
+        """スクリーンネームの列をまとめて検証する
+
+        列を改行で連結し、1回の照合で全体を検証する
+        照合に失敗した場合は1件ずつ検証し、1件ずつ作成した場合と同じ例外を送出する
+
+        Args:
+            name_list (list[str]): 検証するスクリーンネームのリスト
+
+        Raises:
+            TypeError: 要素が str でない場合
+            ValueError: 要素がスクリーンネームのパターンを満たさない場合
+        """
+        if not name_list:
+            return
+        if not all(isinstance(name, str) for name in name_list):
+            raise TypeError("name must be str.")
+        joined = "\n".join(name_list)
+        # 要素自体に改行が含まれていると区切りと区別できないため、区切りの数も確認する
+        if joined.count("\n") == len(name_list) - 1 and cls.COLUMN_PATTERN.fullmatch(joined):
+            return
+        for name in name_list:
+            cls(name)
+
     @property
     def name(self) -> str:
         return self._name
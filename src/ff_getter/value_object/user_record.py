@@ -69,6 +69,33 @@ class UserRecord:
         screen_name = ScreenName(screen_name)
         return cls(user_id, user_name, screen_name)
 
+    @classmethod
+    def create_trusted(cls, user_id: int, name: str, screen_name: str) -> Self:
+        """検証済の値からレコードを作成する
+
+        各値オブジェクトの検証を行わずに作成するため、
+        呼び出し側で UserRecordList.from_columns などにより事前に検証しておくこと
+
+        Args:
+            user_id (int): 検証済のユーザID
+            name (str): 検証済のユーザ名
+            screen_name (str): 検証済のスクリーンネーム
+
+        Returns:
+            Self: レコード
+        """
+        # frozen な dataclass の __setattr__ を経由せずにインスタンス辞書へ直接値を設定する
+        new = object.__new__
+        user_id_obj = new(UserId)
+        user_id_obj.__dict__["_id"] = user_id
+        user_name_obj = new(UserName)
+        user_name_obj.__dict__["_name"] = name
+        screen_name_obj = new(ScreenName)
+        screen_name_obj.__dict__["_name"] = screen_name
+        record = new(cls)
+        record.__dict__.update(_id=user_id_obj, _name=user_name_obj, _screen_name=screen_name_obj)
+        return record
+
 
 @dataclass(frozen=True)
 class Following(UserRecord):
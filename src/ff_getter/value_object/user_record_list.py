@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from typing import Iterable, Iterator, Self
+from typing import ClassVar, Iterable, Iterator, Self
 
+from ff_getter.value_object.screen_name import ScreenName
 from ff_getter.value_object.user_record import Follower, Following, UserRecord
 
 
@@ -10,14 +11,19 @@ class UserRecordList(Iterable):
 
     Args:
         _list (list[UserRecord]): レコードのリスト
+
+    Attributes:
+        RECORD_CLASS (type[UserRecord]): from_columns で作成するレコードのクラス
     """
 
     _list: list[UserRecord]
 
+    RECORD_CLASS: ClassVar[type[UserRecord]] = UserRecord
+
     def __post_init__(self) -> None:
         if not isinstance(self._list, list):
             raise TypeError("arg list must be list[UserRecord].")
-        if not all([isinstance(r, UserRecord) for r in self._list]):
+        if not all(isinstance(r, UserRecord) for r in self._list):
             raise TypeError("arg list must be list[UserRecord].")
 
     def __iter__(self) -> Iterator[UserRecord]:
@@ -44,26 +50,79 @@ class UserRecordList(Iterable):
             Self: レコードリスト
         """
         if isinstance(user_record_list, list):
-            if all([isinstance(r, UserRecord) for r in user_record_list]):
+            # 要素の検証は __post_init__ に任せ、二重に検証しない
+            try:
                 return cls(user_record_list)
+            except TypeError:
+                return cls([])
         if isinstance(user_record_list, UserRecord):
             user_record = user_record_list
             return cls([user_record])
         return cls([])
 
+    @classmethod
+    def from_columns(cls, ids: list[int], names: list[str], screen_names: list[str]) -> Self:
+        """列ごとの値からレコードリストを一括で作成する
+
+        各列をまとめて検証した後、レコードごとの検証を行わずにレコードを作成する
+        検証の条件は UserId, UserName, ScreenName をそれぞれ作成した場合と同じ
+
+        Args:
+            ids (list[int]): ユーザIDの列
+            names (list[str]): ユーザ名の列
+            screen_names (list[str]): スクリーンネームの列
+
+        Raises:
+            TypeError: 値の型が不正な場合
+            ValueError: 列の長さが揃っていない場合, 値が不正な場合
+
+        Returns:
+            Self: レコードリスト
+        """
+        if not (len(ids) == len(names) == len(screen_names)):
+            raise ValueError("length of columns must be same.")
+        if not all(isinstance(user_id, int) for user_id in ids):
+            raise TypeError("id must be integer.")
+        if ids and min(ids) < 0:
+            raise ValueError("id must be 0 or greater.")
+        if not all(isinstance(name, str) for name in names):
+            raise TypeError("name must be str.")
+        ScreenName.validate_column(screen_names)
+
+        create_trusted = cls.RECORD_CLASS.create_trusted
+        return cls.create_trusted([create_trusted(*row) for row in zip(ids, names, screen_names)])
+
+    @classmethod
+    def create_trusted(cls, user_record_list: list[UserRecord]) -> Self:
+        """検証済のレコードのリストからレコードリストを作成する
+
+        __post_init__ による要素ごとの検証を行わずに作成するため、
+        呼び出し側で from_columns などにより事前に検証しておくこと
+
+        Args:
+            user_record_list (list[UserRecord]): 検証済のレコードのリスト
+
+        Returns:
+            Self: レコードリスト
+        """
+        # frozen な dataclass の __setattr__ と __post_init__ を経由せずにインスタンス辞書へ直接値を設定する
+        new = object.__new__(cls)
+        new.__dict__["_list"] = user_record_list
+        return new
+
 
 @dataclass(frozen=True)
 class FollowingList(UserRecordList):
     """Following レコードリスト"""
 
-    pass
+    RECORD_CLASS: ClassVar[type[UserRecord]] = Following
 
 
 @dataclass(frozen=True)
 class FollowerList(UserRecordList):
     """Follower レコードリスト"""
 
-    pass
+    RECORD_CLASS: ClassVar[type[UserRecord]] = Follower
 
 
 if __name__ == "__main__":
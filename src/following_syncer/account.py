@@ -6,11 +6,21 @@ import orjson
 
 from following_syncer.twitter_api import TwitterAPI
 from following_syncer.user import FollowingUser, ListUser
-from following_syncer.util import AccountType, find_values
+from following_syncer.user_store import UserStore
+from following_syncer.util import AccountType, compile_record, get_compiled_path_stats
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
 
+# user_dict から rest_id, name, screen_name, protected を1回の走査でまとめて取得する
+USER_RECORD = compile_record(
+    "result.rest_id",
+    "result.legacy.name",
+    "result.legacy.screen_name",
+    "result.legacy.protected",
+)
+USER_RECORD_DEFAULTS = (..., ..., ..., False)
+
 
 class Account:
     screen_name: str
@@ -29,10 +39,11 @@ class Account:
         account_config_dict: dict,
         account_type: AccountType,
         is_dry_run: bool = True,
+        user_store: UserStore | None = None,
     ) -> None:
         config = account_config_dict["account"]
         self.screen_name = config["screen_name"]
-        self.twitter = TwitterAPI(config["ct0"], config["auth_token"], self.screen_name)
+        self.twitter = TwitterAPI(config["ct0"], config["auth_token"], self.screen_name, user_store)
         self.user_id = self.twitter.target_id
         self.list_id = config["list_id"]
         self.diff_solve_each_num = int(config["diff_solve_each_num"])
@@ -52,11 +63,7 @@ class Account:
         else:
             following_dict = orjson.loads(Path(self.CACHE_PATH / f"{self.screen_name}_following.json").read_bytes())
         for user_dict in following_dict:
-            t_rest_id = find_values(user_dict, "rest_id", True, ["result"], [])
-            t_name = find_values(user_dict, "name", True, ["result", "legacy"], [])
-            t_screen_name = find_values(user_dict, "screen_name", True, ["result", "legacy"], [])
-            t_protected = find_values(user_dict, "protected", False, ["result", "legacy"], [])
-            t_protected = False if len(t_protected) != 1 else t_protected[0]
+            t_rest_id, t_name, t_screen_name, t_protected = USER_RECORD.extract(user_dict, USER_RECORD_DEFAULTS)
             user = FollowingUser(t_rest_id, t_name, t_screen_name, t_protected)
             self.following_user.append(user)
         self.following_user.reverse()
@@ -74,18 +81,25 @@ class Account:
                 Path(self.CACHE_PATH / f"{self.screen_name}_{self.list_id}_list.json").read_bytes()
             )
         for user_dict in list_dict:
-            t_rest_id = find_values(user_dict, "rest_id", True, ["result"], [])
-            t_name = find_values(user_dict, "name", True, ["result", "legacy"], [])
-            t_screen_name = find_values(user_dict, "screen_name", True, ["result", "legacy"], [])
-            t_protected = find_values(user_dict, "protected", False, ["result", "legacy"], [])
-            t_protected = False if len(t_protected) != 1 else t_protected[0]
+            t_rest_id, t_name, t_screen_name, t_protected = USER_RECORD.extract(user_dict, USER_RECORD_DEFAULTS)
             user = ListUser(t_rest_id, t_name, t_screen_name, t_protected)
             self.list_user.append(user)
         self.list_user.reverse()
 
+        # スキーマ変化によりワイルドカード検索にフォールバックしたキーパスがあれば報告する
+        for stats in get_compiled_path_stats():
+            if stats["fallback_count"] > 0:
+                logger.warning(f"Key path '{stats['path']}' fallback count = {stats['fallback_count']}.")
+
     @classmethod
-    def create(cls, account_config_dict: dict, account_type: AccountType, is_dry_run: bool = True) -> Self:
-        return Account(account_config_dict, account_type, is_dry_run)
+    def create(
+        cls,
+        account_config_dict: dict,
+        account_type: AccountType,
+        is_dry_run: bool = True,
+        user_store: UserStore | None = None,
+    ) -> Self:
+        return Account(account_config_dict, account_type, is_dry_run, user_store)
 
 
 if __name__ == "__main__":
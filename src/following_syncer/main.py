@@ -1,12 +1,22 @@
 import argparse
 import logging.config
+import time
+from collections import Counter
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from logging import INFO, getLogger
 from pathlib import Path
 
 import orjson
 
 from following_syncer.account import Account
+from following_syncer.rate_limit import RateLimitScheduler, SimulatedClock, Task
+from following_syncer.reconciler import Reconciler
+from following_syncer.textfile_exporter import TextfileExporter
+from following_syncer.twitter_api import TwitterAPI
 from following_syncer.user import User
+from following_syncer.user_store import UserStore
 from following_syncer.util import AccountType, Result
 
 logging.config.fileConfig("./log/logging.ini", disable_existing_loggers=False)
@@ -20,11 +30,19 @@ logger.setLevel(INFO)
 
 
 class FollowingSyncer:
+    # アカウント情報ロード時の並列数のデフォルト値
+    DEFAULT_LOAD_WORKER_NUM = 4
+    # node_exporter 向けの統計を書き出すファイルパスのデフォルト値
+    TEXTFILE_PATH = "./metrics/following_syncer.prom"
+
     config_json_path: Path
     config_dict: dict
     master: Account
     slave_list: list[Account]
     is_dry_run: bool
+    exporter: TextfileExporter
+    scheduler: RateLimitScheduler
+    user_store: UserStore
 
     def __init__(self, config_json_path: Path, arg_parser: argparse.ArgumentParser) -> None:
         """syncer初期化
@@ -38,8 +56,57 @@ class FollowingSyncer:
 
         self.config_json_path = config_json_path
         self.config_dict = orjson.loads(config_json_path.read_bytes())
-        self.master = self._load_master()
-        self.slave_list = self._load_slave_list()
+
+        # 書き込み操作はレート制限と持ち時間に従って行う, dry run では待機せずに見積もる
+        self.scheduler = RateLimitScheduler.create(self.config_dict, SimulatedClock() if self.is_dry_run else None)
+        # ユーザー情報の問合せ結果は master と全 slave で共有する
+        self.user_store = UserStore(TwitterAPI.USER_STORE_PATH)
+
+        # master と slave のアカウント情報を並行してロードする
+        self.exporter = TextfileExporter("following_syncer")
+        start = time.perf_counter()
+        self._prefetch_target_user()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            master_future = executor.submit(self._load_master)
+            slave_list_future = executor.submit(self._load_slave_list)
+            self.master = master_future.result()
+            self.slave_list = slave_list_future.result()
+        self.exporter.set(
+            "stage_duration_seconds", time.perf_counter() - start, "Duration of each stage.", stage="load"
+        )
+
+    @property
+    def load_worker_num(self) -> int:
+        """アカウント情報ロード時の並列数
+
+        config の option.load_worker_num で指定する, 指定がなければデフォルト値を使用する
+
+        Returns:
+            int: アカウント情報ロード時の並列数(1以上)
+        """
+        option_dict = self.config_dict.get("option", {})
+        worker_num = int(option_dict.get("load_worker_num", self.DEFAULT_LOAD_WORKER_NUM))
+        return max(1, worker_num)
+
+    def _prefetch_target_user(self) -> None:
+        """master と全 slave の screen_name をまとめて問い合わせ、アカウント間で共有するユーザー情報に保存する
+
+        各アカウントのロード時に target_id を1件ずつ問い合わせずに済ませる
+        失敗した場合は警告のみとし、各アカウントのロード時に1件ずつ問い合わせる
+        """
+        master_config = self.config_dict["master"]["account"]
+        screen_name_list = [master_config["screen_name"]]
+        screen_name_list.extend(d["account"]["screen_name"] for d in self.config_dict["slave"]["account_list"])
+        logger.info("Target user lookup -> start")
+        try:
+            twitter = TwitterAPI(
+                master_config["ct0"], master_config["auth_token"], master_config["screen_name"], self.user_store
+            )
+            user_dict = twitter.lookup_users_by_screen_name(screen_name_list)
+            logger.info(f"Num of looked up target user = {len(user_dict)}/{len(screen_name_list)}")
+        except Exception as e:
+            logger.warning(f"Target user lookup failed, fallback to lookup each account: {e}")
+        logger.info("Target user lookup -> done")
 
     def _load_master(self) -> Account:
         """master のアカウント情報をロードする
@@ -48,7 +115,7 @@ class FollowingSyncer:
             Account: master のアカウント情報
         """
         logger.info("Master account create -> start")
-        result = Account.create(self.config_dict["master"], AccountType.master, self.is_dry_run)
+        result = Account.create(self.config_dict["master"], AccountType.master, self.is_dry_run, self.user_store)
         screen_name = self.config_dict["master"]["account"]["screen_name"]
         logger.info(f"\t{screen_name} account created.")
         logger.info("Master account create -> done")
@@ -57,16 +124,24 @@ class FollowingSyncer:
     def _load_slave_list(self) -> list[Account]:
         """slave のアカウント情報をロードする
 
+        各 slave のアカウント情報は load_worker_num 並列でロードする
+        返り値のリストは config に記載された順序を保持する
+
         Returns:
             Account: slave のアカウント情報リスト
         """
         logger.info("Slave account create -> start")
         result = []
         slave_account_dict = self.config_dict["slave"]["account_list"]
-        for account_dict in slave_account_dict:
-            result.append(Account.create(account_dict, AccountType.slave, self.is_dry_run))
-            screen_name = account_dict["account"]["screen_name"]
-            logger.info(f"\t{screen_name} account created.")
+        with ThreadPoolExecutor(max_workers=self.load_worker_num) as executor:
+            account_list = executor.map(
+                lambda account_dict: Account.create(account_dict, AccountType.slave, self.is_dry_run, self.user_store),
+                slave_account_dict,
+            )
+            for account_dict, account in zip(slave_account_dict, account_list):
+                result.append(account)
+                screen_name = account_dict["account"]["screen_name"]
+                logger.info(f"\t{screen_name} account created.")
         logger.info(f"Num of slave = {len(result)}")
         logger.info("Slave account create -> done")
         return result
@@ -75,6 +150,7 @@ class FollowingSyncer:
         """Userリストについて (p - q, q - p) を返す
 
         rest_id を基準に集合演算を行う
+        複数の q に対して同じ p と比較する場合は Reconciler を直接使い、p のインデックスを使い回すこと
 
         Args:
             p (list[User]): Userリスト1
@@ -83,26 +159,7 @@ class FollowingSyncer:
         Returns:
             tuple[list[User], list[User]]: p - q, q - p
         """
-        p_rest_ids: list[str] = [r.rest_id for r in p]
-        q_rest_ids: list[str] = [r.rest_id for r in q]
-        p_set: set[str] = set([r for r in p_rest_ids])
-        q_set: set[str] = set([r for r in q_rest_ids])
-
-        all_set: set[str] = p_set | q_set
-        to_be_added: list[User] = []
-        to_be_removed: list[User] = []
-        for ele in all_set:
-            if (ele in p_set) and (ele not in q_set):
-                # p - q
-                user = [r for r in p if r.rest_id == ele]
-                to_be_added.append(user[0])
-            if (ele not in p_set) and (ele in q_set):
-                # q - p
-                user = [r for r in q if r.rest_id == ele]
-                to_be_removed.append(user[0])
-        to_be_added.sort(key=lambda r: r.rest_id)
-        to_be_removed.sort(key=lambda r: r.rest_id)
-        return to_be_added, to_be_removed
+        return Reconciler(p).diff(q)
 
     def _exclude_account(self, user_list: list[User]) -> list[User]:
         """user_list から特定の条件を満たすものを除外する
@@ -127,6 +184,103 @@ class FollowingSyncer:
         user_list = [r for r in user_list if not r.protected]
         return user_list
 
+    def _record_sync_stats(
+        self,
+        sync_name: str,
+        screen_name: str,
+        to_be_added: Sequence[User] = (),
+        to_be_removed: Sequence[User] = (),
+        to_be_added_rest: Sequence[User] = (),
+        to_be_removed_rest: Sequence[User] = (),
+        api_call_num: int = 0,
+        api_error_num: int = 0,
+    ) -> None:
+        """1アカウント分の同期の統計を exporter に記録する
+
+        Args:
+            sync_name (str): 同期の種別, "master", "following", "list" のいずれか
+            screen_name (str): 反映先のアカウントの screen_name
+            to_be_added (Sequence[User], optional): 今回追加したユーザ
+            to_be_removed (Sequence[User], optional): 今回削除したユーザ
+            to_be_added_rest (Sequence[User], optional): 次回以降に持ち越した追加待ちのユーザ
+            to_be_removed_rest (Sequence[User], optional): 次回以降に持ち越した削除待ちのユーザ
+            api_call_num (int, optional): API 呼び出し回数
+            api_error_num (int, optional): 失敗した API 呼び出し回数
+        """
+        labels = {"sync": sync_name, "account": screen_name}
+        for operation, solved_list, pending_list in [
+            ("add", to_be_added, to_be_added_rest),
+            ("remove", to_be_removed, to_be_removed_rest),
+        ]:
+            self.exporter.set(
+                "solved_users", len(solved_list), "Number of users solved.", operation=operation, **labels
+            )
+            self.exporter.set(
+                "pending_users", len(pending_list), "Number of users left for next run.", operation=operation, **labels
+            )
+        self.exporter.set("api_calls", api_call_num, "Number of API calls to follow/remove users.", **labels)
+        self.exporter.set("api_errors", api_error_num, "Number of failed API calls.", **labels)
+
+    def _create_task_list(
+        self, account: Account, endpoint: str, user_list: list[User], get_args: Callable[[User], tuple]
+    ) -> list[Task]:
+        """account から user_list の各ユーザに対して行う書き込み操作のリストを作成する
+
+        トークンバケットの容量は account の diff_solve_each_num とする
+        持ち時間が0(デフォルト)の場合、従来通り diff_solve_each_num がアカウントと種別ごとの1回の実行の上限となる
+
+        Args:
+            account (Account): 操作するアカウント
+            endpoint (str): 操作の種別, account.twitter のメソッド名, ex: "follow"
+            user_list (list[User]): 操作対象のユーザリスト
+            get_args (Callable[[User], tuple]): ユーザから操作の引数を作成する関数
+
+        Returns:
+            list[Task]: 操作のリスト, user_list の順
+        """
+        self.scheduler.set_capacity(account.screen_name, account.diff_solve_each_num)
+        func = getattr(account.twitter, endpoint)
+        return [Task(account.screen_name, endpoint, user, partial(func, *get_args(user))) for user in user_list]
+
+    def _solve_task_list(self, task_list: list[Task]) -> tuple[list[Task], list[Task], Counter, Counter]:
+        """レート制限と持ち時間の許す限り task_list の操作を行う
+
+        dry run の場合は実際の操作を行わずに、行えたはずの操作を返す
+        失敗した操作は持ち越した操作に含め、次回以降に再度行う
+
+        Args:
+            task_list (list[Task]): 操作のリスト
+
+        Returns:
+            tuple[list[Task], list[Task], Counter, Counter]:
+                (成功した操作, 失敗したまたは持ち越した操作, アカウントごとの API 呼び出し回数, 失敗回数)
+        """
+        api_call_counter: Counter = Counter()
+        api_error_counter: Counter = Counter()
+
+        def run_task(task: Task) -> bool:
+            try:
+                if not self.is_dry_run:
+                    api_call_counter[task.account] += 1
+                    task.func()
+                logger.info(f"\t{task.account} {task.endpoint}: {task.user}")
+                return True
+            except Exception as e:
+                api_error_counter[task.account] += 1
+                logger.error(f"{e}")
+                return False
+
+        dry_run_log = "dry run " if self.is_dry_run else ""
+        logger.info(f"Solve tasks -> {dry_run_log}start")
+        done_list, rest_list = self.scheduler.drain(task_list, run_task)
+        logger.info(f"Num of solved tasks = {len(done_list)}, num of rest tasks = {len(rest_list)}")
+        logger.info(f"Solve tasks -> {dry_run_log}done")
+        return done_list, rest_list, api_call_counter, api_error_counter
+
+    def _select_user(self, task_list: list[Task], account: Account, endpoint: str) -> list[User]:
+        """task_list のうち account の endpoint の操作の対象ユーザを返す"""
+        return [task.user for task in task_list if task.account == account.screen_name and task.endpoint == endpoint]
+
     def master_sync(self) -> Result:
         """master の following を list に反映させる
 
@@ -147,43 +301,35 @@ class FollowingSyncer:
 
         if len(to_be_added_all) == 0 and len(to_be_removed_all) == 0:
             logger.info("Synchronization skipped, following/list are already matched.")
+            self._record_sync_stats("master", self.master.screen_name)
             logger.info("Run master_sync -> done")
             return Result.success
 
-        diff_solve_each_num = self.master.diff_solve_each_num
-        to_be_added = to_be_added_all[:diff_solve_each_num]
-        to_be_added_rest = to_be_added_all[diff_solve_each_num:]
-        logger.info(f"Num of to_be_added = {len(to_be_added)}")
-        logger.info(f"Num of to_be_added_rest = {len(to_be_added_rest)}")
-
-        to_be_removed = to_be_removed_all[:diff_solve_each_num]
-        to_be_removed_rest = to_be_removed_all[diff_solve_each_num:]
-        logger.info(f"Num of to_be_removed = {len(to_be_removed)}")
-        logger.info(f"Num of to_be_removed_rest = {len(to_be_removed_rest)}")
-
         list_id = self.master.list_id
-        dry_run_log = "dry run " if self.is_dry_run else ""
-        logger.info(f"Add to_be_added user -> {dry_run_log}start")
-        for user in to_be_added:
-            screen_name = user.screen_name
-            try:
-                if not self.is_dry_run:
-                    self.master.twitter.add_list_member(list_id, screen_name)
-                logger.info(f"\t{user}")
-            except Exception as e:
-                logger.error(f"{e}")
-        logger.info(f"Add to_be_added user -> {dry_run_log}done")
-
-        logger.info(f"Remove to_be_removed user -> {dry_run_log}start")
-        for user in to_be_removed:
-            screen_name = user.screen_name
-            try:
-                if not self.is_dry_run:
-                    self.master.twitter.remove_list_member(list_id, screen_name)
-                logger.info(f"\t{user}")
-            except Exception as e:
-                logger.error(f"{e}")
-        logger.info(f"Remove to_be_removed user -> {dry_run_log}done")
+        task_list = self._create_task_list(
+            self.master, "add_list_member", to_be_added_all, lambda user: (list_id, user.rest_id)
+        )
+        task_list += self._create_task_list(
+            self.master, "remove_list_member", to_be_removed_all, lambda user: (list_id, user.rest_id)
+        )
+        done_list, rest_list, api_call_counter, api_error_counter = self._solve_task_list(task_list)
+
+        to_be_added = self._select_user(done_list, self.master, "add_list_member")
+        to_be_removed = self._select_user(done_list, self.master, "remove_list_member")
+        to_be_added_rest = self._select_user(rest_list, self.master, "add_list_member")
+        to_be_removed_rest = self._select_user(rest_list, self.master, "remove_list_member")
+        logger.info(f"Num of to_be_added = {len(to_be_added)}, to_be_added_rest = {len(to_be_added_rest)}")
+        logger.info(f"Num of to_be_removed = {len(to_be_removed)}, to_be_removed_rest = {len(to_be_removed_rest)}")
+        self._record_sync_stats(
+            "master",
+            self.master.screen_name,
+            to_be_added,
+            to_be_removed,
+            to_be_added_rest,
+            to_be_removed_rest,
+            api_call_counter[self.master.screen_name],
+            api_error_counter[self.master.screen_name],
+        )
 
         logger.info("Update rest -> start")
         self.config_dict["master"]["list"]["to_be_add"] = [r.to_dict() for r in to_be_added_rest]
@@ -196,19 +342,23 @@ class FollowingSyncer:
     def following_sync(self) -> Result:
         """master の following を slave の following に反映させる
 
+        全 slave の操作をまとめてスケジューラに渡し、あるアカウントがレート制限で待つ間に他のアカウントの操作を進める
+
         Returns:
             Result: 成功時 Result.success, 失敗時 Result.failed
         """
         logger.info("Run following_sync -> start")
         master_following = self.master.following_user
         slave_list = self.slave_list
+        master_reconciler = Reconciler(master_following)
 
-        dry_run_log = "dry run " if self.is_dry_run else ""
+        task_list: list[Task] = []
+        target_list: list[tuple[int, Account]] = []
         for i, slave in enumerate(slave_list):
             logger.info(f"Master: {self.master.screen_name} following.")
             logger.info(f"Slave: {slave.screen_name} following.")
 
-            to_be_added_all, to_be_removed_all = self._deff_account(master_following, slave.following_user)
+            to_be_added_all, to_be_removed_all = master_reconciler.diff(slave.following_user)
             to_be_added_all = self._exclude_account(to_be_added_all)
             to_be_removed_all = self._exclude_account(to_be_removed_all)
             logger.info(f"After excluded, num of to_be_added_all = {len(to_be_added_all)}")
@@ -216,40 +366,32 @@ class FollowingSyncer:
 
             if len(to_be_added_all) == 0 and len(to_be_removed_all) == 0:
                 logger.info("Synchronization skipped, following/list are already matched.")
+                self._record_sync_stats("following", slave.screen_name)
                 continue
 
-            diff_solve_each_num = slave.diff_solve_each_num
-            to_be_added = to_be_added_all[:diff_solve_each_num]
-            to_be_added_rest = to_be_added_all[diff_solve_each_num:]
-            logger.info(f"Num of to_be_added = {len(to_be_added)}")
-            logger.info(f"Num of to_be_added_rest = {len(to_be_added_rest)}")
-
-            to_be_removed = to_be_removed_all[:diff_solve_each_num]
-            to_be_removed_rest = to_be_removed_all[diff_solve_each_num:]
-            logger.info(f"Num of to_be_removed = {len(to_be_removed)}")
-            logger.info(f"Num of to_be_removed_rest = {len(to_be_removed_rest)}")
-
-            logger.info(f"Add to_be_added user -> {dry_run_log}start")
-            for user in to_be_added:
-                user_id = user.rest_id
-                try:
-                    if not self.is_dry_run:
-                        slave.twitter.follow(user_id)
-                    logger.info(f"\t{user}")
-                except Exception as e:
-                    logger.error(f"{e}")
-            logger.info(f"Add to_be_added user -> {dry_run_log}done")
-
-            logger.info(f"Remove to_be_removed user -> {dry_run_log}start")
-            for user in to_be_removed:
-                user_id = user.rest_id
-                try:
-                    if not self.is_dry_run:
-                        slave.twitter.remove(user_id)
-                    logger.info(f"\t{user}")
-                except Exception as e:
-                    logger.error(f"{e}")
-            logger.info(f"Remove to_be_removed user -> {dry_run_log}done")
+            task_list += self._create_task_list(slave, "follow", to_be_added_all, lambda user: (user.rest_id,))
+            task_list += self._create_task_list(slave, "remove", to_be_removed_all, lambda user: (user.rest_id,))
+            target_list.append((i, slave))
+        done_list, rest_list, api_call_counter, api_error_counter = self._solve_task_list(task_list)
+
+        for i, slave in target_list:
+            to_be_added = self._select_user(done_list, slave, "follow")
+            to_be_removed = self._select_user(done_list, slave, "remove")
+            to_be_added_rest = self._select_user(rest_list, slave, "follow")
+            to_be_removed_rest = self._select_user(rest_list, slave, "remove")
+            logger.info(f"Slave: {slave.screen_name} following.")
+            logger.info(f"Num of to_be_added = {len(to_be_added)}, to_be_added_rest = {len(to_be_added_rest)}")
+            logger.info(f"Num of to_be_removed = {len(to_be_removed)}, to_be_removed_rest = {len(to_be_removed_rest)}")
+            self._record_sync_stats(
+                "following",
+                slave.screen_name,
+                to_be_added,
+                to_be_removed,
+                to_be_added_rest,
+                to_be_removed_rest,
+                api_call_counter[slave.screen_name],
+                api_error_counter[slave.screen_name],
+            )
 
             self.config_dict["slave"]["account_list"][i]["following"]["to_be_add"] = [
                 r.to_dict() for r in to_be_added_rest
@@ -268,19 +410,23 @@ class FollowingSyncer:
     def list_sync(self) -> Result:
         """master の list を slave の list に反映させる
 
+        全 slave の操作をまとめてスケジューラに渡し、あるアカウントがレート制限で待つ間に他のアカウントの操作を進める
+
         Returns:
             Result: 成功時 Result.success, 失敗時 Result.failed
         """
         logger.info("Run list_sync -> start")
         master_list = self.master.list_user
         slave_list = self.slave_list
+        master_reconciler = Reconciler(master_list)
 
-        dry_run_log = "dry run " if self.is_dry_run else ""
+        task_list: list[Task] = []
+        target_list: list[tuple[int, Account]] = []
         for i, slave in enumerate(slave_list):
             logger.info(f"Master: {self.master.screen_name} list (list_id = '{self.master.list_id}').")
             logger.info(f"Slave: {slave.screen_name} list (list_id = '{slave.list_id}').")
 
-            to_be_added_all, to_be_removed_all = self._deff_account(master_list, slave.list_user)
+            to_be_added_all, to_be_removed_all = master_reconciler.diff(slave.list_user)
             to_be_added_all = self._exclude_account(to_be_added_all)
             to_be_removed_all = self._exclude_account(to_be_removed_all)
             logger.info(f"After excluded, num of to_be_added_all = {len(to_be_added_all)}")
@@ -288,41 +434,37 @@ class FollowingSyncer:
 
             if len(to_be_added_all) == 0 and len(to_be_removed_all) == 0:
                 logger.info("Synchronization skipped, following/list are already matched.")
+                self._record_sync_stats("list", slave.screen_name)
                 continue
 
-            diff_solve_each_num = slave.diff_solve_each_num
-            to_be_added = to_be_added_all[:diff_solve_each_num]
-            to_be_added_rest = to_be_added_all[diff_solve_each_num:]
-            logger.info(f"Num of to_be_added = {len(to_be_added)}")
-            logger.info(f"Num of to_be_added_rest = {len(to_be_added_rest)}")
-
-            to_be_removed = to_be_removed_all[:diff_solve_each_num]
-            to_be_removed_rest = to_be_removed_all[diff_solve_each_num:]
-            logger.info(f"Num of to_be_removed = {len(to_be_removed)}")
-            logger.info(f"Num of to_be_removed_rest = {len(to_be_removed_rest)}")
-
             list_id = slave.list_id
-            logger.info(f"Add to_be_added user -> {dry_run_log}start")
-            for user in to_be_added:
-                screen_name = user.screen_name
-                try:
-                    if not self.is_dry_run:
-                        slave.twitter.add_list_member(list_id, screen_name)
-                    logger.info(f"\t{user}")
-                except Exception as e:
-                    logger.error(f"{e}")
-            logger.info(f"Add to_be_added user -> {dry_run_log}done")
-
-            logger.info(f"Remove to_be_removed user -> {dry_run_log}start")
-            for user in to_be_removed:
-                screen_name = user.screen_name
-                try:
-                    if not self.is_dry_run:
-                        slave.twitter.remove_list_member(list_id, screen_name)
-                    logger.info(f"\t{user}")
-                except Exception as e:
-                    logger.error(f"{e}")
-            logger.info(f"Remove to_be_removed user -> {dry_run_log}done")
+            task_list += self._create_task_list(
+                slave, "add_list_member", to_be_added_all, lambda user: (list_id, user.rest_id)
+            )
+            task_list += self._create_task_list(
+                slave, "remove_list_member", to_be_removed_all, lambda user: (list_id, user.rest_id)
+            )
+            target_list.append((i, slave))
+        done_list, rest_list, api_call_counter, api_error_counter = self._solve_task_list(task_list)
+
+        for i, slave in target_list:
+            to_be_added = self._select_user(done_list, slave, "add_list_member")
+            to_be_removed = self._select_user(done_list, slave, "remove_list_member")
+            to_be_added_rest = self._select_user(rest_list, slave, "add_list_member")
+            to_be_removed_rest = self._select_user(rest_list, slave, "remove_list_member")
+            logger.info(f"Slave: {slave.screen_name} list (list_id = '{slave.list_id}').")
+            logger.info(f"Num of to_be_added = {len(to_be_added)}, to_be_added_rest = {len(to_be_added_rest)}")
+            logger.info(f"Num of to_be_removed = {len(to_be_removed)}, to_be_removed_rest = {len(to_be_removed_rest)}")
+            self._record_sync_stats(
+                "list",
+                slave.screen_name,
+                to_be_added,
+                to_be_removed,
+                to_be_added_rest,
+                to_be_removed_rest,
+                api_call_counter[slave.screen_name],
+                api_error_counter[slave.screen_name],
+            )
 
             self.config_dict["slave"]["account_list"][i]["list"]["to_be_add"] = [r.to_dict() for r in to_be_added_rest]
             self.config_dict["slave"]["account_list"][i]["list"]["to_be_removed"] = [
@@ -336,21 +478,57 @@ class FollowingSyncer:
         logger.info("Run list_sync -> done")
         return Result.success
 
+    def _export_textfile(self, result: Result) -> None:
+        """有効ならば、記録した統計を node_exporter の textfile collector 向けのファイルに書き出す
+
+        書き出しに失敗しても同期結果には影響させない
+
+        Args:
+            result (Result): 同期結果
+        """
+        textfile_config = self.config_dict.get("textfile_exporter", {})
+        if not textfile_config.get("is_textfile_exporter", False):
+            return
+
+        self.exporter.set("run_success", result == Result.success, "Whether the last sync succeeded.")
+        self.exporter.set("run_timestamp_seconds", time.time(), "Unix time the last sync finished.")
+        for account in [self.master, *self.slave_list]:
+            for kind, user_list in [("following", account.following_user), ("list", account.list_user)]:
+                self.exporter.set(
+                    "users", len(user_list), "Number of loaded users.", account=account.screen_name, kind=kind
+                )
+        try:
+            textfile_path = Path(textfile_config.get("textfile_path", self.TEXTFILE_PATH))
+            self.exporter.write(textfile_path)
+            logger.info(f"Textfile for node_exporter written to: {textfile_path}")
+        except OSError as e:
+            logger.warning(e)
+
     def sync(self) -> Result:
         """sync メイン
 
+        各同期の所要時間と、アカウントごとの同期の統計は textfile_exporter で書き出す
+
         Returns:
             Result: 成功時 Result.success, 失敗時 Result.failed
         """
         horizontal_line = "-" * 80
         half_line = "-" * 40
         logger.info(horizontal_line)
-        self.master_sync()
-        logger.info(half_line)
-        self.following_sync()
-        logger.info(half_line)
-        self.list_sync()
+        for i, (stage_name, sync_func) in enumerate([
+            ("master_sync", self.master_sync),
+            ("following_sync", self.following_sync),
+            ("list_sync", self.list_sync),
+        ]):
+            if i > 0:
+                logger.info(half_line)
+            start = time.perf_counter()
+            sync_func()
+            self.exporter.set(
+                "stage_duration_seconds", time.perf_counter() - start, "Duration of each stage.", stage=stage_name
+            )
         logger.info(horizontal_line)
+        self._export_textfile(Result.success)
         return Result.success
 
 
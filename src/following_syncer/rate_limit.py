@@ -0,0 +1,252 @@
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from logging import INFO, getLogger
+from typing import Any
+
+from following_syncer.user import User
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+
+class Clock:
+    """現在時刻の取得と待機を行う
+
+    テストや dry run では SimulatedClock に差し替える
+    """
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, sec: float) -> None:
+        time.sleep(sec)
+
+
+class SimulatedClock(Clock):
+    """実際には待機せず、待機した分だけ時刻を進める時計
+
+    dry run で実際の操作を行わずに、持ち時間内に行える操作を見積もるために使う
+
+    Args:
+        now (float, optional): 開始時刻
+    """
+
+    now: float
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, sec: float) -> None:
+        self.now += sec
+
+
+@dataclass
+class TokenBucket:
+    """トークンバケット
+
+    capacity 個までトークンを貯められ、1秒あたり refill_per_sec 個ずつ補充される
+    1回の操作でトークンを1個消費する
+
+    Args:
+        capacity (float): 貯められるトークンの最大数, 連続して行える操作の回数
+        refill_per_sec (float): 1秒あたりに補充されるトークンの数, 0の場合は補充されない
+        tokens (float): 現在のトークンの数
+        updated_at (float): tokens を最後に更新した時刻
+    """
+
+    capacity: float
+    refill_per_sec: float
+    tokens: float
+    updated_at: float
+
+    def refill(self, now: float) -> None:
+        """now までに補充される分のトークンを加える"""
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_sec)
+            self.updated_at = now
+
+    def get_wait_sec(self, now: float) -> float:
+        """トークンを1個消費できるまでの待ち時間[s]を返す
+
+        Returns:
+            float: 待ち時間[s], すぐに消費できる場合0, 補充されないため消費できない場合 inf
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        if self.refill_per_sec <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.refill_per_sec
+
+    def consume(self, now: float) -> None:
+        """トークンを1個消費する"""
+        self.refill(now)
+        self.tokens -= 1
+
+
+@dataclass(frozen=True)
+class Task:
+    """1回の書き込み操作
+
+    Args:
+        account (str): 操作するアカウントの screen_name
+        endpoint (str): 操作の種別, ex: "follow"
+        user (User): 操作対象のユーザ
+        func (Callable[[], Any]): 操作を行う関数
+    """
+
+    account: str
+    endpoint: str
+    user: User
+    func: Callable[[], Any]
+
+
+class RateLimitScheduler:
+    """アカウントと操作の種別ごとのトークンバケットに従って書き込み操作を行う
+
+    トークンバケットの容量はアカウントごとに set_capacity で、補充の速さは操作の種別ごとに指定する
+    持ち時間が0(デフォルト)の場合は待機せず、アカウントと種別ごとに容量の回数までの操作のみを行う
+    持ち時間を与えた場合は、その間に補充された分だけ容量を超えて操作を行う
+    操作は種別ごとの待ち行列に入れた順に行い、複数の待ち行列があるときは最も早く操作できるものから行う
+    あるアカウントの操作を待つ間に、別のアカウントや別の種別の操作を進めることができる
+    持ち時間 time_budget_sec は drain の呼び出しごとに与え、その開始から超えてしまう操作は行わず、次回以降に持ち越す
+    トークンバケットは drain の呼び出しをまたいで引き継ぐ
+
+    Attributes:
+        DEFAULT_TIME_BUDGET_SEC (float): drain 1回あたりに書き込み操作に使う時間[s]のデフォルト値
+        DEFAULT_REFILL_PER_SEC_DICT (dict[str, float]): 操作の種別ごとの1秒あたりの補充数のデフォルト値
+        DEFAULT_CAPACITY (int): set_capacity で指定していないアカウントのトークンバケットの容量
+    """
+
+    time_budget_sec: float
+    refill_per_sec_dict: dict[str, float]
+    clock: Clock
+    _capacity_dict: dict[str, int]
+    _bucket_dict: dict[tuple[str, str], TokenBucket]
+
+    DEFAULT_TIME_BUDGET_SEC = 0.0
+    DEFAULT_REFILL_PER_SEC_DICT = {
+        "follow": 1 / 36,
+        "remove": 1 / 36,
+        "add_list_member": 1 / 9,
+        "remove_list_member": 1 / 9,
+    }
+    DEFAULT_CAPACITY = 10
+
+    def __init__(
+        self,
+        time_budget_sec: float = DEFAULT_TIME_BUDGET_SEC,
+        refill_per_sec_dict: dict[str, float] | None = None,
+        clock: Clock | None = None,
+    ) -> None:
+        """RateLimitScheduler
+
+        Args:
+            time_budget_sec (float, optional): drain 1回あたりに書き込み操作に使う時間[s]
+            refill_per_sec_dict (dict[str, float] | None, optional):
+                操作の種別ごとの1秒あたりの補充数, 指定の無い種別はデフォルト値を使う
+            clock (Clock | None, optional): 時計, None の場合は実際の時計を使う
+        """
+        self.time_budget_sec = float(time_budget_sec)
+        self.refill_per_sec_dict = self.DEFAULT_REFILL_PER_SEC_DICT | (refill_per_sec_dict or {})
+        self.clock = clock or Clock()
+        self._capacity_dict = {}
+        self._bucket_dict = {}
+
+    @classmethod
+    def create(cls, config_dict: dict, clock: Clock | None = None) -> "RateLimitScheduler":
+        """following_syncer の config の option.rate_limit から作成する
+
+        Args:
+            config_dict (dict): following_syncer_config.json から取得した設定辞書
+            clock (Clock | None, optional): 時計, None の場合は実際の時計を使う
+
+        Returns:
+            RateLimitScheduler: 作成したスケジューラ
+        """
+        rate_limit_dict = config_dict.get("option", {}).get("rate_limit", {})
+        time_budget_sec = float(rate_limit_dict.get("time_budget_sec", cls.DEFAULT_TIME_BUDGET_SEC))
+        refill_per_sec_dict = {
+            endpoint: float(refill_per_sec)
+            for endpoint, refill_per_sec in rate_limit_dict.get("refill_per_sec", {}).items()
+        }
+        return cls(time_budget_sec, refill_per_sec_dict, clock)
+
+    def set_capacity(self, account: str, capacity: int) -> None:
+        """アカウントのトークンバケットの容量(連続して行える操作の回数)を設定する
+
+        持ち時間が0の場合は、アカウントと種別ごとに1回の実行で行う操作の上限となる
+        作成済のトークンバケットには反映しない
+        """
+        self._capacity_dict[account] = max(1, int(capacity))
+
+    def get_bucket(self, account: str, endpoint: str) -> TokenBucket:
+        """アカウントと操作の種別に対応するトークンバケットを返す, 無ければ満杯の状態で作成する"""
+        key = (account, endpoint)
+        if key not in self._bucket_dict:
+            capacity = self._capacity_dict.get(account, self.DEFAULT_CAPACITY)
+            refill_per_sec = self.refill_per_sec_dict.get(endpoint, 0.0)
+            self._bucket_dict[key] = TokenBucket(capacity, refill_per_sec, capacity, self.clock.monotonic())
+        return self._bucket_dict[key]
+
+    def drain(self, task_list: list[Task], on_task: Callable[[Task], bool]) -> tuple[list[Task], list[Task]]:
+        """トークンバケットと時間の予算が許す限り task_list の操作を行う
+
+        持ち時間は呼び出しごとに、この drain を呼び出した時点から time_budget_sec とする
+
+        Args:
+            task_list (list[Task]): 操作のリスト, アカウントと種別ごとにこの順で行う
+            on_task (Callable[[Task], bool]):
+                操作を行う関数, task.func の呼び出しと例外の処理を行い、成功したかどうかを返す
+                失敗した操作もトークンは消費し、持ち越した操作として返す
+
+        Returns:
+            tuple[list[Task], list[Task]]:
+                (成功した操作のリスト, 失敗したまたは持ち越した操作のリスト), いずれも task_list の順
+        """
+        deadline = self.clock.monotonic() + self.time_budget_sec
+
+        queue_dict: dict[tuple[str, str], deque[tuple[int, Task]]] = {}
+        for index, task in enumerate(task_list):
+            queue_dict.setdefault((task.account, task.endpoint), deque()).append((index, task))
+
+        done_index_set: set[int] = set()
+        while queue_dict:
+            # 最も早く操作できる待ち行列を選ぶ, 同時ならば task_list で先にあるものを優先する
+            now = self.clock.monotonic()
+            ready_at, _, key = min(
+                (now + self.get_bucket(*key).get_wait_sec(now), queue[0][0], key) for key, queue in queue_dict.items()
+            )
+            # 待たずに行える操作は、持ち時間を過ぎていても行う
+            if ready_at > now and ready_at > deadline:
+                rest_num = sum(len(queue) for queue in queue_dict.values())
+                logger.info(f"Rate limit or time budget reached, {rest_num} tasks are carried over.")
+                break
+            if ready_at > now:
+                self.clock.sleep(ready_at - now)
+
+            index, task = queue_dict[key].popleft()
+            if not queue_dict[key]:
+                del queue_dict[key]
+            self.get_bucket(*key).consume(self.clock.monotonic())
+            if on_task(task):
+                done_index_set.add(index)
+
+        done_list = [task for index, task in enumerate(task_list) if index in done_index_set]
+        rest_list = [task for index, task in enumerate(task_list) if index not in done_index_set]
+        return done_list, rest_list
+
+
+if __name__ == "__main__":
+    scheduler = RateLimitScheduler(time_budget_sec=5, refill_per_sec_dict={"follow": 1.0}, clock=SimulatedClock())
+    scheduler.set_capacity("dummy_account", 2)
+    task_list = [
+        Task("dummy_account", "follow", User(f"{i}", f"user_{i}", f"screen_name_{i}"), lambda: None) for i in range(10)
+    ]
+    done_list, rest_list = scheduler.drain(task_list, lambda task: print(task.user) or True)
+    print(f"done = {len(done_list)}, rest = {len(rest_list)}")
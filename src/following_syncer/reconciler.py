@@ -0,0 +1,63 @@
+from following_syncer.user import User
+
+
+class Reconciler:
+    """基準となる User リストと比較対象の User リストの差分を求める
+
+    基準リストから rest_id をキーとしたインデックスを一度だけ作成し、
+    複数の比較対象に対して使い回すことができる
+    master と複数の slave を比較する場合に、master 側のインデックス作成は1回で済む
+
+    Args:
+        base_user_list (list[User]): 基準となる User リスト
+    """
+
+    base_index: dict[str, User]
+
+    def __init__(self, base_user_list: list[User]) -> None:
+        self.base_index = self.create_index(base_user_list)
+
+    @classmethod
+    def create_index(cls, user_list: list[User]) -> dict[str, User]:
+        """rest_id をキーとしたインデックスを作成する
+
+        同一の rest_id が複数存在する場合は先に出現したものを採用する
+
+        Args:
+            user_list (list[User]): インデックス作成対象の User リスト
+
+        Returns:
+            dict[str, User]: rest_id をキー, User を値とする辞書
+        """
+        index: dict[str, User] = {}
+        for user in user_list:
+            index.setdefault(user.rest_id, user)
+        return index
+
+    def diff(self, other_user_list: list[User]) -> tuple[list[User], list[User]]:
+        """基準リストと other_user_list について (base - other, other - base) を返す
+
+        rest_id を基準に集合演算を行う
+        計算量は O(len(base) + len(other)) となる
+        返り値のリストはそれぞれ rest_id 順にソートされる
+
+        Args:
+            other_user_list (list[User]): 比較対象の User リスト
+
+        Returns:
+            tuple[list[User], list[User]]: to_be_added(base - other), to_be_removed(other - base)
+        """
+        base_index = self.base_index
+        other_index = self.create_index(other_user_list)
+        to_be_added: list[User] = [user for rest_id, user in base_index.items() if rest_id not in other_index]
+        to_be_removed: list[User] = [user for rest_id, user in other_index.items() if rest_id not in base_index]
+        to_be_added.sort(key=lambda r: r.rest_id)
+        to_be_removed.sort(key=lambda r: r.rest_id)
+        return to_be_added, to_be_removed
+
+
+if __name__ == "__main__":
+    p = [User(f"{i}", f"user_{i}", f"screen_name_{i}") for i in [0, 1]]
+    q = [User(f"{i}", f"user_{i}", f"screen_name_{i}") for i in [0, 2]]
+    reconciler = Reconciler(p)
+    print(reconciler.diff(q))
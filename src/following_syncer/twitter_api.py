@@ -9,6 +9,7 @@ from twitter.scraper import Scraper
 from twitter.util import get_headers
 from twitter.constants import Operation
 
+from following_syncer.user_store import UserStore
 from following_syncer.util import find_values
 
 logger = getLogger(__name__)
@@ -19,8 +20,17 @@ class TwitterAPI:
     ct0: str
     auth_token: str
     target_screen_name: str
+    user_store: UserStore
 
-    def __init__(self, ct0: str, auth_token: str, target_screen_name: str) -> None:
+    # ユーザー情報の問合せ結果を実行をまたいで保存するファイルパスのデフォルト値
+    USER_STORE_PATH = Path(__file__).parent / "cache" / "user_store.json"
+    # 複数ユーザーを問い合わせるときに Scraper.users_by_ids, Scraper.users に1回で渡す件数
+    # users_by_ids は UsersByRestIds でまとめて問い合わせ、users は1件ごとに UserByScreenName を並行して送る
+    LOOKUP_CHUNK_SIZE = 100
+
+    def __init__(
+        self, ct0: str, auth_token: str, target_screen_name: str, user_store: UserStore | None = None
+    ) -> None:
         if not isinstance(ct0, str):
             raise TypeError("ct0 must be str.")
         if not isinstance(auth_token, str):
@@ -31,6 +41,8 @@ class TwitterAPI:
         self.ct0 = ct0
         self.auth_token = auth_token
         self.target_screen_name = target_screen_name
+        # 問合せ結果をアカウント間で共有する場合は、同じ user_store を渡す
+        self.user_store = user_store if user_store is not None else UserStore(self.USER_STORE_PATH)
 
     @property
     def scraper(self) -> Scraper:
@@ -57,19 +69,85 @@ class TwitterAPI:
     def lookup_user_by_screen_name(self, screen_name: str) -> dict:
         logger.info(f"GET user by screen_name, target user is '{screen_name}' -> start")
 
-        # ユーザー情報の問合せ結果はキャッシュする
-        if hasattr(self, "_lookup_user_cache"):
-            if screen_name in self._lookup_user_cache.keys():
-                return self._lookup_user_cache[screen_name]
-        else:
-            self._lookup_user_cache = {}
+        if (result := self.user_store.get(screen_name)) is not None:
+            logger.info(f"GET user by screen_name, target user is '{screen_name}' -> done (stored)")
+            return result
 
         result = self.scraper.users([screen_name])[0]
-        self._lookup_user_cache[screen_name] = result
+        self.user_store.put(screen_name, result)
 
         logger.info(f"GET user by screen_name, target user is '{screen_name}' -> done")
         return result
 
+    @staticmethod
+    def _get_user_result(user_dict: dict) -> dict:
+        """UserByScreenName の応答形式のユーザー情報から result を取得する"""
+        return user_dict.get("data", {}).get("user", {}).get("result", {})
+
+    def lookup_users_by_screen_name(self, screen_name_list: list[str]) -> dict[str, dict]:
+        """複数ユーザーの情報を screen_name から問い合わせる
+
+        保存済のものは問い合わせず、残りを問い合わせて user_store に保存する
+        有効期限を過ぎて rest_id が分かるものは、LOOKUP_CHUNK_SIZE 件ずつ Scraper.users_by_ids に渡して
+        UsersByRestIds でまとめて問い合わせる
+        一度も保存されていないものや screen_name が変わったものは、LOOKUP_CHUNK_SIZE 件ずつ Scraper.users に渡す
+        screen_name をまとめて問い合わせる API は無いため、こちらは1件ごとに UserByScreenName を並行して送る
+        以降の lookup_user_by_screen_name はアカウントをまたいで保存済の結果を返す
+
+        Args:
+            screen_name_list (list[str]): 問い合わせる screen_name のリスト
+
+        Returns:
+            dict[str, dict]: screen_name をキーとするユーザー情報の辞書, 見つからなかったものは含まない
+        """
+        logger.info(f"GET users by screen_name, num of target users is {len(screen_name_list)} -> start")
+
+        # 大文字小文字のみ異なる screen_name はまとめて1件として問い合わせる
+        pending_dict: dict[str, str] = {}
+        for screen_name in screen_name_list:
+            if self.user_store.get(screen_name) is None:
+                pending_dict.setdefault(screen_name.lower(), screen_name)
+        logger.info(f"Num of users to be looked up = {len(pending_dict)}")
+
+        # 応答の順序は問合せ順とは限らないため、応答中の screen_name で対応付ける
+        rest_id_list = []
+        for screen_name in pending_dict.values():
+            expired_dict = self.user_store.get_expired(screen_name)
+            if expired_dict and (rest_id := self._get_user_result(expired_dict).get("rest_id")):
+                rest_id_list.append(int(rest_id))
+        logger.info(f"Num of users to be looked up by rest_id = {len(rest_id_list)}")
+        for i in range(0, len(rest_id_list), self.LOOKUP_CHUNK_SIZE):
+            chunk = rest_id_list[i : i + self.LOOKUP_CHUNK_SIZE]
+            found_dict = {}
+            for response in self.scraper.users_by_ids(chunk):
+                for user in response.get("data", {}).get("users", []):
+                    # UserByScreenName と同じ応答形式にそろえて保存する
+                    user_dict = {"data": {"user": {"result": user.get("result", {})}}}
+                    legacy = self._get_user_result(user_dict).get("legacy", {})
+                    found_screen_name = str(legacy.get("screen_name", "")).lower()
+                    if found_screen_name in pending_dict:
+                        found_dict[pending_dict.pop(found_screen_name)] = user_dict
+            self.user_store.put_all(found_dict)
+
+        pending_list = list(pending_dict.values())
+        logger.info(f"Num of users to be looked up by screen_name = {len(pending_list)}")
+        for i in range(0, len(pending_list), self.LOOKUP_CHUNK_SIZE):
+            chunk = pending_list[i : i + self.LOOKUP_CHUNK_SIZE]
+            found_dict = {}
+            for user_dict in self.scraper.users(chunk):
+                legacy = self._get_user_result(user_dict).get("legacy", {})
+                found_screen_name = str(legacy.get("screen_name", "")).lower()
+                if found_screen_name in pending_dict:
+                    found_dict[pending_dict[found_screen_name]] = user_dict
+            self.user_store.put_all(found_dict)
+
+        result = {}
+        for screen_name in screen_name_list:
+            if (user_dict := self.user_store.get(screen_name)) is not None:
+                result[screen_name] = user_dict
+        logger.info(f"GET users by screen_name, num of target users is {len(screen_name_list)} -> done")
+        return result
+
     def get_likes(self, screen_name: str = "", limit: int = 300, min_id: int = -1) -> list[dict]:
         result = []
         # screen_name が指定されなかった場合 self.target_screen_name を使用する
@@ -194,22 +272,18 @@ class TwitterAPI:
         logger.info(f"GET list member -> done")
         return result
 
-    def add_list_member(self, list_id: str, screen_name: str) -> dict:
-        logger.info(f"POST list member, target user is '{screen_name}' -> start")
-        target_user = self.lookup_user_by_screen_name(screen_name)
-        target_id = int(find_values(target_user, "rest_id")[0])
-        response = self.account.add_list_member(int(list_id), int(target_id))
+    def add_list_member(self, list_id: str, user_id: str) -> dict:
+        logger.info(f"POST list member, target user_id is '{user_id}' -> start")
+        response = self.account.add_list_member(int(list_id), int(user_id))
         result = find_values(response, "user_results")[0]
-        logger.info(f"POST list member, target user is '{screen_name}' -> done")
+        logger.info(f"POST list member, target user_id is '{user_id}' -> done")
         return result
 
-    def remove_list_member(self, list_id: str, screen_name: str) -> dict:
-        logger.info(f"POST list member, target user is '{screen_name}' -> start")
-        target_user = self.lookup_user_by_screen_name(screen_name)
-        target_id = int(find_values(target_user, "rest_id")[0])
-        response = self.account.remove_list_member(int(list_id), int(target_id))
+    def remove_list_member(self, list_id: str, user_id: str) -> dict:
+        logger.info(f"POST list member, target user_id is '{user_id}' -> start")
+        response = self.account.remove_list_member(int(list_id), int(user_id))
         result = find_values(response, "user_results")[0]
-        logger.info(f"POST list member, target user is '{screen_name}' -> done")
+        logger.info(f"POST list member, target user_id is '{user_id}' -> done")
         return result
 
     def get_mute_keyword_list(self) -> dict:
@@ -381,8 +455,8 @@ if __name__ == "__main__":
 
     # pprint.pprint("list メンバー追加")
     # list_id = "1618833354572595200"  # v_shift9738 - following
-    # screen_name = ""
-    # result = twitter.add_list_member(list_id, screen_name)
+    # user_id = ""
+    # result = twitter.add_list_member(list_id, user_id)
     # save_response(result)
     # pprint.pprint(len(result))
 
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections.abc import Callable
+from logging import INFO, getLogger
+from pathlib import Path
+
+import orjson
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+
+class UserStore:
+    """screen_name から問い合わせたユーザ情報を、件数の上限と有効期限付きでファイルに保存する
+
+    アカウントや実行をまたいで共有し、同じユーザの問い合わせを繰り返さないために使う
+    件数が上限を超えた場合は最も長く参照されていないものから捨てる(LRU)
+    保存から ttl_sec を経過したものは get では無いものとして扱う
+    経過したものも rest_id から再度問い合わせるために残し、get_expired で取得できる
+    ファイルは最初の参照時に読み込み、追加のたびに一時ファイルから置き換えて書き出す
+    まとめて追加する場合は put_all を使い、書き出しを1回で済ませる
+    参照による並び順の更新は、次に書き出すときにファイルに反映する
+
+    Attributes:
+        DEFAULT_MAX_SIZE (int): 保存する件数の上限のデフォルト値
+        DEFAULT_TTL_SEC (float): 有効期限[s]のデフォルト値
+    """
+
+    file_path: Path
+    max_size: int
+    ttl_sec: float
+    clock: Callable[[], float]
+    _record_dict: dict[str, tuple[float, dict]] | None
+    _lock: threading.Lock
+
+    DEFAULT_MAX_SIZE = 1000
+    DEFAULT_TTL_SEC = 7 * 24 * 60 * 60
+
+    def __init__(
+        self,
+        file_path: Path,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl_sec: float = DEFAULT_TTL_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """UserStore
+
+        Args:
+            file_path (Path): 保存先のファイルパス
+            max_size (int, optional): 保存する件数の上限
+            ttl_sec (float, optional): 有効期限[s]
+            clock (Callable[[], float], optional): 現在時刻[s]を返す関数
+        """
+        self.file_path = file_path
+        self.max_size = max(1, int(max_size))
+        self.ttl_sec = float(ttl_sec)
+        self.clock = clock
+        self._record_dict = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(screen_name: str) -> str:
+        """screen_name は大文字小文字を区別しない"""
+        return screen_name.lower()
+
+    def _load(self) -> dict[str, tuple[float, dict]]:
+        """保存済のレコードを返す, 未読込ならばファイルから読み込む
+
+        ファイルが無いか壊れている場合は空として扱う
+        辞書の並び順は参照された順(古い順)
+        """
+        if self._record_dict is not None:
+            return self._record_dict
+        self._record_dict = {}
+        if self.file_path.is_file():
+            try:
+                for key, saved_at, user_dict in orjson.loads(self.file_path.read_bytes()):
+                    self._record_dict[key] = (float(saved_at), user_dict)
+            except (orjson.JSONDecodeError, TypeError, ValueError) as e:
+                logger.warning(f"{self.file_path} is broken and ignored: {e}")
+                self._record_dict = {}
+        return self._record_dict
+
+    def _save(self) -> None:
+        """レコードを参照された順(古い順)にファイルに書き出す"""
+        record_list = [[key, saved_at, user_dict] for key, (saved_at, user_dict) in self._load().items()]
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.file_path.with_suffix(".tmp")
+        try:
+            tmp_path.write_bytes(orjson.dumps(record_list))
+            tmp_path.replace(self.file_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def get(self, screen_name: str) -> dict | None:
+        """保存済のユーザ情報を返す
+
+        Args:
+            screen_name (str): 問い合わせた screen_name
+
+        Returns:
+            dict | None: ユーザ情報, 保存されていないか有効期限を過ぎている場合None
+        """
+        key = self._key(screen_name)
+        with self._lock:
+            record_dict = self._load()
+            if key not in record_dict:
+                return None
+            saved_at, user_dict = record_dict[key]
+            if self.clock() - saved_at > self.ttl_sec:
+                return None
+            record_dict[key] = record_dict.pop(key)
+            return user_dict
+
+    def get_expired(self, screen_name: str) -> dict | None:
+        """有効期限を過ぎたユーザ情報を返す
+
+        参照された順は更新しない
+
+        Args:
+            screen_name (str): 問い合わせた screen_name
+
+        Returns:
+            dict | None: ユーザ情報, 保存されていないか有効期限内の場合None
+        """
+        key = self._key(screen_name)
+        with self._lock:
+            record_dict = self._load()
+            if key not in record_dict:
+                return None
+            saved_at, user_dict = record_dict[key]
+            if self.clock() - saved_at <= self.ttl_sec:
+                return None
+            return user_dict
+
+    def put(self, screen_name: str, user_dict: dict) -> None:
+        """ユーザ情報を保存し、ファイルに書き出す
+
+        Args:
+            screen_name (str): 問い合わせた screen_name
+            user_dict (dict): ユーザ情報
+        """
+        self.put_all({screen_name: user_dict})
+
+    def put_all(self, user_dict_by_screen_name: dict[str, dict]) -> None:
+        """複数のユーザ情報をまとめて保存し、ファイルへの書き出しは1回で済ませる
+
+        Args:
+            user_dict_by_screen_name (dict[str, dict]): 問い合わせた screen_name をキーとするユーザ情報の辞書
+        """
+        if not user_dict_by_screen_name:
+            return
+        with self._lock:
+            record_dict = self._load()
+            saved_at = self.clock()
+            for screen_name, user_dict in user_dict_by_screen_name.items():
+                key = self._key(screen_name)
+                record_dict.pop(key, None)
+                record_dict[key] = (saved_at, user_dict)
+            while len(record_dict) > self.max_size:
+                del record_dict[next(iter(record_dict))]
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(e)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+
+if __name__ == "__main__":
+    store = UserStore(Path("./user_store.json"), max_size=2)
+    store.put("screen_name_1", {"rest_id": "1"})
+    store.put("screen_name_2", {"rest_id": "2"})
+    print(store.get("Screen_Name_1"))
+    store.put("screen_name_3", {"rest_id": "3"})
+    print(store.get("screen_name_2"), len(store))
+    store.file_path.unlink()
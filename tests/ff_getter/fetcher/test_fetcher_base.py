@@ -4,7 +4,11 @@ import unittest
 from collections import namedtuple
 from pathlib import Path
 
-from mock import PropertyMock, patch
+import orjson
+from freezegun import freeze_time
+from mock import MagicMock, PropertyMock, call, patch
+from twitter.constants import Operation
+from twitter.util import build_params
 
 from ff_getter.fetcher.fetcher_base import FetcherBase, FollowerFetcher, FollowingFetcher
 from ff_getter.util import FFtype
@@ -59,6 +63,7 @@ class TestFetcherBase(unittest.TestCase):
         self.assertEqual(
             Path("./src/ff_getter/fetcher").resolve() / f"cache/{instance.ff_type.value}/", instance.cache_path
         )
+        self.assertEqual(FetcherBase.DEFAULT_CHECKPOINT_MAX_AGE_SEC, instance.checkpoint_max_age_sec)
 
         instance = FetcherBase(config, FFtype.follower, True)
         self.assertEqual(FFtype.follower, instance.ff_type)
@@ -76,12 +81,323 @@ class TestFetcherBase(unittest.TestCase):
         with self.assertRaises(ValueError):
             instance = FetcherBase(config, FFtype.following, "invalid_argument")
 
+    def test_init_checkpoint_max_age(self):
+        config = {
+            "twitter_api_client": {
+                "ct0": "dummy_ct0",
+                "auth_token": "dummy_auth_token",
+                "target_screen_name": "dummy_target_screen_name",
+                "target_id": 0,
+            },
+            "checkpoint": {"max_age_sec": 60},
+        }
+        instance = FetcherBase(config, FFtype.following, False)
+        self.assertEqual(60.0, instance.checkpoint_max_age_sec)
+
+    def _get_page(self, user_ids: list[int], next_cursor: str | None = None) -> dict:
+        entries = [
+            {
+                "entryId": f"user-{user_id}",
+                "content": {
+                    "itemContent": {
+                        "user_results": {
+                            "result": {
+                                "rest_id": str(user_id),
+                                "legacy": {"name": f"dummy_name_{user_id}", "screen_name": f"dummy_{user_id}"},
+                            }
+                        }
+                    },
+                },
+            }
+            for user_id in user_ids
+        ]
+        if next_cursor:
+            entries.append({"entryId": "cursor-bottom-0", "content": {"value": next_cursor}})
+        return {"data": {"user": {"result": {"timeline": {"timeline": {"instructions": [{"entries": entries}]}}}}}}
+
+    def test_fetch_page(self):
+        mock_scraper = MagicMock()
+        mock_scraper.session.get.return_value.content = b'{"dummy_json": {}}'
+        instance = self._get_instance()
+
+        Params = namedtuple("Params", ["ff_type", "cursor", "operation"])
+        params_list = [
+            Params(FFtype.following, None, Operation.Following),
+            Params(FFtype.follower, None, Operation.Followers),
+            Params(FFtype.following, "dummy_cursor", Operation.Following),
+        ]
+        for params in params_list:
+            mock_scraper.reset_mock()
+            instance.ff_type = params.ff_type
+            actual = instance._fetch_page(mock_scraper, params.cursor)
+            self.assertEqual({"dummy_json": {}}, actual)
+
+            keys, qid, name = params.operation
+            variables = Operation.default_variables | {"userId": instance.target_id}
+            if params.cursor:
+                variables = variables | {"cursor": params.cursor}
+            expect_params = build_params({"variables": variables, "features": Operation.default_features})
+            mock_scraper.session.get.assert_called_once_with(
+                f"{FetcherBase.GRAPHQL_URL}/{qid}/{name}", params=expect_params
+            )
+            mock_scraper.session.get.return_value.raise_for_status.assert_called_once_with()
+        self.assertEqual(len(params_list), instance.api_call_num)
+
+    def test_get_next_cursor(self):
+        instance = self._get_instance()
+        actual = instance._get_next_cursor(self._get_page([1, 2], "next_cursor"))
+        self.assertEqual(("next_cursor", 2), actual)
+        actual = instance._get_next_cursor(self._get_page([], "0|next_cursor"))
+        self.assertEqual(("0|next_cursor", 0), actual)
+        actual = instance._get_next_cursor(self._get_page([1, 2]))
+        self.assertEqual((None, 2), actual)
+
+        # v2 の応答では itemContent 以下にカーソルがある
+        page = self._get_page([1])
+        page["data"]["user"]["result"]["timeline"]["timeline"]["instructions"][0]["entries"].append({
+            "entryId": "cursor-bottom-0",
+            "content": {"itemContent": {"value": "next_cursor_v2"}},
+        })
+        actual = instance._get_next_cursor(page)
+        self.assertEqual(("next_cursor_v2", 1), actual)
+
+        # 想定と異なる構造のページは最終ページとはみなさない
+        with self.assertRaises(ValueError):
+            actual = instance._get_next_cursor({"dummy_json": {}})
+        with self.assertRaises(ValueError):
+            actual = instance._get_next_cursor({"entries": [], "dummy": {"entries": []}})
+        with self.assertRaises(ValueError):
+            actual = instance._get_next_cursor({"entries": {}})
+
+    def test_iter_pages(self):
+        mock_logger = self.enterContext(patch("ff_getter.fetcher.fetcher_base.logger"))
+        mock_scraper = self.enterContext(patch("ff_getter.fetcher.fetcher_base.Scraper"))
+        mock_fetch_page = self.enterContext(patch("ff_getter.fetcher.fetcher_base.FetcherBase._fetch_page"))
+
+        pages = [
+            self._get_page([1, 2], "cursor_1"),
+            self._get_page([3, 4], "cursor_2"),
+            self._get_page([], "0|cursor_3"),
+        ]
+        mock_fetch_page.side_effect = pages
+        instance = self._get_instance()
+        instance.is_debug = False
+        cache_path = instance.cache_path
+        cache_path.mkdir(parents=True, exist_ok=True)
+        (cache_path / "content_cache99.txt").write_text('{"old_json": {}}')
+
+        # ページは到着順に返され、キャッシュにも保存される
+        actual = list(instance.iter_pages())
+        self.assertEqual(pages, actual)
+        mock_scraper.assert_called_once_with(
+            cookies={"ct0": instance.ct0, "auth_token": instance.auth_token}, pbar=False
+        )
+        self.assertEqual(
+            [
+                call(mock_scraper.return_value, None),
+                call(mock_scraper.return_value, "cursor_1"),
+                call(mock_scraper.return_value, "cursor_2"),
+            ],
+            mock_fetch_page.mock_calls,
+        )
+        self.assertFalse((cache_path / "content_cache99.txt").exists())
+        for i, page in enumerate(pages):
+            self.assertEqual(page, orjson.loads((cache_path / f"content_cache{i}.txt").read_bytes()))
+
+        # デバッグモードの場合はキャッシュからページ番号順に読み込む
+        mock_fetch_page.reset_mock()
+        instance.is_debug = True
+        (cache_path / "content_cache10.txt").write_bytes(orjson.dumps(pages[0]))
+        actual = list(instance.iter_pages())
+        self.assertEqual(pages + [pages[0]], actual)
+        mock_fetch_page.assert_not_called()
+
+        # 取得し終えた場合はチェックポイントは残らない
+        self.assertFalse((cache_path / "checkpoint.json").exists())
+
+        # 途中で取得に失敗した場合は例外が送出され、チェックポイントが残る
+        mock_fetch_page.side_effect = [pages[0], ValueError]
+        instance.is_debug = False
+        with self.assertRaises(ValueError):
+            actual = list(instance.iter_pages())
+        self.assertTrue((cache_path / "content_cache0.txt").exists())
+        checkpoint = orjson.loads((cache_path / "checkpoint.json").read_bytes())
+        self.assertEqual(0, checkpoint["page_index"])
+        self.assertEqual("cursor_1", checkpoint["next_cursor"])
+        started_at = checkpoint["started_at"]
+
+        # 次回はキャッシュ済のページを返した後、チェックポイントのカーソルから再開する
+        mock_fetch_page.reset_mock()
+        mock_fetch_page.side_effect = pages[1:]
+        actual = list(instance.iter_pages())
+        self.assertEqual(pages, actual)
+        self.assertEqual(
+            [
+                call(mock_scraper.return_value, "cursor_1"),
+                call(mock_scraper.return_value, "cursor_2"),
+            ],
+            mock_fetch_page.mock_calls,
+        )
+        for i, page in enumerate(pages):
+            self.assertEqual(page, orjson.loads((cache_path / f"content_cache{i}.txt").read_bytes()))
+        self.assertFalse((cache_path / "checkpoint.json").exists())
+
+        # 最終ページまで保存済のチェックポイントであれば fetch しない
+        instance._write_page(cache_path, 2, pages[2], None, started_at)
+        mock_scraper.reset_mock()
+        mock_fetch_page.reset_mock()
+        actual = list(instance.iter_pages())
+        self.assertEqual(pages, actual)
+        mock_scraper.assert_not_called()
+        mock_fetch_page.assert_not_called()
+        self.assertFalse((cache_path / "checkpoint.json").exists())
+
+    def test_iter_pages_malformed(self):
+        mock_logger = self.enterContext(patch("ff_getter.fetcher.fetcher_base.logger"))
+        mock_scraper = self.enterContext(patch("ff_getter.fetcher.fetcher_base.Scraper"))
+        mock_fetch_page = self.enterContext(patch("ff_getter.fetcher.fetcher_base.FetcherBase._fetch_page"))
+        mock_sleep = self.enterContext(patch("ff_getter.fetcher.fetcher_base.time.sleep"))
+
+        pages = [
+            self._get_page([1, 2], "cursor_1"),
+            self._get_page([3, 4], "cursor_2"),
+            self._get_page([], "0|cursor_3"),
+        ]
+        malformed_page = {"dummy_json": {}}
+        instance = self._get_instance()
+        instance.is_debug = False
+        cache_path = instance.cache_path
+
+        # 途中で想定と異なる構造のページが返ってきた場合は、同じカーソルで取得し直す
+        mock_fetch_page.side_effect = [pages[0], malformed_page, pages[1], pages[2]]
+        actual = list(instance.iter_pages())
+        self.assertEqual(pages, actual)
+        self.assertEqual(
+            [
+                call(mock_scraper.return_value, None),
+                call(mock_scraper.return_value, "cursor_1"),
+                call(mock_scraper.return_value, "cursor_1"),
+                call(mock_scraper.return_value, "cursor_2"),
+            ],
+            mock_fetch_page.mock_calls,
+        )
+        mock_sleep.assert_called_once_with(FetcherBase.RETRY_WAIT_SEC)
+        self.assertEqual(1, instance.retry_num)
+        self.assertFalse((cache_path / "checkpoint.json").exists())
+
+        # 取得し直しても想定と異なる場合は、最終ページとはみなさず例外を送出し、チェックポイントを残す
+        mock_fetch_page.reset_mock()
+        mock_fetch_page.side_effect = [pages[0]] + [malformed_page] * (FetcherBase.MAX_RETRY_NUM + 1)
+        with self.assertRaises(ValueError):
+            actual = list(instance.iter_pages())
+        self.assertEqual(FetcherBase.MAX_RETRY_NUM + 2, mock_fetch_page.call_count)
+        self.assertEqual(1 + FetcherBase.MAX_RETRY_NUM, instance.retry_num)
+        checkpoint = orjson.loads((cache_path / "checkpoint.json").read_bytes())
+        self.assertEqual(0, checkpoint["page_index"])
+        self.assertEqual("cursor_1", checkpoint["next_cursor"])
+        self.assertFalse((cache_path / "content_cache1.txt").exists())
+
+        # ユーザーを含まないページが DUP_LIMIT 回続いた場合は最終ページとみなす
+        shutil.rmtree(cache_path)
+        mock_fetch_page.reset_mock()
+        empty_pages = [self._get_page([], f"empty_cursor_{i}") for i in range(1, 10)]
+        mock_fetch_page.side_effect = [pages[0]] + empty_pages
+        actual = list(instance.iter_pages())
+        self.assertEqual([pages[0]] + empty_pages[: FetcherBase.DUP_LIMIT], actual)
+        self.assertFalse((cache_path / "checkpoint.json").exists())
+
+    def test_write_page(self):
+        instance = self._get_instance()
+        cache_path = instance.cache_path
+        cache_path.mkdir(parents=True, exist_ok=True)
+        page = self._get_page([1, 2], "cursor_1")
+        started_at = "2023-03-20T00:00:00"
+
+        instance._write_page(cache_path, 3, page, "cursor_1", started_at)
+        self.assertEqual(page, orjson.loads((cache_path / "content_cache3.txt").read_bytes()))
+        expect = {
+            "target_id": instance.target_id,
+            "ff_type": instance.ff_type.value,
+            "page_index": 3,
+            "next_cursor": "cursor_1",
+            "started_at": started_at,
+        }
+        self.assertEqual(expect, orjson.loads((cache_path / "checkpoint.json").read_bytes()))
+        self.assertFalse((cache_path / "checkpoint.tmp").exists())
+
+        instance._write_page(cache_path, 4, page, None, started_at)
+        expect = expect | {"page_index": 4, "next_cursor": None}
+        self.assertEqual(expect, orjson.loads((cache_path / "checkpoint.json").read_bytes()))
+
+    def test_load_checkpoint(self):
+        freeze_gun = self.enterContext(freeze_time("2023-03-20 12:00:00"))
+        instance = self._get_instance()
+        cache_path = instance.cache_path
+        cache_path.mkdir(parents=True, exist_ok=True)
+        checkpoint_path = cache_path / "checkpoint.json"
+        page = self._get_page([1, 2], "cursor_1")
+        started_at = "2023-03-20T10:00:00"
+
+        # チェックポイントが存在しない
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+
+        instance._write_page(cache_path, 0, page, "cursor_1", started_at)
+        instance._write_page(cache_path, 1, page, "cursor_2", started_at)
+        expect = {
+            "target_id": instance.target_id,
+            "ff_type": instance.ff_type.value,
+            "page_index": 1,
+            "next_cursor": "cursor_2",
+            "started_at": started_at,
+        }
+        self.assertEqual(expect, instance._load_checkpoint(cache_path))
+
+        # 解釈できない
+        checkpoint_path.write_text("invalid")
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        checkpoint_path.write_bytes(orjson.dumps({"page_index": 1}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        checkpoint_path.write_bytes(orjson.dumps(expect | {"next_cursor": 1}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        checkpoint_path.write_bytes(orjson.dumps(expect | {"started_at": "invalid"}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        checkpoint_path.write_bytes(orjson.dumps({k: v for k, v in expect.items() if k != "started_at"}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+
+        # fetch の開始から max_age_sec を過ぎている
+        instance.checkpoint_max_age_sec = 2 * 60 * 60
+        checkpoint_path.write_bytes(orjson.dumps(expect))
+        self.assertEqual(expect, instance._load_checkpoint(cache_path))
+        freeze_gun.tick(1)
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        instance.checkpoint_max_age_sec = FetcherBase.DEFAULT_CHECKPOINT_MAX_AGE_SEC
+
+        # fetch の開始が別の日、または未来
+        checkpoint_path.write_bytes(orjson.dumps(expect | {"started_at": "2023-03-19T23:59:59"}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        checkpoint_path.write_bytes(orjson.dumps(expect | {"started_at": "2023-03-20T13:00:00"}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+
+        # 対象アカウントや種別が異なる
+        checkpoint_path.write_bytes(orjson.dumps(expect | {"target_id": 999}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+        checkpoint_path.write_bytes(orjson.dumps(expect | {"ff_type": FFtype.follower.value}))
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+
+        # キャッシュが揃っていない
+        checkpoint_path.write_bytes(orjson.dumps(expect))
+        (cache_path / "content_cache0.txt").unlink()
+        self.assertIsNone(instance._load_checkpoint(cache_path))
+
     def test_fetch_jsons(self):
         mock_logger = self.enterContext(patch("ff_getter.fetcher.fetcher_base.logger"))
         mock_scraper = self.enterContext(patch("ff_getter.fetcher.fetcher_base.Scraper"))
+        mock_fetch_page = self.enterContext(patch("ff_getter.fetcher.fetcher_base.FetcherBase._fetch_page"))
 
         Params = namedtuple("Params", ["ff_type", "is_debug", "is_error_occur"])
 
+        page = self._get_page([1, 2])
+
         def pre_run(params: Params, instance: FetcherBase) -> FetcherBase:
             instance.ff_type = params.ff_type
             instance.is_debug = params.is_debug
@@ -93,27 +409,22 @@ class TestFetcherBase(unittest.TestCase):
                 (instance.cache_path / "content_cache0.txt").write_text('{"dummy_json": {}}')
 
             mock_scraper.reset_mock()
-            mock_scraper.return_value.following.side_effect = lambda user_ids: [{"dummy_json": {}}]
-            mock_scraper.return_value.followers.side_effect = lambda user_ids: [{"dummy_json": {}}]
+            mock_fetch_page.reset_mock()
+            mock_fetch_page.side_effect = lambda scraper, cursor: page
 
             return instance
 
         def post_run(params: Params, instance: FetcherBase) -> FetcherBase:
             if params.is_debug:
-                mock_scraper.return_value.followers.assert_not_called()
-                mock_scraper.return_value.following.assert_not_called()
+                mock_scraper.assert_not_called()
+                mock_fetch_page.assert_not_called()
             else:
-                if params.ff_type == FFtype.following:
-                    mock_scraper.return_value.following.assert_called_once_with([instance.target_id])
-                    mock_scraper.return_value.followers.assert_not_called()
-                elif params.ff_type == FFtype.follower:
-                    mock_scraper.return_value.following.assert_not_called()
-                    mock_scraper.return_value.followers.assert_called_once_with([instance.target_id])
+                mock_fetch_page.assert_called_once_with(mock_scraper.return_value, None)
             return instance
 
         params_list = [
-            (Params(FFtype.following, False, False), [{"dummy_json": {}}]),
-            (Params(FFtype.follower, False, False), [{"dummy_json": {}}]),
+            (Params(FFtype.following, False, False), [page]),
+            (Params(FFtype.follower, False, False), [page]),
             (Params(FFtype.following, True, False), [{"dummy_json": {}}]),
             (Params(FFtype.follower, True, False), [{"dummy_json": {}}]),
             (Params(FFtype.following, True, True), "ValueError"),
@@ -185,6 +496,11 @@ class TestFetcherBase(unittest.TestCase):
         expect = FollowerList.create(Follower.create(0, "dummy_name", "dummy_screen_name"))
         self.assertEqual(expect, actual)
 
+        # イテレータを渡した場合もコンバートできる
+        actual = instance.to_convert(iter([json_dict, json_dict]))
+        expect = FollowerList.create([Follower.create(0, "dummy_name", "dummy_screen_name")] * 2)
+        self.assertEqual(expect, actual)
+
         instance.ff_type = FFtype.following
         actual = instance.to_convert([{"entries": [{}]}])
         self.assertEqual([], actual)
@@ -194,12 +510,12 @@ class TestFetcherBase(unittest.TestCase):
         self.assertEqual([], actual)
 
     def test_fetch(self):
-        mock_fetch_jsons = self.enterContext(patch("ff_getter.fetcher.fetcher_base.FetcherBase.fetch_jsons"))
+        mock_iter_pages = self.enterContext(patch("ff_getter.fetcher.fetcher_base.FetcherBase.iter_pages"))
         mock_to_convert = self.enterContext(patch("ff_getter.fetcher.fetcher_base.FetcherBase.to_convert"))
         instance = self._get_instance()
         actual = instance.fetch()
-        mock_fetch_jsons.assert_called_once_with()
-        mock_to_convert.assert_called_once_with(mock_fetch_jsons.return_value)
+        mock_iter_pages.assert_called_once_with()
+        mock_to_convert.assert_called_once_with(mock_iter_pages.return_value)
         self.assertEqual(mock_to_convert.return_value, actual)
 
     def test_fetcher(self):
@@ -213,6 +529,11 @@ class TestFetcherBase(unittest.TestCase):
         }
         instance = FollowingFetcher(config)
         self.assertEqual(FFtype.following, instance.ff_type)
+        self.assertEqual(FetcherBase.DEFAULT_CHECKPOINT_MAX_AGE_SEC, instance.checkpoint_max_age_sec)
+
+        config["checkpoint"] = {"max_age_sec": 60}
+        instance = FetcherBase(config, FFtype.following, False)
+        self.assertEqual(60.0, instance.checkpoint_max_age_sec)
         instance = FollowerFetcher(config)
         self.assertEqual(FFtype.follower, instance.ff_type)
 
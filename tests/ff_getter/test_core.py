@@ -1,6 +1,7 @@
 import argparse
 import datetime
 import sys
+import threading
 import unittest
 import warnings
 from collections import namedtuple
@@ -11,6 +12,7 @@ from freezegun import freeze_time
 from mock import MagicMock, patch
 
 from ff_getter.core import Core, Result
+from ff_getter.log_message import Message as Msg
 
 
 class TestCore(unittest.TestCase):
@@ -38,6 +40,58 @@ class TestCore(unittest.TestCase):
         self.assertTrue(core.config["move_old_file"]["is_move_old_file"])
         self.assertEqual(reserved_file_num, core.config["move_old_file"]["reserved_file_num"])
 
+    def test_fetch(self):
+        mock_logger = self.enterContext(patch("ff_getter.core.logger"))
+        mock_fetcher = MagicMock()
+        mock_fetcher.fetch.return_value = ["dummy_following_list"]
+        instance = Core()
+        actual, start, end = instance._fetch(mock_fetcher, Msg.GET_FOLLOWING_LIST_START, Msg.GET_FOLLOWING_LIST_DONE)
+        self.assertEqual(["dummy_following_list"], actual)
+        self.assertLessEqual(start, end)
+        mock_fetcher.fetch.assert_called_once_with()
+        mock_logger.info.assert_any_call(Msg.GET_FOLLOWING_LIST_START())
+        mock_logger.info.assert_any_call(Msg.GET_FOLLOWING_LIST_DONE())
+
+    def test_run_concurrent_fetch(self):
+        mock_twitter_follorwing = self.enterContext(patch("ff_getter.core.FollowingFetcher"))
+        mock_twitter_follorwer = self.enterContext(patch("ff_getter.core.FollowerFetcher"))
+        mock_directory = self.enterContext(patch("ff_getter.core.Directory"))
+        mock_diff_following_list = self.enterContext(patch("ff_getter.core.DiffFollowingList"))
+        mock_diff_follower_list = self.enterContext(patch("ff_getter.core.DiffFollowerList"))
+        mock_logger = self.enterContext(patch("ff_getter.core.logger"))
+
+        # following と follower の取得が並行して行われなければ Barrier がタイムアウトする
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fetch_following() -> list:
+            barrier.wait()
+            return ["dummy_following_list"]
+
+        def fetch_follower() -> list:
+            barrier.wait()
+            return ["dummy_follower_list"]
+
+        mock_twitter_follorwing.return_value.fetch.side_effect = fetch_following
+        mock_twitter_follorwer.return_value.fetch.side_effect = fetch_follower
+        mock_directory.return_value.move_old_file.return_value = []
+        mock_directory.return_value.load_last_snapshot.return_value = (
+            ["dummy_prev_following_list"],
+            ["dummy_prev_follower_list"],
+            None,
+        )
+
+        instance = Core()
+        instance.config["notification"]["is_notify"] = False
+        instance.config["after_open"]["is_after_open"] = False
+        actual = instance.run()
+        self.assertEqual(Result.success, actual)
+        mock_diff_following_list.create_from_diff.assert_called_once_with(
+            ["dummy_following_list"], ["dummy_prev_following_list"]
+        )
+        mock_diff_follower_list.create_from_diff.assert_called_once_with(
+            ["dummy_follower_list"], ["dummy_prev_follower_list"]
+        )
+
     def test_run(self):
         mock_twitter_follorwing = self.enterContext(patch("ff_getter.core.FollowingFetcher"))
         mock_twitter_follorwer = self.enterContext(patch("ff_getter.core.FollowerFetcher"))
@@ -46,6 +100,9 @@ class TestCore(unittest.TestCase):
         mock_diff_follower_list = self.enterContext(patch("ff_getter.core.DiffFollowerList"))
         mock_notification = self.enterContext(patch("ff_getter.core.notification"))
         mock_subprocess = self.enterContext(patch("ff_getter.core.subprocess"))
+        mock_event_log = self.enterContext(patch("ff_getter.core.EventLog"))
+        mock_metrics_write = self.enterContext(patch("ff_getter.core.RunMetrics.write", autospec=True))
+        mock_textfile_write = self.enterContext(patch("ff_getter.core.TextfileExporter.write", autospec=True))
         mock_logger = self.enterContext(patch("ff_getter.core.logger"))
         freeze_gun = self.enterContext(freeze_time("2023-03-20 00:00:00"))
 
@@ -61,15 +118,26 @@ class TestCore(unittest.TestCase):
             mock_diff_follower_list.reset_mock()
             mock_notification.reset_mock()
             mock_subprocess.reset_mock()
+            mock_event_log.reset_mock()
+            mock_metrics_write.reset_mock()
+            mock_textfile_write.reset_mock()
+            mock_logger.reset_mock()
 
             following_fetcher = mock_twitter_follorwing.return_value
             following_fetcher.fetch.return_value = ["dummy_following_list"]
+            following_fetcher.api_call_num = 2
+            following_fetcher.retry_num = 1
             follower_fetcher = mock_twitter_follorwer.return_value
             follower_fetcher.fetch.return_value = ["dummy_follower_list"]
+            follower_fetcher.api_call_num = 3
+            follower_fetcher.retry_num = 0
 
             directory = mock_directory.return_value
-            directory.get_last_following.return_value = ["dummy_prev_following_list"]
-            directory.get_last_follower.return_value = ["dummy_prev_follower_list"]
+            directory.load_last_snapshot.return_value = (
+                ["dummy_prev_following_list"],
+                ["dummy_prev_follower_list"],
+                "dummy_last_file_path",
+            )
 
             mock_diff_following_list.create_from_diff.return_value = ["dummy_diff_following_list"]
             mock_diff_follower_list.create_from_diff.return_value = ["dummy_diff_follower_list"]
@@ -79,6 +147,22 @@ class TestCore(unittest.TestCase):
             else:
                 directory.save_file.return_value = "dummy_saved_file_path"
             directory.move_old_file.return_value = ["dummy_moved_old_file_path"] if p.is_moved_list else []
+            directory.archive_old_file.return_value = ["dummy_archive_path"] if p.is_moved_list else []
+            directory.get_run_id.return_value = "dummy_run_id"
+            # 通知する場合はイベントログが既存, しない場合は初回作成として扱う
+            # 既存の場合、移動したファイルがなければ前回の実行分がログに無く、今回の実行分は同日の再実行で記録済とする
+            # 移動したファイルがあれば前回の実行分は結果ファイルを読み込めず読み飛ばした実行分とする
+            run_id_list = ["dummy_prev_run_id", "dummy_run_id"]
+            directory.get_run_list.return_value = [{"run_id": run_id} for run_id in run_id_list]
+            recorded_list = [] if p.is_moved_list else ["dummy_run_id"]
+            skipped_list = ["dummy_prev_run_id"] if p.is_moved_list else []
+            event_log = mock_event_log.return_value
+            event_log.exists.return_value = p.is_notify
+            event_log.get_run_id_list.return_value = recorded_list
+            event_log.get_skipped_run_id_list.return_value = skipped_list
+            event_log.import_runs.return_value = [
+                run_id for run_id in run_id_list if not p.is_notify or run_id not in recorded_list
+            ]
 
             instance.config["twitter_api_client"]["ct0"] = "dummy_ct0"
             instance.config["twitter_api_client"]["auth_token"] = "dummy_auth_token"
@@ -88,6 +172,11 @@ class TestCore(unittest.TestCase):
             instance.config["after_open"]["is_after_open"] = p.is_after_open
             instance.config["move_old_file"]["is_move_old_file"] = p.is_move_old_file
             instance.config["move_old_file"]["reserved_file_num"] = 10 if p.is_move_old_file else -1
+            instance.config["archive_old_file"]["is_archive_old_file"] = p.is_move_old_file
+            instance.config["event_log"]["is_event_log"] = p.is_after_open
+            instance.config["delta_chain"]["is_delta_chain"] = p.is_notify
+            instance.config["metrics"]["is_metrics"] = p.is_move_old_file
+            instance.config["textfile_exporter"]["is_textfile_exporter"] = p.is_notify
             return instance
 
         def post_run(instance: Core, p: Params) -> Core:
@@ -99,9 +188,16 @@ class TestCore(unittest.TestCase):
             follower_fetcher = mock_twitter_follorwer.return_value
             follower_fetcher.fetch.assert_called_once_with()
 
+            is_native_writer = instance.config["save_file"]["is_native_writer"]
+            keyframe_interval = instance.config["delta_chain"]["keyframe_interval"] if p.is_notify else 1
+            mock_directory.assert_called_once_with(
+                is_native_writer=is_native_writer, keyframe_interval=keyframe_interval
+            )
             directory = mock_directory.return_value
-            directory.get_last_following.assert_called_once_with()
-            directory.get_last_follower.assert_called_once_with()
+            directory.load_last_snapshot.assert_called_once_with()
+            directory.get_last_following.assert_not_called()
+            directory.get_last_follower.assert_not_called()
+            directory.get_last_file_path.assert_not_called()
             mock_diff_following_list.create_from_diff.assert_called_once_with(
                 ["dummy_following_list"], ["dummy_prev_following_list"]
             )
@@ -115,14 +211,75 @@ class TestCore(unittest.TestCase):
                 ["dummy_follower_list"],
                 ["dummy_diff_following_list"],
                 ["dummy_diff_follower_list"],
+                "dummy_last_file_path",
             )
 
+            # 失敗した場合も、失敗した段階までの計測結果を記録する
+            stage_name_list = ["fetch", "load_previous", "diff", "save"]
+            if not p.is_error_occur:
+                stage_name_list += ["event_log"] if p.is_after_open else []
+                stage_name_list += ["notify", "move"]
+                stage_name_list += ["archive"] if p.is_move_old_file else []
+                stage_name_list += ["open"]
+            if p.is_move_old_file:
+                metrics, metrics_file_path, result = mock_metrics_write.call_args.args
+                self.assertEqual(stage_name_list, [stage.name for stage in metrics.stage_list])
+                self.assertEqual(Path(instance.config["metrics"]["metrics_file_path"]), metrics_file_path)
+                self.assertEqual(Result.failed if p.is_error_occur else Result.success, result)
+                mock_metrics_write.assert_called_once()
+            else:
+                mock_metrics_write.assert_not_called()
+            if p.is_notify:
+                exporter, textfile_path = mock_textfile_write.call_args.args
+                mock_textfile_write.assert_called_once()
+                self.assertEqual(Path(instance.config["textfile_exporter"]["textfile_path"]), textfile_path)
+                self.assertEqual(0.0 if p.is_error_occur else 1.0, exporter.get("run_success"))
+                for stage_name in stage_name_list:
+                    self.assertIsNotNone(exporter.get("stage_duration_seconds", stage=stage_name))
+                self.assertEqual([1.0, 1.0], [exporter.get("users", ff_type=t) for t in ["following", "follower"]])
+                self.assertEqual(
+                    [1.0, 1.0], [exporter.get("diff_users", ff_type=t) for t in ["following", "follower"]]
+                )
+                self.assertEqual([2.0, 3.0], [exporter.get("api_calls", ff_type=t) for t in ["following", "follower"]])
+                self.assertEqual(
+                    [1.0, 0.0], [exporter.get("fetch_retries", ff_type=t) for t in ["following", "follower"]]
+                )
+            else:
+                mock_textfile_write.assert_not_called()
+            logged_stage_list = [
+                c.args[0].split()[1] for c in mock_logger.info.call_args_list if str(c.args[0]).startswith("Stage ")
+            ]
+            self.assertEqual(stage_name_list, logged_stage_list)
+
             if p.is_error_occur:
+                mock_event_log.assert_not_called()
                 mock_notification.notify.assert_not_called()
                 directory.move_old_file.assert_not_called()
+                directory.archive_old_file.assert_not_called()
                 mock_subprocess.Popen.assert_not_called()
                 return instance
 
+            event_log = mock_event_log.return_value
+            if not p.is_after_open:
+                mock_event_log.assert_not_called()
+            else:
+                directory.get_run_id.assert_called_once_with("dummy_saved_file_path")
+                imported_list = []
+                if p.is_notify and p.is_moved_list:
+                    # 目録の実行分がすべてログに記録済または読み飛ばし済であれば補わない
+                    event_log.import_runs.assert_not_called()
+                else:
+                    # 初回、またはログに無い実行分が目録にある場合は既存の結果ファイルから補う
+                    event_log.import_runs.assert_called_once_with(directory)
+                    imported_list = event_log.import_runs.return_value
+                    mock_logger.info.assert_any_call(Msg.IMPORT_EVENT_LOG().format(len(imported_list)))
+                if "dummy_run_id" in imported_list:
+                    event_log.append.assert_not_called()
+                else:
+                    event_log.append.assert_called_once_with(
+                        "dummy_run_id", ["dummy_diff_following_list"], ["dummy_diff_follower_list"], 1, 1
+                    )
+
             is_notify = p.is_notify
             if is_notify:
                 done_msg = "FFGetter run.\n"
@@ -141,8 +298,14 @@ class TestCore(unittest.TestCase):
             if is_move_old_file:
                 reserved_file_num = 10
                 directory.move_old_file.assert_called_once_with(reserved_file_num)
+                reserved_backup_num = 30
+                directory.archive_old_file.assert_called_once_with(reserved_backup_num)
+                archive_path = "dummy_archive_path." if p.is_moved_list else "No File archived."
+                mock_logger.info.assert_any_call(Msg.ARCHIVE_OLD_FILE_PATH().format(archive_path))
+                mock_logger.info.assert_any_call(Msg.ARCHIVE_OLD_FILE_DONE())
             else:
                 directory.move_old_file.assert_not_called()
+                directory.archive_old_file.assert_not_called()
 
             is_after_open = p.is_after_open
             if is_after_open:
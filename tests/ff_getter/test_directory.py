@@ -1,12 +1,19 @@
+import io
+import os
 import shutil
 import sys
 import unittest
 from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile
 
 from freezegun import freeze_time
 from jinja2 import Template
+from mock import patch
 
-from ff_getter.directory import Directory
+from ff_getter.directory import Directory, get_template
+from ff_getter.snapshot import Snapshot
+from ff_getter.snapshot_chain import SnapshotChain
+from ff_getter.util import RunLocation
 from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing, DiffRecord
 from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList, DiffRecordList
 from ff_getter.value_object.user_record import Follower, Following, UserRecord
@@ -18,6 +25,7 @@ class TestDirectory(unittest.TestCase):
         temp_directory_path_list = [
             Path("./tests/ff_getter/result"),
             Path("./tests/ff_getter/bak"),
+            Path("./tests/ff_getter/snapshot"),
         ]
         for temp_directory_path in temp_directory_path_list:
             self._init_path(temp_directory_path)
@@ -27,6 +35,7 @@ class TestDirectory(unittest.TestCase):
         temp_directory_path_list = [
             Path("./tests/ff_getter/result"),
             Path("./tests/ff_getter/bak"),
+            Path("./tests/ff_getter/snapshot"),
         ]
         for temp_directory_path in temp_directory_path_list:
             self._del_path(temp_directory_path)
@@ -46,6 +55,7 @@ class TestDirectory(unittest.TestCase):
         object.__setattr__(directory, "base_path", base_path)
         object.__setattr__(directory, "RESULT_DIRECTORY", "./tests/ff_getter/result")
         object.__setattr__(directory, "BACKUP_DIRECTORY", "./tests/ff_getter/bak")
+        object.__setattr__(directory, "SNAPSHOT_DIRECTORY", "./tests/ff_getter/snapshot")
         return directory
 
     def _make_sample_file(self, date_str) -> Path:
@@ -98,8 +108,26 @@ class TestDirectory(unittest.TestCase):
             "diff_follower_list": t_diff_follower_list,
         })
         file_path.write_text(rendered_str, encoding="utf8")
+        directory.rebuild_manifest()
         return file_path
 
+    def test_get_template(self):
+        # コンパイル済のテンプレートが使い回される
+        actual = get_template(Directory.TEMPLATE_FILE_PATH)
+        self.assertIs(actual, get_template(Directory.TEMPLATE_FILE_PATH))
+        template_str = Path(Directory.TEMPLATE_FILE_PATH).read_text(encoding="utf8")
+        render_dict = {"today_str": "20230318", "following_list": ["1, ユーザー1, screen_name_1\n"]}
+        self.assertEqual(Template(template_str).render(render_dict), actual.render(render_dict))
+
+        # テンプレートファイルが更新された場合は再コンパイルされる
+        template_path = Path("./tests/ff_getter/result/template.txt")
+        template_path.write_text("{{ today_str }}", encoding="utf8")
+        self.assertEqual("20230318", get_template(str(template_path)).render(render_dict))
+        template_path.write_text("updated {{ today_str }}", encoding="utf8")
+        stat = template_path.stat()
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual("updated 20230318", get_template(str(template_path)).render(render_dict))
+
     def test_init(self):
         directory = Directory()
         expect = Path().resolve()
@@ -108,11 +136,15 @@ class TestDirectory(unittest.TestCase):
         FILE_NAME_BASE = "ff_list"
         RESULT_DIRECTORY = "./result/"
         BACKUP_DIRECTORY = "./bak/"
+        SNAPSHOT_DIRECTORY = "./snapshot/"
         TEMPLATE_FILE_PATH = "./ext/template.txt"
         self.assertEqual(FILE_NAME_BASE, Directory.FILE_NAME_BASE)
         self.assertEqual(RESULT_DIRECTORY, Directory.RESULT_DIRECTORY)
         self.assertEqual(BACKUP_DIRECTORY, Directory.BACKUP_DIRECTORY)
+        self.assertEqual(SNAPSHOT_DIRECTORY, Directory.SNAPSHOT_DIRECTORY)
         self.assertEqual(TEMPLATE_FILE_PATH, Directory.TEMPLATE_FILE_PATH)
+        # 差分としての保存は明示的に指定した場合のみ行う
+        self.assertEqual(1, directory.keyframe_interval)
 
     def test_get_last_file_path(self):
         self.enterContext(freeze_time("2023-03-18 00:00:00"))
@@ -127,6 +159,7 @@ class TestDirectory(unittest.TestCase):
         today_str = "20230317"
         file_path = result_directory_path / f"{directory.FILE_NAME_BASE}_{today_str}.txt"
         file_path.touch()
+        directory.rebuild_manifest()
         actual = directory.get_last_file_path()
         expect = file_path
         self.assertEqual(expect, actual)
@@ -136,14 +169,288 @@ class TestDirectory(unittest.TestCase):
         yesterday_str = "20230317"
         file_path = result_directory_path / f"{directory.FILE_NAME_BASE}_{today_str}.txt"
         file_path.touch()
+        directory.rebuild_manifest()
         actual = directory.get_last_file_path()
         expect = result_directory_path / f"{directory.FILE_NAME_BASE}_{yesterday_str}.txt"
         self.assertEqual(expect, actual)
         expect.unlink(missing_ok=True)
 
         # 本日実行分しかなかったため、前回実行分は無かった
+        # 目録が指すファイルが存在しない場合は目録が作り直される
         actual = directory.get_last_file_path()
         self.assertIsNone(actual)
+        expect = [f"{directory.FILE_NAME_BASE}_{today_str}.txt"]
+        self.assertEqual(expect, [run["path"] for run in directory.get_run_list()])
+
+    def test_manifest(self):
+        self.enterContext(freeze_time("2023-03-18 00:00:00"))
+        directory = self._get_instance()
+        result_path = Path(directory.RESULT_DIRECTORY)
+        backup_path = Path(directory.BACKUP_DIRECTORY)
+        file_name_base = directory.FILE_NAME_BASE
+        self.assertEqual(result_path / "manifest.json", directory.manifest_path)
+
+        # 目録が存在しない場合は作り直される
+        for date_str in ["20230316", "20230314"]:
+            (result_path / f"{file_name_base}_{date_str}.txt").touch()
+        (backup_path / f"{file_name_base}_20230315.txt").touch()
+        actual = directory.get_run_list()
+        self.assertTrue(directory.manifest_path.is_file())
+        self.assertEqual(["20230314", "20230315", "20230316"], [run["run_id"] for run in actual])
+        self.assertEqual(["result", "backup", "result"], [run["location"] for run in actual])
+        self.assertEqual([None, None, None], [run["following_num"] for run in actual])
+        actual = directory.get_run_list(RunLocation.backup)
+        self.assertEqual(["20230315"], [run["run_id"] for run in actual])
+
+        # 壊れている場合も作り直される
+        directory.manifest_path.write_text("invalid")
+        actual = directory.get_run_list(RunLocation.result)
+        self.assertEqual(["20230314", "20230316"], [run["run_id"] for run in actual])
+
+        # 結果保存時に件数とともに追記される
+        following_list = FollowingList.create([Following.create(1, "ユーザー1", "screen_name_1")])
+        follower_list = FollowerList.create()
+        file_path = directory.save_file(
+            "dummy_target_username",
+            following_list,
+            follower_list,
+            DiffFollowingList.create(),
+            DiffFollowerList.create(),
+        )
+        self.assertIn("difference with ff_list_20230316.txt", file_path.read_text(encoding="utf8"))
+        actual = directory.get_run_list()[-1]
+        expect = {
+            "run_id": "20230318",
+            "timestamp": "2023-03-18T00:00:00",
+            "path": file_path.name,
+            "following_num": 1,
+            "follower_num": 0,
+            "location": "result",
+        }
+        self.assertEqual(expect, actual)
+
+        # 同日に再実行した場合は上書きされる
+        directory.save_file(
+            "dummy_target_username",
+            following_list,
+            following_list,
+            DiffFollowingList.create(),
+            DiffFollowerList.create(),
+        )
+        actual = directory.get_run_list()
+        self.assertEqual(4, len(actual))
+        self.assertEqual(1, actual[-1]["follower_num"])
+
+        # 移動した分は保存場所が更新される
+        actual = directory.move_old_file(1)
+        expect = [backup_path / f"{file_name_base}_{date_str}.txt" for date_str in ["20230314", "20230316"]]
+        self.assertEqual(expect, actual)
+        actual = directory.get_run_list()
+        self.assertEqual(["backup", "backup", "backup", "result"], [run["location"] for run in actual])
+        self.assertIsNone(directory.get_last_file_path())
+
+    def test_get_run_id(self):
+        directory = self._get_instance()
+        actual = directory.get_run_id(Path(directory.RESULT_DIRECTORY) / f"{directory.FILE_NAME_BASE}_20230318.txt")
+        self.assertEqual("20230318", actual)
+
+    def test_read_run(self):
+        self.enterContext(freeze_time("2023-03-18 00:00:00"))
+        directory = self._get_instance()
+        following_list = FollowingList.create([Following.create(1, "ユーザー1, カンマ入り", "screen_name_1")])
+        follower_list = FollowerList.create([Follower.create(2, "ユーザー2", "screen_name_2")])
+        file_path = directory.save_file(
+            "dummy_target_username",
+            following_list,
+            follower_list,
+            DiffFollowingList.create(),
+            DiffFollowerList.create(),
+        )
+        snapshot_path = directory.snapshot_chain.get_path(directory.get_run_id(file_path), True)
+
+        # スナップショットから読み込む
+        run = directory.get_run_list()[-1]
+        self.assertEqual((following_list, follower_list), directory.read_run(run))
+
+        # 結果ファイルから読み込む
+        snapshot_path.unlink()
+        self.assertEqual((following_list, follower_list), directory.read_run(run))
+
+        # アーカイブから読み込む
+        directory.move_old_file(0)
+        directory.archive_old_file(0)
+        run = directory.get_run_list()[-1]
+        self.assertEqual("archive", run["location"])
+        self.assertEqual((following_list, follower_list), directory.read_run(run))
+
+        # 結果ファイルが存在しない
+        run = dict(run, location="result")
+        with self.assertRaises(FileNotFoundError):
+            directory.read_run(run)
+
+    def test_get_archive_path(self):
+        directory = self._get_instance()
+        actual = directory.get_archive_path("20230318")
+        expect = Path(directory.BACKUP_DIRECTORY) / f"{directory.FILE_NAME_BASE}_202303.zip"
+        self.assertEqual(expect, actual)
+
+    def test_archive_old_file(self):
+        self.enterContext(freeze_time("2023-03-18 00:00:00"))
+        directory = self._get_instance()
+        backup_path = Path(directory.BACKUP_DIRECTORY)
+        file_name_base = directory.FILE_NAME_BASE
+        date_str_list = ["20230227", "20230228", "20230301", "20230302", "20230303"]
+        for date_str in date_str_list:
+            (backup_path / f"{file_name_base}_{date_str}.txt").write_text(f"content {date_str}", encoding="utf8")
+        directory.rebuild_manifest()
+
+        # reserved_backup_num が不正
+        self.assertEqual([], directory.archive_old_file("invalid_str"))
+        self.assertEqual([], directory.archive_old_file(-1))
+        # 圧縮対象が無い
+        self.assertEqual([], directory.archive_old_file(5))
+
+        # 古い順に月ごとのアーカイブに圧縮される
+        actual = directory.archive_old_file(2)
+        expect = [backup_path / f"{file_name_base}_202302.zip", backup_path / f"{file_name_base}_202303.zip"]
+        self.assertEqual(expect, actual)
+        with ZipFile(expect[0]) as archive:
+            self.assertEqual([f"{file_name_base}_20230227.txt", f"{file_name_base}_20230228.txt"], archive.namelist())
+            self.assertTrue(all(info.compress_type == ZIP_DEFLATED for info in archive.infolist()))
+        with ZipFile(expect[1]) as archive:
+            self.assertEqual([f"{file_name_base}_20230301.txt"], archive.namelist())
+        actual = sorted(p.name for p in backup_path.glob(f"{file_name_base}*.txt"))
+        self.assertEqual([f"{file_name_base}_20230302.txt", f"{file_name_base}_20230303.txt"], actual)
+        self.assertEqual([], list(backup_path.glob("*.tmp")))
+
+        actual = directory.get_run_list(RunLocation.archive)
+        self.assertEqual(["20230227", "20230228", "20230301"], [run["run_id"] for run in actual])
+        self.assertEqual([expect[0].name, expect[0].name, expect[1].name], [run["archive"] for run in actual])
+
+        # 既存のアーカイブには追記される
+        actual = directory.archive_old_file(0)
+        self.assertEqual([backup_path / f"{file_name_base}_202303.zip"], actual)
+        with ZipFile(actual[0]) as archive:
+            expect_name_list = [f"{file_name_base}_{date_str}.txt" for date_str in date_str_list[2:]]
+            self.assertEqual(expect_name_list, archive.namelist())
+        self.assertEqual([], directory.get_run_list(RunLocation.backup))
+
+        # 目録を作り直してもアーカイブ内のファイルが実行履歴となる
+        actual = directory.rebuild_manifest()
+        self.assertEqual(date_str_list, [run["run_id"] for run in actual])
+        self.assertEqual(["archive"] * 5, [run["location"] for run in actual])
+
+        # 中断などで同じ内容がすでに格納されている場合は追加せずに元のファイルを削除する
+        (backup_path / f"{file_name_base}_20230303.txt").write_text("content 20230303", encoding="utf8")
+        directory.rebuild_manifest()
+        actual = directory.archive_old_file(0)
+        self.assertEqual([backup_path / f"{file_name_base}_202303.zip"], actual)
+        self.assertFalse((backup_path / f"{file_name_base}_20230303.txt").exists())
+        with ZipFile(actual[0]) as archive:
+            self.assertEqual(3, len(archive.namelist()))
+
+        # 同じ名前で内容が異なる場合
+        (backup_path / f"{file_name_base}_20230303.txt").write_text("changed", encoding="utf8")
+        directory.rebuild_manifest()
+        with self.assertRaises(FileExistsError):
+            actual = directory.archive_old_file(0)
+        self.assertTrue((backup_path / f"{file_name_base}_20230303.txt").exists())
+        self.assertEqual(["20230303"], [run["run_id"] for run in directory.get_run_list(RunLocation.backup)])
+
+    def test_open_archived_file(self):
+        directory = self._get_instance()
+        backup_path = Path(directory.BACKUP_DIRECTORY)
+        file_name_base = directory.FILE_NAME_BASE
+        for date_str in ["20230301", "20230302"]:
+            (backup_path / f"{file_name_base}_{date_str}.txt").write_text(f"ユーザー {date_str}\n", encoding="utf8")
+        directory.rebuild_manifest()
+        directory.archive_old_file(0)
+
+        # 対象のファイルのみを読み込める
+        with directory.open_archived_file(f"{file_name_base}_20230302.txt") as fin:
+            actual = io.TextIOWrapper(fin, encoding="utf8").read()
+        self.assertEqual("ユーザー 20230302\n", actual)
+
+        # アーカイブに格納されていない
+        with self.assertRaises(FileNotFoundError):
+            directory.open_archived_file(f"{file_name_base}_20230303.txt")
+        # アーカイブが存在しない
+        with self.assertRaises(FileNotFoundError):
+            directory.open_archived_file(f"{file_name_base}_20230401.txt")
+
+    def test_get_last_following_from_snapshot(self):
+        directory = self._get_instance()
+        file_path = self._make_sample_file("20230317")
+
+        # スナップショットがあればテキストの結果ファイルよりも優先する
+        following_list = FollowingList.create([Following.create(9, "ユーザー9, 名前", "screen_name_9")])
+        follower_list = FollowerList.create([Follower.create(8, "ユーザー8", "screen_name_8")])
+        Snapshot.save(
+            directory.snapshot_chain.get_path(directory.get_run_id(file_path), True), following_list, follower_list
+        )
+        self.assertEqual(following_list, directory.get_last_following())
+        self.assertEqual(follower_list, directory.get_last_follower())
+
+    def test_load_last_snapshot(self):
+        directory = self._get_instance()
+        # result が空の場合
+        actual = directory.load_last_snapshot()
+        expect = (FollowingList.create(), FollowerList.create(), None)
+        self.assertEqual(expect, actual)
+
+        # result に前回実行ファイルが存在する場合
+        file_path = self._make_sample_file("20230317")
+        actual = directory.load_last_snapshot()
+        following_list = FollowingList.create([
+            Following.create(1, "ユーザー1", "screen_name_1"),
+            Following.create(2, "ユーザー2", "screen_name_2"),
+        ])
+        follower_list = FollowerList.create([
+            Follower.create(2, "ユーザー2", "screen_name_2"),
+            Follower.create(3, "ユーザー3", "screen_name_3"),
+        ])
+        self.assertEqual((following_list, follower_list, file_path), actual)
+
+        # スナップショットが存在する場合はそちらから取得する
+        following_list = FollowingList.create([Following.create(9, "ユーザー9", "screen_name_9")])
+        follower_list = FollowerList.create([Follower.create(8, "ユーザー8", "screen_name_8")])
+        Snapshot.save(
+            directory.snapshot_chain.get_path(directory.get_run_id(file_path), True), following_list, follower_list
+        )
+        actual = directory.load_last_snapshot()
+        self.assertEqual((following_list, follower_list, file_path), actual)
+
+    def test_read_result_file(self):
+        directory = self._get_instance()
+        file_path = Path(directory.RESULT_DIRECTORY) / f"{directory.FILE_NAME_BASE}_20230317.txt"
+        file_path.write_text(
+            "20230317 dummy_target_username\n"
+            "following 2\n"
+            "id, name, screen_name\n"
+            "1, ユーザー1, カンマ入り, screen_name_1\n"
+            "2, ユーザー2, screen_name_2\n"
+            "\n"
+            "follower 0\n"
+            "id, name, screen_name\n"
+            "\n"
+            "difference with nothing (first run)\n"
+            "following\n"
+            "diff_type, id, name, screen_name\n"
+            "ADD, 1, ユーザー1, カンマ入り, screen_name_1\n"
+            "\n",
+            encoding="utf-8",
+        )
+        actual = directory._read_result_file(file_path)
+        following_list = FollowingList.create([
+            Following.create(1, "ユーザー1, カンマ入り", "screen_name_1"),
+            Following.create(2, "ユーザー2", "screen_name_2"),
+        ])
+        self.assertEqual((following_list, FollowerList.create()), actual)
+
+        # ブロックが存在しない
+        file_path.write_text("20230317 dummy_target_username\n", encoding="utf-8")
+        actual = directory._read_result_file(file_path)
+        self.assertEqual((FollowingList.create(), FollowerList.create()), actual)
 
     def test_get_last_following(self):
         directory = self._get_instance()
@@ -209,6 +516,12 @@ class TestDirectory(unittest.TestCase):
         actual_str: str = file_path.read_text(encoding="utf8")
         self.assertEqual(expect_str, actual_str)
 
+        # スナップショットも保存される
+        snapshot = Snapshot.load(directory.snapshot_chain.get_path(directory.get_run_id(file_path), True))
+        self.assertEqual(following_list, snapshot.following_list())
+        self.assertEqual(follower_list, snapshot.follower_list())
+        del snapshot
+
         # result に前回実行ファイルが存在する場合
         self._make_sample_file(yesterday_str)
         expect: Path = self._make_sample_file(today_str)
@@ -224,6 +537,197 @@ class TestDirectory(unittest.TestCase):
         actual_str: str = file_path.read_text(encoding="utf8")
         self.assertEqual(expect_str, actual_str)
 
+        # 前回実行ファイルのパスを渡した場合はそれを使う
+        mock_get_last_file_path = self.enterContext(patch.object(Directory, "get_last_file_path"))
+        last_file_path = Path(directory.RESULT_DIRECTORY) / f"{directory.FILE_NAME_BASE}_{yesterday_str}.txt"
+        actual: Path = directory.save_file(
+            target_username, following_list, follower_list, diff_following_list, diff_follower_list, last_file_path
+        )
+        mock_get_last_file_path.assert_not_called()
+        actual_str: str = actual.read_text(encoding="utf8")
+        self.assertEqual(expect_str, actual_str)
+
+        actual: Path = directory.save_file(
+            target_username, following_list, follower_list, diff_following_list, diff_follower_list, None
+        )
+        mock_get_last_file_path.assert_not_called()
+        actual_str: str = actual.read_text(encoding="utf8")
+        self.assertIn("difference with nothing (first run)", actual_str)
+
+    def test_save_file_native_writer(self):
+        self.enterContext(freeze_time("2023-03-18 00:00:00"))
+        template_directory = self._get_instance()
+        native_directory = self._get_instance()
+        object.__setattr__(native_directory, "is_native_writer", True)
+        self.assertFalse(template_directory.is_native_writer)
+        self.assertTrue(native_directory.is_native_writer)
+
+        target_username = "dummy_target_username"
+        following_list = FollowingList.create([
+            Following.create(1, "ユーザー1, カンマ入り🎉", "screen_name_1"),
+            Following.create(2, "", "screen_name_2"),
+        ])
+        follower_list = FollowerList.create([Follower.create(3, "ユーザー3", "screen_name_3")])
+        diff_following_list = DiffFollowingList.create([DiffFollowing.create("ADD", 1, "ユーザー1", "screen_name_1")])
+        diff_follower_list = DiffFollowerList.create([DiffFollower.create("REMOVE", 4, "ユーザー4", "screen_name_4")])
+
+        params_list = [
+            (following_list, follower_list, diff_following_list, diff_follower_list, None),
+            (following_list, follower_list, diff_following_list, diff_follower_list, Path("ff_list_20230317.txt")),
+            (
+                FollowingList.create(),
+                FollowerList.create(),
+                DiffFollowingList.create(),
+                DiffFollowerList.create(),
+                None,
+            ),
+            (following_list, FollowerList.create(), DiffFollowingList.create(), diff_follower_list, None),
+        ]
+        for params in params_list:
+            # テンプレートでの出力結果とバイト単位で一致する
+            expect_path = template_directory.save_file(target_username, *params)
+            expect = expect_path.read_bytes()
+            expect_path.unlink()
+            actual_path = native_directory.save_file(target_username, *params)
+            actual = actual_path.read_bytes()
+            self.assertEqual(expect_path, actual_path)
+            self.assertEqual(expect, actual)
+
+    def test_save_file_delta_chain(self):
+        directory = self._get_instance()
+        object.__setattr__(directory, "keyframe_interval", 3)
+        expect = SnapshotChain(
+            Path(directory.SNAPSHOT_DIRECTORY), "ff_list", 3, Path(directory.BACKUP_DIRECTORY), ".zip"
+        )
+        self.assertEqual(expect, directory.snapshot_chain)
+
+        target_username = "dummy_target_username"
+        following_list = FollowingList.create([Following.create(1, "ユーザー1", "screen_name_1")])
+        expect_dict = {}
+        for day in range(17, 21):
+            self.enterContext(freeze_time(f"2023-03-{day} 00:00:00"))
+            follower_list = FollowerList.create([
+                Follower.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in range(day, 15, -1)
+            ])
+            prev_following_list, prev_follower_list, last_file_path = directory.load_last_snapshot()
+            if last_file_path:
+                self.assertEqual(
+                    expect_dict[directory.get_run_id(last_file_path)], (prev_following_list, prev_follower_list)
+                )
+            file_path = directory.save_file(
+                target_username,
+                following_list,
+                follower_list,
+                DiffFollowingList.create_from_diff(following_list, prev_following_list),
+                DiffFollowerList.create_from_diff(follower_list, prev_follower_list),
+                last_file_path,
+            )
+            expect_dict[directory.get_run_id(file_path)] = (following_list, follower_list)
+
+            # キーフレームの実行分のみ一覧を出力する
+            actual_str = file_path.read_text(encoding="utf8")
+            if day in [17, 20]:
+                self.assertTrue(directory.snapshot_chain.get_path(f"202303{day}", True).is_file())
+                self.assertIn(f"follower {len(follower_list)}\nid, name, screen_name\n{day}, ", actual_str)
+            else:
+                self.assertTrue(directory.snapshot_chain.get_path(f"202303{day}", False).is_file())
+                expect_caption = f"follower {len(follower_list)} (omitted, saved as ff_list_202303{day}.delta)"
+                self.assertIn(f"{expect_caption}\nid, name, screen_name\n\n", actual_str)
+                self.assertIn(f"ADD, {day}, ユーザー{day}, screen_name_{day}\n", actual_str)
+
+        # 各実行分はスナップショットから復元される
+        for run in directory.get_run_list():
+            self.assertEqual(expect_dict[run["run_id"]], directory.read_run(run))
+
+    def test_prune_snapshot(self):
+        directory = self._get_instance()
+        object.__setattr__(directory, "keyframe_interval", 3)
+        reserved_file_num = 2
+        reserved_backup_num = 2
+        snapshot_chain = directory.snapshot_chain
+        backup_path = Path(directory.BACKUP_DIRECTORY)
+
+        following_list = FollowingList.create([Following.create(1, "ユーザー1", "screen_name_1")])
+        expect_dict = {}
+        for day in range(1, 16):
+            with freeze_time(f"2023-03-{day:02} 00:00:00"):
+                follower_list = FollowerList.create([
+                    Follower.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in range(day, max(day - 3, 0), -1)
+                ])
+                file_path = directory.save_file(
+                    "dummy_target_username",
+                    following_list,
+                    follower_list,
+                    DiffFollowingList.create(),
+                    DiffFollowerList.create(),
+                    None,
+                )
+                expect_dict[directory.get_run_id(file_path)] = (following_list, follower_list)
+                directory.move_old_file(reserved_file_num)
+                directory.archive_old_file(reserved_backup_num)
+
+            # 実行を重ねてもスナップショットは残す実行分とキーフレームの間隔分を超えて増えない
+            entry_list = snapshot_chain.get_entry_list()
+            self.assertLessEqual(len(entry_list), reserved_file_num + reserved_backup_num + 3 - 1)
+
+        # 圧縮していない実行分はスナップショットから復元できる
+        run_list = directory.get_run_list()
+        not_archived_run_list = [run for run in run_list if run["location"] != RunLocation.archive.value]
+        self.assertEqual(reserved_file_num + reserved_backup_num, len(not_archived_run_list))
+        for run in not_archived_run_list:
+            self.assertEqual(expect_dict[run["run_id"]], snapshot_chain.load(run["run_id"]))
+
+        # 削除したスナップショットはアーカイブに格納されている
+        entry_run_id_list = [run_id for run_id, _ in snapshot_chain.get_entry_list()]
+        for run_id, is_keyframe in [("20230301", True), ("20230302", False)]:
+            self.assertNotIn(run_id, entry_run_id_list)
+            with ZipFile(directory.get_archive_path(run_id)) as archive:
+                self.assertIn(snapshot_chain.get_path(run_id, is_keyframe).name, archive.namelist())
+
+        # スナップショットは実行履歴に含めない
+        actual = directory.rebuild_manifest()
+        self.assertEqual(sorted(expect_dict.keys()), [run["run_id"] for run in actual])
+        self.assertEqual([], list(backup_path.glob("*.tmp")))
+
+    def test_read_run_archived_delta_chain(self):
+        directory = self._get_instance()
+        object.__setattr__(directory, "keyframe_interval", 3)
+        snapshot_chain = directory.snapshot_chain
+
+        following_list = FollowingList.create([Following.create(1, "ユーザー1", "screen_name_1")])
+        expect_dict = {}
+        for day in range(1, 7):
+            with freeze_time(f"2023-03-{day:02} 00:00:00"):
+                follower_list = FollowerList.create([
+                    Follower.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in range(day + 3, 0, -1)
+                ])
+                file_path = directory.save_file(
+                    "dummy_target_username",
+                    following_list,
+                    follower_list,
+                    DiffFollowingList.create(),
+                    DiffFollowerList.create(),
+                    None,
+                )
+                expect_dict[directory.get_run_id(file_path)] = (following_list, follower_list)
+
+        # 一覧を差分としてのみ保存した実行分も、圧縮してスナップショットを削除した後に復元できる
+        directory.move_old_file(1)
+        directory.archive_old_file(0)
+        entry_run_id_list = [run_id for run_id, _ in snapshot_chain.get_entry_list()]
+        for run_id in ["20230301", "20230302", "20230303"]:
+            self.assertNotIn(run_id, entry_run_id_list)
+        run_list = directory.get_run_list()
+        self.assertEqual(
+            [RunLocation.archive.value] * 5 + [RunLocation.result.value], [run["location"] for run in run_list]
+        )
+        for run in run_list:
+            self.assertEqual(expect_dict[run["run_id"]], directory.read_run(run))
+
+        # アーカイブを参照しない場合は復元できない
+        object.__setattr__(directory, "BACKUP_DIRECTORY", "./tests/ff_getter/invalid")
+        self.assertIsNone(directory.snapshot_chain.load("20230302"))
+
     def test_move_old_file(self):
         self.enterContext(freeze_time("2023-03-18 00:00:00"))
         directory = self._get_instance()
@@ -261,7 +765,7 @@ class TestDirectory(unittest.TestCase):
         for index in range(reserved_file_num + over_num):
             (result_path / f"{file_name_base}_{index}.txt").touch()
         actual = directory.move_old_file(reserved_file_num)
-        expect = list(backup_path.glob(f"{file_name_base}*"))
+        expect = sorted(backup_path.glob(f"{file_name_base}*"))
         self.assertEqual(expect, actual)
         reserved_file = list(result_path.glob(f"{file_name_base}*"))
         self.assertEqual(reserved_file_num, len(reserved_file))
@@ -0,0 +1,387 @@
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+import orjson
+from freezegun import freeze_time
+from mock import patch
+
+from ff_getter.directory import Directory
+from ff_getter.event_log import EventLog, UserOffsetTable
+from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+from ff_getter.value_object.user_record import Follower, Following
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+
+class TestUserOffsetTable(unittest.TestCase):
+    def test_UserOffsetTable(self):
+        screen_name_hash = UserOffsetTable.hash_screen_name("screen_name_1")
+        self.assertEqual(screen_name_hash, UserOffsetTable.hash_screen_name("Screen_Name_1"))
+        self.assertNotEqual(screen_name_hash, UserOffsetTable.hash_screen_name("screen_name_2"))
+
+        base = UserOffsetTable(UserOffsetTable.dumps(10, None, [(2, 5), (1, 0)], [(screen_name_hash, 1)]))
+        self.assertEqual(10, base.log_size)
+        self.assertEqual([0], base.get_offset_list(1))
+        self.assertEqual([5], base.get_offset_list(2))
+        self.assertEqual([], base.get_offset_list(3))
+        self.assertEqual([1], base.get_user_id_list("SCREEN_NAME_1"))
+        self.assertEqual([], base.get_user_id_list("screen_name_2"))
+
+        # 既存の表に追加分を合わせて作成する, 同じ対応は重複しない
+        screen_name_pair_list = [(screen_name_hash, 3), (screen_name_hash, 1)]
+        instance = UserOffsetTable(UserOffsetTable.dumps(20, base, [(1, 12), (3, 15)], screen_name_pair_list))
+        self.assertEqual(20, instance.log_size)
+        self.assertEqual([0, 12], instance.get_offset_list(1))
+        self.assertEqual([15], instance.get_offset_list(3))
+        self.assertEqual([1, 3], instance.get_user_id_list("screen_name_1"))
+
+        with self.assertRaises(ValueError):
+            UserOffsetTable(b"")
+        with self.assertRaises(ValueError):
+            UserOffsetTable(b"INVALID!" + bytes(24))
+        with self.assertRaises(ValueError):
+            UserOffsetTable(UserOffsetTable.dumps(10, None, [(1, 0)], [])[:-1])
+
+
+class TestEventLog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_directory_path_list = [
+            Path("./tests/ff_getter/event"),
+            Path("./tests/ff_getter/result"),
+            Path("./tests/ff_getter/bak"),
+            Path("./tests/ff_getter/snapshot"),
+        ]
+        for temp_directory_path in self.temp_directory_path_list:
+            shutil.rmtree(temp_directory_path, ignore_errors=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        for temp_directory_path in self.temp_directory_path_list:
+            shutil.rmtree(temp_directory_path, ignore_errors=True)
+        return super().tearDown()
+
+    def _get_instance(self) -> EventLog:
+        self.enterContext(patch.object(EventLog, "EVENT_DIRECTORY", "./tests/ff_getter/event"))
+        return EventLog()
+
+    def _get_directory(self) -> Directory:
+        directory = Directory()
+        object.__setattr__(directory, "RESULT_DIRECTORY", "./tests/ff_getter/result")
+        object.__setattr__(directory, "BACKUP_DIRECTORY", "./tests/ff_getter/bak")
+        object.__setattr__(directory, "SNAPSHOT_DIRECTORY", "./tests/ff_getter/snapshot")
+        Path(directory.RESULT_DIRECTORY).mkdir(parents=True, exist_ok=True)
+        Path(directory.BACKUP_DIRECTORY).mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def _get_diff_lists(self) -> tuple[DiffFollowingList, DiffFollowerList]:
+        diff_following_list = DiffFollowingList.create([
+            DiffFollowing.create("ADD", 1, "ユーザー1, カンマ入り", "screen_name_1"),
+        ])
+        diff_follower_list = DiffFollowerList.create([
+            DiffFollower.create("REMOVE", 2, "ユーザー2", "screen_name_2"),
+            DiffFollower.create("ADD", 1, "ユーザー1, カンマ入り", "screen_name_1"),
+        ])
+        return diff_following_list, diff_follower_list
+
+    def test_EventLog(self):
+        instance = self._get_instance()
+        self.assertEqual(Path("./tests/ff_getter/event"), instance.base_path)
+        self.assertTrue(instance.base_path.is_dir())
+        self.assertEqual(instance.base_path / "event_log.jsonl", instance.log_path)
+        self.assertEqual(instance.base_path / "event_index.json", instance.index_path)
+        self.assertEqual(instance.base_path / "event_user_table.bin", instance.table_path)
+        self.assertFalse(instance.exists())
+
+    def test_append(self):
+        self.enterContext(freeze_time("2023-03-18 00:00:00"))
+        instance = self._get_instance()
+        diff_following_list, diff_follower_list = self._get_diff_lists()
+
+        actual = instance.append("20230318", diff_following_list, diff_follower_list, 10, 20)
+        self.assertEqual(1, actual)
+        self.assertTrue(instance.exists())
+
+        record_list = [orjson.loads(line) for line in instance.log_path.read_bytes().splitlines()]
+        expect = {
+            "kind": "run",
+            "seq": 1,
+            "run_id": "20230318",
+            "timestamp": "2023-03-18T00:00:00",
+            "following_num": 10,
+            "follower_num": 20,
+        }
+        self.assertEqual(expect, record_list[0])
+        expect = {
+            "kind": "event",
+            "seq": 1,
+            "run_id": "20230318",
+            "ff_type": "following",
+            "diff_type": "ADD",
+            "id": 1,
+            "name": "ユーザー1, カンマ入り",
+            "screen_name": "screen_name_1",
+        }
+        self.assertEqual(expect, record_list[1])
+        self.assertEqual(["follower", "follower"], [record["ff_type"] for record in record_list[2:]])
+        self.assertEqual(4, len(record_list))
+
+        index = orjson.loads(instance.index_path.read_bytes())
+        self.assertEqual(instance.log_path.stat().st_size, index["log_size"])
+        self.assertEqual({"20230318": 1}, index["run_dict"])
+        table = UserOffsetTable.load(instance.table_path)
+        self.assertEqual(index["log_size"], table.log_size)
+        self.assertEqual([1, 1, 2], list(table.offset_user_ids))
+        self.assertEqual(2, len(table.get_offset_list(1)))
+
+        # 差分が空でも実行は記録される
+        actual = instance.append("20230319", DiffFollowingList.create(), DiffFollowerList.create())
+        self.assertEqual(2, actual)
+        self.assertEqual(["20230318", "20230319"], instance.get_run_id_list())
+
+    def test_load_index(self):
+        instance = self._get_instance()
+        diff_following_list, diff_follower_list = self._get_diff_lists()
+
+        # ログも索引も存在しない
+        actual = instance.load_index()
+        self.assertEqual({"log_size": 0, "seq": 0, "run_dict": {}, "seq_dict": {}}, actual)
+
+        instance.append("20230317", diff_following_list, diff_follower_list)
+        instance.append("20230318", diff_following_list, DiffFollowerList.create())
+        expect = orjson.loads(instance.index_path.read_bytes())
+
+        # 索引が存在しない, 壊れている場合は作り直される
+        instance.index_path.unlink()
+        self.assertEqual(expect, instance.load_index())
+        instance.index_path.write_text("invalid")
+        self.assertEqual(expect, instance.load_index())
+        instance.index_path.write_bytes(orjson.dumps({"log_size": 0}))
+        self.assertEqual(expect, instance.load_index())
+
+        # ユーザ位置表が存在しない, 壊れている, 索引と食い違う場合も作り直される
+        expect_table_bytes = instance.table_path.read_bytes()
+        instance.table_path.unlink()
+        self.assertEqual(expect, instance.load_index())
+        self.assertEqual(expect_table_bytes, instance.table_path.read_bytes())
+        instance.table_path.write_bytes(b"invalid")
+        self.assertEqual(expect, instance.load_index())
+        self.assertEqual(expect_table_bytes, instance.table_path.read_bytes())
+        instance.table_path.write_bytes(UserOffsetTable.dumps(0, None, [], []))
+        self.assertEqual(expect, instance.load_index())
+        self.assertEqual(expect_table_bytes, instance.table_path.read_bytes())
+
+        # 索引がログより古い場合は追記分のみが反映される
+        old_index_bytes = instance.index_path.read_bytes()
+        old_table_bytes = instance.table_path.read_bytes()
+        instance.append("20230319", diff_following_list, diff_follower_list)
+        expect = orjson.loads(instance.index_path.read_bytes())
+        expect_table_bytes = instance.table_path.read_bytes()
+        instance.index_path.write_bytes(old_index_bytes)
+        instance.table_path.write_bytes(old_table_bytes)
+        self.assertEqual(expect, instance.load_index())
+        self.assertEqual(expect_table_bytes, instance.table_path.read_bytes())
+
+        # 書き込み途中で中断された行は索引に含めず、次の追記はその後ろから行われる
+        with instance.log_path.open("ab") as fout:
+            fout.write(b'{"kind": "eve')
+        actual = instance.load_index()
+        self.assertEqual(expect, actual)
+        instance.append("20230320", diff_following_list, DiffFollowerList.create())
+        self.assertEqual(["20230317", "20230318", "20230319", "20230320"], instance.get_run_id_list())
+        expect = orjson.loads(instance.index_path.read_bytes())
+        instance.index_path.unlink()
+        self.assertEqual(expect, instance.load_index())
+
+        # ログが作り直された場合
+        instance.log_path.unlink()
+        instance.append("20230321", diff_following_list, DiffFollowerList.create())
+        self.assertEqual(["20230321"], instance.get_run_id_list())
+
+    def test_get_user_event_list(self):
+        instance = self._get_instance()
+        diff_following_list, diff_follower_list = self._get_diff_lists()
+        self.assertEqual([], instance.get_user_event_list(1))
+
+        instance.append("20230317", diff_following_list, diff_follower_list)
+        instance.append("20230318", DiffFollowingList.create(), diff_follower_list)
+
+        actual = instance.get_user_event_list(1)
+        expect = [
+            ("20230317", "following", "ADD"),
+            ("20230317", "follower", "ADD"),
+            ("20230318", "follower", "ADD"),
+        ]
+        self.assertEqual(expect, [(e["run_id"], e["ff_type"], e["diff_type"]) for e in actual])
+        actual = instance.get_user_event_list(2)
+        self.assertEqual(
+            [("20230317", "REMOVE"), ("20230318", "REMOVE")], [(e["run_id"], e["diff_type"]) for e in actual]
+        )
+        self.assertEqual([], instance.get_user_event_list(3))
+
+        # 同日に再実行した場合は後から追記した分のみが有効となる
+        instance.append("20230318", DiffFollowingList.create(), DiffFollowerList.create())
+        actual = instance.get_user_event_list(2)
+        self.assertEqual([("20230317", "REMOVE")], [(e["run_id"], e["diff_type"]) for e in actual])
+
+    def test_get_run_list(self):
+        instance = self._get_instance()
+        diff_following_list, diff_follower_list = self._get_diff_lists()
+        self.assertEqual([], instance.get_run_list())
+
+        instance.append("20230318", diff_following_list, diff_follower_list)
+        instance.append("20230317", DiffFollowingList.create(), diff_follower_list)
+        instance.append("20230318", diff_following_list, DiffFollowerList.create())
+        actual = instance.get_run_list()
+        expect = [
+            {"run_id": "20230317", "seq": 2, "count_dict": {"follower_REMOVE": 1, "follower_ADD": 1}},
+            {"run_id": "20230318", "seq": 3, "count_dict": {"following_ADD": 1}},
+        ]
+        self.assertEqual(expect, actual)
+
+        # 索引を作り直しても同じ結果となる
+        instance.index_path.unlink()
+        self.assertEqual(expect, instance.get_run_list())
+
+    def test_get_user_id_list(self):
+        instance = self._get_instance()
+        diff_following_list, diff_follower_list = self._get_diff_lists()
+        instance.append("20230317", diff_following_list, diff_follower_list)
+        instance.append(
+            "20230318",
+            DiffFollowingList.create([DiffFollowing.create("ADD", 3, "ユーザー3", "Screen_Name_1")]),
+            DiffFollowerList.create(),
+        )
+        self.assertEqual([2], instance.get_user_id_list("screen_name_2"))
+        self.assertEqual([1, 3], instance.get_user_id_list("@SCREEN_NAME_1"))
+        self.assertEqual([], instance.get_user_id_list("screen_name_4"))
+
+    def test_iter_event_records(self):
+        instance = self._get_instance()
+        diff_following_list, diff_follower_list = self._get_diff_lists()
+        self.assertEqual([], list(instance.iter_event_records()))
+
+        instance.append("20230316", diff_following_list, DiffFollowerList.create())
+        instance.append("20230317", DiffFollowingList.create(), diff_follower_list)
+        instance.append("20230318", diff_following_list, diff_follower_list)
+        instance.append("20230317", DiffFollowingList.create(), DiffFollowerList.create())
+
+        actual = list(instance.iter_event_records())
+        self.assertEqual(["20230316", "20230318", "20230318", "20230318"], [e["run_id"] for e in actual])
+        self.assertTrue(all(e["kind"] == "event" for e in actual))
+        actual = list(instance.iter_event_records("20230316", "20230317"))
+        self.assertEqual([], actual)
+        actual = list(instance.iter_event_records("20230316"))
+        self.assertEqual(["20230318"] * 3, [e["run_id"] for e in actual])
+        actual = list(instance.iter_event_records(to_run_id="20230317"))
+        self.assertEqual(["20230316"], [e["run_id"] for e in actual])
+
+    def test_import_runs(self):
+        instance = self._get_instance()
+        directory = self._get_directory()
+        object.__setattr__(directory, "keyframe_interval", 1)
+        following_1 = Following.create(1, "ユーザー1", "screen_name_1")
+        following_2 = Following.create(2, "ユーザー2", "screen_name_2")
+        follower_3 = Follower.create(3, "ユーザー3", "screen_name_3")
+        follower_4 = Follower.create(4, "ユーザー4", "screen_name_4")
+        ff_list = [
+            ("2023-03-16", [following_1], [follower_3]),
+            ("2023-03-17", [following_1, following_2], [follower_3]),
+            ("2023-03-18", [following_2], [follower_4]),
+        ]
+        for date_str, following_list, follower_list in ff_list:
+            with freeze_time(date_str):
+                directory.save_file(
+                    "dummy_target_username",
+                    FollowingList.create(following_list),
+                    FollowerList.create(follower_list),
+                    DiffFollowingList.create(),
+                    DiffFollowerList.create(),
+                )
+        # 古い実行分はアーカイブから、スナップショットが無い分は結果ファイルから読み込む
+        # 移動と圧縮により、RESULT_DIRECTORY より前の実行分のスナップショットは削除される
+        directory.move_old_file(1)
+        directory.archive_old_file(1)
+        self.assertFalse(Path(directory.SNAPSHOT_DIRECTORY).joinpath("ff_list_20230316.snap").exists())
+        Path(directory.SNAPSHOT_DIRECTORY).joinpath("ff_list_20230318.snap").unlink()
+
+        actual = instance.import_runs(directory)
+        self.assertEqual(["20230316", "20230317", "20230318"], actual)
+        self.assertEqual(actual, instance.get_run_id_list())
+
+        actual = instance.get_user_event_list(2)
+        self.assertEqual(
+            [("20230317", "following", "ADD")], [(e["run_id"], e["ff_type"], e["diff_type"]) for e in actual]
+        )
+        actual = instance.get_user_event_list(1)
+        self.assertEqual(
+            [("20230318", "following", "REMOVE")], [(e["run_id"], e["ff_type"], e["diff_type"]) for e in actual]
+        )
+        actual = instance.get_user_event_list(4)
+        self.assertEqual(
+            [("20230318", "follower", "ADD")], [(e["run_id"], e["ff_type"], e["diff_type"]) for e in actual]
+        )
+
+        # 記録済の実行分は追記しない
+        actual = instance.import_runs(directory)
+        self.assertEqual([], actual)
+        self.assertEqual(1, len(instance.get_user_event_list(4)))
+        self.assertEqual([], instance.get_skipped_run_id_list())
+
+        # 結果ファイルを読み込めない実行分は読み飛ばした実行IDとして記録する
+        with freeze_time("2023-03-19"):
+            saved_file_path = directory.save_file(
+                "dummy_target_username",
+                FollowingList.create([following_2]),
+                FollowerList.create([follower_4]),
+                DiffFollowingList.create(),
+                DiffFollowerList.create(),
+            )
+        Path(saved_file_path).unlink()
+        Path(directory.SNAPSHOT_DIRECTORY).joinpath("ff_list_20230319.snap").unlink()
+        actual = instance.import_runs(directory)
+        self.assertEqual([], actual)
+        self.assertEqual(["20230316", "20230317", "20230318"], instance.get_run_id_list())
+        self.assertEqual(["20230319"], instance.get_skipped_run_id_list())
+        actual = instance.import_runs(directory)
+        self.assertEqual(["20230319"], instance.get_skipped_run_id_list())
+
+        # 記録ファイルが不正な場合は空のリストとする
+        instance.skipped_path.write_bytes(b"invalid")
+        self.assertEqual([], instance.get_skipped_run_id_list())
+
+    def test_import_runs_archived_delta_chain(self):
+        instance = self._get_instance()
+        directory = self._get_directory()
+        object.__setattr__(directory, "keyframe_interval", 3)
+        following_list = FollowingList.create([Following.create(1, "ユーザー1", "screen_name_1")])
+        for day in range(1, 7):
+            with freeze_time(f"2023-03-{day:02}"):
+                follower_list = FollowerList.create([
+                    Follower.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in range(day, 0, -1)
+                ])
+                directory.save_file(
+                    "dummy_target_username",
+                    following_list,
+                    follower_list,
+                    DiffFollowingList.create(),
+                    DiffFollowerList.create(),
+                )
+        directory.move_old_file(1)
+        directory.archive_old_file(0)
+
+        # 圧縮した差分の実行分も復元でき、2回目以降の各実行で1人ずつ follower が増えたことのみが記録される
+        actual = instance.import_runs(directory)
+        self.assertEqual([f"2023030{day}" for day in range(1, 7)], actual)
+        event_list = list(instance.iter_event_records())
+        expect = [(f"2023030{day}", "follower", "ADD", day) for day in range(2, 7)]
+        self.assertEqual(
+            sorted(expect), sorted((e["run_id"], e["ff_type"], e["diff_type"], e["id"]) for e in event_list)
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -0,0 +1,137 @@
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+from mock import patch
+
+from ff_getter.event_log import EventLog
+from ff_getter.history import History, Period
+from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.event_directory_path = Path("./tests/ff_getter/event")
+        shutil.rmtree(self.event_directory_path, ignore_errors=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.event_directory_path, ignore_errors=True)
+        return super().tearDown()
+
+    def _get_instance(self) -> History:
+        self.enterContext(patch.object(EventLog, "EVENT_DIRECTORY", str(self.event_directory_path)))
+        event_log = EventLog()
+        # 20230301: 1 をフォロー, 2 にフォローされる
+        # 20230302: 3 をフォロー, 2 にフォロー解除される
+        # 20230310: 1 をフォロー解除, 2 にフォローされる(スクリーンネーム変更)
+        # 20230401: 3 をフォロー解除, 4 にフォローされる
+        event_log.append(
+            "20230301",
+            DiffFollowingList.create([DiffFollowing.create("ADD", 1, "ユーザー1", "screen_name_1")]),
+            DiffFollowerList.create([DiffFollower.create("ADD", 2, "ユーザー2", "screen_name_2")]),
+        )
+        event_log.append(
+            "20230302",
+            DiffFollowingList.create([DiffFollowing.create("ADD", 3, "ユーザー3", "screen_name_3")]),
+            DiffFollowerList.create([DiffFollower.create("REMOVE", 2, "ユーザー2", "screen_name_2")]),
+        )
+        event_log.append(
+            "20230310",
+            DiffFollowingList.create([DiffFollowing.create("REMOVE", 1, "ユーザー1", "screen_name_1")]),
+            DiffFollowerList.create([DiffFollower.create("ADD", 2, "ユーザー2", "new_screen_name_2")]),
+        )
+        event_log.append(
+            "20230401",
+            DiffFollowingList.create([DiffFollowing.create("REMOVE", 3, "ユーザー3", "screen_name_3")]),
+            DiffFollowerList.create([DiffFollower.create("ADD", 4, "ユーザー4", "screen_name_4")]),
+        )
+        return History(event_log)
+
+    def test_History(self):
+        instance = self._get_instance()
+        self.assertIsInstance(instance.event_log, EventLog)
+
+    def test_timeline(self):
+        instance = self._get_instance()
+        actual = instance.timeline(2)
+        expect = [("20230301", "ADD"), ("20230302", "REMOVE"), ("20230310", "ADD")]
+        self.assertEqual(expect, [(e["run_id"], e["diff_type"]) for e in actual])
+        self.assertEqual(actual, instance.timeline("2"))
+
+        # スクリーンネームで指定した場合は、そのスクリーンネームだったことのあるユーザが対象となる
+        self.assertEqual(actual, instance.timeline("@screen_name_2"))
+        self.assertEqual(actual, instance.timeline("New_Screen_Name_2"))
+        actual = instance.timeline("@screen_name_1")
+        expect = [("20230301", "ADD"), ("20230310", "REMOVE")]
+        self.assertEqual(expect, [(e["run_id"], e["diff_type"]) for e in actual])
+
+        self.assertEqual([], instance.timeline(5))
+        self.assertEqual([], instance.timeline("@screen_name_5"))
+
+    def test_diff(self):
+        instance = self._get_instance()
+
+        # 期間中に ADD と REMOVE の両方があるユーザは含まない
+        diff_following_list, diff_follower_list = instance.diff("20230228", "20230310")
+        expect = DiffFollowingList.create([DiffFollowing.create("ADD", 3, "ユーザー3", "screen_name_3")])
+        self.assertEqual(expect, diff_following_list)
+        expect = DiffFollowerList.create([DiffFollower.create("ADD", 2, "ユーザー2", "new_screen_name_2")])
+        self.assertEqual(expect, diff_follower_list)
+
+        # 並び順は ADD, REMOVE の順
+        diff_following_list, diff_follower_list = instance.diff("20230301", "20230401")
+        expect = DiffFollowingList.create([DiffFollowing.create("REMOVE", 1, "ユーザー1", "screen_name_1")])
+        self.assertEqual(expect, diff_following_list)
+        expect = DiffFollowerList.create([DiffFollower.create("ADD", 4, "ユーザー4", "screen_name_4")])
+        self.assertEqual(expect, diff_follower_list)
+
+        # 基準の実行分は含まない
+        diff_following_list, diff_follower_list = instance.diff("20230310", "20230310")
+        self.assertEqual(DiffFollowingList.create(), diff_following_list)
+        self.assertEqual(DiffFollowerList.create(), diff_follower_list)
+
+        with self.assertRaises(ValueError):
+            instance.diff("20230401", "20230301")
+
+    def test_churn(self):
+        instance = self._get_instance()
+        actual = instance.churn()
+        expect = [
+            {
+                "period": "202303",
+                "run_num": 3,
+                "following_ADD": 2,
+                "following_REMOVE": 1,
+                "follower_ADD": 2,
+                "follower_REMOVE": 1,
+            },
+            {
+                "period": "202304",
+                "run_num": 1,
+                "following_ADD": 0,
+                "following_REMOVE": 1,
+                "follower_ADD": 1,
+                "follower_REMOVE": 0,
+            },
+        ]
+        self.assertEqual(expect, actual)
+
+        actual = instance.churn(Period.day)
+        self.assertEqual(["20230301", "20230302", "20230310", "20230401"], [c["period"] for c in actual])
+        actual = instance.churn(Period.week)
+        self.assertEqual(["2023-W09", "2023-W10", "2023-W13"], [c["period"] for c in actual])
+        self.assertEqual([2, 1, 1], [c["run_num"] for c in actual])
+        actual = instance.churn(Period.year)
+        self.assertEqual([("2023", 4)], [(c["period"], c["run_num"]) for c in actual])
+
+        with self.assertRaises(ValueError):
+            instance.churn("invalid")
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -0,0 +1,109 @@
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from ff_getter.history import Period
+from ff_getter.history_main import create_parser, main, run
+from ff_getter.value_object.diff_record import DiffFollower, DiffFollowing
+from ff_getter.value_object.diff_record_list import DiffFollowerList, DiffFollowingList
+
+
+class TestHistoryMain(unittest.TestCase):
+    def test_create_parser(self):
+        self.enterContext(patch("sys.stderr"))
+        parser = create_parser()
+        args = parser.parse_args(["timeline", "@screen_name_1"])
+        self.assertEqual(("timeline", "@screen_name_1"), (args.command, args.user))
+        args = parser.parse_args(["diff", "20230301", "20230318"])
+        self.assertEqual(("diff", "20230301", "20230318"), (args.command, args.from_run_id, args.to_run_id))
+        args = parser.parse_args(["churn"])
+        self.assertEqual(("churn", "month"), (args.command, args.period))
+        args = parser.parse_args(["churn", "--period", "week"])
+        self.assertEqual("week", args.period)
+
+        with self.assertRaises(SystemExit):
+            parser.parse_args(["churn", "--period", "invalid"])
+        with self.assertRaises(SystemExit):
+            parser.parse_args([])
+
+    def test_run(self):
+        parser = create_parser()
+        history = MagicMock()
+
+        history.timeline.return_value = [
+            {
+                "run_id": "20230318",
+                "ff_type": "following",
+                "diff_type": "ADD",
+                "id": 1,
+                "name": "ユーザー1",
+                "screen_name": "screen_name_1",
+            }
+        ]
+        actual = run(parser.parse_args(["timeline", "1"]), history)
+        expect = [
+            "run_id, ff_type, diff_type, id, name, screen_name",
+            "20230318, following, ADD, 1, ユーザー1, screen_name_1",
+        ]
+        self.assertEqual(expect, actual)
+        history.timeline.assert_called_once_with("1")
+
+        history.diff.return_value = (
+            DiffFollowingList.create([DiffFollowing.create("ADD", 1, "ユーザー1", "screen_name_1")]),
+            DiffFollowerList.create([DiffFollower.create("REMOVE", 2, "ユーザー2", "screen_name_2")]),
+        )
+        actual = run(parser.parse_args(["diff", "20230301", "20230318"]), history)
+        expect = [
+            "difference 20230301 -> 20230318",
+            "following",
+            "diff_type, id, name, screen_name",
+            "ADD, 1, ユーザー1, screen_name_1",
+            "",
+            "follower",
+            "diff_type, id, name, screen_name",
+            "REMOVE, 2, ユーザー2, screen_name_2",
+            "",
+        ]
+        self.assertEqual(expect, actual)
+        history.diff.assert_called_once_with("20230301", "20230318")
+
+        history.churn.return_value = [
+            {
+                "period": "202303",
+                "run_num": 3,
+                "following_ADD": 2,
+                "following_REMOVE": 1,
+                "follower_ADD": 2,
+                "follower_REMOVE": 1,
+            }
+        ]
+        actual = run(parser.parse_args(["churn", "--period", "month"]), history)
+        expect = [
+            "period, run_num, following_ADD, following_REMOVE, follower_ADD, follower_REMOVE",
+            "202303, 3, 2, 1, 2, 1",
+        ]
+        self.assertEqual(expect, actual)
+        history.churn.assert_called_once_with(Period.month)
+
+    def test_main(self):
+        mock_history = self.enterContext(patch("ff_getter.history_main.History"))
+        mock_stdout = self.enterContext(patch("ff_getter.history_main.sys.stdout"))
+        self.enterContext(patch.object(sys, "argv", ["history_main.py", "churn"]))
+        mock_history.return_value.churn.return_value = []
+        main()
+        mock_history.return_value.churn.assert_called_once_with(Period.month)
+        mock_stdout.write.assert_called_once_with(
+            "period, run_num, following_ADD, following_REMOVE, follower_ADD, follower_REMOVE\n"
+        )
+
+        mock_history.return_value.diff.side_effect = ValueError("from_run_id must be before to_run_id.")
+        self.enterContext(patch.object(sys, "argv", ["history_main.py", "diff", "20230318", "20230301"]))
+        self.enterContext(patch("ff_getter.history_main.argparse.ArgumentParser.error", side_effect=SystemExit))
+        with self.assertRaises(SystemExit):
+            main()
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
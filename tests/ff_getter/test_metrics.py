@@ -0,0 +1,134 @@
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+import orjson
+from mock import patch
+
+from ff_getter.metrics import RunMetrics, StageMetrics, get_peak_rss
+from ff_getter.util import Result
+
+
+class TestStageMetrics(unittest.TestCase):
+    def test_StageMetrics(self):
+        instance = StageMetrics("fetch")
+        self.assertEqual("fetch", instance.name)
+        self.assertEqual(0.0, instance.wall_sec)
+        self.assertEqual(0.0, instance.cpu_sec)
+        self.assertIsNone(instance.peak_rss_delta)
+        self.assertEqual({}, instance.item_num_dict)
+
+    def test_count(self):
+        instance = StageMetrics("fetch")
+        instance.count(following=1, follower=2)
+        self.assertEqual({"following": 1, "follower": 2}, instance.item_num_dict)
+        instance.count(follower=3)
+        self.assertEqual({"following": 1, "follower": 3}, instance.item_num_dict)
+
+    def test_item_per_sec(self):
+        instance = StageMetrics("fetch", wall_sec=2.0)
+        self.assertIsNone(instance.item_per_sec)
+        instance.count(following=1, follower=3)
+        self.assertEqual(2.0, instance.item_per_sec)
+        instance.wall_sec = 0.0
+        self.assertIsNone(instance.item_per_sec)
+
+    def test_to_dict(self):
+        instance = StageMetrics("fetch", wall_sec=2.0, cpu_sec=1.0, peak_rss_delta=1024)
+        instance.count(following=1, follower=3)
+        expect = {
+            "name": "fetch",
+            "wall_sec": 2.0,
+            "cpu_sec": 1.0,
+            "peak_rss_delta": 1024,
+            "item_num": {"following": 1, "follower": 3},
+            "item_per_sec": 2.0,
+        }
+        self.assertEqual(expect, instance.to_dict())
+
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics_path = Path("./tests/ff_getter/metrics/ff_getter_metrics.jsonl")
+        shutil.rmtree(self.metrics_path.parent, ignore_errors=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.metrics_path.parent, ignore_errors=True)
+        return super().tearDown()
+
+    def test_get_peak_rss(self):
+        actual = get_peak_rss()
+        if actual is not None:
+            self.assertGreater(actual, 0)
+
+        with patch("ff_getter.metrics.resource", None):
+            self.assertIsNone(get_peak_rss())
+
+    def test_stage(self):
+        instance = RunMetrics()
+        with instance.stage("fetch") as stage:
+            self.assertIsInstance(stage, StageMetrics)
+            stage.count(following=1)
+        with instance.stage("diff"):
+            pass
+        self.assertEqual(["fetch", "diff"], [stage.name for stage in instance.stage_list])
+        stage = instance.stage_list[0]
+        self.assertGreaterEqual(stage.wall_sec, 0.0)
+        self.assertGreaterEqual(stage.cpu_sec, 0.0)
+        if get_peak_rss() is not None:
+            self.assertGreaterEqual(stage.peak_rss_delta, 0)
+        self.assertEqual({"following": 1}, stage.item_num_dict)
+
+        # 例外が発生した場合も計測結果を記録する
+        with self.assertRaises(ValueError):
+            with instance.stage("save"):
+                raise ValueError
+        self.assertEqual(["fetch", "diff", "save"], [stage.name for stage in instance.stage_list])
+
+        # ピークメモリ使用量を取得できない環境
+        with patch("ff_getter.metrics.get_peak_rss", return_value=None):
+            with instance.stage("notify"):
+                pass
+        self.assertIsNone(instance.stage_list[-1].peak_rss_delta)
+
+    def test_to_dict(self):
+        instance = RunMetrics(started_at="2023-03-18T00:00:00")
+        instance.stage_list = [
+            StageMetrics("fetch", wall_sec=2.0, cpu_sec=1.0),
+            StageMetrics("diff", wall_sec=0.5, cpu_sec=0.5),
+        ]
+        with patch("ff_getter.metrics.get_peak_rss", return_value=4096):
+            actual = instance.to_dict(Result.success)
+        expect = {
+            "started_at": "2023-03-18T00:00:00",
+            "result": "success",
+            "wall_sec": 2.5,
+            "cpu_sec": 1.5,
+            "peak_rss": 4096,
+            "stages": [stage.to_dict() for stage in instance.stage_list],
+        }
+        self.assertEqual(expect, actual)
+
+    def test_write(self):
+        instance = RunMetrics(started_at="2023-03-18T00:00:00")
+        with instance.stage("fetch") as stage:
+            stage.count(following=1)
+        actual = instance.write(self.metrics_path, Result.success)
+        self.assertEqual(self.metrics_path, actual)
+
+        # 実行ごとに1行ずつ追記する
+        instance.write(self.metrics_path, Result.failed)
+        line_list = self.metrics_path.read_bytes().splitlines()
+        self.assertEqual(2, len(line_list))
+        actual = [orjson.loads(line) for line in line_list]
+        self.assertEqual(["success", "failed"], [d["result"] for d in actual])
+        self.assertEqual(["fetch"], [s["name"] for s in actual[0]["stages"]])
+        self.assertEqual({"following": 1}, actual[0]["stages"][0]["item_num"])
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -0,0 +1,238 @@
+import shutil
+import struct
+import sys
+import unittest
+from pathlib import Path
+
+from mock import patch
+
+from ff_getter.snapshot import Snapshot, SnapshotDelta, SnapshotSection
+from ff_getter.value_object.user_record import Follower, Following
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.snapshot_path = Path("./tests/ff_getter/snapshot/ff_list_20230317.snap")
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.snapshot_path.parent, ignore_errors=True)
+        return super().tearDown()
+
+    def _get_lists(self) -> tuple[FollowingList, FollowerList]:
+        following_list = FollowingList.create([
+            Following.create(3, "ユーザー3", "screen_name_3"),
+            Following.create(1, "ユーザー1, カンマ入り🎉", "screen_name_1"),
+            Following.create(2, "", "screen_name_2"),
+        ])
+        follower_list = FollowerList.create([
+            Follower.create(2**63, "ユーザー2", "screen_name_2"),
+            Follower.create(4, "ユーザー4", "screen_name_4"),
+        ])
+        return following_list, follower_list
+
+    def test_dumps(self):
+        following_list, follower_list = self._get_lists()
+        actual = Snapshot.dumps(following_list, follower_list)
+        header = struct.unpack_from("<8s6Q", actual, 0)
+        following_names_size = sum(len(r.name.name.encode("utf-8")) for r in following_list)
+        follower_names_size = sum(len(r.name.name.encode("utf-8")) for r in follower_list)
+        expect = (Snapshot.MAGIC, 3, following_names_size, 13 * 3, 2, follower_names_size, 13 * 2)
+        self.assertEqual(expect, header)
+
+        actual = Snapshot.dumps(FollowingList.create(), FollowerList.create())
+        self.assertEqual(struct.pack("<8s6Q", Snapshot.MAGIC, 0, 0, 0, 0, 0, 0) + bytes(8 * 4), actual)
+
+    def test_init(self):
+        following_list, follower_list = self._get_lists()
+        instance = Snapshot(Snapshot.dumps(following_list, follower_list))
+        self.assertIsInstance(instance.following, SnapshotSection)
+        self.assertIsInstance(instance.follower, SnapshotSection)
+        self.assertEqual(3, len(instance.following))
+        self.assertEqual(2, len(instance.follower))
+        self.assertEqual([3, 1, 2], instance.following.ids.tolist())
+        self.assertEqual("ユーザー1, カンマ入り🎉", instance.following.name(1))
+        self.assertEqual("screen_name_1", instance.following.screen_name(1))
+        self.assertEqual("", instance.following.name(2))
+        self.assertEqual([2**63, 4], instance.follower.ids.tolist())
+        self.assertEqual(
+            (
+                [3, 1, 2],
+                ["ユーザー3", "ユーザー1, カンマ入り🎉", ""],
+                ["screen_name_3", "screen_name_1", "screen_name_2"],
+            ),
+            instance.following.to_columns(),
+        )
+
+        buffer = Snapshot.dumps(following_list, follower_list)
+        with self.assertRaises(ValueError):
+            instance = Snapshot(buffer[:10])
+        with self.assertRaises(ValueError):
+            instance = Snapshot(b"INVALID!" + buffer[8:])
+        with self.assertRaises(ValueError):
+            instance = Snapshot(buffer[:-1])
+        with self.assertRaises(ValueError):
+            instance = Snapshot(buffer + b"\x00")
+
+    def test_list(self):
+        following_list, follower_list = self._get_lists()
+        instance = Snapshot(Snapshot.dumps(following_list, follower_list))
+        actual = instance.following_list()
+        self.assertIsInstance(actual, FollowingList)
+        self.assertEqual(following_list, actual)
+        actual = instance.follower_list()
+        self.assertIsInstance(actual, FollowerList)
+        self.assertEqual(follower_list, actual)
+
+        instance = Snapshot(Snapshot.dumps(FollowingList.create(), FollowerList.create()))
+        self.assertEqual(FollowingList.create(), instance.following_list())
+        self.assertEqual(FollowerList.create(), instance.follower_list())
+
+        # レコードごとではなく列ごとにまとめて検証する
+        invalid_follower_list = FollowerList.create([Follower.create(4, "ユーザー4", "screen_name_4")])
+        buffer = Snapshot.dumps(following_list, invalid_follower_list).replace(b"screen_name_4", b"screen name 4")
+        instance = Snapshot(buffer)
+        with patch.object(FollowerList, "from_columns", wraps=FollowerList.from_columns) as mock_from_columns:
+            with self.assertRaises(ValueError):
+                actual = instance.follower_list()
+        mock_from_columns.assert_called_once_with([4], ["ユーザー4"], ["screen name 4"])
+
+    def test_save_load(self):
+        following_list, follower_list = self._get_lists()
+        actual = Snapshot.save(self.snapshot_path, following_list, follower_list)
+        self.assertEqual(self.snapshot_path, actual)
+        self.assertFalse(self.snapshot_path.with_suffix(".tmp").exists())
+
+        instance = Snapshot.load(self.snapshot_path)
+        self.assertEqual(following_list, instance.following_list())
+        self.assertEqual(follower_list, instance.follower_list())
+        del instance
+
+        self.snapshot_path.write_bytes(b"")
+        with self.assertRaises(ValueError):
+            instance = Snapshot.load(self.snapshot_path)
+        self.snapshot_path.write_bytes(b"invalid")
+        with self.assertRaises(ValueError):
+            instance = Snapshot.load(self.snapshot_path)
+
+
+class TestSnapshotDelta(unittest.TestCase):
+    def setUp(self) -> None:
+        self.delta_path = Path("./tests/ff_getter/snapshot/ff_list_20230318.delta")
+        self.delta_path.parent.mkdir(parents=True, exist_ok=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.delta_path.parent, ignore_errors=True)
+        return super().tearDown()
+
+    def _get_lists(self) -> tuple[FollowingList, FollowerList, FollowingList, FollowerList]:
+        prev_following_list = FollowingList.create([
+            Following.create(3, "ユーザー3", "screen_name_3"),
+            Following.create(1, "ユーザー1, カンマ入り🎉", "screen_name_1"),
+            Following.create(2, "", "screen_name_2"),
+        ])
+        prev_follower_list = FollowerList.create([
+            Follower.create(2**63, "ユーザー2", "screen_name_2"),
+            Follower.create(4, "ユーザー4", "screen_name_4"),
+        ])
+        # following: 5 を追加, 3 を削除, 1 のスクリーンネームを変更
+        following_list = FollowingList.create([
+            Following.create(5, "ユーザー5", "screen_name_5"),
+            Following.create(1, "ユーザー1, カンマ入り🎉", "new_screen_name_1"),
+            Following.create(2, "", "screen_name_2"),
+        ])
+        # follower: 変更なし
+        follower_list = prev_follower_list
+        return prev_following_list, prev_follower_list, following_list, follower_list
+
+    def _get_rows(self) -> tuple[list, list, list, list]:
+        return tuple(SnapshotDelta.to_rows(record_list) for record_list in self._get_lists())
+
+    def test_to_rows(self):
+        prev_following_list, _, _, _ = self._get_lists()
+        actual = SnapshotDelta.to_rows(prev_following_list)
+        expect = [
+            (3, "ユーザー3", "screen_name_3"),
+            (1, "ユーザー1, カンマ入り🎉", "screen_name_1"),
+            (2, "", "screen_name_2"),
+        ]
+        self.assertEqual(expect, actual)
+        self.assertEqual([], SnapshotDelta.to_rows(FollowingList.create()))
+
+    def test_dumps(self):
+        prev_following_rows, prev_follower_rows, following_rows, follower_rows = self._get_rows()
+        actual = SnapshotDelta.dumps(
+            "20230317", prev_following_rows, prev_follower_rows, following_rows, follower_rows
+        )
+        header = struct.unpack_from("<8s16s2Q", actual, 0)
+        self.assertEqual((SnapshotDelta.MAGIC, b"20230317".ljust(16, b"\x00"), 1, 0), header)
+        self.assertEqual(3, struct.unpack_from("<Q", actual, struct.calcsize("<8s16s2Q"))[0])
+
+        # 全件保存するよりも小さい
+        _, _, following_list, follower_list = self._get_lists()
+        self.assertLess(len(actual), len(Snapshot.dumps(following_list, follower_list)))
+
+    def test_init(self):
+        prev_following_rows, prev_follower_rows, following_rows, follower_rows = self._get_rows()
+        buffer = SnapshotDelta.dumps(
+            "20230317", prev_following_rows, prev_follower_rows, following_rows, follower_rows
+        )
+        instance = SnapshotDelta(buffer)
+        self.assertEqual("20230317", instance.base_run_id)
+        self.assertEqual([3], instance.following_removed_ids.tolist())
+        self.assertEqual([], instance.follower_removed_ids.tolist())
+        self.assertIsInstance(instance.upserted, Snapshot)
+        self.assertEqual([5, 1], instance.upserted.following.ids.tolist())
+        self.assertEqual([], instance.upserted.follower.ids.tolist())
+
+        with self.assertRaises(ValueError):
+            instance = SnapshotDelta(buffer[:10])
+        with self.assertRaises(ValueError):
+            instance = SnapshotDelta(b"INVALID!" + buffer[8:])
+        with self.assertRaises(ValueError):
+            instance = SnapshotDelta(buffer[:-1])
+
+    def test_apply(self):
+        prev_following_rows, prev_follower_rows, following_rows, follower_rows = self._get_rows()
+        buffer = SnapshotDelta.dumps(
+            "20230317", prev_following_rows, prev_follower_rows, following_rows, follower_rows
+        )
+        actual = SnapshotDelta(buffer).apply(prev_following_rows, prev_follower_rows)
+        self.assertEqual((following_rows, follower_rows), actual)
+
+        # 差分が無い
+        buffer = SnapshotDelta.dumps("20230318", following_rows, follower_rows, following_rows, follower_rows)
+        actual = SnapshotDelta(buffer).apply(following_rows, follower_rows)
+        self.assertEqual((following_rows, follower_rows), actual)
+
+        # 前回が空
+        buffer = SnapshotDelta.dumps("", [], [], following_rows, follower_rows)
+        actual = SnapshotDelta(buffer).apply([], [])
+        self.assertEqual((following_rows, follower_rows), actual)
+
+    def test_save_load(self):
+        prev_following_rows, prev_follower_rows, following_rows, follower_rows = self._get_rows()
+        buffer = SnapshotDelta.dumps(
+            "20230317", prev_following_rows, prev_follower_rows, following_rows, follower_rows
+        )
+        actual = SnapshotDelta.save(self.delta_path, buffer)
+        self.assertEqual(self.delta_path, actual)
+        self.assertEqual(buffer, self.delta_path.read_bytes())
+        self.assertFalse(self.delta_path.with_suffix(".tmp").exists())
+
+        instance = SnapshotDelta.load(self.delta_path)
+        actual = instance.apply(prev_following_rows, prev_follower_rows)
+        self.assertEqual((following_rows, follower_rows), actual)
+
+        self.delta_path.write_bytes(b"invalid")
+        with self.assertRaises(ValueError):
+            instance = SnapshotDelta.load(self.delta_path)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -0,0 +1,132 @@
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+from mock import patch
+
+from ff_getter.snapshot import Snapshot, SnapshotSection
+from ff_getter.snapshot_chain import SnapshotChain
+from ff_getter.value_object.user_record import Follower, Following
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList
+
+
+class TestSnapshotChain(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_path = Path("./tests/ff_getter/snapshot")
+        shutil.rmtree(self.base_path, ignore_errors=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base_path, ignore_errors=True)
+        return super().tearDown()
+
+    def _get_lists(self, day: int) -> tuple[FollowingList, FollowerList]:
+        """day 日目には day 番のユーザが新たにフォローし、day - 3 番のユーザがフォロー解除する"""
+        following_list = FollowingList.create([Following.create(1, "ユーザー1", f"screen_name_1_{day // 2}")])
+        follower_list = FollowerList.create([
+            Follower.create(i, f"ユーザー{i}", f"screen_name_{i}") for i in range(day, max(day - 3, 0), -1)
+        ])
+        return following_list, follower_list
+
+    def test_get_path(self):
+        instance = SnapshotChain(self.base_path, "ff_list", 3)
+        self.assertEqual(self.base_path / "ff_list_20230318.snap", instance.get_path("20230318", True))
+        self.assertEqual(self.base_path / "ff_list_20230318.delta", instance.get_path("20230318", False))
+
+    def test_save_load(self):
+        instance = SnapshotChain(self.base_path, "ff_list", 3)
+        self.assertEqual([], instance.get_entry_list())
+        self.assertIsNone(instance.load("20230301"))
+
+        # keyframe_interval 回ごとにキーフレームを保存する
+        for day in range(1, 8):
+            actual = instance.save(f"202303{day:02}", *self._get_lists(day))
+            expect = instance.get_path(f"202303{day:02}", day % 3 == 1)
+            self.assertEqual(expect, actual)
+        expect = [(f"202303{day:02}", day % 3 == 1) for day in range(1, 8)]
+        self.assertEqual(expect, instance.get_entry_list())
+
+        # 任意の実行分を復元できる
+        for day in range(1, 8):
+            self.assertEqual(self._get_lists(day), instance.load(f"202303{day:02}"))
+        self.assertIsNone(instance.load("20230308"))
+
+        # キーフレームの実行分は組を作成せずに列のまま読み込む, 組は差分を適用する場合のみ作成する
+        with patch.object(SnapshotSection, "iter_rows", autospec=True, side_effect=SnapshotSection.iter_rows) as m:
+            self.assertEqual(self._get_lists(4), instance.load("20230304"))
+            m.assert_not_called()
+            self.assertEqual(self._get_lists(5), instance.load("20230305"))
+            m.assert_called()
+
+        # 同日の再実行は置き換える
+        actual = instance.save("20230307", *self._get_lists(8))
+        self.assertEqual(instance.get_path("20230307", True), actual)
+        self.assertEqual(self._get_lists(8), instance.load("20230307"))
+        actual = instance.save("20230306", *self._get_lists(6))
+        self.assertEqual(instance.get_path("20230306", False), actual)
+        self.assertFalse(instance.get_path("20230306", True).exists())
+
+        # 途中の差分が欠けている場合は復元できない
+        instance.get_path("20230305", False).unlink()
+        self.assertIsNone(instance.load("20230306"))
+        self.assertEqual(self._get_lists(4), instance.load("20230304"))
+        instance.get_path("20230304", True).write_bytes(b"invalid")
+        self.assertIsNone(instance.load("20230304"))
+
+    def test_save_keyframe(self):
+        # keyframe_interval が1以下の場合は毎回キーフレームを保存する
+        instance = SnapshotChain(self.base_path, "ff_list", 1)
+        for day in range(1, 4):
+            actual = instance.save(f"202303{day:02}", *self._get_lists(day))
+            self.assertEqual(instance.get_path(f"202303{day:02}", True), actual)
+
+        # 差分を適用しても並び順が一致しない場合はキーフレームを保存する
+        instance = SnapshotChain(self.base_path, "ff_list", 30)
+        following_list, follower_list = self._get_lists(3)
+        reversed_follower_list = FollowerList.create(list(reversed(list(follower_list))))
+        actual = instance.save("20230304", following_list, reversed_follower_list)
+        self.assertEqual(instance.get_path("20230304", True), actual)
+        self.assertEqual((following_list, reversed_follower_list), instance.load("20230304"))
+
+        # 前回分を復元できない場合もキーフレームを保存する
+        instance.get_path("20230304", True).write_bytes(b"invalid")
+        actual = instance.save("20230305", *self._get_lists(5))
+        self.assertEqual(instance.get_path("20230305", True), actual)
+        self.assertTrue(Snapshot.load(actual))
+        self.assertFalse(instance.get_path("20230305", False).exists())
+
+    def test_prune(self):
+        instance = SnapshotChain(self.base_path, "ff_list", 3)
+        self.assertEqual(
+            SnapshotChain.DEFAULT_KEYFRAME_INTERVAL, SnapshotChain(self.base_path, "ff_list").keyframe_interval
+        )
+        for day in range(1, 8):
+            instance.save(f"202303{day:02}", *self._get_lists(day))
+        self.assertEqual(
+            [(f"202303{day:02}", day in [1, 4, 7]) for day in range(1, 8)],
+            instance.get_entry_list(),
+        )
+
+        # 残す実行分以前にキーフレームが無い場合は削除しない
+        self.assertEqual([], instance.prune("20230100"))
+
+        # 残す実行分の復元に必要なキーフレームより前の分を削除する
+        actual = instance.prune("20230305")
+        self.assertEqual(
+            [instance.get_path("20230301", True)] + [instance.get_path(f"202303{day:02}", False) for day in [2, 3]],
+            actual,
+        )
+        self.assertEqual("20230304", instance.get_entry_list()[0][0])
+        for day in range(5, 8):
+            self.assertEqual(self._get_lists(day), instance.load(f"202303{day:02}"))
+
+        # 残す実行分がキーフレームの場合はそれより前をすべて削除する
+        instance.prune("20230307")
+        self.assertEqual([("20230307", True)], instance.get_entry_list())
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
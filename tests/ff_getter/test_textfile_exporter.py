@@ -0,0 +1,88 @@
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+from ff_getter.textfile_exporter import TextfileExporter
+
+
+class TestTextfileExporter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.textfile_path = Path("./tests/ff_getter/metrics/ff_getter.prom")
+        shutil.rmtree(self.textfile_path.parent, ignore_errors=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.textfile_path.parent, ignore_errors=True)
+        return super().tearDown()
+
+    def test_set_get(self):
+        instance = TextfileExporter("ff_getter")
+        self.assertEqual("ff_getter", instance.prefix)
+        instance.set("users", 100, "Number of users.", ff_type="following")
+        instance.set("users", 200, "Number of users.", ff_type="follower")
+        instance.set("run_success", True, "Whether the last run succeeded.")
+        self.assertEqual(100.0, instance.get("users", ff_type="following"))
+        self.assertEqual(200.0, instance.get("users", ff_type="follower"))
+        self.assertEqual(1.0, instance.get("run_success"))
+
+        # 同じ名前とラベルの組は上書きする
+        instance.set("users", 300, "Number of users.", ff_type="following")
+        self.assertEqual(300.0, instance.get("users", ff_type="following"))
+
+        self.assertIsNone(instance.get("users"))
+        self.assertIsNone(instance.get("invalid", ff_type="following"))
+
+    def test_render(self):
+        instance = TextfileExporter("ff_getter")
+        self.assertEqual("", instance.render())
+
+        instance.set("users", 200, "Number of users.", ff_type="follower")
+        instance.set("users", 100, "Number of users.", ff_type="following")
+        instance.set("stage_duration_seconds", 1.5, "Duration of each stage.", stage="fetch")
+        instance.set("run_success", 0, "Whether the last run succeeded.")
+        instance.set("escaped", float("inf"), "Escaped label.", label='back\\slash "quoted"\nnewline', other="a")
+        actual = instance.render()
+        expect = (
+            "# HELP ff_getter_escaped Escaped label.\n"
+            "# TYPE ff_getter_escaped gauge\n"
+            'ff_getter_escaped{label="back\\\\slash \\"quoted\\"\\nnewline",other="a"} +Inf\n'
+            "# HELP ff_getter_run_success Whether the last run succeeded.\n"
+            "# TYPE ff_getter_run_success gauge\n"
+            "ff_getter_run_success 0\n"
+            "# HELP ff_getter_stage_duration_seconds Duration of each stage.\n"
+            "# TYPE ff_getter_stage_duration_seconds gauge\n"
+            'ff_getter_stage_duration_seconds{stage="fetch"} 1.5\n'
+            "# HELP ff_getter_users Number of users.\n"
+            "# TYPE ff_getter_users gauge\n"
+            'ff_getter_users{ff_type="follower"} 200\n'
+            'ff_getter_users{ff_type="following"} 100\n'
+        )
+        self.assertEqual(expect, actual)
+
+        instance = TextfileExporter("ff_getter")
+        instance.set("nan", float("nan"), "NaN value.")
+        instance.set("negative", float("-inf"), "Negative infinity.")
+        self.assertIn("ff_getter_nan NaN\n", instance.render())
+        self.assertIn("ff_getter_negative -Inf\n", instance.render())
+
+    def test_write(self):
+        instance = TextfileExporter("ff_getter")
+        instance.set("users", 100, "Number of users.", ff_type="following")
+        actual = instance.write(self.textfile_path)
+        self.assertEqual(self.textfile_path, actual)
+        self.assertEqual(instance.render(), self.textfile_path.read_text(encoding="utf-8"))
+        self.assertFalse(self.textfile_path.with_suffix(".tmp").exists())
+
+        # 置き換えに失敗しても一時ファイルは残さない
+        directory_path = self.textfile_path.parent / "directory.prom"
+        directory_path.mkdir()
+        with self.assertRaises(OSError):
+            instance.write(directory_path)
+        self.assertFalse(directory_path.with_suffix(".tmp").exists())
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
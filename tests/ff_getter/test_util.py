@@ -1,10 +1,12 @@
 import sys
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import orjson
 
-from ff_getter.util import FFtype, Result, find_values
+from ff_getter.util import CompiledPath, CompiledRecord, FFtype, Result, compile_path, compile_record, find_values
+from ff_getter.util import get_compiled_path_stats
 
 
 class TestUtil(unittest.TestCase):
@@ -108,6 +110,143 @@ class TestUtil(unittest.TestCase):
         with self.assertRaises(ValueError):
             actual = find_values(sample_dict, "invalid_key", True)
 
+    def test_compile_path(self):
+        # 同じキーパスには同じインスタンスが返る
+        compiled_path = compile_path("result.legacy.screen_name")
+        self.assertIsInstance(compiled_path, CompiledPath)
+        self.assertIs(compiled_path, compile_path("result.legacy.screen_name"))
+        self.assertEqual(("result", "legacy", "screen_name"), compiled_path.keys)
+        self.assertIn(compiled_path.stats, get_compiled_path_stats())
+
+        with self.assertRaises(TypeError):
+            CompiledPath(None)
+        with self.assertRaises(ValueError):
+            CompiledPath("result..screen_name")
+        with self.assertRaises(ValueError):
+            CompiledPath("")
+
+    def test_resolve(self):
+        sample_dict = {
+            "result": {
+                "rest_id": "12345678",
+                "legacy": {
+                    "name": "dummy_name",
+                    "screen_name": "dummy_screen_name",
+                },
+            }
+        }
+        # キーパスを直接たどれる
+        instance = CompiledPath("result.legacy.screen_name")
+        actual = instance.resolve(sample_dict)
+        self.assertEqual("dummy_screen_name", actual)
+        self.assertEqual((1, 0, 0), (instance.hit_count, instance.fallback_count, instance.miss_count))
+
+        # 途中の階層が変化した場合はワイルドカード検索にフォールバックする
+        drifted_dict = {"result": {"core": {"screen_name": "drifted_screen_name"}}}
+        actual = instance.resolve(drifted_dict)
+        self.assertEqual("drifted_screen_name", actual)
+        self.assertEqual((1, 1, 0), (instance.hit_count, instance.fallback_count, instance.miss_count))
+
+        # 末尾のキーのみ存在しない場合はフォールバックしない
+        instance = CompiledPath("result.legacy.protected")
+        actual = instance.resolve(sample_dict, False)
+        self.assertEqual(False, actual)
+        self.assertEqual((0, 0, 1), (instance.hit_count, instance.fallback_count, instance.miss_count))
+        with self.assertRaises(ValueError):
+            actual = instance.resolve(sample_dict)
+
+        # フォールバックしても見つからない場合
+        instance = CompiledPath("content.itemContent.rest_id")
+        actual = instance.resolve({"content": {"value": "cursor"}}, None)
+        self.assertIsNone(actual)
+        self.assertEqual((0, 0, 1), (instance.hit_count, instance.fallback_count, instance.miss_count))
+        with self.assertRaises(ValueError):
+            actual = instance.resolve("invalid_object")
+
+        # フォールバックして複数見つかった場合
+        instance = CompiledPath("data.name")
+        with self.assertRaises(ValueError):
+            actual = instance.resolve([{"name": "name_1"}, {"name": "name_2"}])
+        actual = instance.resolve([{"name": "name_1"}, {"name": "name_2"}], None)
+        self.assertIsNone(actual)
+        self.assertEqual((0, 0, 2), (instance.hit_count, instance.fallback_count, instance.miss_count))
+
+    def test_compile_record(self):
+        instance = compile_record("result.rest_id", "result.legacy.name", "result.legacy.screen_name")
+        self.assertIsInstance(instance, CompiledRecord)
+        self.assertEqual(
+            [
+                compile_path("result.rest_id"),
+                compile_path("result.legacy.name"),
+                compile_path("result.legacy.screen_name"),
+            ],
+            instance.compiled_path_list,
+        )
+        with self.assertRaises(ValueError):
+            CompiledRecord()
+
+    def test_extract(self):
+        user_dict = {
+            "result": {
+                "rest_id": "12345678",
+                "legacy": {
+                    "name": "dummy_name",
+                    "screen_name": "dummy_screen_name",
+                },
+            }
+        }
+        paths = ["rec.result.rest_id", "rec.result.legacy.name", "rec.result.legacy.protected"]
+        instance = CompiledRecord(*paths)
+        compiled_path_list = instance.compiled_path_list
+
+        # すべての値を1回の走査で取得する, 末尾のキーのみ存在しない場合は default を返す
+        actual = instance.extract({"rec": user_dict}, (..., ..., False))
+        self.assertEqual(("12345678", "dummy_name", False), actual)
+        self.assertEqual([1, 1, 0], [p.hit_count for p in compiled_path_list])
+        self.assertEqual([0, 0, 0], [p.fallback_count for p in compiled_path_list])
+        self.assertEqual([0, 0, 1], [p.miss_count for p in compiled_path_list])
+
+        # 途中の階層が変化したキーパスのみフォールバックする
+        drifted_dict = {"rec": {"result": {"rest_id": "12345678", "core": {"name": "drifted_name"}}}}
+        actual = instance.extract(drifted_dict, (..., ..., False))
+        self.assertEqual(("12345678", "drifted_name", False), actual)
+        self.assertEqual([2, 1, 0], [p.hit_count for p in compiled_path_list])
+        self.assertEqual([0, 1, 0], [p.fallback_count for p in compiled_path_list])
+        self.assertEqual([0, 0, 2], [p.miss_count for p in compiled_path_list])
+
+        # 見つからない場合
+        actual = instance.extract({}, (None, None, None))
+        self.assertEqual((None, None, None), actual)
+        actual = instance.extract("invalid_object", (None, None, None))
+        self.assertEqual((None, None, None), actual)
+        with self.assertRaises(ValueError):
+            actual = instance.extract({"rec": user_dict})
+        with self.assertRaises(ValueError):
+            actual = instance.extract({"rec": user_dict}, (..., ...))
+
+    def test_extract_concurrent(self):
+        user_dict = {"result": {"rest_id": "12345678", "legacy": {"name": "dummy_name"}}}
+        paths = ["concurrent.result.rest_id", "concurrent.result.legacy.name", "concurrent.result.legacy.protected"]
+        thread_num, loop_num = 8, 2000
+
+        def run(_: int) -> CompiledRecord:
+            instance = compile_record(*paths)
+            for _ in range(loop_num):
+                instance.extract({"concurrent": user_dict}, (..., ..., False))
+            return instance
+
+        # 複数スレッドから同時に使っても、同じキーパスは同じインスタンスで集計は欠けない
+        with ThreadPoolExecutor(max_workers=thread_num) as executor:
+            instance_list = list(executor.map(run, range(thread_num)))
+        compiled_path_list = instance_list[0].compiled_path_list
+        for instance in instance_list:
+            self.assertEqual([id(p) for p in compiled_path_list], [id(p) for p in instance.compiled_path_list])
+        total = thread_num * loop_num
+        self.assertEqual([total, total, 0], [p.hit_count for p in compiled_path_list])
+        self.assertEqual([0, 0, total], [p.miss_count for p in compiled_path_list])
+        stats_list = [stats for stats in get_compiled_path_stats() if stats["path"].startswith("concurrent.")]
+        self.assertEqual(3, len(stats_list))
+
 
 if __name__ == "__main__":
     if sys.argv:
@@ -0,0 +1,107 @@
+import sys
+import unittest
+from array import array
+
+from ff_getter.value_object.columnar_user_record_list import ColumnarFollowerList, ColumnarFollowingList
+from ff_getter.value_object.columnar_user_record_list import ColumnarUserRecordList
+from ff_getter.value_object.user_record import Follower, Following, UserRecord
+from ff_getter.value_object.user_record_list import FollowerList, FollowingList, UserRecordList
+
+
+class TestColumnarUserRecordList(unittest.TestCase):
+    def _get_rows(self) -> list[tuple[int, str, str]]:
+        return [
+            (3, "ユーザー3", "screen_name_3"),
+            (1, "ユーザー1, カンマ入り🎉", "screen_name_1"),
+            (2, "", "screen_name_2"),
+        ]
+
+    def test_ColumnarUserRecordList(self):
+        ids = array("Q", [1, 2])
+        name_offsets = array("Q", [0, 1, 3])
+        screen_name_offsets = array("Q", [0, 1, 2])
+        instance = ColumnarUserRecordList(ids, name_offsets, b"abc", screen_name_offsets, b"xy")
+        self.assertEqual(2, len(instance))
+        self.assertEqual(ids, instance.ids)
+        self.assertEqual([UserRecord.create(1, "a", "x"), UserRecord.create(2, "bc", "y")], list(instance))
+
+        instance = ColumnarUserRecordList(array("Q"), array("Q", [0]), b"", array("Q", [0]), b"")
+        self.assertEqual(0, len(instance))
+        self.assertEqual([], list(instance))
+
+        with self.assertRaises(TypeError):
+            instance = ColumnarUserRecordList([1, 2], name_offsets, b"abc", screen_name_offsets, b"xy")
+        with self.assertRaises(TypeError):
+            instance = ColumnarUserRecordList(ids, name_offsets, "abc", screen_name_offsets, b"xy")
+        with self.assertRaises(ValueError):
+            instance = ColumnarUserRecordList(ids, array("Q", [0, 1]), b"abc", screen_name_offsets, b"xy")
+        with self.assertRaises(ValueError):
+            instance = ColumnarUserRecordList(ids, name_offsets, b"abcd", screen_name_offsets, b"xy")
+
+    def test_getitem(self):
+        instance = ColumnarUserRecordList.from_rows(self._get_rows())
+        self.assertEqual(UserRecord.create(3, "ユーザー3", "screen_name_3"), instance[0])
+        self.assertEqual(UserRecord.create(1, "ユーザー1, カンマ入り🎉", "screen_name_1"), instance[1])
+        self.assertEqual(UserRecord.create(2, "", "screen_name_2"), instance[-1])
+        with self.assertRaises(IndexError):
+            instance[3]
+        with self.assertRaises(IndexError):
+            instance[-4]
+
+    def test_from_rows(self):
+        rows = self._get_rows()
+        actual = ColumnarUserRecordList.from_rows(rows)
+        expect = [UserRecord.create(*row) for row in rows]
+        self.assertEqual(expect, list(actual))
+        self.assertEqual(array("Q", [3, 1, 2]), actual.ids)
+
+        actual = ColumnarUserRecordList.from_rows(iter(rows))
+        self.assertEqual(expect, list(actual))
+
+        actual = ColumnarUserRecordList.from_rows([])
+        self.assertEqual([], list(actual))
+
+        with self.assertRaises(TypeError):
+            actual = ColumnarUserRecordList.from_rows([("1", "ユーザー1", "screen_name_1")])
+        with self.assertRaises(ValueError):
+            actual = ColumnarUserRecordList.from_rows([(-1, "ユーザー1", "screen_name_1")])
+        with self.assertRaises(TypeError):
+            actual = ColumnarUserRecordList.from_rows([(1, None, "screen_name_1")])
+        with self.assertRaises(ValueError):
+            actual = ColumnarUserRecordList.from_rows([(1, "ユーザー1", "不正なスクリーンネーム")])
+
+    def test_create(self):
+        records = [UserRecord.create(*row) for row in self._get_rows()]
+        actual = ColumnarUserRecordList.create(records)
+        self.assertEqual(records, list(actual))
+
+        actual = ColumnarUserRecordList.create(UserRecordList.create(records))
+        self.assertEqual(records, list(actual))
+
+        actual = ColumnarUserRecordList.create()
+        self.assertEqual(0, len(actual))
+
+        with self.assertRaises(TypeError):
+            actual = ColumnarUserRecordList.create(["invalid_arg"])
+
+    def test_ff(self):
+        rows = self._get_rows()
+        actual = ColumnarFollowingList.from_rows(rows)
+        self.assertIsInstance(actual, ColumnarUserRecordList)
+        self.assertTrue(all(isinstance(r, Following) for r in actual))
+        record_list = actual.to_record_list()
+        self.assertIsInstance(record_list, FollowingList)
+        self.assertEqual(FollowingList.create([Following.create(*row) for row in rows]), record_list)
+
+        actual = ColumnarFollowerList.from_rows(rows)
+        self.assertIsInstance(actual, ColumnarUserRecordList)
+        self.assertTrue(all(isinstance(r, Follower) for r in actual))
+        record_list = actual.to_record_list()
+        self.assertIsInstance(record_list, FollowerList)
+        self.assertEqual(FollowerList.create([Follower.create(*row) for row in rows]), record_list)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -62,6 +62,31 @@ class TestDiffRecordList(unittest.TestCase):
         expect = DiffRecordList.create()
         self.assertEqual(expect, actual)
 
+        # ADD は p_list の順, REMOVE は q_list の順で並ぶ
+        # 同一IDが複数存在する場合は先に出現したものが採用される
+        user_record_4 = UserRecord.create(4, "ユーザー4", "screen_name_4")
+        user_record_5 = UserRecord.create(5, "ユーザー5", "screen_name_5")
+        user_record_1_renamed = UserRecord.create(1, "ユーザー1_renamed", "screen_name_1_renamed")
+        user_record_list_1 = UserRecordList.create([user_record_4, user_record_2, user_record_1, user_record_4])
+        user_record_list_2 = UserRecordList.create([user_record_5, user_record_2, user_record_3, user_record_5])
+        actual = DiffRecordList.create_from_diff(user_record_list_1, user_record_list_2)
+        expect = DiffRecordList.create([
+            DiffRecord.create("ADD", 4, "ユーザー4", "screen_name_4"),
+            DiffRecord.create("ADD", 1, "ユーザー1", "screen_name_1"),
+            DiffRecord.create("REMOVE", 5, "ユーザー5", "screen_name_5"),
+            DiffRecord.create("REMOVE", 3, "ユーザー3", "screen_name_3"),
+        ])
+        self.assertEqual(expect, actual)
+
+        user_record_list_1 = UserRecordList.create([user_record_1, user_record_1_renamed])
+        user_record_list_2 = UserRecordList.create([user_record_2])
+        actual = DiffRecordList.create_from_diff(user_record_list_1, user_record_list_2)
+        expect = DiffRecordList.create([
+            DiffRecord.create("ADD", 1, "ユーザー1", "screen_name_1"),
+            DiffRecord.create("REMOVE", 2, "ユーザー2", "screen_name_2"),
+        ])
+        self.assertEqual(expect, actual)
+
     def test_ff(self):
         diff_record = DiffRecord.create("ADD", 1, "ユーザー1", "screen_name_1")
 
@@ -11,6 +11,7 @@ class TestScreenName(unittest.TestCase):
 
         PATTERN = "^[0-9a-zA-Z_]+$"
         self.assertEqual(PATTERN, ScreenName.PATTERN)
+        self.assertEqual(PATTERN, ScreenName.COMPILED_PATTERN.pattern)
 
         with self.assertRaises(TypeError):
             screen_name = ScreenName(-1)
@@ -19,6 +20,23 @@ class TestScreenName(unittest.TestCase):
         with self.assertRaises(ValueError):
             screen_name = ScreenName("")
 
+    def test_validate_column(self):
+        ScreenName.validate_column(["screen_name_1", "screen_name_2", "A_1"])
+        ScreenName.validate_column([])
+
+        with self.assertRaises(TypeError):
+            ScreenName.validate_column(["screen_name_1", -1])
+        with self.assertRaises(ValueError):
+            ScreenName.validate_column(["screen_name_1", "不正なスクリーンネーム"])
+        with self.assertRaises(ValueError):
+            ScreenName.validate_column(["screen_name_1", ""])
+        with self.assertRaises(ValueError):
+            ScreenName.validate_column(["screen_name_1\nscreen_name_2"])
+
+        # 1件ずつ作成した場合と同じ結果になる
+        ScreenName("screen_name_1\n")
+        ScreenName.validate_column(["screen_name_1\n", "screen_name_2"])
+
     def test_name(self):
         name = "screen_name_1"
         screen_name = ScreenName(name)
@@ -68,6 +68,25 @@ class TestDiffRecord(unittest.TestCase):
         with self.assertRaises(ValueError):
             actual = DiffRecord.create("invalid_diff_type", user_id.id, user_name.name, screen_name.name)
 
+    def test_create_trusted(self):
+        diff_type = DiffType.ADD
+        user_id = UserId(123)
+        user_name = UserName("ユーザー1")
+        screen_name = ScreenName("screen_name_1")
+        actual = DiffRecord.create_trusted(diff_type, user_id.id, user_name.name, screen_name.name)
+        expect = DiffRecord(diff_type, user_id, user_name, screen_name)
+        self.assertEqual(expect, actual)
+        self.assertEqual(hash(expect), hash(actual))
+        self.assertEqual(expect.line, actual.line)
+
+        actual = DiffFollower.create_trusted(DiffType.REMOVE, user_id.id, user_name.name, screen_name.name)
+        self.assertIsInstance(actual, DiffFollower)
+        self.assertEqual(DiffFollower(DiffType.REMOVE, user_id, user_name, screen_name), actual)
+
+        # frozen であることは変わらない
+        with self.assertRaises(AttributeError):
+            actual._id = UserId(456)
+
     def test_ff(self):
         diff_type = DiffType.ADD
         user_id = UserId(123)
@@ -57,6 +57,24 @@ class TestUserRecord(unittest.TestCase):
         expect = UserRecord(user_id, user_name, screen_name)
         self.assertEqual(expect, actual)
 
+    def test_create_trusted(self):
+        user_id = UserId(123)
+        user_name = UserName("ユーザー1")
+        screen_name = ScreenName("screen_name_1")
+        actual = UserRecord.create_trusted(user_id.id, user_name.name, screen_name.name)
+        expect = UserRecord(user_id, user_name, screen_name)
+        self.assertEqual(expect, actual)
+        self.assertEqual(hash(expect), hash(actual))
+        self.assertEqual(expect.line, actual.line)
+
+        actual = Following.create_trusted(user_id.id, user_name.name, screen_name.name)
+        self.assertIsInstance(actual, Following)
+        self.assertEqual(Following(user_id, user_name, screen_name), actual)
+
+        # frozen であることは変わらない
+        with self.assertRaises(AttributeError):
+            actual._id = UserId(456)
+
     def test_ff(self):
         user_id = UserId(123)
         user_name = UserName("ユーザー1")
@@ -1,7 +1,9 @@
 import sys
 import unittest
 
-from ff_getter.value_object.user_record import UserRecord
+from mock import patch
+
+from ff_getter.value_object.user_record import Follower, Following, UserRecord
 from ff_getter.value_object.user_record_list import FollowerList, FollowingList, UserRecordList
 
 
@@ -43,6 +45,60 @@ class TestUserRecordList(unittest.TestCase):
         expect = UserRecordList([])
         self.assertEqual(expect, actual)
 
+        actual = UserRecordList.create([user_record, "invalid_arg"])
+        expect = UserRecordList([])
+        self.assertEqual(expect, actual)
+
+    def test_from_columns(self):
+        ids = [123, 456]
+        names = ["ユーザー1", ""]
+        screen_names = ["screen_name_1", "screen_name_2"]
+        actual = UserRecordList.from_columns(ids, names, screen_names)
+        expect = UserRecordList.create([
+            UserRecord.create(123, "ユーザー1", "screen_name_1"),
+            UserRecord.create(456, "", "screen_name_2"),
+        ])
+        self.assertEqual(expect, actual)
+
+        actual = UserRecordList.from_columns([], [], [])
+        self.assertEqual(UserRecordList.create(), actual)
+
+        actual = FollowingList.from_columns(ids, names, screen_names)
+        self.assertIsInstance(actual, FollowingList)
+        self.assertTrue(all(isinstance(r, Following) for r in actual))
+        actual = FollowerList.from_columns(ids, names, screen_names)
+        self.assertIsInstance(actual, FollowerList)
+        self.assertTrue(all(isinstance(r, Follower) for r in actual))
+
+        with self.assertRaises(ValueError):
+            actual = UserRecordList.from_columns(ids, names, screen_names[:1])
+        with self.assertRaises(TypeError):
+            actual = UserRecordList.from_columns(["123", 456], names, screen_names)
+        with self.assertRaises(ValueError):
+            actual = UserRecordList.from_columns([123, -1], names, screen_names)
+        with self.assertRaises(TypeError):
+            actual = UserRecordList.from_columns(ids, ["ユーザー1", None], screen_names)
+        with self.assertRaises(TypeError):
+            actual = UserRecordList.from_columns(ids, names, ["screen_name_1", None])
+        with self.assertRaises(ValueError):
+            actual = UserRecordList.from_columns(ids, names, ["screen_name_1", "不正なスクリーンネーム"])
+        with self.assertRaises(ValueError):
+            actual = UserRecordList.from_columns(ids, names, ["screen_name_1", "screen\nname"])
+        with self.assertRaises(ValueError):
+            actual = UserRecordList.from_columns(ids, names, ["screen_name_1", ""])
+
+    def test_create_trusted(self):
+        record_list = [UserRecord.create(123, "ユーザー1", "screen_name_1")]
+        actual = FollowingList.create_trusted(record_list)
+        self.assertIsInstance(actual, FollowingList)
+        self.assertEqual(FollowingList(record_list), actual)
+
+        # 要素ごとの検証は行わない
+        with patch.object(UserRecordList, "__post_init__") as mock_post_init:
+            actual = UserRecordList.from_columns([123], ["ユーザー1"], ["screen_name_1"])
+            mock_post_init.assert_not_called()
+        self.assertEqual(UserRecordList(record_list), actual)
+
     def test_ff(self):
         user_record = UserRecord.create(123, "ユーザー1", "screen_name_1")
 
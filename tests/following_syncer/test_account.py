@@ -90,7 +90,7 @@ class TestAccount(unittest.TestCase):
         def post_run(params: Params, instance: Account) -> None:
             config = params.account_config_dict["account"]
             screen_name = config["screen_name"]
-            mock_twitter_api.assert_called_once_with(config["ct0"], config["auth_token"], screen_name)
+            mock_twitter_api.assert_called_once_with(config["ct0"], config["auth_token"], screen_name, None)
 
             self.assertEqual(screen_name, instance.screen_name)
             self.assertEqual(mock_twitter_api.return_value, instance.twitter)
@@ -116,6 +116,14 @@ class TestAccount(unittest.TestCase):
             instance = Account(params.account_config_dict, params.account_type, params.is_dry_run)
             post_run(params, instance)
 
+        # user_store を渡した場合は TwitterAPI に渡す
+        mock_twitter_api.reset_mock()
+        config = account_config_dict["master"]["account"]
+        instance = Account(account_config_dict["master"], AccountType.master, True, "dummy_user_store")
+        mock_twitter_api.assert_called_once_with(
+            config["ct0"], config["auth_token"], config["screen_name"], "dummy_user_store"
+        )
+
     def test_create(self):
         mock_twitter_api = self.enterContext(patch("following_syncer.account.TwitterAPI"))
         account_config_dict = self._get_config_dict()
@@ -1,4 +1,5 @@
 import sys
+import threading
 import unittest
 from collections import namedtuple
 from pathlib import Path
@@ -7,6 +8,7 @@ import orjson
 from mock import MagicMock, call, patch
 
 from following_syncer.main import FollowingSyncer
+from following_syncer.rate_limit import RateLimitScheduler, SimulatedClock
 from following_syncer.user import FollowingUser, ListUser, User
 from following_syncer.util import AccountType, Result
 
@@ -14,6 +16,7 @@ from following_syncer.util import AccountType, Result
 class TestFollowingSyncer(unittest.TestCase):
     def setUp(self) -> None:
         mock_logger = self.enterContext(patch("following_syncer.main.logger"))
+        self.mock_twitter_api = self.enterContext(patch("following_syncer.main.TwitterAPI"))
         self.cache_path = Path("./tests/following_syncer/cache/following_syncer_config.json")
         self.cache_path.parent.mkdir(parents=True, exist_ok=True)
         return super().setUp()
@@ -87,6 +90,27 @@ class TestFollowingSyncer(unittest.TestCase):
         self.assertEqual(mock_load_master.return_value, instance.master)
         self.assertEqual(mock_load_slave_list.return_value, instance.slave_list)
         self.assertFalse(instance.is_dry_run)
+        self.assertIsInstance(instance.scheduler, RateLimitScheduler)
+        self.assertEqual(0.0, instance.scheduler.time_budget_sec)
+        self.mock_twitter_api.return_value.lookup_users_by_screen_name.assert_called_once_with([
+            "dummy_master_screen_name",
+            "dummy_slave1_screen_name",
+            "dummy_slave2_screen_name",
+        ])
+
+    def test_prefetch_target_user(self):
+        instance = self._get_instance()
+        self.mock_twitter_api.reset_mock()
+        mock_lookup: MagicMock = self.mock_twitter_api.return_value.lookup_users_by_screen_name
+        instance._prefetch_target_user()
+        self.mock_twitter_api.assert_called_once_with(
+            "dummy_master_ct0", "dummy_master_auth_token", "dummy_master_screen_name", instance.user_store
+        )
+        mock_lookup.assert_called_once()
+
+        # 失敗してもロードは続ける
+        mock_lookup.side_effect = ValueError
+        instance._prefetch_target_user()
 
     def test_load_master(self):
         mock_account = self.enterContext(patch("following_syncer.main.Account"))
@@ -96,7 +120,9 @@ class TestFollowingSyncer(unittest.TestCase):
         config_dict = orjson.loads(config_json_path.read_bytes())
 
         instance = FollowingSyncer(config_json_path, mock_argparse)
-        mock_account.create.assert_called_once_with(config_dict["master"], AccountType.master, instance.is_dry_run)
+        mock_account.create.assert_called_once_with(
+            config_dict["master"], AccountType.master, instance.is_dry_run, instance.user_store
+        )
         self.assertEqual(mock_account.create.return_value, instance.master)
         mock_load_slave_list.assert_called_once_with()
 
@@ -108,14 +134,41 @@ class TestFollowingSyncer(unittest.TestCase):
         config_dict = orjson.loads(config_json_path.read_bytes())
         slave_account_dict = config_dict["slave"]["account_list"]
 
+        # 並列にロードされても config に記載された順序で slave_list が作成される
+        barrier = threading.Barrier(len(slave_account_dict), timeout=5)
+
+        def account_create(account_dict: dict, account_type: AccountType, is_dry_run: bool, user_store) -> str:
+            barrier.wait()
+            return account_dict["account"]["screen_name"]
+
+        mock_account.create.side_effect = account_create
+
         instance = FollowingSyncer(config_json_path, mock_argparse)
-        self.assertEqual(
-            [call.create(account_dict, AccountType.slave, instance.is_dry_run) for account_dict in slave_account_dict],
-            mock_account.mock_calls,
+        mock_account.create.assert_has_calls(
+            [
+                call(account_dict, AccountType.slave, instance.is_dry_run, instance.user_store)
+                for account_dict in slave_account_dict
+            ],
+            any_order=True,
         )
-        self.assertEqual([mock_account.create.return_value for _ in slave_account_dict], instance.slave_list)
+        self.assertEqual(len(slave_account_dict), mock_account.create.call_count)
+        expect = [account_dict["account"]["screen_name"] for account_dict in slave_account_dict]
+        self.assertEqual(expect, instance.slave_list)
         mock_load_master.assert_called_once_with()
 
+    def test_load_worker_num(self):
+        instance = self._get_instance()
+        self.assertEqual(4, instance.load_worker_num)
+
+        instance.config_dict["option"]["load_worker_num"] = 1
+        self.assertEqual(1, instance.load_worker_num)
+
+        instance.config_dict["option"]["load_worker_num"] = 0
+        self.assertEqual(1, instance.load_worker_num)
+
+        del instance.config_dict["option"]
+        self.assertEqual(FollowingSyncer.DEFAULT_LOAD_WORKER_NUM, instance.load_worker_num)
+
     def test_deff_account(self):
         instance = self._get_instance()
         p = [self._get_user(index) for index in [0, 1]]
@@ -186,16 +239,43 @@ class TestFollowingSyncer(unittest.TestCase):
         def post_run(params: Params, instance: FollowingSyncer) -> None:
             mock_twitter: MagicMock = instance.master.twitter
             list_id = instance.master.list_id
+
+            # 同期の統計が記録される
+            labels = {"sync": "master", "account": instance.master.screen_name}
+            # 失敗した操作は次回に持ち越す
+            is_add_error = not params.is_dry_run and params.is_add_error
+            is_remove_error = not params.is_dry_run and params.is_remove_error
+            solved_num = 0 if params.is_skip else 2
+            api_call_num = 0 if params.is_skip or params.is_dry_run else 4
+            api_error_num = 2 if is_add_error or is_remove_error else 0
+            for operation, is_error in [("add", is_add_error), ("remove", is_remove_error)]:
+                self.assertEqual(
+                    0 if is_error else solved_num,
+                    instance.exporter.get("solved_users", operation=operation, **labels),
+                )
+                self.assertEqual(
+                    solved_num if is_error else 0,
+                    instance.exporter.get("pending_users", operation=operation, **labels),
+                )
+            self.assertEqual(api_call_num, instance.exporter.get("api_calls", **labels))
+            self.assertEqual(api_error_num, instance.exporter.get("api_errors", **labels))
+            list_dict = instance.config_dict["master"]["list"]
+            if not params.is_skip:
+                expect = [self._get_user(index).to_dict() for index in [1, 2]] if is_add_error else []
+                self.assertEqual(expect, list_dict["to_be_add"])
+                expect = [self._get_user(index).to_dict() for index in [6, 7]] if is_remove_error else []
+                self.assertEqual(expect, list_dict["to_be_removed"])
+
             if params.is_skip or params.is_dry_run:
                 mock_twitter.add_list_member.assert_not_called()
                 mock_twitter.remove_list_member.assert_not_called()
             else:
                 self.assertEqual(
                     [
-                        call.add_list_member(list_id, "test_user_1"),
-                        call.add_list_member(list_id, "test_user_2"),
-                        call.remove_list_member(list_id, "test_user_6"),
-                        call.remove_list_member(list_id, "test_user_7"),
+                        call.add_list_member(list_id, "1"),
+                        call.add_list_member(list_id, "2"),
+                        call.remove_list_member(list_id, "6"),
+                        call.remove_list_member(list_id, "7"),
                     ],
                     mock_twitter.mock_calls,
                 )
@@ -258,6 +338,15 @@ class TestFollowingSyncer(unittest.TestCase):
 
         def post_run(params: Params, instance: FollowingSyncer) -> None:
             mock_twitter: MagicMock = instance.slave_list[0].twitter
+
+            # 失敗した操作は次回に持ち越す
+            following_dict = instance.config_dict["slave"]["account_list"][0]["following"]
+            if not (params.is_skip or params.is_dry_run):
+                expect = [self._get_user(index).to_dict() for index in [1, 2]] if params.is_add_error else []
+                self.assertEqual(expect, following_dict["to_be_add"])
+                expect = [self._get_user(index).to_dict() for index in [6, 7]] if params.is_remove_error else []
+                self.assertEqual(expect, following_dict["to_be_removed"])
+
             if params.is_skip or params.is_dry_run:
                 mock_twitter.follow.assert_not_called()
                 mock_twitter.remove.assert_not_called()
@@ -286,6 +375,36 @@ class TestFollowingSyncer(unittest.TestCase):
             self.assertEqual(Result.success, actual)
             post_run(params, instance)
 
+    def test_following_sync_rate_limit(self):
+        instance = self._get_instance()
+        clock = SimulatedClock()
+        instance.scheduler = RateLimitScheduler(2, {"follow": 0.5}, clock)
+        instance.master.following_user = [FollowingUser.create(self._get_user(index)) for index in [1, 2, 3]]
+        for slave in instance.slave_list:
+            slave.diff_solve_each_num = 1
+            slave.following_user = []
+            slave.twitter = MagicMock()
+
+        actual = instance.following_sync()
+        self.assertEqual(Result.success, actual)
+
+        # 各 slave の follow はトークンの補充を待ちながら交互に行い、持ち時間を超える分は持ち越す
+        for i, slave in enumerate(instance.slave_list):
+            self.assertEqual([call.follow("1"), call.follow("2")], slave.twitter.mock_calls)
+            labels = {"sync": "following", "account": slave.screen_name}
+            self.assertEqual(2, instance.exporter.get("solved_users", operation="add", **labels))
+            self.assertEqual(1, instance.exporter.get("pending_users", operation="add", **labels))
+            self.assertEqual(2, instance.exporter.get("api_calls", **labels))
+            following_dict = instance.config_dict["slave"]["account_list"][i]["following"]
+            self.assertEqual([self._get_user(3).to_dict()], following_dict["to_be_add"])
+            self.assertEqual([], following_dict["to_be_removed"])
+        self.assertEqual(2.0, clock.monotonic())
+
+        config_dict = orjson.loads(self.cache_path.read_bytes())
+        self.assertEqual(
+            [self._get_user(3).to_dict()], config_dict["slave"]["account_list"][1]["following"]["to_be_add"]
+        )
+
     def test_list_sync(self):
         Params = namedtuple("Params", ["is_skip", "is_dry_run", "is_add_error", "is_remove_error"])
 
@@ -329,16 +448,25 @@ class TestFollowingSyncer(unittest.TestCase):
         def post_run(params: Params, instance: FollowingSyncer) -> None:
             mock_twitter: MagicMock = instance.slave_list[0].twitter
             list_id = instance.slave_list[0].list_id
+
+            # 失敗した操作は次回に持ち越す
+            list_dict = instance.config_dict["slave"]["account_list"][0]["list"]
+            if not (params.is_skip or params.is_dry_run):
+                expect = [self._get_user(index).to_dict() for index in [1, 2]] if params.is_add_error else []
+                self.assertEqual(expect, list_dict["to_be_add"])
+                expect = [self._get_user(index).to_dict() for index in [6, 7]] if params.is_remove_error else []
+                self.assertEqual(expect, list_dict["to_be_removed"])
+
             if params.is_skip or params.is_dry_run:
                 mock_twitter.add_list_member.assert_not_called()
                 mock_twitter.remove_list_member.assert_not_called()
             else:
                 self.assertEqual(
                     [
-                        call.add_list_member(list_id, "test_user_1"),
-                        call.add_list_member(list_id, "test_user_2"),
-                        call.remove_list_member(list_id, "test_user_6"),
-                        call.remove_list_member(list_id, "test_user_7"),
+                        call.add_list_member(list_id, "1"),
+                        call.add_list_member(list_id, "2"),
+                        call.remove_list_member(list_id, "6"),
+                        call.remove_list_member(list_id, "7"),
                     ],
                     mock_twitter.mock_calls,
                 )
@@ -367,6 +495,26 @@ class TestFollowingSyncer(unittest.TestCase):
         mock_master_sync.assert_called_once_with()
         mock_following_sync.assert_called_once_with()
         mocklist_sync.assert_called_once_with()
+        for stage_name in ["load", "master_sync", "following_sync", "list_sync"]:
+            self.assertIsNotNone(instance.exporter.get("stage_duration_seconds", stage=stage_name))
+
+        # 有効ならば node_exporter 向けのファイルを書き出す
+        textfile_path = Path("./tests/following_syncer/cache/following_syncer.prom")
+        self.addCleanup(textfile_path.unlink, missing_ok=True)
+        instance = self._get_instance()
+        instance.config_dict["textfile_exporter"] = {"is_textfile_exporter": True, "textfile_path": str(textfile_path)}
+        actual = instance.sync()
+        self.assertEqual(Result.success, actual)
+        text = textfile_path.read_text(encoding="utf-8")
+        self.assertIn("following_syncer_run_success 1\n", text)
+        self.assertIn('following_syncer_stage_duration_seconds{stage="master_sync"} ', text)
+        self.assertIn('following_syncer_users{account="master_screen_name",kind="following"} 5\n', text)
+        self.assertIn('following_syncer_users{account="slave_screen_name_0",kind="list"} 3\n', text)
+
+        # 書き出しに失敗しても同期結果には影響しない
+        instance.config_dict["textfile_exporter"]["textfile_path"] = "./tests/following_syncer/cache"
+        actual = instance.sync()
+        self.assertEqual(Result.success, actual)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+import sys
+import unittest
+
+from mock import MagicMock, call, patch
+
+from following_syncer.rate_limit import Clock, RateLimitScheduler, SimulatedClock, Task, TokenBucket
+from following_syncer.user import User
+
+
+class TestClock(unittest.TestCase):
+    def test_Clock(self):
+        instance = Clock()
+        with patch("following_syncer.rate_limit.time") as mock_time:
+            mock_time.monotonic.return_value = 1.5
+            self.assertEqual(1.5, instance.monotonic())
+            instance.sleep(2.0)
+            mock_time.sleep.assert_called_once_with(2.0)
+
+    def test_SimulatedClock(self):
+        instance = SimulatedClock()
+        self.assertEqual(0.0, instance.monotonic())
+        instance.sleep(2.5)
+        self.assertEqual(2.5, instance.monotonic())
+        instance = SimulatedClock(10.0)
+        self.assertEqual(10.0, instance.monotonic())
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refill(self):
+        instance = TokenBucket(3, 0.5, 0, 0.0)
+        instance.refill(2.0)
+        self.assertEqual(1.0, instance.tokens)
+        self.assertEqual(2.0, instance.updated_at)
+
+        # capacity を超えては補充しない
+        instance.refill(100.0)
+        self.assertEqual(3.0, instance.tokens)
+
+        # 過去の時刻では補充しない
+        instance.refill(50.0)
+        self.assertEqual(3.0, instance.tokens)
+        self.assertEqual(100.0, instance.updated_at)
+
+    def test_get_wait_sec(self):
+        instance = TokenBucket(2, 0.5, 2, 0.0)
+        self.assertEqual(0.0, instance.get_wait_sec(0.0))
+        instance.consume(0.0)
+        instance.consume(0.0)
+        self.assertEqual(0.0, instance.tokens)
+        self.assertEqual(2.0, instance.get_wait_sec(0.0))
+        self.assertEqual(1.0, instance.get_wait_sec(1.0))
+        self.assertEqual(0.0, instance.get_wait_sec(2.0))
+
+        # 補充されない場合は待っても消費できない
+        instance = TokenBucket(1, 0.0, 0, 0.0)
+        self.assertEqual(float("inf"), instance.get_wait_sec(0.0))
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        mock_logger = self.enterContext(patch("following_syncer.rate_limit.logger"))
+        return super().setUp()
+
+    def _get_task_list(self, account: str, endpoint: str, index_list: list[int]) -> list[Task]:
+        return [
+            Task(account, endpoint, User(f"{index}", f"test_user_{index}", f"test_user_{index}"), MagicMock())
+            for index in index_list
+        ]
+
+    def test_init(self):
+        instance = RateLimitScheduler()
+        self.assertEqual(RateLimitScheduler.DEFAULT_TIME_BUDGET_SEC, instance.time_budget_sec)
+        self.assertEqual(RateLimitScheduler.DEFAULT_REFILL_PER_SEC_DICT, instance.refill_per_sec_dict)
+        self.assertIsInstance(instance.clock, Clock)
+
+        clock = SimulatedClock()
+        instance = RateLimitScheduler(10, {"follow": 1.0}, clock)
+        self.assertEqual(10.0, instance.time_budget_sec)
+        self.assertEqual(1.0, instance.refill_per_sec_dict["follow"])
+        self.assertEqual(
+            RateLimitScheduler.DEFAULT_REFILL_PER_SEC_DICT["remove"], instance.refill_per_sec_dict["remove"]
+        )
+        self.assertIs(clock, instance.clock)
+
+    def test_create(self):
+        config_dict = {"option": {"rate_limit": {"time_budget_sec": 60, "refill_per_sec": {"follow": "0.5"}}}}
+        instance = RateLimitScheduler.create(config_dict)
+        self.assertEqual(60.0, instance.time_budget_sec)
+        self.assertEqual(0.5, instance.refill_per_sec_dict["follow"])
+
+        instance = RateLimitScheduler.create({})
+        self.assertEqual(RateLimitScheduler.DEFAULT_TIME_BUDGET_SEC, instance.time_budget_sec)
+        self.assertEqual(RateLimitScheduler.DEFAULT_REFILL_PER_SEC_DICT, instance.refill_per_sec_dict)
+
+    def test_get_bucket(self):
+        instance = RateLimitScheduler(10, {"follow": 1.0}, SimulatedClock(5.0))
+        instance.set_capacity("account_1", 3)
+        instance.set_capacity("account_2", 0)
+        self.assertEqual(TokenBucket(3, 1.0, 3, 5.0), instance.get_bucket("account_1", "follow"))
+        self.assertEqual(TokenBucket(1, 1.0, 1, 5.0), instance.get_bucket("account_2", "follow"))
+        self.assertEqual(
+            TokenBucket(RateLimitScheduler.DEFAULT_CAPACITY, 0.0, RateLimitScheduler.DEFAULT_CAPACITY, 5.0),
+            instance.get_bucket("account_3", "invalid"),
+        )
+        self.assertIs(instance.get_bucket("account_1", "follow"), instance.get_bucket("account_1", "follow"))
+
+    def test_drain(self):
+        clock = SimulatedClock()
+        instance = RateLimitScheduler(10, {"follow": 0.5, "remove": 1.0}, clock)
+        instance.set_capacity("account_1", 2)
+        task_list = self._get_task_list("account_1", "follow", [1, 2, 3, 4, 5, 6, 7, 8])
+        task_list += self._get_task_list("account_1", "remove", [9, 10])
+
+        mock_on_task = MagicMock(return_value=True)
+        done_list, rest_list = instance.drain(task_list, mock_on_task)
+
+        # バースト分の2件の後は2秒ごとに1件, 10秒の持ち時間で follow は 2 + 5 件
+        # remove は follow の待ち時間の間に行う
+        self.assertEqual(task_list[:7] + task_list[8:], done_list)
+        self.assertEqual(task_list[7:8], rest_list)
+        self.assertEqual(
+            [call(task) for task in task_list[:2] + task_list[8:] + task_list[2:7]], mock_on_task.mock_calls
+        )
+        self.assertEqual(10.0, clock.monotonic())
+
+        # 持ち時間は drain の呼び出しごとに与えられ、トークンバケットは引き継ぐ
+        mock_on_task.reset_mock()
+        done_list, rest_list = instance.drain(rest_list, mock_on_task)
+        self.assertEqual(task_list[7:8], done_list)
+        self.assertEqual([], rest_list)
+        mock_on_task.assert_called_once_with(task_list[7])
+        self.assertEqual(12.0, clock.monotonic())
+
+    def test_drain_interleave(self):
+        clock = SimulatedClock()
+        instance = RateLimitScheduler(4, {"follow": 0.5}, clock)
+        instance.set_capacity("account_1", 1)
+        instance.set_capacity("account_2", 1)
+        task_list = self._get_task_list("account_1", "follow", [1, 2, 3])
+        task_list += self._get_task_list("account_2", "follow", [4, 5, 6])
+
+        mock_on_task = MagicMock(return_value=True)
+        done_list, rest_list = instance.drain(task_list, mock_on_task)
+
+        # 待ち時間が同じならば task_list で先にあるものから, アカウントを交互に進める
+        self.assertEqual(
+            [call(task_list[index]) for index in [0, 3, 1, 4, 2, 5]],
+            mock_on_task.mock_calls,
+        )
+        self.assertEqual(task_list, done_list)
+        self.assertEqual([], rest_list)
+        self.assertEqual(4.0, clock.monotonic())
+
+    def test_drain_failed(self):
+        clock = SimulatedClock()
+        instance = RateLimitScheduler(0, {"follow": 0.0}, clock)
+        instance.set_capacity("account_1", 3)
+        task_list = self._get_task_list("account_1", "follow", [1, 2, 3, 4])
+
+        # 失敗した操作はトークンを消費し、持ち越した操作として返す
+        mock_on_task = MagicMock(side_effect=[True, False, True])
+        done_list, rest_list = instance.drain(task_list, mock_on_task)
+        self.assertEqual([call(task) for task in task_list[:3]], mock_on_task.mock_calls)
+        self.assertEqual([task_list[0], task_list[2]], done_list)
+        self.assertEqual([task_list[1], task_list[3]], rest_list)
+
+    def test_drain_default_budget(self):
+        clock = SimulatedClock()
+        instance = RateLimitScheduler(refill_per_sec_dict={"follow": 1.0}, clock=clock)
+        self.assertEqual(0.0, instance.time_budget_sec)
+        instance.set_capacity("account_1", 2)
+        task_list = self._get_task_list("account_1", "follow", [1, 2, 3])
+
+        # 持ち時間が0の場合は待機せず、容量の回数までの操作のみを行う
+        done_list, rest_list = instance.drain(task_list, MagicMock(return_value=True))
+        self.assertEqual(task_list[:2], done_list)
+        self.assertEqual(task_list[2:], rest_list)
+        self.assertEqual(0.0, clock.monotonic())
+
+        # 実際の時計で時刻が進んでも、待たずに行える操作は行う
+        instance = RateLimitScheduler(refill_per_sec_dict={"follow": 0.01})
+        instance.set_capacity("account_1", 2)
+        with patch("following_syncer.rate_limit.time") as mock_time:
+            mock_time.monotonic.side_effect = [float(i) for i in range(100)]
+            done_list, rest_list = instance.drain(task_list, MagicMock(return_value=True))
+        self.assertEqual(task_list[:2], done_list)
+        self.assertEqual(task_list[2:], rest_list)
+        mock_time.sleep.assert_not_called()
+
+    def test_drain_no_refill(self):
+        clock = SimulatedClock()
+        instance = RateLimitScheduler(300, {"follow": 0.0}, clock)
+        instance.set_capacity("account_1", 2)
+        task_list = self._get_task_list("account_1", "follow", [1, 2, 3])
+
+        # 補充されない場合は capacity 件で打ち切り、待機しない
+        done_list, rest_list = instance.drain(task_list, MagicMock(return_value=True))
+        self.assertEqual(task_list[:2], done_list)
+        self.assertEqual(task_list[2:], rest_list)
+        self.assertEqual(0.0, clock.monotonic())
+
+        done_list, rest_list = instance.drain([], MagicMock())
+        self.assertEqual(([], []), (done_list, rest_list))
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -0,0 +1,64 @@
+import sys
+import unittest
+
+from following_syncer.reconciler import Reconciler
+from following_syncer.user import FollowingUser, User
+
+
+class TestReconciler(unittest.TestCase):
+    def _get_user(self, index: int, protected: bool = False) -> User:
+        return User(f"{index}", f"test_user🎉_{index}", f"test_user_{index}", protected)
+
+    def test_init(self):
+        p = [self._get_user(index) for index in [0, 1]]
+        instance = Reconciler(p)
+        self.assertEqual({"0": self._get_user(0), "1": self._get_user(1)}, instance.base_index)
+
+        instance = Reconciler([])
+        self.assertEqual({}, instance.base_index)
+
+    def test_create_index(self):
+        user_1 = self._get_user(1)
+        user_1_renamed = User("1", "renamed", "renamed_screen_name")
+        actual = Reconciler.create_index([user_1, self._get_user(2), user_1_renamed])
+        expect = {"1": user_1, "2": self._get_user(2)}
+        self.assertEqual(expect, actual)
+        self.assertIs(user_1, actual["1"])
+
+    def test_diff(self):
+        p = [self._get_user(index) for index in [0, 1]]
+        q = [self._get_user(index) for index in [0, 2]]
+        actual = Reconciler(p).diff(q)
+        self.assertEqual(([self._get_user(1)], [self._get_user(2)]), actual)
+
+        p = [self._get_user(index) for index in [0, 1, 1]]
+        q = [self._get_user(index) for index in [0, 2, 2]]
+        actual = Reconciler(p).diff(q)
+        self.assertEqual(([self._get_user(1)], [self._get_user(2)]), actual)
+
+        # rest_id 順にソートされる
+        p = [self._get_user(index) for index in [5, 3, 0, 4]]
+        q = [self._get_user(index) for index in [9, 0, 7, 8]]
+        actual = Reconciler(p).diff(q)
+        expect = (
+            [self._get_user(index) for index in [3, 4, 5]],
+            [self._get_user(index) for index in [7, 8, 9]],
+        )
+        self.assertEqual(expect, actual)
+
+        # 1つの Reconciler で複数のリストと比較できる
+        reconciler = Reconciler([FollowingUser.create(self._get_user(index)) for index in [1, 2, 3]])
+        actual = reconciler.diff([FollowingUser.create(self._get_user(index)) for index in [1, 2, 3]])
+        self.assertEqual(([], []), actual)
+        actual = reconciler.diff([])
+        expect = [FollowingUser.create(self._get_user(index)) for index in [1, 2, 3]]
+        self.assertEqual((expect, []), actual)
+
+        actual = Reconciler([]).diff([])
+        self.assertEqual(([], []), actual)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
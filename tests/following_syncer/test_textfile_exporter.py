@@ -0,0 +1,91 @@
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+from following_syncer.textfile_exporter import TextfileExporter
+
+
+class TestTextfileExporter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.textfile_path = Path("./tests/following_syncer/metrics/following_syncer.prom")
+        shutil.rmtree(self.textfile_path.parent, ignore_errors=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.textfile_path.parent, ignore_errors=True)
+        return super().tearDown()
+
+    def test_set_get(self):
+        instance = TextfileExporter("following_syncer")
+        self.assertEqual("following_syncer", instance.prefix)
+        labels = {"sync": "master", "account": "master_screen_name"}
+        instance.set("solved_users", 2, "Number of users solved.", operation="add", **labels)
+        instance.set("solved_users", 1, "Number of users solved.", operation="remove", **labels)
+        instance.set("run_success", True, "Whether the last sync succeeded.")
+        self.assertEqual(2.0, instance.get("solved_users", operation="add", **labels))
+        self.assertEqual(1.0, instance.get("solved_users", operation="remove", **labels))
+        self.assertEqual(1.0, instance.get("run_success"))
+
+        # 同じ名前とラベルの組は上書きする
+        instance.set("solved_users", 3, "Number of users solved.", operation="add", **labels)
+        self.assertEqual(3.0, instance.get("solved_users", operation="add", **labels))
+
+        self.assertIsNone(instance.get("solved_users", operation="add"))
+        self.assertIsNone(instance.get("invalid", operation="add", **labels))
+
+    def test_render(self):
+        instance = TextfileExporter("following_syncer")
+        self.assertEqual("", instance.render())
+
+        instance.set("users", 200, "Number of loaded users.", account="slave_screen_name", kind="following")
+        instance.set("users", 100, "Number of loaded users.", account="master_screen_name", kind="list")
+        instance.set("stage_duration_seconds", 1.5, "Duration of each stage.", stage="master_sync")
+        instance.set("run_success", 0, "Whether the last sync succeeded.")
+        instance.set("escaped", float("inf"), "Escaped label.", label='back\\slash "quoted"\nnewline', other="a")
+        actual = instance.render()
+        expect = (
+            "# HELP following_syncer_escaped Escaped label.\n"
+            "# TYPE following_syncer_escaped gauge\n"
+            'following_syncer_escaped{label="back\\\\slash \\"quoted\\"\\nnewline",other="a"} +Inf\n'
+            "# HELP following_syncer_run_success Whether the last sync succeeded.\n"
+            "# TYPE following_syncer_run_success gauge\n"
+            "following_syncer_run_success 0\n"
+            "# HELP following_syncer_stage_duration_seconds Duration of each stage.\n"
+            "# TYPE following_syncer_stage_duration_seconds gauge\n"
+            'following_syncer_stage_duration_seconds{stage="master_sync"} 1.5\n'
+            "# HELP following_syncer_users Number of loaded users.\n"
+            "# TYPE following_syncer_users gauge\n"
+            'following_syncer_users{account="master_screen_name",kind="list"} 100\n'
+            'following_syncer_users{account="slave_screen_name",kind="following"} 200\n'
+        )
+        self.assertEqual(expect, actual)
+
+        instance = TextfileExporter("following_syncer")
+        instance.set("nan", float("nan"), "NaN value.")
+        instance.set("negative", float("-inf"), "Negative infinity.")
+        self.assertIn("following_syncer_nan NaN\n", instance.render())
+        self.assertIn("following_syncer_negative -Inf\n", instance.render())
+
+    def test_write(self):
+        instance = TextfileExporter("following_syncer")
+        instance.set(
+            "api_calls", 3, "Number of API calls to follow/remove users.", sync="list", account="slave_screen_name"
+        )
+        actual = instance.write(self.textfile_path)
+        self.assertEqual(self.textfile_path, actual)
+        self.assertEqual(instance.render(), self.textfile_path.read_text(encoding="utf-8"))
+        self.assertFalse(self.textfile_path.with_suffix(".tmp").exists())
+
+        # 置き換えに失敗しても一時ファイルは残さない
+        directory_path = self.textfile_path.parent / "directory.prom"
+        directory_path.mkdir()
+        with self.assertRaises(OSError):
+            instance.write(directory_path)
+        self.assertFalse(directory_path.with_suffix(".tmp").exists())
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -1,12 +1,14 @@
 import sys
 import unittest
 from collections import namedtuple
+from pathlib import Path
 
-from mock import MagicMock, patch
+from mock import MagicMock, call, patch
 from twitter.constants import Operation
 from twitter.util import get_headers
 
 from following_syncer.twitter_api import TwitterAPI
+from following_syncer.user_store import UserStore
 
 
 class TestTwitterAPI(unittest.TestCase):
@@ -14,8 +16,15 @@ class TestTwitterAPI(unittest.TestCase):
         mock_logger = self.enterContext(patch("following_syncer.twitter_api.logger"))
         self.mock_scraper = self.enterContext(patch("following_syncer.twitter_api.Scraper"))
         self.mock_account = self.enterContext(patch("following_syncer.twitter_api.Account"))
+        self.user_store_path = Path("./tests/following_syncer/cache/user_store.json")
+        self.user_store_path.unlink(missing_ok=True)
+        self.enterContext(patch.object(TwitterAPI, "USER_STORE_PATH", self.user_store_path))
         return super().setUp()
 
+    def tearDown(self) -> None:
+        self.user_store_path.unlink(missing_ok=True)
+        return super().tearDown()
+
     def _get_instance(self) -> TwitterAPI:
         instance = TwitterAPI("dummy_ct0", "dummy_auth_token", "dummy_target_screen_name")
         return instance
@@ -25,6 +34,14 @@ class TestTwitterAPI(unittest.TestCase):
         self.assertEqual("dummy_ct0", instance.ct0)
         self.assertEqual("dummy_auth_token", instance.auth_token)
         self.assertEqual("dummy_target_screen_name", instance.target_screen_name)
+        self.assertEqual(self.user_store_path, instance.user_store.file_path)
+
+        # user_store はインスタンスごとに作成し、渡された場合はそれを使う
+        other = TwitterAPI("dummy_ct0", "dummy_auth_token", "dummy_target_screen_name")
+        self.assertIsNot(instance.user_store, other.user_store)
+        user_store = UserStore(self.user_store_path)
+        instance = TwitterAPI("dummy_ct0", "dummy_auth_token", "dummy_target_screen_name", user_store)
+        self.assertIs(user_store, instance.user_store)
 
         with self.assertRaises(TypeError):
             instance = TwitterAPI(-1, "dummy_auth_token", "dummy_target_screen_name")
@@ -98,6 +115,80 @@ class TestTwitterAPI(unittest.TestCase):
             self.assertEqual(expect, actual)
             mock_users.assert_not_called()
 
+        # 同じ user_store を渡した他のアカウントとも共有する
+        other = TwitterAPI("dummy_ct0_2", "dummy_auth_token_2", "dummy_target_screen_name_2", instance.user_store)
+        actual = other.lookup_user_by_screen_name("DUMMY_SCREEN_NAME_0")
+        self.assertEqual({"dummy_lookup": "user_0"}, actual)
+        mock_users.assert_not_called()
+
+        # 問合せ結果はファイルに保存し、実行をまたいで再利用する
+        instance = TwitterAPI("dummy_ct0_3", "dummy_auth_token_3", "dummy_target_screen_name_3")
+        actual = instance.lookup_user_by_screen_name("dummy_screen_name_1")
+        self.assertEqual({"dummy_lookup": "user_1"}, actual)
+        mock_users.assert_not_called()
+        self.assertTrue(self.user_store_path.is_file())
+        self.assertEqual({"dummy_lookup": "user_0"}, UserStore(self.user_store_path).get("dummy_screen_name_0"))
+
+    def test_lookup_users_by_screen_name(self):
+        def get_user(screen_name: str) -> dict:
+            return {"data": {"user": {"result": {"rest_id": screen_name[-1], "legacy": {"screen_name": screen_name}}}}}
+
+        def users_return(screen_name_list):
+            # 見つからないユーザーは含まず、順序は問合せ順とは限らない
+            return [get_user(screen_name) for screen_name in reversed(screen_name_list) if screen_name != "missing"]
+
+        def users_by_ids_return(user_id_list):
+            # rest_id が 4 のユーザーは screen_name が変わっている
+            screen_name_list = [f"screen_name_{user_id}" if user_id != 4 else "renamed_4" for user_id in user_id_list]
+            user_list = [get_user(screen_name)["data"]["user"] for screen_name in screen_name_list]
+            return [{"data": {"users": list(reversed(user_list))}}]
+
+        mock_users: MagicMock = self.mock_scraper.return_value.users
+        mock_users.side_effect = users_return
+        mock_users_by_ids: MagicMock = self.mock_scraper.return_value.users_by_ids
+        mock_users_by_ids.side_effect = users_by_ids_return
+        self.enterContext(patch.object(TwitterAPI, "LOOKUP_CHUNK_SIZE", 2))
+        self.now = 0.0
+        user_store = UserStore(self.user_store_path, clock=lambda: self.now)
+        user_store.put_all({f"screen_name_{i}": get_user(f"screen_name_{i}") for i in range(3, 6)})
+        self.now = UserStore.DEFAULT_TTL_SEC + 1
+        user_store.put("screen_name_0", get_user("screen_name_0"))
+        instance = TwitterAPI("dummy_ct0", "dummy_auth_token", "dummy_target_screen_name", user_store)
+
+        screen_name_list = [
+            "screen_name_0",
+            "screen_name_1",
+            "Screen_Name_2",
+            "missing",
+            "screen_name_1",
+            "screen_name_2",
+            "screen_name_3",
+            "Screen_Name_4",
+            "screen_name_5",
+        ]
+        actual = instance.lookup_users_by_screen_name(screen_name_list)
+        expect = {
+            screen_name: get_user(screen_name.lower()) for screen_name in screen_name_list if screen_name != "missing"
+        }
+        expect["Screen_Name_2"] = get_user("Screen_Name_2")
+        expect["screen_name_2"] = get_user("Screen_Name_2")
+        expect["Screen_Name_4"] = get_user("Screen_Name_4")
+        self.assertEqual(expect, actual)
+        # 有効期限を過ぎたものは rest_id から LOOKUP_CHUNK_SIZE 件ずつまとめて問い合わせる
+        self.assertEqual([call([3, 4]), call([5])], mock_users_by_ids.mock_calls)
+        # 残りは保存済のものと重複を除いて LOOKUP_CHUNK_SIZE 件ずつ screen_name から問い合わせる
+        # screen_name が変わっていたものも含める
+        self.assertEqual(
+            [call(["screen_name_1", "Screen_Name_2"]), call(["missing", "Screen_Name_4"])],
+            mock_users.mock_calls,
+        )
+
+        # 以降は1件ずつの問合せを行わない
+        mock_users.reset_mock()
+        self.assertEqual(get_user("Screen_Name_2"), instance.lookup_user_by_screen_name("screen_name_2"))
+        self.assertEqual(get_user("screen_name_3"), instance.lookup_user_by_screen_name("screen_name_3"))
+        mock_users.assert_not_called()
+
     def test_get_likes(self):
         mock_lookup = self.enterContext(patch("following_syncer.twitter_api.TwitterAPI.lookup_user_by_screen_name"))
         mock_likes: MagicMock = self.mock_scraper.return_value.likes
@@ -297,26 +388,26 @@ class TestTwitterAPI(unittest.TestCase):
 
     def test_add_list_member(self):
         mock_lookup = self.enterContext(patch("following_syncer.twitter_api.TwitterAPI.lookup_user_by_screen_name"))
-        mock_lookup.side_effect = lambda screen_name: [{"rest_id": "11111"}]
         mock_add_list_member: MagicMock = self.mock_account.return_value.add_list_member
         mock_add_list_member.side_effect = lambda list_id, user_id: [{"user_results": "dummy_user_results"}]
         list_id = "22222"
-        screen_name = "dummy_screen_name"
+        user_id = "11111"
         instance = self._get_instance()
-        actual = instance.add_list_member(list_id, screen_name)
-        mock_add_list_member.assert_called_once_with(int(list_id), int("11111"))
+        actual = instance.add_list_member(list_id, user_id)
+        mock_add_list_member.assert_called_once_with(int(list_id), int(user_id))
+        mock_lookup.assert_not_called()
         self.assertEqual("dummy_user_results", actual)
 
     def test_remove_list_member(self):
         mock_lookup = self.enterContext(patch("following_syncer.twitter_api.TwitterAPI.lookup_user_by_screen_name"))
-        mock_lookup.side_effect = lambda screen_name: [{"rest_id": "11111"}]
         mock_remove_list_member: MagicMock = self.mock_account.return_value.remove_list_member
         mock_remove_list_member.side_effect = lambda list_id, user_id: [{"user_results": "dummy_user_results"}]
         list_id = "22222"
-        screen_name = "dummy_screen_name"
+        user_id = "11111"
         instance = self._get_instance()
-        actual = instance.remove_list_member(list_id, screen_name)
-        mock_remove_list_member.assert_called_once_with(int(list_id), int("11111"))
+        actual = instance.remove_list_member(list_id, user_id)
+        mock_remove_list_member.assert_called_once_with(int(list_id), int(user_id))
+        mock_lookup.assert_not_called()
         self.assertEqual("dummy_user_results", actual)
 
     def test_get_mute_keyword_list(self):
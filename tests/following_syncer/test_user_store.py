@@ -0,0 +1,124 @@
+import sys
+import unittest
+from pathlib import Path
+
+import orjson
+from mock import patch
+
+from following_syncer.user_store import UserStore
+
+
+class TestUserStore(unittest.TestCase):
+    def setUp(self) -> None:
+        mock_logger = self.enterContext(patch("following_syncer.user_store.logger"))
+        self.file_path = Path("./tests/following_syncer/cache/user_store.json")
+        self.file_path.unlink(missing_ok=True)
+        self.now = 0.0
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.file_path.unlink(missing_ok=True)
+        return super().tearDown()
+
+    def _get_instance(self, max_size: int = 3, ttl_sec: float = 100) -> UserStore:
+        return UserStore(self.file_path, max_size, ttl_sec, lambda: self.now)
+
+    def test_init(self):
+        instance = UserStore(self.file_path)
+        self.assertEqual(self.file_path, instance.file_path)
+        self.assertEqual(UserStore.DEFAULT_MAX_SIZE, instance.max_size)
+        self.assertEqual(UserStore.DEFAULT_TTL_SEC, instance.ttl_sec)
+        self.assertEqual(0, len(instance))
+        # 最初の参照まではファイルを読み込まない
+        self.assertFalse(self.file_path.exists())
+
+        instance = UserStore(self.file_path, 0, 10)
+        self.assertEqual(1, instance.max_size)
+        self.assertEqual(10.0, instance.ttl_sec)
+
+    def test_get_put(self):
+        instance = self._get_instance()
+        self.assertIsNone(instance.get("screen_name_1"))
+        instance.put("screen_name_1", {"rest_id": "1"})
+        self.assertEqual({"rest_id": "1"}, instance.get("screen_name_1"))
+        # screen_name は大文字小文字を区別しない
+        self.assertEqual({"rest_id": "1"}, instance.get("Screen_Name_1"))
+
+        # 上書きする
+        instance.put("screen_name_1", {"rest_id": "11"})
+        self.assertEqual({"rest_id": "11"}, instance.get("screen_name_1"))
+        self.assertEqual(1, len(instance))
+
+    def test_put_all(self):
+        instance = self._get_instance(max_size=2)
+        instance.put_all({})
+        self.assertFalse(self.file_path.exists())
+
+        with patch.object(UserStore, "_save", autospec=True, side_effect=UserStore._save) as mock_save:
+            instance.put_all({f"screen_name_{i}": {"rest_id": f"{i}"} for i in range(1, 4)})
+        mock_save.assert_called_once_with(instance)
+        self.assertEqual(2, len(instance))
+        self.assertIsNone(instance.get("screen_name_1"))
+        self.assertEqual({"rest_id": "3"}, instance.get("screen_name_3"))
+
+    def test_lru(self):
+        instance = self._get_instance(max_size=2)
+        instance.put("screen_name_1", {"rest_id": "1"})
+        instance.put("screen_name_2", {"rest_id": "2"})
+        # 参照したものは捨てられにくくなる
+        instance.get("screen_name_1")
+        instance.put("screen_name_3", {"rest_id": "3"})
+        self.assertEqual(2, len(instance))
+        self.assertEqual({"rest_id": "1"}, instance.get("screen_name_1"))
+        self.assertIsNone(instance.get("screen_name_2"))
+        self.assertEqual({"rest_id": "3"}, instance.get("screen_name_3"))
+
+    def test_ttl(self):
+        instance = self._get_instance(ttl_sec=100)
+        instance.put("screen_name_1", {"rest_id": "1"})
+        self.now = 100.0
+        self.assertEqual({"rest_id": "1"}, instance.get("screen_name_1"))
+        self.assertIsNone(instance.get_expired("screen_name_1"))
+        # 参照しても有効期限は延びない
+        self.now = 101.0
+        self.assertIsNone(instance.get("screen_name_1"))
+        # 有効期限を過ぎたものは再度問い合わせるまで残す
+        self.assertEqual({"rest_id": "1"}, instance.get_expired("Screen_Name_1"))
+        self.assertIsNone(instance.get_expired("screen_name_2"))
+        self.assertEqual(1, len(instance))
+        instance.put("screen_name_1", {"rest_id": "1"})
+        self.assertEqual({"rest_id": "1"}, instance.get("screen_name_1"))
+        self.assertIsNone(instance.get_expired("screen_name_1"))
+
+    def test_persist(self):
+        instance = self._get_instance()
+        instance.put("screen_name_1", {"rest_id": "1"})
+        instance.put("screen_name_2", {"rest_id": "2"})
+        self.assertTrue(self.file_path.is_file())
+        self.assertFalse(self.file_path.with_suffix(".tmp").exists())
+        expect = [["screen_name_1", 0.0, {"rest_id": "1"}], ["screen_name_2", 0.0, {"rest_id": "2"}]]
+        self.assertEqual(expect, orjson.loads(self.file_path.read_bytes()))
+
+        # 別のインスタンスからも参照できる
+        instance = self._get_instance()
+        self.assertEqual({"rest_id": "2"}, instance.get("screen_name_2"))
+        self.assertEqual(2, len(instance))
+
+        # 壊れたファイルは空として扱う
+        self.file_path.write_bytes(b"{invalid")
+        instance = self._get_instance()
+        self.assertIsNone(instance.get("screen_name_1"))
+        instance.put("screen_name_3", {"rest_id": "3"})
+        self.assertEqual([["screen_name_3", 0.0, {"rest_id": "3"}]], orjson.loads(self.file_path.read_bytes()))
+
+        # 書き出しに失敗してもメモリ上には保存する
+        instance = UserStore(self.file_path.parent, 3, 100, lambda: self.now)
+        instance._record_dict = {}
+        instance.put("screen_name_4", {"rest_id": "4"})
+        self.assertEqual({"rest_id": "4"}, instance.get("screen_name_4"))
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")